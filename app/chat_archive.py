@@ -0,0 +1,391 @@
+"""
+Chat-history archival and retention.
+
+chat_history gets two rows per turn and nothing reads a conversation once
+it is over, so appointments.db would grow without bound. ChatArchiver
+moves sessions idle for `archive_after_days` out of it into a separate
+SQLite file (chat_archive.db):
+
+  - one row per session holding its messages as JSON lines, zlib-compressed
+    (as app/session_store.py stores events), keyed by session_id: fetching
+    an archived transcript is a primary-key read and a decompress;
+  - rows carry `day` (UTC date of the last message), the unit retention
+    works in: days older than `retention_days` are dropped from the archive;
+  - the live rows are deleted only after the archive commit, and archiving
+    merges by message id and timestamp (ids are rowids, reused once the
+    newest rows are gone), so a crash in between archives a session twice
+    rather than losing it;
+  - the per-session summary (app/chat_sessions.py) is told how many
+    messages moved, in the same transaction as the delete, so the admin
+    session list keeps showing archived sessions until retention drops them;
+    retention clears a session's summary before deleting its archive row,
+    so a crash in between only leaves archive rows the next run deletes;
+  - the freed pages go back to the filesystem a bounded number per run
+    (PRAGMA incremental_vacuum). Files created before auto_vacuum was turned
+    on (app/database.py) need one full VACUUM first:
+    `python -m app.chat_archive --enable-incremental-vacuum`.
+
+Usage:
+    python -m app.chat_archive                     # archive, enforce retention, vacuum once
+    python -m app.chat_archive --status
+    python -m app.chat_archive --session <id>      # print an archived transcript
+    python -m app.chat_archive --enable-incremental-vacuum
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import delete, select, exists
+from sqlalchemy.orm import aliased
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.database import engine, cache_sync, DB_PATH, ChatHistory
+from app.event_hub import event_hub
+from app import chat_sessions
+
+logger = logging.getLogger(__name__)
+
+CHAT_ARCHIVE_PATH = os.getenv("CHAT_ARCHIVE_PATH", os.path.join(os.path.dirname(DB_PATH), "chat_archive.db"))
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "30"))   # 0 = never archive
+CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", "365"))          # 0 = keep archives forever
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_sessions (
+    session_id TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    first_at TEXT NOT NULL,
+    last_at TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL,
+    archived_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_archived_sessions_day ON archived_sessions (day);
+"""
+
+
+def _encode(messages):
+    raw = "\n".join(json.dumps(m, separators=(",", ":")) for m in messages).encode("utf-8")
+    return raw, zlib.compress(raw, 6)
+
+
+def _decode(codec, data):
+    if codec != "zlib":
+        raise ValueError(f"Unknown archive codec {codec!r}")
+    return [json.loads(line) for line in zlib.decompress(data).decode("utf-8").split("\n") if line]
+
+
+class ChatArchiver:
+    """
+    Moves idle sessions from chat_history to the archive, expires old
+    archive days and reclaims the freed pages. Run it from one process at a
+    time (run_periodically with a Lease); transcript() is safe anywhere.
+    """
+
+    def __init__(self, archive_path=CHAT_ARCHIVE_PATH, bind=engine, archive_after_days=CHAT_ARCHIVE_AFTER_DAYS,
+                 retention_days=CHAT_RETENTION_DAYS, batch_sessions=200, vacuum_pages=2000):
+        self.archive_path = archive_path
+        self.bind = bind
+        self.archive_after = timedelta(days=archive_after_days) if archive_after_days else None
+        self.retention = timedelta(days=retention_days) if retention_days else None
+        self.batch_sessions = batch_sessions
+        self.vacuum_pages = vacuum_pages   # per database per run, so a run never holds the lock for long
+        self._local = threading.local()
+
+        # Metrics
+        self.runs = 0
+        self.sessions_archived = 0
+        self.messages_archived = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.sessions_expired = 0
+        self.pages_vacuumed = 0
+        self.last_run_at = None
+        self.last_run_ms = 0.0
+
+    # --- ARCHIVE FILE ---
+    def _archive(self):
+        """Per-thread autocommit connection to the archive file (created on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.archive_path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect before the first table
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- ARCHIVING ---
+    def _idle_sessions(self, conn, cutoff, limit):
+        """Sessions with messages before `cutoff` and none since (both via chat_history's indexes)."""
+        old = select(ChatHistory.session_id).where(ChatHistory.timestamp < cutoff).distinct().subquery()
+        newer = aliased(ChatHistory)
+        active = exists().where(newer.session_id == old.c.session_id, newer.timestamp >= cutoff)
+        return conn.execute(select(old.c.session_id).where(~active).limit(limit)).scalars().all()
+
+    def _store(self, rows):
+        """Writes (merging with any earlier archive of the same session) in one archive transaction."""
+        sessions = {}
+        for row in rows:
+            sessions.setdefault(row.session_id, []).append({
+                "id": row.id, "role": row.role, "content": row.content, "timestamp": row.timestamp.isoformat(),
+            })
+        conn = self._archive()
+        raw_total = compressed_total = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for session_id, messages in sessions.items():
+                earlier = conn.execute(
+                    "SELECT codec, data FROM archived_sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if earlier:
+                    # chat_history ids are rowids: once archiving empties the table they are
+                    # handed out again, so the id alone does not identify a message.
+                    by_key = {(m["id"], m["timestamp"]): m for m in _decode(*earlier)}
+                    by_key.update(((m["id"], m["timestamp"]), m) for m in messages)
+                    messages = sorted(by_key.values(), key=lambda m: (m["timestamp"], m["id"]))
+                raw, data = _encode(messages)
+                conn.execute(
+                    "INSERT OR REPLACE INTO archived_sessions "
+                    "(session_id, day, first_at, last_at, messages, raw_bytes, codec, data, archived_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'zlib', ?, ?)",
+                    (session_id, messages[-1]["timestamp"][:10], messages[0]["timestamp"],
+                     messages[-1]["timestamp"], len(messages), len(raw), data, time.time()))
+                raw_total += len(raw)
+                compressed_total += len(data)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(sessions), raw_total, compressed_total
+
+    def archive(self, now=None):
+        """Moves every session idle since before now - archive_after_days; returns how many."""
+        if self.archive_after is None:
+            return 0
+        cutoff = (now or datetime.utcnow()) - self.archive_after
+        archived = 0
+        while True:
+            with self.bind.connect() as conn:
+                session_ids = self._idle_sessions(conn, cutoff, self.batch_sessions)
+                if not session_ids:
+                    break
+                rows = conn.execute(
+                    select(ChatHistory.id, ChatHistory.session_id, ChatHistory.role, ChatHistory.content,
+                           ChatHistory.timestamp)
+                    .where(ChatHistory.session_id.in_(session_ids), ChatHistory.timestamp < cutoff)
+                    .order_by(ChatHistory.session_id, ChatHistory.timestamp, ChatHistory.id)
+                ).all()
+            stored, raw, compressed = self._store(rows)
+            counts = {}
+            for row in rows:
+                counts[row.session_id] = counts.get(row.session_id, 0) + 1
+
+            # Only what was archived: a message written since the read is newer than the cutoff.
+            with self.bind.begin() as conn:
+                chat_sessions.record_archived(conn, counts)
+                conn.execute(delete(ChatHistory).where(ChatHistory.session_id.in_(session_ids),
+                                                       ChatHistory.timestamp < cutoff))
+                bumped = cache_sync.bump(conn, ["chat_history"])
+            if bumped:
+                cache_sync.committed(["chat_history"])
+            archived += stored
+            self.sessions_archived += stored
+            self.messages_archived += len(rows)
+            self.raw_bytes += raw
+            self.compressed_bytes += compressed
+            if len(session_ids) < self.batch_sessions:
+                break
+        if archived:
+            event_hub.reset_all()  # open admin tabs refetch the chat log
+        return archived
+
+    def enforce_retention(self, now=None):
+        """Drops archived sessions whose last message is older than retention_days; returns how many."""
+        if self.retention is None:
+            return 0
+        oldest_day = ((now or datetime.utcnow()) - self.retention).date().isoformat()
+        archive = self._archive()
+        expired = [row[0] for row in archive.execute(
+            "SELECT session_id FROM archived_sessions WHERE day < ?", (oldest_day,))]
+        if not expired:
+            return 0
+        # Summary first: forget_archived is idempotent, and the delete below
+        # only takes sessions it has already been told about.
+        with self.bind.begin() as conn:
+            for start in range(0, len(expired), 500):
+                chat_sessions.forget_archived(conn, expired[start:start + 500])
+        archive.execute("BEGIN IMMEDIATE")
+        try:
+            for start in range(0, len(expired), 500):
+                batch = expired[start:start + 500]
+                archive.execute(
+                    f"DELETE FROM archived_sessions WHERE day < ? AND session_id IN ({', '.join('?' * len(batch))})",
+                    (oldest_day, *batch))
+            archive.execute("COMMIT")
+        except BaseException:
+            archive.execute("ROLLBACK")
+            raise
+        self.sessions_expired += len(expired)
+        return len(expired)
+
+    # --- SPACE ---
+    @staticmethod
+    def _incremental_vacuum(conn, max_pages):
+        """Frees up to `max_pages` pages of a sqlite3 connection's file if it uses incremental auto-vacuum."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        pages = min(conn.execute("PRAGMA freelist_count").fetchone()[0], max_pages)
+        if pages:
+            # executescript steps the pragma to completion; execute() would free a single page.
+            conn.executescript(f"PRAGMA incremental_vacuum({pages});")
+        return pages
+
+    def vacuum(self):
+        """Returns freed pages of appointments.db and the archive to the filesystem; returns the count."""
+        raw = self.bind.raw_connection()
+        try:
+            freed = self._incremental_vacuum(raw.driver_connection, self.vacuum_pages)
+        finally:
+            raw.close()
+        freed += self._incremental_vacuum(self._archive(), self.vacuum_pages)
+        self.pages_vacuumed += freed
+        return freed
+
+    def run_once(self, now=None):
+        start = time.perf_counter()
+        result = {
+            "archived_sessions": self.archive(now),
+            "expired_sessions": self.enforce_retention(now),
+            "vacuumed_pages": self.vacuum(),
+        }
+        self.runs += 1
+        self.last_run_at = datetime.utcnow().isoformat()
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        return result
+
+    async def run_periodically(self, interval_seconds=3600, lease=None):
+        """
+        Runs in a worker thread every `interval_seconds` until cancelled; with
+        a `lease` (app.worker_sync.Lease) only the worker holding it does.
+        """
+        try:
+            while True:
+                try:
+                    if lease is None or await asyncio.to_thread(lease.acquire):
+                        result = await asyncio.to_thread(self.run_once)
+                        if result["archived_sessions"] or result["expired_sessions"]:
+                            logger.info(f"Chat archive: {result}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Chat archive run failed: {e}")
+                await asyncio.sleep(interval_seconds)
+        finally:
+            if lease is not None:
+                lease.release()
+
+    # --- READS ---
+    def transcript(self, session_id):
+        """The archived session as {"session_id", "first_at", "last_at", "archived_at", "messages"}, or None."""
+        row = self._archive().execute(
+            "SELECT first_at, last_at, archived_at, codec, data FROM archived_sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        first_at, last_at, archived_at, codec, data = row
+        return {
+            "session_id": session_id,
+            "first_at": first_at,
+            "last_at": last_at,
+            "archived_at": datetime.utcfromtimestamp(archived_at).isoformat(),
+            "messages": _decode(codec, data),
+        }
+
+    def summaries(self):
+        """{session_id: (messages, first_at, last_at)} of every archived session (no decompression)."""
+        return {session_id: (messages, first_at, last_at) for session_id, messages, first_at, last_at in
+                self._archive().execute("SELECT session_id, messages, first_at, last_at FROM archived_sessions")}
+
+    def stats(self):
+        sessions, messages, raw, stored, oldest, newest = self._archive().execute(
+            "SELECT COUNT(*), COALESCE(SUM(messages), 0), COALESCE(SUM(raw_bytes), 0), "
+            "COALESCE(SUM(LENGTH(data)), 0), MIN(day), MAX(day) FROM archived_sessions"
+        ).fetchone()
+        return {
+            "archive_path": self.archive_path,
+            "archive_after_days": self.archive_after.days if self.archive_after else None,
+            "retention_days": self.retention.days if self.retention else None,
+            "archived_sessions": sessions,
+            "archived_messages": messages,
+            "compression_ratio": round(raw / stored, 2) if stored else None,
+            "oldest_day": oldest,
+            "newest_day": newest,
+            "runs": self.runs,
+            "sessions_archived": self.sessions_archived,
+            "messages_archived": self.messages_archived,
+            "sessions_expired": self.sessions_expired,
+            "pages_vacuumed": self.pages_vacuumed,
+            "last_run_at": self.last_run_at,
+            "last_run_ms": round(self.last_run_ms, 1),
+        }
+
+
+def enable_incremental_vacuum(bind=engine):
+    """
+    Switches an existing appointments.db to incremental auto-vacuum. This
+    rewrites the whole file (VACUUM) under an exclusive lock: run it with
+    the app stopped.
+    """
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            return False
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+    return True
+
+
+chat_archiver = ChatArchiver()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Archive idle chat sessions from appointments.db.")
+    parser.add_argument("--status", action="store_true", help="show archive statistics")
+    parser.add_argument("--session", help="print the archived transcript of this session")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="one-off full VACUUM so freed pages can be reclaimed incrementally (app stopped)")
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum:
+        changed = enable_incremental_vacuum()
+        print("Incremental auto-vacuum enabled." if changed else "Incremental auto-vacuum was already enabled.")
+    elif args.session:
+        transcript = chat_archiver.transcript(args.session)
+        if transcript is None:
+            print(f"No archived session {args.session!r}")
+            sys.exit(1)
+        print(json.dumps(transcript, indent=2))
+    elif args.status:
+        print(json.dumps(chat_archiver.stats(), indent=2))
+    else:
+        print(json.dumps(chat_archiver.run_once(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+from app.database import async_engine, engine as sync_engine, cache_sync, ChatHistory
+from app.observability import DB_COMMIT_SECONDS
+from app.event_hub import event_hub
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ChatLogWriter:
+    """
+    Write-behind queue for ChatHistory rows.
+    The request path only calls enqueue(); a background task drains the queue
+    and writes each batch with one executemany INSERT in a single transaction.
+    A batch is flushed when it reaches `batch_size` rows or `max_delay` seconds
+    after its first row arrived, whichever comes first.
+
+    Rows written by other worker processes reach this process's admin
+    clients through publish_remote(): chat_history is append-only, so its
+    id is the row version and every id above the last one seen is new.
+    """
+
+    def __init__(self, engine=async_engine, batch_size=200, max_delay=0.25, max_retries=3,
+                 sync_engine=sync_engine, remote_limit=500):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.sync_engine = sync_engine
+        self.remote_limit = remote_limit
+        self.queue = asyncio.Queue()
+        self._task = None
+        self._seen_id = None        # highest chat_history.id already published here
+        self._own_ids = set()       # ids this process wrote above _seen_id
+        self._remote_lock = threading.Lock()
+
+        # Metrics
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self.remote_rows = 0
+
+    # --- REQUEST PATH ---
+    def enqueue(self, session_id: str, role: str, content: str):
+        """Queues one message. Never touches the disk."""
+        self.queue.put_nowait({
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "timestamp": datetime.utcnow(),
+        })
+
+    # --- LIFECYCLE ---
+    def start(self):
+        if self._task is None or self._task.done():
+            # asyncio.Queue binds to the loop it is first awaited on, so give
+            # each run its own queue (carrying over anything enqueued early).
+            pending, self.queue = self.queue, asyncio.Queue()
+            while not pending.empty():
+                self.queue.put_nowait(pending.get_nowait())
+            self._task = asyncio.create_task(self._run(), name="chat-log-writer")
+
+    async def stop(self):
+        """Flushes everything still queued, then stops the background task."""
+        if self._task is not None and not self._task.done():
+            self.queue.put_nowait(_STOP)
+            await self._task
+        self._task = None
+        # Anything enqueued after the sentinel is written here.
+        leftover = []
+        while not self.queue.empty():
+            row = self.queue.get_nowait()
+            if row is not _STOP:
+                leftover.append(row)
+        if leftover:
+            await self._flush(leftover)
+
+    # --- BACKGROUND TASK ---
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self.queue.get()
+            if row is _STOP:
+                return
+            batch = [row]
+            stopping = False
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch):
+        for attempt in range(1, self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                async with self.engine.begin() as conn:
+                    ids = (await conn.execute(insert(ChatHistory.__table__).returning(ChatHistory.id), batch)).scalars().all()
+                    bumped = await conn.run_sync(cache_sync.bump, ["chat_history"])
+            except Exception as e:
+                logger.error(f"Chat log flush failed (attempt {attempt}/{self.max_retries}): {e}")
+                await asyncio.sleep(0.1 * attempt)
+                continue
+            if bumped:
+                cache_sync.committed(["chat_history"])
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            DB_COMMIT_SECONDS.observe(elapsed_ms / 1000, source="chat_log")
+            self.batches += 1
+            self.rows_written += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            self._track_own(ids)
+            event_hub.publish("chat", {"messages": [
+                {**row, "id": id, "timestamp": row["timestamp"].isoformat()} for id, row in zip(ids, batch)
+            ]})
+            return
+        self.rows_dropped += len(batch)
+        logger.error(f"Dropped {len(batch)} chat log rows after {self.max_retries} failed flushes")
+
+    # --- OTHER WORKERS ---
+    def _track_own(self, ids):
+        with self._remote_lock:
+            if self._seen_id is None or not ids:
+                return
+            # One transaction holds the write lock, so its ids are consecutive;
+            # right after the last one seen, nobody else wrote in between.
+            if not self._own_ids and min(ids) == self._seen_id + 1 and max(ids) - min(ids) + 1 == len(ids):
+                self._seen_id = max(ids)
+            else:
+                self._own_ids.update(ids)
+
+    def mark_seen(self):
+        """Starts publish_remote() from the current end of chat_history."""
+        with self.sync_engine.connect() as conn:
+            seen_id = conn.execute(select(func.max(ChatHistory.id))).scalar() or 0
+        with self._remote_lock:
+            self._seen_id = seen_id
+            self._own_ids = {id for id in self._own_ids if id > seen_id}
+
+    def publish_remote(self, tables=None):
+        """
+        Publishes the chat rows other worker processes committed since the
+        last call (a cache_sync callback, so it runs on the polling thread).
+        Rows this process wrote were published by _flush and are skipped.
+        More than `remote_limit` new rows make the admin clients refetch
+        instead of receiving one huge event.
+        """
+        if self._seen_id is None:
+            self.mark_seen()
+            return
+        with self.sync_engine.connect() as conn:
+            rows = conn.execute(
+                select(ChatHistory.id, ChatHistory.session_id, ChatHistory.role, ChatHistory.content,
+                       ChatHistory.timestamp)
+                .where(ChatHistory.id > self._seen_id).order_by(ChatHistory.id).limit(self.remote_limit + 1)
+            ).all()
+        if not rows:
+            return
+        if len(rows) > self.remote_limit:
+            self.mark_seen()
+            event_hub.reset_all()
+            return
+        with self._remote_lock:
+            remote = [row for row in rows if row.id not in self._own_ids]
+            self._seen_id = rows[-1].id
+            self._own_ids = {id for id in self._own_ids if id > self._seen_id}
+        if remote:
+            self.remote_rows += len(remote)
+            event_hub.publish("chat", {"messages": [
+                {**row._asdict(), "timestamp": row.timestamp.isoformat()} for row in remote
+            ]})
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "remote_rows": self.remote_rows,
+        }
+
+
+chat_log_writer = ChatLogWriter()
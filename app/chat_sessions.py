@@ -0,0 +1,197 @@
+"""
+Per-session summaries of the chat log.
+
+Triggers on chat_history keep `chat_sessions` current inside the same
+transaction as every write (the chat log writer's batches, raw SQL,
+archiving), so the admin session list reads one index range instead of a
+GROUP BY over all history:
+
+    chat_sessions   session_id -> messages, archived_messages,
+                    first_at, last_at
+
+Sessions moved to the chat archive (app/chat_archive.py) keep their row:
+the archiver adds their count to archived_messages before deleting the
+live rows, and clears it before retention drops them from the archive. A
+row goes away once both counts are zero. --check and --rebuild also
+compare archived_messages with the archive file itself, so a run that
+stopped halfway is found and repaired.
+
+Usage:
+    python -m app.chat_sessions --check     # report drift from chat_history and the archive
+    python -m app.chat_sessions --rebuild   # recompute the live and archived counts
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import bindparam, text
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.database import engine, ChatSession
+
+logger = logging.getLogger(__name__)
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"  # SQLAlchemy's SQLite DateTime storage format
+
+
+# --- TRIGGERS ---
+SESSION_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_chat_sessions_insert AFTER INSERT ON chat_history
+    BEGIN
+        INSERT INTO chat_sessions (session_id, messages, archived_messages, first_at, last_at)
+        VALUES (NEW.session_id, 1, 0, COALESCE(NEW.timestamp, datetime('now')), COALESCE(NEW.timestamp, datetime('now')))
+        ON CONFLICT (session_id) DO UPDATE SET
+            messages = messages + 1,
+            first_at = MIN(first_at, excluded.first_at),
+            last_at = MAX(last_at, excluded.last_at);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_chat_sessions_delete AFTER DELETE ON chat_history
+    BEGIN
+        UPDATE chat_sessions SET messages = messages - 1 WHERE session_id = OLD.session_id;
+        DELETE FROM chat_sessions
+        WHERE session_id = OLD.session_id AND messages <= 0 AND archived_messages <= 0;
+    END
+    """,
+]
+
+
+def create(conn):
+    """Creates the table and triggers if missing (used by the migration)."""
+    ChatSession.__table__.create(conn, checkfirst=True)
+    for trigger in SESSION_TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+# --- ARCHIVE HOOKS ---
+def record_archived(conn, counts):
+    """Before the archiver deletes live rows, in its transaction: {session_id: messages archived}."""
+    if counts:
+        conn.execute(
+            text("UPDATE chat_sessions SET archived_messages = archived_messages + :n WHERE session_id = :s"),
+            [{"s": session_id, "n": n} for session_id, n in counts.items()]
+        )
+
+
+def forget_archived(conn, session_ids):
+    """
+    Sessions retention is about to drop from the archive: their archived
+    part is gone. Idempotent, so it runs (and commits) before the archive
+    delete: a crash in between leaves archive rows that the next run drops.
+    """
+    if session_ids:
+        params = {"ids": list(session_ids)}
+        conn.execute(text("UPDATE chat_sessions SET archived_messages = 0 WHERE session_id IN :ids")
+                     .bindparams(bindparam("ids", expanding=True)), params)
+        conn.execute(text("DELETE FROM chat_sessions WHERE session_id IN :ids AND messages <= 0")
+                     .bindparams(bindparam("ids", expanding=True)), params)
+
+
+# --- REBUILD ---
+_LIVE_SQL = """
+    SELECT session_id, COUNT(*), MIN(timestamp), MAX(timestamp) FROM chat_history GROUP BY session_id
+"""
+
+
+def rebuild_on(conn):
+    """Recomputes the live counts from chat_history on `conn` (archived counts are kept)."""
+    conn.exec_driver_sql("UPDATE chat_sessions SET messages = 0")
+    # WHERE true: an upsert after INSERT ... SELECT needs it (SQLite parsing rule).
+    conn.exec_driver_sql(f"""
+        WITH live(session_id, n, first_at, last_at) AS ({_LIVE_SQL})
+        INSERT INTO chat_sessions (session_id, messages, archived_messages, first_at, last_at)
+        SELECT session_id, n, 0, first_at, last_at FROM live WHERE true
+        ON CONFLICT (session_id) DO UPDATE SET
+            messages = excluded.messages,
+            first_at = MIN(first_at, excluded.first_at),
+            last_at = MAX(last_at, excluded.last_at)
+    """)
+    conn.exec_driver_sql("DELETE FROM chat_sessions WHERE messages <= 0 AND archived_messages <= 0")
+
+
+def reconcile_archived_on(conn, archived):
+    """
+    Sets archived_messages from the archive itself: `archived` is
+    {session_id: (messages, first_at, last_at)} (ChatArchiver.summaries()).
+    """
+    conn.exec_driver_sql("UPDATE chat_sessions SET archived_messages = 0 WHERE archived_messages != 0")
+    if archived:
+        conn.execute(text("""
+            INSERT INTO chat_sessions (session_id, messages, archived_messages, first_at, last_at)
+            VALUES (:s, 0, :n, :first_at, :last_at)
+            ON CONFLICT (session_id) DO UPDATE SET
+                archived_messages = excluded.archived_messages,
+                first_at = MIN(first_at, excluded.first_at),
+                last_at = MAX(last_at, excluded.last_at)
+        """), [{"s": session_id, "n": n, "first_at": _stored(first_at), "last_at": _stored(last_at)}
+               for session_id, (n, first_at, last_at) in archived.items()])
+    conn.exec_driver_sql("DELETE FROM chat_sessions WHERE messages <= 0 AND archived_messages <= 0")
+
+
+def _stored(iso):
+    return datetime.fromisoformat(iso).strftime(FMT)
+
+
+def rebuild(bind=engine, archived=None):
+    """Recomputes the live counts, and the archived ones too when `archived` is given."""
+    with bind.begin() as conn:
+        rebuild_on(conn)
+        if archived is not None:
+            reconcile_archived_on(conn, archived)
+    logger.info("Chat session summaries rebuilt")
+
+
+def check(bind=engine):
+    """Sessions whose live count differs from chat_history, as (session_id, stored, actual)."""
+    with bind.connect() as conn:
+        return [tuple(row) for row in conn.exec_driver_sql(f"""
+            WITH live(session_id, n, first_at, last_at) AS ({_LIVE_SQL})
+            SELECT s.session_id, s.messages, COALESCE(l.n, 0) FROM chat_sessions s
+            LEFT JOIN live l ON l.session_id = s.session_id WHERE s.messages != COALESCE(l.n, 0)
+            UNION ALL
+            SELECT l.session_id, NULL, l.n FROM live l
+            WHERE NOT EXISTS (SELECT 1 FROM chat_sessions s WHERE s.session_id = l.session_id)
+        """)]
+
+
+def check_archived(archived, bind=engine):
+    """Sessions whose archived count differs from the archive, as (session_id, stored, actual)."""
+    with bind.connect() as conn:
+        stored = dict(conn.exec_driver_sql(
+            "SELECT session_id, archived_messages FROM chat_sessions WHERE archived_messages != 0").all())
+    actual = {session_id: n for session_id, (n, _, _) in archived.items()}
+    return [(session_id, stored.get(session_id), actual.get(session_id, 0))
+            for session_id in sorted(stored.keys() | actual.keys())
+            if stored.get(session_id, 0) != actual.get(session_id, 0)]
+
+
+def main():
+    from app.chat_archive import chat_archiver
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Check or rebuild the chat session summaries.")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+    archived = chat_archiver.summaries()
+    if args.rebuild:
+        rebuild(archived=archived)
+    drift = check()
+    for session_id, stored, actual in drift[:50]:
+        print(f"  {session_id}: stored {stored}, actual {actual}")
+    archived_drift = check_archived(archived)
+    for session_id, stored, actual in archived_drift[:50]:
+        print(f"  {session_id}: stored {stored} archived, archive holds {actual}")
+    print(f"{len(drift)} session(s) drifted from chat_history, {len(archived_drift)} from the archive")
+    sys.exit(1 if (drift or archived_drift) and args.check else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Materialized dashboard aggregates.
+
+Triggers on doctors, departments and appointments keep two tables current
+inside the same transaction as every write, whoever makes it (ORM, raw SQL,
+migrations):
+
+    stats_counters       name -> running total (doctors, departments,
+                         appointments, confirmed, cancelled, revenue)
+    doctor_daily_stats   (day, doctor_id) -> booked, cancelled,
+                         booked_minutes, revenue
+
+so the dashboard reads a handful of rows however many appointments exist.
+Utilization divides booked minutes by the doctor's own bookable minutes
+that day (their slot starts in app/tools/schedule.py times the slot
+length), so part-time days and days off are not measured against the
+whole clinic day. An appointment's revenue is the doctor's consultation fee at write time;
+rebuild() recomputes everything from the source tables with current fees.
+
+Usage:
+    python -m app.dashboard_stats --check     # report drift from the source tables
+    python -m app.dashboard_stats --rebuild   # recompute both tables
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import select
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.database import engine, Doctor, StatsCounter, DoctorDailyStats
+
+logger = logging.getLogger(__name__)
+
+COUNT_NAMES = ("doctors", "departments", "appointments", "confirmed", "cancelled")
+
+
+# --- TRIGGERS ---
+def _appointment_delta(row, sign):
+    """SQL adding (sign=1) or removing (sign=-1) one appointment row (NEW/OLD) from both tables."""
+    confirmed = f"({row}.status = 'Confirmed')"
+    cancelled = f"({row}.status = 'Cancelled')"
+    fee = f"COALESCE((SELECT consultation_fee FROM doctors WHERE id = {row}.doctor_id), 0)"
+    minutes = f"CAST(round((julianday({row}.end_time) - julianday({row}.start_time)) * 1440) AS INTEGER)"
+    return f"""
+        INSERT INTO stats_counters (name, value) VALUES
+            ('appointments', {sign}), ('confirmed', {sign} * {confirmed}),
+            ('cancelled', {sign} * {cancelled}), ('revenue', {sign} * {confirmed} * {fee})
+        ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        INSERT INTO doctor_daily_stats (day, doctor_id, booked, cancelled, booked_minutes, revenue)
+        SELECT date({row}.start_time), {row}.doctor_id, {sign} * {confirmed}, {sign} * {cancelled},
+               {sign} * {confirmed} * {minutes}, {sign} * {confirmed} * {fee}
+        WHERE {row}.doctor_id IS NOT NULL
+        ON CONFLICT (day, doctor_id) DO UPDATE SET
+            booked = booked + excluded.booked,
+            cancelled = cancelled + excluded.cancelled,
+            booked_minutes = booked_minutes + excluded.booked_minutes,
+            revenue = revenue + excluded.revenue;
+    """
+
+
+def _count_delta(name, sign):
+    return f"""
+        INSERT INTO stats_counters (name, value) VALUES ('{name}', {sign})
+        ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+    """
+
+
+STATS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_appointments_insert AFTER INSERT ON appointments
+    BEGIN {_appointment_delta("NEW", 1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_appointments_update
+    AFTER UPDATE OF doctor_id, start_time, end_time, status ON appointments
+    BEGIN {_appointment_delta("OLD", -1)} {_appointment_delta("NEW", 1)} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_appointments_delete AFTER DELETE ON appointments
+    BEGIN {_appointment_delta("OLD", -1)} END
+    """,
+]
+for _table in ("doctors", "departments"):
+    STATS_TRIGGERS += [
+        f"CREATE TRIGGER IF NOT EXISTS trg_stats_{_table}_insert AFTER INSERT ON {_table} BEGIN {_count_delta(_table, 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_stats_{_table}_delete AFTER DELETE ON {_table} BEGIN {_count_delta(_table, -1)} END",
+    ]
+
+
+# --- REBUILD ---
+# The aggregates computed from scratch; rebuild() stores them, check() diffs against them.
+_COUNTERS_SQL = """
+    SELECT 'doctors', COUNT(*) FROM doctors
+    UNION ALL SELECT 'departments', COUNT(*) FROM departments
+    UNION ALL SELECT 'appointments', COUNT(*) FROM appointments
+    UNION ALL SELECT 'confirmed', COUNT(*) FROM appointments WHERE status = 'Confirmed'
+    UNION ALL SELECT 'cancelled', COUNT(*) FROM appointments WHERE status = 'Cancelled'
+    UNION ALL SELECT 'revenue', COALESCE(SUM(d.consultation_fee), 0)
+        FROM appointments a JOIN doctors d ON d.id = a.doctor_id WHERE a.status = 'Confirmed'
+"""
+_DAILY_SQL = """
+    SELECT date(a.start_time), a.doctor_id,
+           SUM(a.status = 'Confirmed'), SUM(a.status = 'Cancelled'),
+           SUM(CASE WHEN a.status = 'Confirmed'
+               THEN CAST(round((julianday(a.end_time) - julianday(a.start_time)) * 1440) AS INTEGER) ELSE 0 END),
+           SUM(CASE WHEN a.status = 'Confirmed' THEN COALESCE(d.consultation_fee, 0) ELSE 0 END)
+    FROM appointments a LEFT JOIN doctors d ON d.id = a.doctor_id
+    WHERE a.doctor_id IS NOT NULL
+    GROUP BY 1, 2
+"""
+
+
+def create(conn):
+    """Creates the tables and triggers if missing (used by the migration)."""
+    for model in (StatsCounter, DoctorDailyStats):
+        model.__table__.create(conn, checkfirst=True)
+    for trigger in STATS_TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+def rebuild_on(conn):
+    """Recomputes both tables on `conn`, inside the caller's transaction."""
+    conn.exec_driver_sql("DELETE FROM stats_counters")
+    conn.exec_driver_sql("DELETE FROM doctor_daily_stats")
+    conn.exec_driver_sql(f"INSERT INTO stats_counters (name, value) {_COUNTERS_SQL}")
+    conn.exec_driver_sql(
+        f"INSERT INTO doctor_daily_stats (day, doctor_id, booked, cancelled, booked_minutes, revenue) {_DAILY_SQL}"
+    )
+
+
+def rebuild(bind=engine):
+    with bind.begin() as conn:
+        rebuild_on(conn)
+    logger.info("Dashboard stats rebuilt")
+
+
+def check(bind=engine):
+    """Rows where the materialized tables differ from a fresh aggregate, as (table, row) pairs."""
+    with bind.connect() as conn:
+        counters = f"""
+            WITH fresh(name, value) AS ({_COUNTERS_SQL})
+            SELECT 'stats_counters', * FROM (
+                SELECT name, round(value, 2) FROM stats_counters WHERE value != 0
+                EXCEPT SELECT name, round(value, 2) FROM fresh WHERE value != 0
+            )
+            UNION ALL
+            SELECT 'stats_counters (fresh)', * FROM (
+                SELECT name, round(value, 2) FROM fresh WHERE value != 0
+                EXCEPT SELECT name, round(value, 2) FROM stats_counters WHERE value != 0
+            )
+        """
+        # A drifted row shows up once with its stored values and once with the fresh ones.
+        stored = "SELECT day, doctor_id, booked, cancelled, booked_minutes, round(revenue, 2) FROM doctor_daily_stats"
+        fresh = "SELECT day, doctor_id, booked, cancelled, booked_minutes, round(revenue, 2) FROM fresh"
+        nonzero = "WHERE booked != 0 OR cancelled != 0 OR booked_minutes != 0 OR revenue != 0"
+        daily = f"""
+            WITH fresh(day, doctor_id, booked, cancelled, booked_minutes, revenue) AS ({_DAILY_SQL})
+            SELECT 'doctor_daily_stats', * FROM ({stored} {nonzero} EXCEPT {fresh} {nonzero})
+            UNION ALL
+            SELECT 'doctor_daily_stats (fresh)', * FROM ({fresh} {nonzero} EXCEPT {stored} {nonzero})
+        """
+        return [(row[0], tuple(row[1:])) for sql in (counters, daily) for row in conn.exec_driver_sql(sql)]
+
+
+# --- READS ---
+async def read_counters(db):
+    """{name: total} from stats_counters; a handful of rows."""
+    rows = (await db.execute(select(StatsCounter.name, StatsCounter.value))).all()
+    totals = {name: 0 for name in COUNT_NAMES}
+    totals["revenue"] = 0.0
+    for name, value in rows:
+        totals[name] = int(value) if name in COUNT_NAMES else round(value, 2)
+    return totals
+
+
+def _capacity_minutes(schedules, keys):
+    return {(doctor_id, day): schedules.capacity_minutes(doctor_id, day) for doctor_id, day in keys}
+
+
+async def read_utilization(db, schedules, start=None, days=7):
+    """
+    Per doctor per day rollups for [start, start + days), with utilization
+    of that doctor's bookable minutes (`schedules` is a DoctorSchedules).
+    Utilization is None on a day the doctor has no slots but bookings.
+    """
+    start = start or date.today()
+    stats = DoctorDailyStats
+    rows = (await db.execute(
+        select(stats.day, stats.doctor_id, Doctor.name, stats.booked, stats.cancelled, stats.booked_minutes, stats.revenue)
+        .join(Doctor, Doctor.id == stats.doctor_id)
+        .where(stats.day >= start, stats.day < start + timedelta(days=days))
+        .where((stats.booked != 0) | (stats.cancelled != 0))
+        .order_by(stats.day, stats.doctor_id)
+    )).all()
+    # The schedule window may need a (synchronous) reload.
+    capacity = await asyncio.to_thread(_capacity_minutes, schedules, {(row.doctor_id, row.day) for row in rows})
+    return [{
+        "day": row.day.isoformat(),
+        "doctor_id": row.doctor_id,
+        "doctor": row.name,
+        "booked": row.booked,
+        "cancelled": row.cancelled,
+        "booked_hours": round(row.booked_minutes / 60, 2),
+        "revenue": round(row.revenue, 2),
+        "capacity_hours": round(capacity[row.doctor_id, row.day] / 60, 2),
+        "utilization": round(row.booked_minutes / capacity[row.doctor_id, row.day], 3)
+                       if capacity[row.doctor_id, row.day] else None,
+    } for row in rows]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Check or rebuild the materialized dashboard stats.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--check", action="store_true", help="list rows that differ from the source tables")
+    group.add_argument("--rebuild", action="store_true", help="recompute the stats tables from scratch")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild()
+        print("Dashboard stats rebuilt.")
+        return
+    drift = check()
+    for table, row in drift:
+        print(f"{table}: {row}")
+    print(f"{len(drift)} drifted row(s)." if drift else "Dashboard stats match the source tables.")
+    sys.exit(1 if drift else 0)
+
+
+if __name__ == "__main__":
+    main()
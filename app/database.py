@@ -1,15 +1,96 @@
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text, Numeric
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Date, Float, Boolean, ForeignKey, Text, Numeric, Index, DDL, event, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.tools.doctor_index import DoctorIndex
+from app.event_hub import event_hub
+from app.worker_sync import CacheSync
 
 # 1. Setup SQLite
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "appointments.db")
+DB_PATH = os.getenv("APPOINTMENTS_DB_PATH", os.path.join(BASE_DIR, "..", "appointments.db"))
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Every worker process (uvicorn --workers N / gunicorn) opens its own pools on
+# the same file. WAL lets readers run alongside the single writer, and
+# busy_timeout makes a writer wait for the lock instead of failing at once.
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KIB = int(os.getenv("SQLITE_CACHE_KIB", "16384"))   # page cache per connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))                # per process, per engine
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "8"))
+# SQLite has one writer at a time, so more write connections only queue on its lock.
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "2"))
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",      # durable at checkpoints; safe from corruption in WAL mode
+    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+    f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    # New files only (existing ones need one VACUUM, see app/chat_archive.py): pages freed
+    # by archiving chat history can then be returned a few at a time. Setting it takes the
+    # write lock, so it is skipped on existing files, where it would make every connection
+    # opened during someone else's write wait out the busy timeout for nothing.
+    cursor.execute("PRAGMA page_count")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False},
+                       pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+event.listen(engine, "connect", _configure_sqlite)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async twin of the engine above (aiosqlite), used by the FastAPI handlers so
+# DB calls never block the event loop. Handlers only read through it: concurrent
+# AsyncSession commits collide on SQLite's write lock and back off in its busy
+# handler (sleeps of up to 100 ms), a worse p99 than queueing them. Chat turns
+# are written by the ChatLogWriter's single task instead (benchmarks/bench_async_db.py).
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+event.listen(async_engine.sync_engine, "connect", _configure_sqlite)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Booking writes check a slot and then claim it, so their transactions take
+# SQLite's write lock up front (BEGIN IMMEDIATE) instead of on first write:
+# two check-then-insert transactions can then never interleave.
+write_engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False},
+                             pool_size=DB_WRITE_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
+@event.listens_for(write_engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    _configure_sqlite(dbapi_connection, connection_record)
+    dbapi_connection.isolation_level = None  # we emit BEGIN ourselves
+
+@event.listens_for(write_engine, "begin")
+def _begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
+def _dispose_pools_after_fork():
+    # A forked worker (gunicorn --preload) must not reuse the parent's SQLite
+    # connections; close=False leaves them open for the parent.
+    for pooled in (engine, write_engine, async_engine.sync_engine):
+        pooled.dispose(close=False)
+
+os.register_at_fork(after_in_child=_dispose_pools_after_fork)
+
+# Cross-process cache invalidation (see app/worker_sync.py).
+cache_sync = CacheSync(DB_PATH, interval_seconds=float(os.getenv("CACHE_SYNC_INTERVAL", "1.0")))
+cache_sync.watch_sessions()
+
 Base = declarative_base()
 
 # 2. Define Models
@@ -29,6 +110,7 @@ class Doctor(Base):
     consultation_fee = Column(Numeric(10, 2), nullable=False)
     availability_text = Column(String)
     department_id = Column(Integer, ForeignKey("departments.id"))
+    calendar_id = Column(String)  # Google calendar for this doctor's events; NULL = the shared 'primary'
     
     department = relationship("Department", back_populates="doctors")
     appointments = relationship("Appointment", back_populates="doctor")
@@ -50,17 +132,199 @@ class Appointment(Base):
     gcal_event_id = Column(String)
     source_session_id = Column(String) 
     created_at = Column(DateTime, default=datetime.utcnow)
+    idempotency_key = Column(String)  # Set by app/reservations.py; also the Google event ID
+    calendar_status = Column(String)  # Set by the calendar outbox: "synced", or "failed" once it gives up
     
     doctor = relationship("Doctor", back_populates="appointments")
 
+    __table_args__ = (
+        Index("ix_appointments_doctor_start", "doctor_id", "start_time"),
+        # Availability windows start today, so `end_time > start` only walks upcoming bookings.
+        Index("ix_appointments_status_end", "status", "end_time"),
+        Index("ix_appointments_source_session", "source_session_id"),
+        Index("ix_appointments_start_time", "start_time"),
+        # A retried booking call finds the appointment it already made.
+        Index("ux_appointments_idempotency", "idempotency_key", unique=True, sqlite_where=text("status = 'Confirmed'")),
+    )
+
+# SQLite has no exclusion constraints, so overlapping confirmed bookings for a
+# doctor are rejected by triggers. Each check is one index seek: if confirmed
+# bookings never overlap, the only one that can collide with [start, end) is
+# the latest one starting before `end`.
+APPOINTMENT_OVERLAP_MESSAGE = "appointment overlaps a confirmed booking for this doctor"
+APPOINTMENT_OVERLAP_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_appointments_no_overlap_insert
+    BEFORE INSERT ON appointments
+    WHEN NEW.status = 'Confirmed' AND (
+        SELECT end_time FROM appointments
+        WHERE doctor_id = NEW.doctor_id AND status = 'Confirmed' AND start_time < NEW.end_time
+        ORDER BY start_time DESC LIMIT 1
+    ) > NEW.start_time
+    BEGIN
+        SELECT RAISE(ABORT, '{APPOINTMENT_OVERLAP_MESSAGE}');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_appointments_no_overlap_update
+    BEFORE UPDATE OF doctor_id, start_time, end_time, status ON appointments
+    WHEN NEW.status = 'Confirmed' AND (
+        SELECT end_time FROM appointments
+        WHERE doctor_id = NEW.doctor_id AND status = 'Confirmed' AND start_time < NEW.end_time AND id != NEW.id
+        ORDER BY start_time DESC LIMIT 1
+    ) > NEW.start_time
+    BEGIN
+        SELECT RAISE(ABORT, '{APPOINTMENT_OVERLAP_MESSAGE}');
+    END
+    """,
+]
+for _trigger in APPOINTMENT_OVERLAP_TRIGGERS:
+    event.listen(Appointment.__table__, "after_create", DDL(_trigger))
+
+class BookingConflictError(Exception):
+    """The doctor already has a confirmed booking overlapping the requested time."""
+
+class OutsideScheduleError(BookingConflictError):
+    """The requested time is not a bookable slot in the doctor's schedule."""
+
+class BookingInProgressError(BookingConflictError):
+    """An identical booking request still holds the slot; the same call can be retried shortly."""
+
+class ScheduleRule(Base):
+    """Weekly working hours: `doctor_id` sees patients on `weekday` (0 = Monday) in `slot_minutes` slots."""
+    __tablename__ = "schedule_rules"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    weekday = Column(Integer, nullable=False)
+    start_minute = Column(Integer, nullable=False)   # minutes after midnight, IST
+    end_minute = Column(Integer, nullable=False)
+    slot_minutes = Column(Integer, nullable=False, default=60)
+    valid_from = Column(Date)                        # NULL = open-ended
+    valid_until = Column(Date)
+
+    __table_args__ = (Index("ix_schedule_rules_doctor", "doctor_id", "weekday"),)
+
+class ScheduleException(Base):
+    """
+    One-off change to a day: time off (available=False; whole day when the
+    minutes are NULL) or extra hours (available=True). doctor_id NULL
+    applies to every doctor (clinic holidays).
+    """
+    __tablename__ = "schedule_exceptions"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id"))
+    day = Column(Date, nullable=False)
+    start_minute = Column(Integer)
+    end_minute = Column(Integer)
+    available = Column(Boolean, nullable=False, default=False)
+    slot_minutes = Column(Integer, nullable=False, default=60)
+    reason = Column(String)
+
+    __table_args__ = (Index("ix_schedule_exceptions_day", "day", "doctor_id"),)
+
+class SlotHold(Base):
+    """Short-lived claim on a doctor's slot while a booking is confirmed (see app/reservations.py)."""
+    __tablename__ = "slot_holds"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    idempotency_key = Column(String, nullable=False, unique=True)
+    doctor_id = Column(Integer, nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_slot_holds_doctor_start", "doctor_id", "start_time"),)
+
+class CalendarOutboxEntry(Base):
+    """Calendar write committed with its appointment, pushed to Google by app/tools/calendar_outbox.py."""
+    __tablename__ = "calendar_outbox"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    appointment_id = Column(Integer, nullable=False)
+    event_id = Column(String, nullable=False)        # deterministic Google event ID
+    calendar_id = Column(String)                     # the doctor's calendar; NULL = 'primary'
+    payload = Column(Text, nullable=False)           # event body (JSON)
+    status = Column(String, nullable=False, default="pending")  # pending, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+    last_error = Column(Text)
+
+    __table_args__ = (Index("ix_calendar_outbox_status_due", "status", "next_attempt_at"),)
+
 class ChatHistory(Base):
     __tablename__ = "chat_history"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(String, index=True, nullable=False)
+    session_id = Column(String, nullable=False)
     role = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_chat_history_session_timestamp", "session_id", "timestamp"),
+        Index("ix_chat_history_timestamp", "timestamp"),
+    )
+
+class ChatSession(Base):
+    """Per-session summary of chat_history, kept current by triggers (app/chat_sessions.py)."""
+    __tablename__ = "chat_sessions"
+    session_id = Column(String, primary_key=True)
+    messages = Column(Integer, nullable=False, default=0)            # rows in chat_history
+    archived_messages = Column(Integer, nullable=False, default=0)   # moved to the chat archive
+    first_at = Column(DateTime, nullable=False)
+    last_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_chat_sessions_last_at", "last_at", "session_id"),)
+
+class CalendarEvent(Base):
+    """Local mirror of Google Calendar events, kept current by app/tools/calendar_sync.py."""
+    __tablename__ = "calendar_events"
+    id = Column(String, primary_key=True)            # Google event ID
+    calendar_id = Column(String, primary_key=True)
+    summary = Column(String)
+    description = Column(Text)
+    start_time = Column(DateTime, nullable=False)    # Naive IST
+    end_time = Column(DateTime, nullable=False)
+    transparency = Column(String)                    # "transparent" events don't block time
+    updated = Column(String)
+
+    __table_args__ = (Index("ix_calendar_events_calendar_start", "calendar_id", "start_time"),)
+
+class CalendarSyncState(Base):
+    __tablename__ = "calendar_sync_state"
+    calendar_id = Column(String, primary_key=True)
+    sync_token = Column(String)
+    last_full_sync = Column(DateTime)
+    last_sync = Column(DateTime)
+
+class CacheVersion(Base):
+    """Write counter per table, bumped in the writing transaction; polled by app/worker_sync.py."""
+    __tablename__ = "cache_versions"
+    name = Column(String, primary_key=True)          # table name
+    version = Column(Integer, nullable=False, default=0)
+
+class WorkerLease(Base):
+    """Which worker process currently runs a once-per-deployment background job."""
+    __tablename__ = "worker_leases"
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(Float, nullable=False)       # unix time
+
+class StatsCounter(Base):
+    """Running totals for the admin dashboard, maintained by the triggers in app/dashboard_stats.py."""
+    __tablename__ = "stats_counters"
+    name = Column(String, primary_key=True)          # doctors, departments, appointments, confirmed, cancelled, revenue
+    value = Column(Float, nullable=False, default=0)
+
+class DoctorDailyStats(Base):
+    """Per doctor per day appointment rollup, maintained by the triggers in app/dashboard_stats.py."""
+    __tablename__ = "doctor_daily_stats"
+    day = Column(Date, primary_key=True)             # date(start_time)
+    doctor_id = Column(Integer, primary_key=True)
+    booked = Column(Integer, nullable=False, default=0)          # confirmed bookings
+    cancelled = Column(Integer, nullable=False, default=0)
+    booked_minutes = Column(Integer, nullable=False, default=0)  # confirmed minutes
+    revenue = Column(Float, nullable=False, default=0)           # consultation fees of confirmed bookings
+
 # 3. Helper to get DB session
 def get_db():
     db = SessionLocal()
@@ -69,6 +333,10 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # 4. Helper to Seed Data
 def seed_database():
     Base.metadata.create_all(bind=engine)
@@ -89,6 +357,11 @@ def seed_database():
     doc2 = Doctor(name="Dr. John Doe", specialization="General Physician", consultation_fee=80.00, availability_text="Tue-Sat 10am-6pm", department_id=gen_med.id)
     db.add_all([doc1, doc2])
     db.commit()
+
+    # Structured form of the availability_text above (what migration 10 parses for existing doctors).
+    db.add_all(ScheduleRule(doctor_id=doc1.id, weekday=day, start_minute=9 * 60, end_minute=16 * 60) for day in range(0, 5))
+    db.add_all(ScheduleRule(doctor_id=doc2.id, weekday=day, start_minute=10 * 60, end_minute=18 * 60) for day in range(1, 6))
+    db.commit()
     db.close()
     print("Database seeded successfully!")
 
@@ -101,16 +374,112 @@ def get_all_doctors():
     finally:
         db.close()
 
+def get_doctor_catalog():
+    """Doctors joined with their department, as plain dicts (for code paths that answer without the LLM)."""
+    db = SessionLocal()
+    try:
+        rows = db.query(Doctor, Department).outerjoin(Department, Doctor.department_id == Department.id).all()
+        return [{
+            "id": doc.id,
+            "name": doc.name,
+            "specialization": doc.specialization,
+            "fee": float(doc.consultation_fee),
+            "availability": doc.availability_text,
+            "department": dept.name if dept else None,
+            "location": dept.location if dept else None,
+        } for doc, dept in rows]
+    finally:
+        db.close()
+
+def _load_doctor_names():
+    db = SessionLocal()
+    try:
+        return db.query(Doctor.id, Doctor.name).all()
+    finally:
+        db.close()
+
+# Name -> doctor resolution for the tools; kept current as Doctor rows are committed.
+doctor_index = DoctorIndex(loader=_load_doctor_names)
+doctor_index.watch(Doctor)
+
+def _appointment_event(appt):
+    """Committed appointment changes as pushed to the admin dashboard (same shape as the admin API rows)."""
+    return {
+        "id": appt.id,
+        "patient": appt.patient_name,
+        "email": appt.patient_email,
+        "doctor": doctor_index.name_of(appt.doctor_id),
+        "doctor_id": appt.doctor_id,
+        "time": appt.start_time.strftime("%Y-%m-%d %H:%M"),
+        "end_time": appt.end_time.strftime("%Y-%m-%d %H:%M"),
+        "status": appt.status,
+        "session_id": appt.source_session_id,
+        "notes": appt.notes,
+        "calendar_status": appt.calendar_status,
+    }
+
+event_hub.watch(Appointment, "appointment", _appointment_event)
+
+def find_doctor(doctor_name):
+    """Returns (id, name) of the one doctor `doctor_name` refers to, or None if unknown or ambiguous."""
+    match = doctor_index.resolve(doctor_name)
+    return (match.doctor_id, match.name) if match else None
+
+def suggest_doctors(doctor_name, limit=5):
+    """Names of the closest matches for `doctor_name`, best first."""
+    return [c.name for c in doctor_index.candidates(doctor_name, limit=limit)]
+
+def get_doctor_calendars():
+    """{doctor_id: calendar_id} for the doctors that have their own Google calendar."""
+    db = SessionLocal()
+    try:
+        return dict(db.query(Doctor.id, Doctor.calendar_id).filter(Doctor.calendar_id.isnot(None)).all())
+    finally:
+        db.close()
+
+def get_schedules(start_day, end_day):
+    """Every schedule rule (a few per doctor) and the exceptions in [start_day, end_day), as plain tuples."""
+    db = SessionLocal()
+    try:
+        rules = db.query(
+            ScheduleRule.doctor_id, ScheduleRule.weekday, ScheduleRule.start_minute, ScheduleRule.end_minute,
+            ScheduleRule.slot_minutes, ScheduleRule.valid_from, ScheduleRule.valid_until
+        ).all()
+        exceptions = db.query(
+            ScheduleException.doctor_id, ScheduleException.day, ScheduleException.start_minute,
+            ScheduleException.end_minute, ScheduleException.available, ScheduleException.slot_minutes
+        ).filter(ScheduleException.day >= start_day, ScheduleException.day < end_day).all()
+        return [tuple(r) for r in rules], [tuple(e) for e in exceptions]
+    finally:
+        db.close()
+
+def get_booked_intervals(start, end):
+    """Returns (appointment_id, doctor_id, start_time, end_time) for confirmed bookings overlapping [start, end)."""
+    db = SessionLocal()
+    try:
+        rows = db.query(Appointment.id, Appointment.doctor_id, Appointment.start_time, Appointment.end_time).filter(
+            Appointment.status == "Confirmed",
+            Appointment.start_time < end,
+            Appointment.end_time > start
+        ).all()
+        return [tuple(r) for r in rows]
+    finally:
+        db.close()
+
 # --- UNIFIED BOOKING HELPER ---
 def create_appointment_in_db(patient_name, patient_email, doctor_name, start_time, end_time, reason, gcal_id=None):
     """
     Finds doctor, saves appointment with Name, Email, Time, and Reason.
     """
+    match = doctor_index.resolve(doctor_name)
+    if not match:
+        return None
+
     db = SessionLocal()
     try:
-        doc = db.query(Doctor).filter(Doctor.name.ilike(f"%{doctor_name}%")).first()
-        
+        doc = db.get(Doctor, match.doctor_id)
         if not doc:
+            doctor_index.invalidate()
             return None
             
         appt = Appointment(
@@ -126,7 +495,13 @@ def create_appointment_in_db(patient_name, patient_email, doctor_name, start_tim
         db.add(appt)
         db.commit()
         db.refresh(appt)
-        return appt.id, doc.name
+        return appt.id, doc.name, doc.id
+    except IntegrityError as e:
+        db.rollback()
+        if APPOINTMENT_OVERLAP_MESSAGE in str(e):
+            raise BookingConflictError(f"{doc.name} is already booked between {start_time} and {end_time}") from e
+        print(f"DB Error: {e}")
+        return None
     except Exception as e:
         print(f"DB Error: {e}")
         return None
@@ -0,0 +1,172 @@
+"""
+In-process pub/sub hub that pushes admin dashboard deltas over SSE, so
+open admin tabs stop re-running the list queries to notice new activity.
+
+Producers call publish() from any thread (booking commits happen on tool
+worker threads). Every event gets an ID "<epoch>-<seq>" and is kept in a
+bounded replay buffer. A client reconnecting with Last-Event-ID gets the
+events it missed. If they have already left the buffer, or were
+published by an earlier or another worker process, it gets a single
+"reset" event instead and should refetch everything. Appointment changes
+committed by other worker processes reach connected clients the same way
+(reset_all); their chat messages arrive as ordinary "chat" events
+(ChatLogWriter.publish_remote).
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+_RESET = object()
+_PENDING_KEY = "event_hub_pending"
+
+
+class EventHub:
+    def __init__(self, buffer_size=1000, max_queue=500, heartbeat_seconds=15.0):
+        self.max_queue = max_queue
+        self.heartbeat_seconds = heartbeat_seconds
+        self.epoch = format(int(time.time() * 1000), "x")
+        self._buffer = deque(maxlen=buffer_size)   # (seq, type, data)
+        self._seq = 0
+        self._subscribers = {}                     # asyncio.Queue -> its event loop
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.published = 0
+        self.resets = 0
+        self.remote_resets = 0
+
+    # --- PRODUCERS ---
+    def publish(self, event_type, data):
+        """Records one event and hands it to every connected client. Safe from any thread."""
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, event_type, data)
+            self._buffer.append(item)
+            self.published += 1
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, item)
+            except RuntimeError:
+                pass  # loop already closed; the stream's finally will unsubscribe
+
+    def reset_all(self):
+        """Makes every connected client refetch (another worker process changed the data). Safe from any thread."""
+        with self._lock:
+            self.remote_resets += 1
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, _RESET)
+            except RuntimeError:
+                pass
+
+    def _deliver(self, queue, item):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop its backlog and make it refetch.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_RESET)
+            self.resets += 1
+
+    # --- CONSUMERS ---
+    def _event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def _missed(self, last_event_id):
+        """Buffered events after `last_event_id`, [] when there is none, or None when they can't be replayed."""
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq:
+            return None
+        oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+        if seq + 1 < oldest:
+            return None
+        return [item for item in self._buffer if item[0] > seq]
+
+    def _frame(self, item):
+        seq, event_type, data = item
+        return f"id: {self._event_id(seq)}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def _reset_frame(self):
+        # Carries the latest ID so a reconnect after the refetch resumes from here.
+        return f"id: {self._event_id(self._seq)}\nevent: reset\ndata: {{}}\n\n"
+
+    async def stream(self, last_event_id=None):
+        """SSE frames for one client: missed events first, then live ones, with keepalive comments."""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        with self._lock:
+            # Snapshot and subscribe under one lock, so nothing is missed or sent twice.
+            missed = self._missed(last_event_id)
+            reset = missed is None and self._reset_frame()
+            self.resets += bool(reset)
+            self._subscribers[queue] = asyncio.get_running_loop()
+        try:
+            yield "retry: 3000\n\n"
+            if reset:
+                yield reset
+            for item in missed or ():
+                yield self._frame(item)
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is _RESET:
+                    with self._lock:
+                        frame = self._reset_frame()
+                    yield frame
+                else:
+                    yield self._frame(item)
+        finally:
+            with self._lock:
+                self._subscribers.pop(queue, None)
+
+    # --- ORM HOOKS ---
+    def watch(self, model, event_type, describe):
+        """Publishes `describe(row)` plus an "op" for every committed insert/update/delete of `model`."""
+        def queue(target, op):
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault(_PENDING_KEY, []).append((self, event_type, {"op": op, **describe(target)}))
+
+        event.listen(model, "after_insert", lambda m, c, t: queue(t, "created"))
+        event.listen(model, "after_update", lambda m, c, t: queue(t, "updated"))
+        event.listen(model, "after_delete", lambda m, c, t: queue(t, "deleted"))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "buffered": len(self._buffer),
+                "last_event_id": self._event_id(self._seq),
+                "resets": self.resets,
+                "remote_resets": self.remote_resets,
+            }
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    for hub, event_type, data in session.info.pop(_PENDING_KEY, []):
+        hub.publish(event_type, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+event_hub = EventHub()
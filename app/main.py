@@ -1,12 +1,21 @@
 import os 
+import io
+import csv
+import json
+import time
+import asyncio
 import logging 
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.responses import FileResponse 
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Depends, Query, Header
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles 
 from fastapi.middleware.cors import CORSMiddleware 
 from pydantic import BaseModel 
 from dotenv import load_dotenv 
-from sqlalchemy.orm import Session 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
 import sys 
 
@@ -15,24 +24,58 @@ project_root = current_file.parent.parent
 if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
-from app.database import get_db, Appointment, ChatHistory, Doctor, Department
+from app.database import get_async_db, async_engine, AsyncSessionLocal, cache_sync, DB_PATH, Appointment, ChatHistory, ChatSession, Doctor, Department
+from app.pagination import keyset_page, next_cursor
+from app.dashboard_stats import read_counters, read_utilization
+from app.chat_log import chat_log_writer
+from app.chat_archive import chat_archiver
+from app.search import SEARCH_SCOPES, SEARCH_SORTS, to_match
+from app.event_hub import event_hub
+from app.migrations import upgrade as upgrade_schema
+from app.session_store import SqliteSessionService
+from app.worker_sync import Lease
+from app.observability import metrics, TraceMiddleware, log_trace_ids
 
 from google.adk.runners import Runner 
-from google.adk.sessions import InMemorySessionService 
+from google.adk.events import Event
+from google.adk.agents.invocation_context import new_invocation_context_id
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai.types import Content, Part 
 
 from app.scheduling_agent.agent import root_agent 
+from app.scheduling_agent.tools import (
+    availability, calendar_sync, calendar_outbox, reservations, schedules, SESSION_ID_STATE_KEY
+)
+from app.scheduling_agent.router import intent_router
+from app.scheduling_agent.compaction import history_compactor
+from app.tools.calendar_client import calendar_clients
+from app.tools.tool_cache import tool_cache
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO) 
 logger = logging.getLogger(__name__)
+if os.getenv("LOG_TRACE_IDS", "0") == "1":
+    log_trace_ids()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 APP_NAME = "adk-scheduling_agent"
+CALENDAR_SYNC_INTERVAL = int(os.getenv("CALENDAR_SYNC_INTERVAL", "60"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+CHAT_ARCHIVE_INTERVAL = int(os.getenv("CHAT_ARCHIVE_INTERVAL", "3600"))
+
+session_service = SqliteSessionService(ttl_seconds=SESSION_TTL_SECONDS)
 
-session_service = InMemorySessionService()
+# With several worker processes only one runs the calendar sync; the lease
+# passes to another worker if it stops renewing.
+calendar_sync_lease = Lease(DB_PATH, "calendar_sync", ttl_seconds=max(3 * CALENDAR_SYNC_INTERVAL, 60))
+chat_archive_lease = Lease(DB_PATH, "chat_archive", ttl_seconds=max(3 * CHAT_ARCHIVE_INTERVAL, 60))
+
+# Admin tabs connected to this worker hear about other workers' commits:
+# new chat rows as "chat" deltas, appointment changes as a refetch.
+cache_sync.on_change(("appointments",), lambda tables: event_hub.reset_all())
+cache_sync.on_change(("chat_history",), chat_log_writer.publish_remote)
 
 runner = Runner(
     agent=root_agent, 
@@ -40,51 +83,105 @@ runner = Runner(
     session_service=session_service
 )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(upgrade_schema)
+    await asyncio.to_thread(chat_log_writer.mark_seen)
+    chat_log_writer.start()
+    # The first sync runs in the background too: credentials and a full mirror fill never delay serving.
+    sync_task = asyncio.create_task(calendar_sync.run_periodically(CALENDAR_SYNC_INTERVAL, lease=calendar_sync_lease))
+    freebusy_task = asyncio.create_task(availability.run_calendar_refresh(CALENDAR_SYNC_INTERVAL))
+    janitor_task = asyncio.create_task(session_service.run_janitor())
+    outbox_task = asyncio.create_task(calendar_outbox.run())
+    cache_sync_task = asyncio.create_task(cache_sync.run())
+    archive_task = asyncio.create_task(chat_archiver.run_periodically(CHAT_ARCHIVE_INTERVAL, lease=chat_archive_lease))
+    yield
+    sync_task.cancel()
+    freebusy_task.cancel()
+    janitor_task.cancel()
+    outbox_task.cancel()
+    cache_sync_task.cancel()
+    archive_task.cancel()
+    await chat_log_writer.stop()
+    calendar_clients.close()
+
+app = FastAPI(lifespan=lifespan)
+# Every response carries X-Trace-ID (the caller's X-Request-ID if it sent one).
+app.add_middleware(TraceMiddleware)
 
 class ChatRequest(BaseModel): 
     session_id: str 
     text: str
 
+def save_chat_turn(session_id: str, user_text: str, model_text: str):
+    """Queues one user/model exchange for the background chat-log writer."""
+    chat_log_writer.enqueue(session_id, "user", user_text)
+    chat_log_writer.enqueue(session_id, "model", model_text)
+
+async def ensure_session(user_id: str, session_id: str):
+    # Step A: Try to GET the session first
+    session = await session_service.get_session(
+        app_name=APP_NAME, 
+        user_id=user_id, 
+        session_id=session_id
+    )
+    
+    # Step B: If missing, CREATE it (Defensively)
+    if session is None: 
+        try:
+            session = await session_service.create_session(
+                app_name=APP_NAME, 
+                user_id=user_id, 
+                session_id=session_id
+            )
+        except Exception:
+            # If creation fails (e.g. race condition where it was just created), 
+            # we can safely ignore it and proceed. The session exists now.
+            pass
+    return session
+
+async def record_routed_turn(user_id: str, session_id: str, user_text: str, response: str):
+    """
+    Appends a turn answered by the intent router to the ADK session, so the
+    agent sees it in the history of the next turn it takes.
+    """
+    session = await ensure_session(user_id, session_id) or await session_service.get_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    )
+    if session is None:
+        logger.warning(f"Routed turn not added to missing session {session_id}")
+        return
+    invocation_id = new_invocation_context_id()
+    for author, role, text in (("user", "user", user_text), (root_agent.name, "model", response)):
+        await session_service.append_event(session, Event(
+            invocation_id=invocation_id, author=author, content=Content(role=role, parts=[Part(text=text)])
+        ))
+
+def sse(event: str, payload: dict) -> str:
+    """Formats one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
 @app.post("/chat")
 async def chat_endpoint(request: ChatRequest): 
     try: 
         user_id = "default_user"
         user_text = request.text.strip()
         
+        started = time.perf_counter()
+        
         # --- 1. RULE-BASED CHECK (No LLM) ---
-        greetings = ["hi", "hello", "hey", "start", "greetings"]
+        # Greetings, doctor list, fees, locations and hours are answered from the DB.
+        routed = await asyncio.to_thread(intent_router.route, user_text)
         
-        if user_text.lower() in greetings:
-            hardcoded_response = "Hello Sir/Mam! Welcome to Rugas Health. Can I please know your name?"
+        if routed:
+            await record_routed_turn(user_id, request.session_id, user_text, routed.response)
+            save_chat_turn(request.session_id, user_text, routed.response)
+            intent_router.record(routed.intent, (time.perf_counter() - started) * 1000, request.session_id)
             
-            db = next(get_db())
-            db.add(ChatHistory(session_id=request.session_id, role="user", content=user_text))
-            db.add(ChatHistory(session_id=request.session_id, role="model", content=hardcoded_response))
-            db.commit()
-            
-            return {"response": hardcoded_response}
+            return {"response": routed.response}
 
         # --- 2. SESSION MANAGEMENT (FIXED) ---
-        # Step A: Try to GET the session first
-        session = await session_service.get_session(
-            app_name=APP_NAME, 
-            user_id=user_id, 
-            session_id=request.session_id
-        )
-        
-        # Step B: If missing, CREATE it (Defensively)
-        if session is None: 
-            try:
-                session = await session_service.create_session(
-                    app_name=APP_NAME, 
-                    user_id=user_id, 
-                    session_id=request.session_id
-                )
-            except Exception:
-                # If creation fails (e.g. race condition where it was just created), 
-                # we can safely ignore it and proceed. The session exists now.
-                pass
+        await ensure_session(user_id, request.session_id)
         
         # --- 3. RUN AGENT ---
         user_content = Content(role='user', parts=[Part(text=user_text)])
@@ -93,7 +190,8 @@ async def chat_endpoint(request: ChatRequest):
         async for event in runner.run_async(
             user_id=user_id, 
             session_id=request.session_id, 
-            new_message=user_content
+            new_message=user_content,
+            state_delta={SESSION_ID_STATE_KEY: request.session_id}
         ): 
             if event.content and event.content.parts:
                 for part in event.content.parts: 
@@ -101,10 +199,8 @@ async def chat_endpoint(request: ChatRequest):
                         final_text += part.text 
         
         # --- 4. SAVE TO DB ---
-        db = next(get_db())
-        db.add(ChatHistory(session_id=request.session_id, role="user", content=user_text))
-        db.add(ChatHistory(session_id=request.session_id, role="model", content=final_text))
-        db.commit()
+        save_chat_turn(request.session_id, user_text, final_text)
+        intent_router.record("agent", (time.perf_counter() - started) * 1000, request.session_id)
         
         return {"response": final_text}
         
@@ -112,55 +208,420 @@ async def chat_endpoint(request: ChatRequest):
         logger.error(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
+# --- STREAMING CHAT (SSE) ---
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Same turn as /chat, but streamed as Server-Sent Events:
+      token -> {"text": ...}                 partial model text, as generated
+      tool  -> {"name": ..., "status": ...}  tool call started / finished
+      done  -> {"response": ..., "ttft_ms": ..., "total_ms": ...}
+      error -> {"detail": ...}
+    The runner is only advanced when the client has read the previous frame
+    (backpressure), and a client disconnect cancels the run.
+    """
+    user_id = "default_user"
+    user_text = request.text.strip()
+    session_id = request.session_id
+
+    async def event_stream():
+        started = time.perf_counter()
+        elapsed_ms = lambda: round((time.perf_counter() - started) * 1000, 1)
+
+        # --- 1. RULE-BASED CHECK (No LLM) ---
+        routed = await asyncio.to_thread(intent_router.route, user_text)
+        if routed:
+            await record_routed_turn(user_id, session_id, user_text, routed.response)
+            save_chat_turn(session_id, user_text, routed.response)
+            ttft_ms = elapsed_ms()
+            intent_router.record(routed.intent, ttft_ms, session_id)
+            yield sse("token", {"text": routed.response})
+            yield sse("done", {"response": routed.response, "ttft_ms": ttft_ms, "total_ms": ttft_ms})
+            return
+
+        # --- 2. RUN AGENT (streaming) ---
+        await ensure_session(user_id, session_id)
+        events = runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=Content(role='user', parts=[Part(text=user_text)]),
+            state_delta={SESSION_ID_STATE_KEY: session_id},
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+        )
+        final_text = ""
+        streamed = ""  # Partial text of the model response in progress
+        ttft_ms = None
+        try:
+            async for event in events:
+                if not (event.content and event.content.parts):
+                    continue
+                for part in event.content.parts:
+                    if part.function_call:
+                        yield sse("tool", {"name": part.function_call.name, "status": "started"})
+                    elif part.function_response:
+                        yield sse("tool", {"name": part.function_response.name, "status": "finished"})
+                    elif part.text:
+                        if event.partial:
+                            streamed += part.text
+                            chunk = part.text
+                        else:
+                            # Final aggregate of the partials; only forward it if nothing was streamed.
+                            final_text += part.text
+                            chunk = "" if streamed else part.text
+                            streamed = ""
+                        if chunk:
+                            if ttft_ms is None:
+                                ttft_ms = elapsed_ms()
+                            yield sse("token", {"text": chunk})
+            yield sse("done", {"response": final_text, "ttft_ms": ttft_ms, "total_ms": elapsed_ms()})
+        except asyncio.CancelledError:
+            logger.info(f"Client disconnected from stream {session_id}")
+            raise
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            yield sse("error", {"detail": str(e)})
+        finally:
+            await events.aclose()
+            # --- 3. SAVE TO DB ---
+            save_chat_turn(session_id, user_text, final_text or streamed)
+            intent_router.record("agent", elapsed_ms(), session_id)
+            logger.info(f"stream session={session_id} ttft_ms={ttft_ms} total_ms={elapsed_ms()}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- DASHBOARD ENDPOINT --- 
 @app.get("/api/admin/dashboard")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    total_docs = db.query(Doctor).count()
-    total_depts = db.query(Department).count()
-    total_appts = db.query(Appointment).count()
-    
-    doctors = db.query(Doctor, Department.name).join(Department, Doctor.department_id == Department.id).all()
-    
-    doc_list = []
-    for doc, dept_name in doctors:
-        doc_list.append({
-            "id": doc.id,
-            "name": doc.name,
-            "specialization": doc.specialization,
-            "department": dept_name,
-            "fee": doc.consultation_fee,
-            "availability": doc.availability_text
-        })
-        
+async def get_dashboard_stats(
+    date_from: Optional[date] = None,
+    days: int = Query(7, ge=1, le=31),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Counts and rollups come from the trigger-maintained stats tables (app/dashboard_stats.py).
+    totals = await read_counters(db)
+    utilization = await read_utilization(db, schedules, date_from, days)
     return {
-        "stats": {
-            "doctors": total_docs,
-            "departments": total_depts,
-            "appointments": total_appts
-        },
-        "doctors": doc_list
+        "stats": totals,
+        "utilization": utilization
     }
 
+@tool_cache.cached("admin_doctors", ttl_seconds=300, maxsize=1, depends_on=("doctors", "departments"))
+async def read_doctors():
+    """The doctor table of the admin page; cached until a doctor or department changes."""
+    async with AsyncSessionLocal() as db:
+        doctors = (await db.execute(
+            select(Doctor, Department.name).join(Department, Doctor.department_id == Department.id)
+        )).all()
+    return [{
+        "id": doc.id,
+        "name": doc.name,
+        "specialization": doc.specialization,
+        "department": dept_name,
+        "fee": doc.consultation_fee,
+        "availability": doc.availability_text
+    } for doc, dept_name in doctors]
+
+@app.get("/api/admin/doctors")
+async def get_doctors():
+    return await read_doctors()
+
 # --- ADMIN API ENDPOINTS ---
+# Sort name -> keyset columns (the last one is unique). Prefix with "-" for descending.
+APPOINTMENT_SORTS = {
+    "id": (Appointment.id,),
+    "start_time": (Appointment.start_time, Appointment.id),
+}
+EXPORT_CHUNK = 1000
+EXPORT_FIELDS = ["id", "patient", "email", "doctor", "doctor_id", "time", "end_time", "status", "session_id", "notes",
+                 "calendar_status"]
+
+class AppointmentFilters(BaseModel):
+    doctor_id: Optional[int] = None
+    status: Optional[str] = None
+    session_id: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+    def query(self):
+        stmt = select(
+            Appointment.id, Appointment.patient_name, Appointment.patient_email, Doctor.name.label("doctor"),
+            Appointment.doctor_id, Appointment.start_time, Appointment.end_time, Appointment.status,
+            Appointment.source_session_id, Appointment.notes, Appointment.calendar_status
+        ).join(Doctor, Appointment.doctor_id == Doctor.id)
+        if self.doctor_id is not None:
+            stmt = stmt.where(Appointment.doctor_id == self.doctor_id)
+        if self.status:
+            stmt = stmt.where(Appointment.status == self.status)
+        if self.session_id:
+            stmt = stmt.where(Appointment.source_session_id == self.session_id)
+        if self.date_from:
+            stmt = stmt.where(Appointment.start_time >= self.date_from)
+        if self.date_to:
+            stmt = stmt.where(Appointment.start_time < self.date_to)
+        return stmt
+
+def appointment_row(row):
+    return {
+        "id": row.id,
+        "patient": row.patient_name,
+        "email": row.patient_email,
+        "doctor": row.doctor,
+        "doctor_id": row.doctor_id,
+        "time": row.start_time.strftime("%Y-%m-%d %H:%M"),
+        "end_time": row.end_time.strftime("%Y-%m-%d %H:%M"),
+        "status": row.status,
+        "session_id": row.source_session_id,
+        "notes": row.notes,
+        "calendar_status": row.calendar_status,
+    }
+
+def parse_sort(sort, sorts):
+    descending = sort.startswith("-")
+    columns = sorts.get(sort.lstrip("-"))
+    if columns is None:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(sorts)} (prefix '-' for descending)")
+    return columns, descending
+
+async def fetch_page(db, stmt, columns, cursor, descending, limit):
+    try:
+        stmt = keyset_page(stmt, columns, cursor=cursor, descending=descending, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return next_cursor((await db.execute(stmt)).all(), columns, limit)
+
 @app.get("/api/admin/appointments")
-def get_all_appointments(db: Session = Depends(get_db)):
-    results = db.query(Appointment, Doctor.name).join(Doctor, Appointment.doctor_id == Doctor.id).all()
-    data = []
-    for appt, doc_name in results:
-        data.append({
-            "id": appt.id,
-            "patient": appt.patient_name,
-            "doctor": doc_name,
-            "time": appt.start_time.strftime("%Y-%m-%d %H:%M"),
-            "status": appt.status,
-            "session_id": appt.source_session_id
-        })
-    return data
+async def get_all_appointments(
+    filters: AppointmentFilters = Depends(),
+    sort: str = "-id",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    columns, descending = parse_sort(sort, APPOINTMENT_SORTS)
+    rows, cursor = await fetch_page(db, filters.query(), columns, cursor, descending, limit)
+    return {"items": [appointment_row(r) for r in rows], "next_cursor": cursor}
+
+@app.get("/api/admin/appointments/export")
+async def export_appointments(filters: AppointmentFilters = Depends(), format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Streams every matching appointment (oldest first) as NDJSON or CSV.
+    Rows are read in keyset chunks, each in its own short read, so memory
+    stays constant and writers are never blocked behind one long export.
+    """
+    columns = APPOINTMENT_SORTS["id"]
+
+    async def chunks():
+        cursor = None
+        if format == "csv":
+            yield ",".join(EXPORT_FIELDS) + "\n"
+        while True:
+            async with async_engine.connect() as conn:
+                stmt = keyset_page(filters.query(), columns, cursor=cursor, limit=EXPORT_CHUNK)
+                rows, cursor = next_cursor((await conn.execute(stmt)).all(), columns, EXPORT_CHUNK)
+            buf = io.StringIO()
+            if format == "csv":
+                writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+                writer.writerows(appointment_row(r) for r in rows)
+            else:
+                for r in rows:
+                    buf.write(json.dumps(appointment_row(r)) + "\n")
+            yield buf.getvalue()
+            if cursor is None:
+                return
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f"attachment; filename=appointments.{format}"}
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
 
 @app.get("/api/admin/chat_history")
-def get_chat_logs(db: Session = Depends(get_db)):
-    logs = db.query(ChatHistory).order_by(ChatHistory.timestamp.desc()).limit(100).all()
-    return logs
+async def get_chat_logs(
+    session_id: Optional[str] = None,
+    role: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(ChatHistory)
+    if session_id:
+        stmt = stmt.where(ChatHistory.session_id == session_id)
+    if role:
+        stmt = stmt.where(ChatHistory.role == role)
+    if since:
+        stmt = stmt.where(ChatHistory.timestamp >= since)
+    if until:
+        stmt = stmt.where(ChatHistory.timestamp < until)
+    # Newest first, as the admin log has always been shown.
+    columns = (ChatHistory.timestamp, ChatHistory.id)
+    try:
+        stmt = keyset_page(stmt, columns, cursor=cursor, descending=True, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logs, cursor = next_cursor((await db.execute(stmt)).scalars().all(), columns, limit)
+    return {"items": logs, "next_cursor": cursor}
+
+@app.get("/api/admin/chat_archive")
+async def get_chat_archive_stats():
+    return await asyncio.to_thread(chat_archiver.stats)
+
+@app.get("/api/admin/chat_archive/{session_id}")
+async def get_archived_transcript(session_id: str):
+    """A session moved out of chat_history by app/chat_archive.py (one indexed read)."""
+    transcript = await asyncio.to_thread(chat_archiver.transcript, session_id)
+    if transcript is None:
+        raise HTTPException(status_code=404, detail=f"No archived session {session_id!r}")
+    return transcript
+
+def session_row(row):
+    return {
+        "session_id": row.session_id,
+        "messages": row.messages + row.archived_messages,
+        "archived_messages": row.archived_messages,
+        "first_at": row.first_at,
+        "last_at": row.last_at,
+    }
+
+@app.get("/api/admin/sessions")
+async def get_sessions(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Chat sessions, most recently active first, from the trigger-maintained summary (app/chat_sessions.py)."""
+    stmt = select(ChatSession)
+    if since:
+        stmt = stmt.where(ChatSession.last_at >= since)
+    if until:
+        stmt = stmt.where(ChatSession.last_at < until)
+    columns = (ChatSession.last_at, ChatSession.session_id)
+    try:
+        stmt = keyset_page(stmt, columns, cursor=cursor, descending=True, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows, cursor = next_cursor((await db.execute(stmt)).scalars().all(), columns, limit)
+    return {"items": [session_row(r) for r in rows], "next_cursor": cursor}
+
+@app.get("/api/admin/sessions/{session_id}")
+async def get_session_transcript(session_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    One session's full transcript, oldest first, with the appointments it
+    booked. Live messages come from the (session_id, timestamp) index; the
+    archive is only read when the summary says part of the session was moved.
+    """
+    summary = await db.get(ChatSession, session_id)
+    live = (await db.execute(
+        select(ChatHistory.id, ChatHistory.role, ChatHistory.content, ChatHistory.timestamp)
+        .where(ChatHistory.session_id == session_id)
+        .order_by(ChatHistory.timestamp, ChatHistory.id)
+    )).all()
+    messages = [
+        {"id": r.id, "role": r.role, "content": r.content, "timestamp": r.timestamp.isoformat() if r.timestamp else None}
+        for r in live
+    ]
+    if summary is None or summary.archived_messages > 0:
+        archived = await asyncio.to_thread(chat_archiver.transcript, session_id)
+        if archived:
+            # Keyed like the archive's merge: ids are rowids, reused once archiving empties the table.
+            seen = {(m["id"], m["timestamp"]) for m in messages}
+            messages = [m for m in archived["messages"] if (m["id"], m["timestamp"]) not in seen] + messages
+    appointments = (await db.execute(AppointmentFilters(session_id=session_id).query().order_by(Appointment.id))).all()
+    if summary is None and not messages and not appointments:
+        raise HTTPException(status_code=404, detail=f"No session {session_id!r}")
+    return {
+        "session": session_row(summary) if summary else None,
+        "messages": messages,
+        "appointments": [appointment_row(r) for r in appointments],
+    }
+
+@app.get("/api/admin/search")
+async def search_text(
+    q: str = Query(..., min_length=1),
+    scope: str = Query("chat", pattern="^(chat|appointments)$"),
+    sort: str = Query("rank", pattern="^(rank|recent)$"),
+    session_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Full-text search (app/search.py) over chat messages or appointment
+    notes, best match first (sort=recent: newest first), with a
+    highlighted snippet per hit. Archived sessions are not searched.
+    """
+    match = to_match(q)
+    if match is None:
+        raise HTTPException(status_code=400, detail="q has no words to search for")
+    fts, build, hit = SEARCH_SCOPES[scope]
+    columns, descending = SEARCH_SORTS[sort](fts)
+    rows, cursor = await fetch_page(db, build(match, session_id, since, until), columns, cursor, descending, limit)
+    return {"items": [hit(r) for r in rows], "next_cursor": cursor}
+
+@app.get("/api/admin/events")
+async def admin_events(last_event_id: Optional[str] = Header(None)):
+    """
+    Live dashboard deltas over SSE: "appointment" (a committed row, with op
+    created/updated/deleted), "chat" (persisted messages) and "reset"
+    (refetch everything). EventSource resends Last-Event-ID on reconnect.
+    """
+    return StreamingResponse(
+        event_hub.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/admin/router_stats")
+async def get_router_stats():
+    return intent_router.stats()
+
+@app.get("/api/admin/compaction")
+async def get_compaction_stats():
+    return history_compactor.stats()
+
+@app.get("/api/admin/tool_cache")
+async def get_tool_cache_stats():
+    return tool_cache.stats()
+
+@app.get("/api/admin/event_hub")
+async def get_event_hub_stats():
+    return event_hub.stats()
+
+@app.get("/api/admin/reservations")
+async def get_reservation_stats():
+    return reservations.stats()
+
+@app.get("/api/admin/schedules")
+async def get_schedule_stats():
+    return schedules.stats()
+
+@app.get("/api/admin/calendar_outbox")
+async def get_calendar_outbox_stats():
+    return await asyncio.to_thread(calendar_outbox.stats)
+
+@app.get("/api/admin/chat_log_writer")
+async def get_chat_log_writer_stats():
+    return chat_log_writer.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latencies and counters of this worker process, in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/admin/metrics")
+async def get_metrics_summary():
+    return metrics.stats()
+
+@app.get("/api/admin/worker_sync")
+async def get_worker_sync_stats():
+    """Per process: answered by whichever worker took the request."""
+    return {**cache_sync.stats(), "pid": os.getpid(), "calendar_sync_lease": calendar_sync_lease.held}
 
 app.add_middleware(
     CORSMiddleware,
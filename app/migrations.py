@@ -0,0 +1,249 @@
+"""
+Versioned schema migrations for appointments.db.
+
+Applied versions are recorded in `schema_migrations`; upgrade() runs the
+pending ones in order, each in its own transaction, so an existing
+database file is brought up to date in place. Every migration is written
+to be safe on a fresh database too (version 1 creates whatever is missing
+from the models).
+
+Usage:
+    python -m app.migrations            # upgrade to the latest version
+    python -m app.migrations --status   # list applied / pending versions
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.database import (
+    engine, Base, Appointment, ChatHistory, SlotHold, CalendarOutboxEntry, ScheduleRule, ScheduleException,
+    CacheVersion, WorkerLease,
+    APPOINTMENT_OVERLAP_TRIGGERS
+)
+from app import dashboard_stats, chat_sessions, search
+from app.tools.schedule import parse_availability_text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+# --- MIGRATIONS ---
+@migration(1, "Create missing tables")
+def _create_tables(conn):
+    Base.metadata.create_all(conn)
+
+
+@migration(2, "Add appointments.notes (databases created from the old app/models/models.py lack it)")
+def _add_appointment_notes(conn):
+    if "notes" not in _columns(conn, "appointments"):
+        conn.exec_driver_sql("ALTER TABLE appointments ADD COLUMN notes TEXT")
+
+
+@migration(3, "Indexes for appointment lookups and chat history ordering")
+def _add_indexes(conn):
+    for table in (Appointment.__table__, ChatHistory.__table__):
+        existing = _columns(conn, table.name)
+        for index in table.indexes:
+            # Indexes on columns added by later migrations are created there.
+            if all(column.name in existing for column in index.columns):
+                index.create(conn, checkfirst=True)
+    # Superseded by ix_chat_history_session_timestamp (same leading column).
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_chat_history_session_id")
+
+
+@migration(4, "Reject overlapping confirmed bookings per doctor")
+def _add_overlap_guard(conn):
+    # One pass per doctor in start order: a booking overlaps an earlier one if
+    # it starts before the latest end seen so far.
+    overlapping = [row[0] for row in conn.exec_driver_sql("""
+        SELECT id FROM (
+            SELECT id, start_time, MAX(end_time) OVER (
+                PARTITION BY doctor_id ORDER BY start_time, id
+                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            ) AS previous_end
+            FROM appointments WHERE status = 'Confirmed'
+        ) WHERE previous_end > start_time
+    """)]
+    if overlapping:
+        # Existing data is left alone; the triggers only guard new writes.
+        logger.warning(f"{len(overlapping)} confirmed booking(s) already overlap an earlier one: ids {overlapping[:10]}")
+    for trigger in APPOINTMENT_OVERLAP_TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+@migration(5, "Index appointments.start_time for admin sorting and date filters")
+def _add_start_time_index(conn):
+    for index in Appointment.__table__.indexes:
+        if index.name == "ix_appointments_start_time":
+            index.create(conn, checkfirst=True)
+
+
+@migration(6, "Materialized dashboard stats kept current by triggers")
+def _add_dashboard_stats(conn):
+    dashboard_stats.create(conn)
+    dashboard_stats.rebuild_on(conn)
+
+
+@migration(7, "Slot holds and idempotency keys for bookings")
+def _add_slot_holds(conn):
+    if "idempotency_key" not in _columns(conn, "appointments"):
+        conn.exec_driver_sql("ALTER TABLE appointments ADD COLUMN idempotency_key VARCHAR")
+    SlotHold.__table__.create(conn, checkfirst=True)
+    for index in Appointment.__table__.indexes:
+        if index.name == "ux_appointments_idempotency":
+            index.create(conn, checkfirst=True)
+
+
+@migration(8, "Outbox for calendar writes")
+def _add_calendar_outbox(conn):
+    CalendarOutboxEntry.__table__.create(conn, checkfirst=True)
+
+
+@migration(9, "Per-doctor Google calendars")
+def _add_doctor_calendars(conn):
+    for table in ("doctors", "calendar_outbox"):
+        if "calendar_id" not in _columns(conn, table):
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN calendar_id VARCHAR")
+
+
+@migration(10, "Structured doctor schedules, parsed from availability_text")
+def _add_schedules(conn):
+    ScheduleRule.__table__.create(conn, checkfirst=True)
+    ScheduleException.__table__.create(conn, checkfirst=True)
+    doctors = conn.exec_driver_sql("""
+        SELECT id, name, availability_text FROM doctors
+        WHERE id NOT IN (SELECT doctor_id FROM schedule_rules)
+    """).all()
+    unparsed = []
+    for doctor_id, name, availability_text in doctors:
+        rules = parse_availability_text(availability_text)
+        if not rules:
+            unparsed.append(f"{name} ({availability_text!r})")
+            continue
+        conn.execute(ScheduleRule.__table__.insert(), [
+            {"doctor_id": doctor_id, "weekday": day, "start_minute": start, "end_minute": end, "slot_minutes": 60}
+            for day, start, end in rules
+        ])
+    if unparsed:
+        # They keep the clinic-hours default until rules are added.
+        logger.warning(f"Could not parse availability_text for {len(unparsed)} doctor(s): {unparsed[:10]}")
+
+
+@migration(11, "Cross-process cache versions and worker leases")
+def _add_worker_sync(conn):
+    CacheVersion.__table__.create(conn, checkfirst=True)
+    WorkerLease.__table__.create(conn, checkfirst=True)
+
+
+@migration(12, "Chat session summaries kept current by triggers")
+def _add_chat_sessions(conn):
+    chat_sessions.create(conn)
+    chat_sessions.rebuild_on(conn)
+
+
+@migration(13, "Full-text search over chat messages and appointment notes")
+def _add_search(conn):
+    search.create(conn)
+    search.rebuild_on(conn)
+
+
+@migration(14, "Calendar write status on appointments")
+def _add_calendar_status(conn):
+    if "calendar_status" not in _columns(conn, "appointments"):
+        conn.exec_driver_sql("ALTER TABLE appointments ADD COLUMN calendar_status VARCHAR")
+    conn.exec_driver_sql("UPDATE appointments SET calendar_status = 'synced' WHERE gcal_event_id IS NOT NULL")
+    conn.exec_driver_sql("""
+        UPDATE appointments SET calendar_status = 'failed'
+        WHERE id IN (SELECT appointment_id FROM calendar_outbox WHERE status = 'failed')
+    """)
+
+
+# --- RUNNER ---
+def _ensure_version_table(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(bind=engine):
+    with bind.connect() as conn:
+        _ensure_version_table(conn)
+        conn.commit()
+        return {row[0] for row in conn.exec_driver_sql("SELECT version FROM schema_migrations")}
+
+
+def upgrade(bind=engine, target=None):
+    """Applies every pending migration up to `target` (default: latest). Returns the versions applied."""
+    done = applied_versions(bind)
+    applied = []
+    # Explicit BEGIN/COMMIT: pysqlite would otherwise run DDL outside the transaction.
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for version, description, fn in MIGRATIONS:
+            if version in done or (target is not None and version > target):
+                continue
+            start = time.perf_counter()
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            # Every worker process upgrades on startup: another one may have
+            # applied this version while we waited for the lock.
+            if conn.exec_driver_sql("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).first():
+                conn.exec_driver_sql("COMMIT")
+                continue
+            try:
+                fn(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                    {"v": version, "d": description}
+                )
+                conn.exec_driver_sql("COMMIT")
+            except Exception:
+                conn.exec_driver_sql("ROLLBACK")
+                logger.error(f"Migration {version} ({description}) failed; database left at the previous version")
+                raise
+            applied.append(version)
+            logger.info(f"Applied migration {version}: {description} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return applied
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Upgrade appointments.db to the latest schema version.")
+    parser.add_argument("--status", action="store_true", help="show applied and pending migrations")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    args = parser.parse_args()
+
+    if args.status:
+        done = applied_versions()
+        for version, description, _ in MIGRATIONS:
+            print(f"{'applied' if version in done else 'pending':<8} {version:>3}  {description}")
+        return
+    applied = upgrade(target=args.target)
+    print(f"Applied {len(applied)} migration(s): {applied}" if applied else "Database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Where a /chat turn spends its time: latency histograms and counters per
+stage (LLM calls, agent tools, DB commits, Google API requests), a
+Prometheus text exposition for /metrics, and per-request trace IDs for
+the logs.
+
+Histograms are HDR-style: a value is recorded in microseconds into
+log-linear buckets (exact below 128 us, then 64 sub-buckets per power of
+two, so within ~1.6%), which keeps quantiles accurate from sub-millisecond
+commits to minute-long LLM calls without choosing bucket bounds up front.
+/metrics folds them onto PROMETHEUS_BUCKETS; stats() reports p50/p90/p99
+and max from the fine buckets.
+
+Recording costs two perf_counter() calls, a bit_length() and a dict
+update under a lock, a couple of microseconds; a turn records a dozen or
+so. Metrics are per process: with several workers, each reports its own.
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import math
+import threading
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "scheduling"
+PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_SUB_BITS = 7
+_SUB = 1 << _SUB_BITS     # values below this get a bucket each
+_HALF = _SUB >> 1         # sub-buckets per power of two above it
+
+
+def _bucket(us):
+    if us < _SUB:
+        return us
+    shift = us.bit_length() - _SUB_BITS
+    return _SUB + (shift - 1) * _HALF + (us >> shift) - _HALF
+
+
+def _bucket_upper_us(index):
+    """Highest value (in us) that lands in bucket `index`."""
+    if index < _SUB:
+        return index
+    shift, offset = divmod(index - _SUB, _HALF)
+    return ((offset + _HALF + 1) << (shift + 1)) - 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Series:
+    __slots__ = ("counts", "count", "sum_us", "max_us")
+
+    def __init__(self):
+        self.counts = {}      # bucket index -> observations
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Histogram:
+    """A latency histogram family: observe(seconds, **labels), or `with histogram.time(**labels):`."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        us = int(seconds * 1e6) if seconds > 0 else 0
+        index = _bucket(us)
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.counts[index] = series.counts.get(index, 0) + 1
+            series.count += 1
+            series.sum_us += us
+            if us > series.max_us:
+                series.max_us = us
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def _snapshot(self):
+        with self._lock:
+            return [(key, sorted(s.counts.items()), s.count, s.sum_us, s.max_us) for key, s in self._series.items()]
+
+    @staticmethod
+    def _quantile(buckets, count, q):
+        target, seen = max(math.ceil(q * count), 1), 0
+        for index, n in buckets:
+            seen += n
+            if seen >= target:
+                return _bucket_upper_us(index)
+        return 0
+
+    def stats(self):
+        return {
+            ",".join(f"{name}={value}" for name, value in zip(self.labels, key)) or "all": {
+                "count": count,
+                "avg_ms": round(sum_us / count / 1000, 3),
+                "p50_ms": round(self._quantile(buckets, count, 0.50) / 1000, 3),
+                "p90_ms": round(self._quantile(buckets, count, 0.90) / 1000, 3),
+                "p99_ms": round(self._quantile(buckets, count, 0.99) / 1000, 3),
+                "max_ms": round(max_us / 1000, 3),
+            }
+            for key, buckets, count, sum_us, max_us in self._snapshot()
+        }
+
+    def render(self, full_name):
+        lines = []
+        for key, buckets, count, sum_us, _ in self._snapshot():
+            cumulative, position = 0, 0
+            for bound in PROMETHEUS_BUCKETS:
+                bound_us = bound * 1e6
+                while position < len(buckets) and _bucket_upper_us(buckets[position][0]) <= bound_us:
+                    cumulative += buckets[position][1]
+                    position += 1
+                le = f'le="{bound}"'
+                lines.append(f"{full_name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{full_name}_bucket{_label_text(self.labels, key, le)} {count}")
+            lines.append(f"{full_name}_sum{_label_text(self.labels, key)} {sum_us / 1e6}")
+            lines.append(f"{full_name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class CounterFamily:
+    """A monotonically increasing counter family: inc(amount=1, **labels)."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def stats(self):
+        with self._lock:
+            return {",".join(f"{n}={v}" for n, v in zip(self.labels, key)) or "all": value
+                    for key, value in self._values.items()}
+
+    def render(self, full_name):
+        with self._lock:
+            return [f"{full_name}{_label_text(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Registry:
+    def __init__(self, namespace=NAMESPACE):
+        self.namespace = namespace
+        self._metrics = {}
+
+    def histogram(self, name, help, labels=()):
+        return self._metrics.setdefault(name, Histogram(name, help, labels))
+
+    def counter(self, name, help, labels=()):
+        return self._metrics.setdefault(name, CounterFamily(name, help, labels))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, metric in self._metrics.items():
+            full_name = f"{self.namespace}_{name}"
+            lines.append(f"# HELP {full_name} {metric.help}")
+            lines.append(f"# TYPE {full_name} {metric.kind}")
+            lines.extend(metric.render(full_name))
+        return "\n".join(lines) + "\n"
+
+    def stats(self):
+        return {name: metric.stats() for name, metric in self._metrics.items()}
+
+
+metrics = Registry()
+
+# --- STAGES ---
+CHAT_TURN_SECONDS = metrics.histogram("chat_turn_seconds", "Time to answer a /chat turn.", ("path",))
+FAST_PATH_HITS = metrics.counter("fast_path_hits_total", "Turns answered by the rule-based router.", ("intent",))
+LLM_CALL_SECONDS = metrics.histogram("llm_call_seconds", "Time per model call, to the final response.", ("model",))
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens reported by the model.", ("model", "kind"))
+LLM_ERRORS = metrics.counter("llm_errors_total", "Model calls that returned an error.", ("model",))
+TOOL_CALL_SECONDS = metrics.histogram("tool_call_seconds", "Time per agent tool call.", ("tool",))
+TOOL_ERRORS = metrics.counter("tool_errors_total", "Tool calls that raised or returned an error.", ("tool",))
+DB_COMMIT_SECONDS = metrics.histogram("db_commit_seconds", "Time per DB commit (incl. the final flush).",
+                                      ("source",))
+GOOGLE_API_SECONDS = metrics.histogram("google_api_seconds", "Time per Google API HTTP request.",
+                                       ("operation", "method"))
+GOOGLE_API_REQUESTS = metrics.counter("google_api_requests_total", "Google API HTTP requests by status.",
+                                      ("operation", "status"))
+
+
+def timed(histogram, **labels):
+    """Decorator: times every call of a sync or async function into `histogram`."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_tool(is_error=None):
+    """
+    Decorator for agent tools: times each call and counts it as an error
+    when it raises or when `is_error(result)` is true (tools report
+    failures as strings to the model).
+    """
+    def decorator(fn):
+        tool = fn.__name__
+
+        def finish(started, result=None, failed=False):
+            TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=tool)
+            if failed or (is_error is not None and is_error(result)):
+                TOOL_ERRORS.inc(tool=tool)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception:
+                    finish(started, failed=True)
+                    raise
+                finish(started, result)
+                return result
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception:
+                    finish(started, failed=True)
+                    raise
+                finish(started, result)
+                return result
+        return wrapper
+    return decorator
+
+
+class LlmTimer:
+    """
+    before/after_model_callback pair for the agent: times each model call
+    to its final (non-partial) response and counts the tokens it reports.
+    """
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._pending = {}   # invocation_id -> (started, model)
+
+    def before_model(self, callback_context, llm_request):
+        if len(self._pending) >= self.max_pending:
+            self._pending.clear()  # calls that errored out never reached after_model
+        self._pending[callback_context.invocation_id] = (time.perf_counter(), llm_request.model or "unknown")
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        pending = self._pending.pop(callback_context.invocation_id, None)
+        if pending is None:
+            return None
+        started, model = pending
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started, model=model)
+        if llm_response.error_code:
+            LLM_ERRORS.inc(model=model)
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            LLM_TOKENS.inc(usage.prompt_token_count or 0, model=model, kind="prompt")
+            LLM_TOKENS.inc(usage.candidates_token_count or 0, model=model, kind="completion")
+        return None
+
+
+llm_timer = LlmTimer()
+
+
+# --- DB COMMITS ---
+# Every SQLAlchemy Session (sync, async, write); before_commit runs ahead of
+# the final flush, so the flush is part of the commit time.
+_COMMIT_KEY = "observability_commit_started"
+
+
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info[_COMMIT_KEY] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop(_COMMIT_KEY, None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started, source="session")
+
+
+@event.listens_for(Session, "after_rollback")
+def _commit_abandoned(session):
+    session.info.pop(_COMMIT_KEY, None)
+
+
+# --- TRACE IDS ---
+trace_id_var = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace_id(incoming=None):
+    """Reuses a caller's X-Request-ID when it looks sane, else makes a new 16-hex-digit ID."""
+    if incoming and len(incoming) <= 64 and incoming.replace("-", "").isalnum():
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+class TraceMiddleware:
+    """ASGI middleware: one trace ID per HTTP request, in the context for logs and echoed as X-Trace-ID."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-request-id"), None)
+        trace_id = new_trace_id(incoming)
+        token = trace_id_var.set(trace_id)
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", trace_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            trace_id_var.reset(token)
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+def log_trace_ids(fmt="%(levelname)s:%(name)s:[%(trace_id)s] %(message)s"):
+    """Adds the current trace ID to every line written by the root logger's handlers."""
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(TraceIdFilter())
+        handler.setFormatter(logging.Formatter(fmt))
@@ -0,0 +1,57 @@
+"""
+Keyset (cursor) pagination for the admin APIs. A page is fetched with
+`WHERE (sort, id) < (last sort, last id) ORDER BY sort, id LIMIT n`, so
+every page costs one index seek no matter how deep it is, unlike OFFSET.
+Cursors are opaque URL-safe tokens holding the last row's key.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, tuple_
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    """Cursor -> key values typed like `columns`. Raises ValueError for a malformed cursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+    return [
+        datetime.fromisoformat(v) if isinstance(col.type, DateTime) and v is not None else v
+        for v, col in zip(values, columns)
+    ]
+
+
+def keyset_page(stmt, columns, cursor=None, descending=False, limit=50):
+    """
+    Orders `stmt` by `columns` (the last one must be unique, e.g. the primary
+    key) and applies the cursor predicate. Fetch limit + 1 rows and pass them
+    to next_cursor() to learn whether there is another page.
+    """
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, columns))
+        stmt = stmt.where(key < values if descending else key > values)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def next_cursor(rows, columns, limit):
+    """Trims the look-ahead row; returns (rows, cursor for the next page or None)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if hasattr(last, "_mapping"):
+        values = [last._mapping[c.key] for c in columns]
+    else:
+        values = [getattr(last, c.key) for c in columns]
+    return rows, encode_cursor(values)
@@ -0,0 +1,252 @@
+"""
+Slot reservations: a doctor's slot is booked at most once, however many
+sessions race for it and however often the model retries the tool call.
+
+    1. hold        BEGIN IMMEDIATE: drop expired holds, check the slot
+                   against confirmed bookings and other live holds, and
+                   insert a SlotHold that expires after `hold_seconds`.
+    2. confirm     BEGIN IMMEDIATE: insert the confirmed Appointment (the
+                   overlap triggers check it once more), queue its calendar
+                   event in the outbox and drop the hold, in one commit.
+
+The event is written by the CalendarOutbox worker after the commit, under
+an ID derived from the booking's idempotency key, so a resend overwrites
+the event instead of duplicating it; Appointment.gcal_event_id stays NULL
+until it lands.
+
+The idempotency key hashes doctor, start time and patient (email, else
+name). A repeated call waits while an attempt holds that key, then
+returns the appointment it made; if the attempt still holds it after
+`hold_seconds`, the repeat gives up with BookingInProgressError and
+leaves the hold alone.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app.database import (
+    WriteSessionLocal, Appointment, Doctor, SlotHold, BookingConflictError, BookingInProgressError,
+    OutsideScheduleError, APPOINTMENT_OVERLAP_MESSAGE, find_doctor
+)
+from app.tools.calendar_client import event_body
+from app.tools.calendar_outbox import enqueue_event
+
+logger = logging.getLogger(__name__)
+
+
+def idempotency_key(doctor_id, start_time, patient_email, patient_name):
+    """Hex digest naming one booking; doubles as its Google event ID (IDs must be [a-v0-9])."""
+    patient = (patient_email or patient_name or "").strip().lower()
+    return hashlib.sha256(f"{doctor_id}|{start_time.isoformat()}|{patient}".encode()).hexdigest()[:32]
+
+
+@dataclass
+class Booking:
+    appointment_id: int
+    doctor_id: int
+    doctor_name: str
+    event_id: str
+    end_time: datetime
+    replayed: bool = False  # True when an earlier identical call had already booked it
+
+
+class SlotReservations:
+    """
+    `on_booked()` is called after each new booking commits (tools.py wakes
+    the calendar outbox worker with it). With `schedules` (a
+    DoctorSchedules), a booking must be one of the doctor's slots, and an
+    omitted end time is the slot length.
+    """
+
+    def __init__(self, on_booked=None, hold_seconds=30, session_factory=WriteSessionLocal, schedules=None):
+        self.on_booked = on_booked
+        self.schedules = schedules
+        self.hold_seconds = hold_seconds
+        self.session_factory = session_factory
+
+        # Metrics
+        self.booked = 0
+        self.replayed = 0
+        self.conflicts = 0
+        self.outside_hours = 0
+        self.waits = 0
+
+    # --- DB STEPS (worker threads) ---
+    def _slot_taken(self, db, doctor_id, start, end, key):
+        """True if a confirmed booking or another live hold overlaps [start, end)."""
+        # Confirmed bookings never overlap, so only the latest one starting before `end` can collide.
+        latest_end = db.query(Appointment.end_time).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.status == "Confirmed",
+            Appointment.start_time < end
+        ).order_by(Appointment.start_time.desc()).limit(1).scalar()
+        if latest_end is not None and latest_end > start:
+            return True
+        return db.query(SlotHold.id).filter(
+            SlotHold.doctor_id == doctor_id,
+            SlotHold.idempotency_key != key,
+            SlotHold.start_time < end,
+            SlotHold.end_time > start
+        ).first() is not None
+
+    def _existing(self, db, key):
+        return db.query(Appointment.id).filter(
+            Appointment.idempotency_key == key, Appointment.status == "Confirmed"
+        ).scalar()
+
+    def _hold(self, key, doctor_id, start, end):
+        """Returns ("booked", appointment_id), ("pending", None) or ("held", None); raises on conflict."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            db.query(SlotHold).filter(SlotHold.expires_at <= now).delete()
+            # An identical call is between hold and confirm.
+            if db.query(SlotHold.id).filter(SlotHold.idempotency_key == key).first():
+                db.commit()
+                return "pending", None
+            existing = self._existing(db, key)
+            if existing is not None:
+                db.commit()
+                return "booked", existing
+            if self._slot_taken(db, doctor_id, start, end, key):
+                db.commit()
+                raise BookingConflictError(f"the doctor is already booked between {start} and {end}")
+            db.add(SlotHold(idempotency_key=key, doctor_id=doctor_id, start_time=start, end_time=end,
+                            expires_at=now + timedelta(seconds=self.hold_seconds)))
+            db.commit()
+            return "held", None
+        finally:
+            db.close()
+
+    def _confirm(self, key, doctor_id, doctor_name, start, end, patient_name, patient_email, reason, session_id):
+        """Inserts the confirmed Appointment and its outbox entry, releasing our hold; returns (appointment_id, replayed)."""
+        db = self.session_factory()
+        try:
+            hold = db.query(SlotHold).filter(SlotHold.idempotency_key == key).first()
+            if hold is None or hold.expires_at <= datetime.utcnow():
+                # The hold lapsed (slow step before us); the slot is still ours if nobody else claimed it.
+                db.query(SlotHold).filter(SlotHold.expires_at <= datetime.utcnow()).delete()
+                if self._slot_taken(db, doctor_id, start, end, key):
+                    db.commit()
+                    raise BookingConflictError(f"the doctor is already booked between {start} and {end}")
+            appt = Appointment(
+                doctor_id=doctor_id,
+                patient_name=patient_name,
+                patient_email=patient_email,
+                start_time=start,
+                end_time=end,
+                notes=reason,
+                source_session_id=session_id,
+                idempotency_key=key,
+                status="Confirmed"
+            )
+            db.add(appt)
+            db.flush()
+            calendar_id = db.query(Doctor.calendar_id).filter(Doctor.id == doctor_id).scalar()
+            enqueue_event(db, appt.id, key, event_body(
+                summary=f"Appt: {patient_name} ({doctor_name})",
+                start_iso=start.isoformat(),
+                end_iso=end.isoformat(),
+                description=f"Reason: {reason}\nDB ID: {appt.id}",
+                attendee_email=patient_email
+            ), calendar_id=calendar_id)
+            db.query(SlotHold).filter(SlotHold.idempotency_key == key).delete()
+            db.commit()
+            return appt.id, False
+        except IntegrityError as e:
+            db.rollback()
+            if APPOINTMENT_OVERLAP_MESSAGE in str(e):
+                raise BookingConflictError(f"the doctor is already booked between {start} and {end}") from e
+            existing = self._existing(db, key)
+            if existing is None:
+                raise
+            return existing, True
+        finally:
+            db.close()
+
+    def _release(self, key):
+        db = self.session_factory()
+        try:
+            db.query(SlotHold).filter(SlotHold.idempotency_key == key).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    # --- BOOKING ---
+    async def book(self, patient_name, patient_email, doctor_name, start, end, reason, session_id=None):
+        """
+        Books the slot and queues its calendar event. Returns a Booking, or
+        None when `doctor_name` doesn't identify one doctor. Raises
+        BookingConflictError when the slot is taken (OutsideScheduleError
+        when the doctor doesn't see patients then, BookingInProgressError
+        when an identical call is still booking it). `end` may be None.
+        """
+        doctor = await asyncio.to_thread(find_doctor, doctor_name)
+        if not doctor:
+            return None
+        doctor_id, doctor_name = doctor
+        if self.schedules is not None:
+            end = end or start + await asyncio.to_thread(self.schedules.slot_length, doctor_id, start)
+            problem = await asyncio.to_thread(self.schedules.outside_hours, doctor_id, start, end)
+            if problem:
+                self.outside_hours += 1
+                raise OutsideScheduleError(f"{doctor_name} can't be booked at {start}: {problem}")
+        end = end or start + timedelta(hours=1)
+        key = idempotency_key(doctor_id, start, patient_email, patient_name)
+
+        # 1. Hold (waiting out an identical call that is mid-booking).
+        deadline = time.monotonic() + self.hold_seconds
+        while True:
+            try:
+                state, appointment_id = await asyncio.to_thread(self._hold, key, doctor_id, start, end)
+            except BookingConflictError as e:
+                self.conflicts += 1
+                raise BookingConflictError(f"{doctor_name} is already booked between {start} and {end}") from e
+            if state != "pending":
+                break
+            if time.monotonic() > deadline:
+                # The hold is another call's: neither confirm on it nor release it.
+                self.conflicts += 1
+                raise BookingInProgressError(f"an identical booking with {doctor_name} at {start} is still in progress")
+            self.waits += 1
+            await asyncio.sleep(0.05)
+        if state == "booked":
+            self.replayed += 1
+            return Booking(appointment_id, doctor_id, doctor_name, key, end, replayed=True)
+
+        # 2. Confirm (state == "held": the hold is ours to release).
+        try:
+            appointment_id, replayed = await asyncio.to_thread(
+                self._confirm, key, doctor_id, doctor_name, start, end, patient_name, patient_email, reason, session_id
+            )
+        except BookingConflictError as e:
+            self.conflicts += 1
+            await asyncio.to_thread(self._release, key)
+            raise BookingConflictError(f"{doctor_name} is already booked between {start} and {end}") from e
+        except Exception:
+            await asyncio.to_thread(self._release, key)
+            raise
+        if replayed:
+            await asyncio.to_thread(self._release, key)
+            self.replayed += 1
+            return Booking(appointment_id, doctor_id, doctor_name, key, end, replayed=True)
+
+        self.booked += 1
+        if self.on_booked:
+            self.on_booked()
+        return Booking(appointment_id, doctor_id, doctor_name, key, end)
+
+    def stats(self):
+        return {
+            "booked": self.booked,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "outside_hours": self.outside_hours,
+            "waits": self.waits,
+            "hold_seconds": self.hold_seconds,
+        }
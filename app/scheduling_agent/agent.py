@@ -8,7 +8,9 @@ if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 
 from app.scheduling_agent._llm import lite,SYSTEM_INSTRUCTION
-from app.scheduling_agent.tools import list_available_doctors,check_calendar_availability,book_doctor_appointment
+from app.scheduling_agent.tools import list_available_doctors,check_calendar_availability,book_doctor_appointment,find_free_doctors
+from app.scheduling_agent.compaction import history_compactor
+from app.observability import llm_timer
 
 root_agent = LlmAgent(
     model=lite,
@@ -17,5 +19,9 @@ root_agent = LlmAgent(
     instruction=SYSTEM_INSTRUCTION,
     tools = [list_available_doctors,
              check_calendar_availability,
-             book_doctor_appointment]
+             book_doctor_appointment,
+             find_free_doctors],
+    # The timer goes last, so compaction is not counted as model time.
+    before_model_callback=[history_compactor, llm_timer.before_model],
+    after_model_callback=llm_timer.after_model
 )
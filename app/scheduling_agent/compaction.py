@@ -0,0 +1,107 @@
+"""
+Keeps the prompt from growing with the conversation. Before every model
+call, only the last `keep_turns` user turns are sent verbatim; everything
+older (including bulky tool output such as the doctor list) is folded into
+a small booking-state summary that lives in session state and is appended
+to the system instruction.
+"""
+import logging
+import re
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+BOOKING_STATE_KEY = "booking_state"
+BOOKING_FIELDS = ("patient_name", "patient_email", "doctor_name", "date_time", "reason", "status")
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_NAME = re.compile(r"\b(?i:my name is|name'?s|this is|i am|i'm)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)")
+_REASON = re.compile(r"\b(?:i have|i've got|i've been having|suffering from|i need (?:a|an|to see a)?)\s+(.{3,80}?)(?:[.!?,]|$)",
+                     re.IGNORECASE)
+
+# Tool-call argument names -> booking-state fields.
+_TOOL_ARGS = {
+    "book_doctor_appointment": {
+        "patient_name": "patient_name", "patient_email": "patient_email", "doctor_name": "doctor_name",
+        "date_time_iso": "date_time", "reason": "reason",
+    },
+    "check_calendar_availability": {"doctor_name": "doctor_name", "date_str": "date_time"},
+}
+
+
+def _is_user_turn(content):
+    """A new turn starts at a user message with text (function responses also have role 'user')."""
+    return content.role == "user" and any(p.text and not p.function_response for p in content.parts or [])
+
+
+def extract_booking_state(contents, state=None):
+    """Folds what the given contents say about the booking into `state` (later contents win)."""
+    state = dict(state or {})
+    for content in contents:
+        for part in content.parts or []:
+            if part.function_call and part.function_call.name in _TOOL_ARGS:
+                for arg, field in _TOOL_ARGS[part.function_call.name].items():
+                    value = (part.function_call.args or {}).get(arg)
+                    if value:
+                        state[field] = value
+            elif part.function_response and part.function_response.name == "book_doctor_appointment":
+                result = str((part.function_response.response or {}).get("result", ""))
+                state["status"] = "booked" if result.startswith("SUCCESS") else "booking failed"
+            elif part.text and content.role == "user":
+                if match := _EMAIL.search(part.text):
+                    state["patient_email"] = match.group(0)
+                if match := _NAME.search(part.text):
+                    state["patient_name"] = match.group(1)
+                if "reason" not in state and (match := _REASON.search(part.text)):
+                    state["reason"] = match.group(1).strip()
+    return state
+
+
+def format_booking_state(state):
+    known = [f"- {field.replace('_', ' ')}: {state[field]}" for field in BOOKING_FIELDS if state.get(field)]
+    lines = [
+        "### 📌 EARLIER CONVERSATION (summarized)",
+        "Older turns were removed to keep this prompt short. Details collected so far:",
+        *(known or ["- nothing yet"]),
+        "Do not ask again for details listed here. Call `list_available_doctors` again if you need the doctor list.",
+    ]
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """
+    `before_model_callback` for the agent. Drops every content before the
+    last `keep_turns` user turns, merges what they said into
+    state["booking_state"] and tells the model about it in the system
+    instruction.
+    """
+
+    def __init__(self, keep_turns=4):
+        self.keep_turns = keep_turns
+        self.counters = Counter()
+
+    def __call__(self, callback_context, llm_request):
+        contents = llm_request.contents
+        turn_starts = [i for i, c in enumerate(contents) if _is_user_turn(c)]
+        booking_state = callback_context.state.get(BOOKING_STATE_KEY) or {}
+
+        self.counters["requests"] += 1
+        if len(turn_starts) > self.keep_turns:
+            cut = turn_starts[-self.keep_turns]
+            folded = extract_booking_state(contents[:cut], booking_state)
+            if folded != booking_state:
+                callback_context.state[BOOKING_STATE_KEY] = booking_state = folded
+            llm_request.contents = contents[cut:]
+            self.counters["compacted"] += 1
+            self.counters["contents_dropped"] += cut
+            logger.debug(f"Compacted history: dropped {cut} content(s), kept {len(contents) - cut}")
+
+        if booking_state:
+            llm_request.append_instructions([format_booking_state(booking_state)])
+        return None
+
+    def stats(self):
+        return dict(self.counters)
+
+
+history_compactor = HistoryCompactor()
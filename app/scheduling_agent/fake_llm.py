@@ -0,0 +1,133 @@
+"""
+Deterministic stand-in for the LiteLlm model in _llm.py, for benchmarks
+and offline runs (no API key, no network):
+
+    root_agent.model = ScriptedLlm(latency_seconds=0.3)
+
+Each model call looks at the current turn (the last user message and the
+tool results that followed it) and asks a script what to do next: a
+(tool_name, args) pair becomes a function call that ADK executes with the
+real tools, a string is the final answer. The same conversation always
+produces the same calls, so load tests measure the app rather than a
+model's mood.
+
+receptionist_script covers the booking workflow of SYSTEM_INSTRUCTION for
+messages that spell out what they want, e.g.
+
+    "Is Dr. Asha Rao available on 2030-01-07?"
+    "Who is free at 2030-01-07T10:00:00 in Cardiology?"
+    "Book Dr. Asha Rao at 2030-01-07T10:00:00 for Ravi Kumar <ravi@example.com>, reason: checkup"
+"""
+import asyncio
+import re
+from typing import Any, AsyncGenerator, Callable
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+_DOCTOR_RE = re.compile(r"\bDr\.?\s+[A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)?")
+_WHEN_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}(?:T\d{2}:\d{2}(?::\d{2})?)?\b")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PATIENT_RE = re.compile(r"\bfor ([A-Z][\w'-]*(?: [A-Z][\w'-]*)*)")
+_REASON_RE = re.compile(r"\breason:?\s*(.+?)\s*[.!]?$", re.IGNORECASE)
+_DEPARTMENT_RE = re.compile(r"\bin ([A-Z][\w ]+?)\s*[?.!]?$")
+
+
+def receptionist_script(text, results):
+    """
+    Next step for one turn: (tool_name, args) to call a tool, or the reply
+    text. `results` holds the tool answers of this turn so far, in order.
+    """
+    doctor = _DOCTOR_RE.search(text)
+    doctor = doctor.group(0) if doctor else ""
+    when = _WHEN_RE.search(text)
+    when = when.group(0) if when else ""
+    lowered = text.lower()
+
+    if "book" in lowered and doctor and "T" in when:
+        email, patient = _EMAIL_RE.search(text), _PATIENT_RE.search(text)
+        if not (email and patient):
+            return "Could you tell me the patient's full name and email address?"
+        if not results:
+            return "check_calendar_availability", {"date_str": when, "doctor_name": doctor}
+        if len(results) == 1 and " is free at " in results[0]:
+            reason = _REASON_RE.search(text)
+            return "book_doctor_appointment", {
+                "patient_name": patient.group(1), "patient_email": email.group(0), "doctor_name": doctor,
+                "date_time_iso": when, "reason": reason.group(1) if reason else "Consultation",
+            }
+        return results[-1]
+
+    if results:
+        return results[-1]
+    if ("free" in lowered or "available" in lowered) and when:
+        if doctor or "T" not in when:
+            return "check_calendar_availability", {"date_str": when, "doctor_name": doctor}
+        department = _DEPARTMENT_RE.search(text)
+        return "find_free_doctors", {"date_time_iso": when, "department": department.group(1) if department else ""}
+    if "doctor" in lowered or "specialist" in lowered:
+        return "list_available_doctors", {}
+    return "Hello! I'm the Rugas Health receptionist. How can I help you today?"
+
+
+def _current_turn(contents):
+    """The last user message and the tool results after it (oldest first)."""
+    results = []
+    for content in reversed(contents):
+        parts = content.parts or []
+        responses = [p.function_response for p in parts if p.function_response]
+        if responses:
+            for response in reversed(responses):
+                payload = response.response or {}
+                results.append(str(payload.get("result", payload)))
+            continue
+        text = "".join(p.text for p in parts if p.text)
+        if content.role == "user" and text:
+            return text, results[::-1]
+    return "", results[::-1]
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    A BaseLlm that replays `script(user_text, tool_results)` (see
+    receptionist_script), waiting `latency_seconds` per call like a model
+    round trip and reporting a rough token count so the LLM metrics fill in.
+    """
+
+    model: str = "scripted"
+    script: Callable[[str, list], Any] = receptionist_script
+    latency_seconds: float = 0.0
+    calls: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        text, results = _current_turn(llm_request.contents)
+        step = self.script(text, results)
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        if isinstance(step, str):
+            if stream:
+                words = step.split(" ")
+                for i, word in enumerate(words):
+                    chunk = word if i == len(words) - 1 else word + " "
+                    yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                                      partial=True)
+            part = types.Part(text=step)
+        else:
+            name, args = step
+            part = types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+        prompt_chars = sum(len(p.text or "") for c in llm_request.contents for p in (c.parts or []))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=len(str(step)) // 4,
+            ),
+            turn_complete=True,
+        )
@@ -0,0 +1,243 @@
+"""
+Deterministic fast path that answers common turns straight from the DB,
+before the LLM is involved. Each intent is a small handler; the router runs
+all of them and takes the most confident answer, falling back to the agent
+when nothing clears the threshold.
+
+The catalog is loaded into a CatalogSnapshot every `catalog_ttl` seconds:
+doctor names go into a DoctorIndex and department/specialization words
+into a small vocabulary, so matching a turn against the catalog is a few
+posting lookups, and the full listings are rendered once per snapshot.
+"""
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from app.database import get_doctor_catalog
+from app.observability import CHAT_TURN_SECONDS, FAST_PATH_HITS
+from app.tools.doctor_index import DoctorIndex
+
+logger = logging.getLogger(__name__)
+
+GREETING_RESPONSE = "Hello Sir/Mam! Welcome to Rugas Health. Can I please know your name?"
+
+# Anything that needs the booking workflow or a real calendar check goes to the agent.
+_NEEDS_AGENT = re.compile(
+    r"\b(book|booking|appointment|schedule|reschedule|cancel|tomorrow|today|tonight|monday|tuesday|"
+    r"wednesday|thursday|friday|saturday|sunday|next week|\d{1,2}\s*(?:am|pm)|\d{1,2}:\d{2}|\d{4}-\d{2}-\d{2}|"
+    r"free at|available at|slot)\b",
+    re.IGNORECASE,
+)
+_GREETING = re.compile(
+    r"^(hi|hello|hey|hii+|start|greetings|good (morning|afternoon|evening))( there)?[\s!.]*$", re.IGNORECASE
+)
+_LIST_DOCTORS = re.compile(
+    r"\b((which|what|who|list|show)\b.*\b(doctors?|specialists?|physicians?)|doctors? (do )?you have|"
+    r"(all|your) (doctors|specialists))\b",
+    re.IGNORECASE,
+)
+_FEE = re.compile(r"\b(fee|fees|cost|costs|charge|charges|price|pricing|how much)\b", re.IGNORECASE)
+_LOCATION = re.compile(r"\b(where|location|located|address|which (wing|floor)|find you)\b", re.IGNORECASE)
+_HOURS = re.compile(r"\b(hours|timings?|working days|when (is|are|does|do)\b.*\b(available|work|open))", re.IGNORECASE)
+
+_WORD = re.compile(r"[a-z]+")
+_STOP_WORDS = {"dr", "doctor", "the", "and", "what", "whats", "which", "where", "when", "your", "for", "with", "his", "her"}
+
+
+@dataclass
+class RouteResult:
+    intent: str
+    confidence: float
+    response: str
+
+
+class CatalogSnapshot:
+    """One load of the doctor catalog, with the lookups built from it."""
+
+    def __init__(self, doctors):
+        self.doctors = doctors
+        self.by_id = {doc["id"]: doc for doc in doctors}
+        self.names = DoctorIndex()
+        self.names.load((doc["id"], doc["name"]) for doc in doctors)
+        self.fields = {}            # department/specialization word -> [doctor]
+        for doc in doctors:
+            words = _WORD.findall(f"{doc['department'] or ''} {doc['specialization'] or ''}".lower())
+            for word in dict.fromkeys(w for w in words if len(w) >= 4):
+                self.fields.setdefault(word, []).append(doc)
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def rendered(self, key, render):
+        """render(doctors), computed once per snapshot (the catalog-wide listings)."""
+        with self._lock:
+            if key not in self._rendered:
+                self._rendered[key] = render(self.doctors)
+            return self._rendered[key]
+
+
+class RouteContext:
+    """Catalog snapshot plus fuzzy lookups shared by all handlers for one turn."""
+
+    def __init__(self, text, catalog):
+        self.text = text
+        self.catalog = catalog
+        self.words = [w for w in _WORD.findall(text.lower()) if len(w) >= 3 and w not in _STOP_WORDS]
+
+    def match_doctors(self, min_score=0.8):
+        """[(score, doctor)] for doctors whose name fuzzy-matches a word in the text, best first."""
+        scores = self.catalog.names.mentioned(self.words, min_score)
+        matches = [(score, self.catalog.by_id[doctor_id]) for doctor_id, score in scores.items()]
+        return sorted(matches, key=lambda m: (-m[0], m[1]["id"]))
+
+    def match_departments(self, min_score=0.8):
+        """[(score, doctor)] for doctors whose department or specialization matches the text."""
+        best = {}
+        for field_word, doctors in self.catalog.fields.items():
+            score = max((SequenceMatcher(None, word, field_word).ratio() for word in self.words), default=0.0)
+            if score >= min_score:
+                for doc in doctors:
+                    if score > best.get(doc["id"], (0.0, None))[0]:
+                        best[doc["id"]] = (score, doc)
+        return sorted(best.values(), key=lambda m: (-m[0], m[1]["id"]))
+
+    def targets(self):
+        """Doctors the question is about: by name first, then by department/specialization."""
+        return self.match_doctors() or self.match_departments()
+
+
+def _format_doctor(doc):
+    return f"{doc['name']} ({doc['specialization']})"
+
+
+# --- INTENT HANDLERS ---
+def greeting(ctx):
+    if _GREETING.match(ctx.text.strip()):
+        return RouteResult("greeting", 1.0, GREETING_RESPONSE)
+
+
+def list_doctors(ctx):
+    if not _LIST_DOCTORS.search(ctx.text) or _FEE.search(ctx.text) or _LOCATION.search(ctx.text):
+        return None
+    if not ctx.catalog.doctors:
+        return RouteResult("list_doctors", 0.9, "I apologize, we don't have any doctors listed right now.")
+    return RouteResult("list_doctors", 0.9, ctx.catalog.rendered("list_doctors", lambda doctors: (
+        "Here are our doctors:\n"
+        + "\n".join(f"- **{_format_doctor(d)}**, {d['department']}, fee ${d['fee']:.2f}" for d in doctors)
+    )))
+
+
+def doctor_fee(ctx):
+    if not _FEE.search(ctx.text):
+        return None
+    targets = ctx.targets()
+    if targets:
+        score, _ = targets[0]
+        docs = [d for s, d in targets if s == score]
+        lines = [f"The consultation fee for {_format_doctor(d)} is ${d['fee']:.2f}." for d in docs]
+        return RouteResult("doctor_fee", 0.95 * score, " ".join(lines))
+    return RouteResult("doctor_fee", 0.8, ctx.catalog.rendered("doctor_fee", lambda doctors: (
+        "Our consultation fees:\n" + "\n".join(f"- {_format_doctor(d)}: ${d['fee']:.2f}" for d in doctors)
+    )))
+
+
+def doctor_location(ctx):
+    if not _LOCATION.search(ctx.text):
+        return None
+    targets = ctx.targets()
+    if targets:
+        score, _ = targets[0]
+        docs = [d for s, d in targets if s == score]
+        lines = [f"{_format_doctor(d)} sees patients in {d['department']}, {d['location']}." for d in docs]
+        return RouteResult("doctor_location", 0.95 * score, " ".join(lines))
+    def render(doctors):
+        departments = {d["department"]: d["location"] for d in doctors if d["department"]}
+        lines = [f"- {name}: {location}" for name, location in departments.items()]
+        return "You can find our departments here:\n" + "\n".join(lines)
+    return RouteResult("doctor_location", 0.8, ctx.catalog.rendered("doctor_location", render))
+
+
+def doctor_hours(ctx):
+    if not _HOURS.search(ctx.text):
+        return None
+    targets = ctx.targets()
+    if targets:
+        score, _ = targets[0]
+        docs = [d for s, d in targets if s == score]
+        lines = [f"{_format_doctor(d)} is available {d['availability']}." for d in docs]
+        return RouteResult("doctor_hours", 0.95 * score, " ".join(lines))
+    return RouteResult("doctor_hours", 0.8, ctx.catalog.rendered("doctor_hours", lambda doctors: (
+        "Our doctors' hours:\n" + "\n".join(f"- {_format_doctor(d)}: {d['availability']}" for d in doctors)
+    )))
+
+
+DEFAULT_HANDLERS = [greeting, list_doctors, doctor_fee, doctor_location, doctor_hours]
+
+
+class IntentRouter:
+    """
+    Runs every registered handler on a turn and returns the most confident
+    RouteResult, or None when the agent should take the turn. Handlers are
+    plain functions `handler(ctx: RouteContext) -> RouteResult | None`;
+    add more with register().
+    """
+
+    def __init__(self, handlers=None, threshold=0.75, catalog_loader=get_doctor_catalog, catalog_ttl=60):
+        self.handlers = list(DEFAULT_HANDLERS if handlers is None else handlers)
+        self.threshold = threshold
+        self.catalog_loader = catalog_loader
+        self.catalog_ttl = catalog_ttl
+        self._catalog = None
+        self._catalog_loaded_at = 0.0
+
+        # Stats: turns per route (intent name, or "agent") and total latency.
+        self.routes = Counter()
+        self.latency_ms = Counter()
+
+    def register(self, handler):
+        self.handlers.append(handler)
+        return handler
+
+    def catalog(self):
+        if self._catalog is None or time.monotonic() - self._catalog_loaded_at > self.catalog_ttl:
+            self._catalog = CatalogSnapshot(self.catalog_loader())
+            self._catalog_loaded_at = time.monotonic()
+        return self._catalog
+
+    def route(self, text):
+        if _NEEDS_AGENT.search(text):
+            return None
+        ctx = RouteContext(text, self.catalog())
+        best = None
+        for handler in self.handlers:
+            result = handler(ctx)
+            if result and result.confidence >= self.threshold and (best is None or result.confidence > best.confidence):
+                best = result
+        return best
+
+    def record(self, route, elapsed_ms, session_id=None):
+        """Records how one turn was served ("agent" when the router fell back)."""
+        self.routes[route] += 1
+        self.latency_ms[route] += elapsed_ms
+        CHAT_TURN_SECONDS.observe(elapsed_ms / 1000, path="agent" if route == "agent" else "fast_path")
+        if route != "agent":
+            FAST_PATH_HITS.inc(intent=route)
+        logger.info(f"route={route} latency_ms={elapsed_ms:.1f} session={session_id}")
+
+    def stats(self):
+        total = sum(self.routes.values())
+        bypassed = total - self.routes["agent"]
+        return {
+            "turns": total,
+            "llm_bypass_rate": round(bypassed / total, 3) if total else 0.0,
+            "routes": {
+                route: {"turns": n, "avg_latency_ms": round(self.latency_ms[route] / n, 2)}
+                for route, n in self.routes.items()
+            },
+        }
+
+
+intent_router = IntentRouter()
@@ -1,4 +1,6 @@
+import asyncio
 import datetime
+import logging
 import sys
 from pathlib import Path
 
@@ -9,12 +11,69 @@ if str(project_root) not in sys.path:
     sys.path.append(str(project_root))
 # ----------------
 
-from app.tools.calendar_client import get_calendar_service, create_event, list_upcoming_events
-from app.database import create_appointment_in_db, get_all_doctors
+from google.adk.tools.tool_context import ToolContext
 
-service = get_calendar_service()
+from app.tools.calendar_client import calendar_clients, get_calendar_service, to_local
+from app.tools.availability import AvailabilityEngine, google_freebusy_loader
+from app.tools.schedule import DoctorSchedules
+from app.tools.calendar_sync import CalendarSync
+from app.tools.calendar_outbox import CalendarOutbox
+from app.tools.tool_cache import tool_cache
+from app.observability import timed_tool
+from app.database import (
+    get_all_doctors, get_doctor_catalog, find_doctor, suggest_doctors, BookingConflictError, BookingInProgressError,
+    ScheduleRule, ScheduleException, cache_sync, doctor_index
+)
+from app.worker_sync import TRACKED_TABLES
+from app.reservations import SlotReservations
+
+logger = logging.getLogger(__name__)
+
+# Availability checks read the local calendar mirror of the shared calendar; doctors with their
+# own calendar are covered by a bulk freebusy query (50 calendars per request) that the app runs
+# in the background through the Calendar pool (availability.run_calendar_refresh).
+# The Calendar client is created lazily, per thread, on first use.
+calendar_sync = CalendarSync(get_calendar_service)
+# Working hours and slot lengths per doctor, as bitmaps per doctor-day (reloaded when a rule changes).
+schedules = DoctorSchedules()
+schedules.watch(ScheduleRule, ScheduleException)
+availability = AvailabilityEngine(calendar_sync.events_between,
+                                  load_calendar_busy=google_freebusy_loader(calendar_clients.run),
+                                  schedules=schedules)
+
+def _on_calendar_change():
+    availability.invalidate()
+    tool_cache.invalidate(["calendar_events"])
+
+calendar_sync.on_change = _on_calendar_change
+
+# Commits made by other worker processes (app/worker_sync.py); our own are handled above and by the ORM hooks.
+cache_sync.on_change(TRACKED_TABLES, tool_cache.invalidate)
+cache_sync.on_change(("appointments", "calendar_events", "doctors"), lambda tables: availability.invalidate())
+cache_sync.on_change(("schedule_rules", "schedule_exceptions"), lambda tables: schedules.invalidate())
+cache_sync.on_change(("doctors",), lambda tables: doctor_index.invalidate())
+
+# Calendar writes go through the outbox: a booking returns once its DB commit is done.
+calendar_outbox = CalendarOutbox(calendar_clients.run)
+
+# Hold -> confirm (+ outbox entry), idempotent per (doctor, slot, patient).
+reservations = SlotReservations(on_booked=calendar_outbox.wake, schedules=schedules)
+
+# The /chat handlers put the chat session's id in the session state (runner.run_async(state_delta=...)),
+# where tools read it through the public tool_context.state.
+SESSION_ID_STATE_KEY = "chat_session_id"
+
+def _failed(result):
+    return result.startswith(("Error", "ERROR", "System:"))
+
+def _cacheable(result):
+    """Error strings are never cached, so a transient failure is retried on the next call."""
+    return not _failed(result)
 
 # --- TOOL 1: DISCOVERY ---
+@timed_tool(is_error=_failed)
+@tool_cache.cached("list_available_doctors", ttl_seconds=300, maxsize=1,
+                   depends_on=("doctors", "departments"), cache_if=_cacheable)
 def list_available_doctors() -> str:
     """
     Returns a list of all doctors, their specializations, and consultation fees.
@@ -28,27 +87,78 @@ def list_available_doctors() -> str:
     except Exception as e:
         return f"Error listing doctors: {e}"
 
+def _doctor_not_found(doctor_name):
+    """Error for an unknown or ambiguous doctor name, with the closest matches for the model to offer."""
+    suggestions = suggest_doctors(doctor_name)
+    if suggestions:
+        return (f"ERROR: '{doctor_name}' does not identify exactly one doctor. "
+                f"Closest matches: {', '.join(suggestions)}. Ask the user which one they mean.")
+    return f"ERROR: Could not find a doctor named '{doctor_name}'. Please ask the user to pick from: {list_available_doctors()}"
+
 # --- TOOL 2: CHECKING ---
-def check_calendar_availability(date_str: str) -> str:
+@timed_tool(is_error=_failed)
+@tool_cache.cached("check_calendar_availability", ttl_seconds=30, maxsize=512,
+                   depends_on=("appointments", "doctors", "calendar_events", "schedule_rules", "schedule_exceptions"),
+                   cache_if=_cacheable)
+async def check_calendar_availability(date_str: str, doctor_name: str) -> str:
     """
-    Checks availability for a specific date (YYYY-MM-DD).
+    Checks availability for a date (YYYY-MM-DD) or a specific slot (YYYY-MM-DDTHH:MM:SS).
+    
+    Args:
+        date_str: The date, or the exact start time of the slot to check.
+        doctor_name: Name of the doctor whose schedule to check (e.g. "Dr. Sarah"). Use "" for the whole clinic.
     """
+    # DB reads (and the very first mirror sync) must not block the event loop.
+    return await asyncio.to_thread(_check_availability, date_str, doctor_name)
+
+def _check_availability(date_str, doctor_name):
     try:
-        events = list_upcoming_events(service, max_results=10)
-        busy_times = []
-        for e in events:
-            start = e['start'].get('dateTime', e['start'].get('date'))
-            if date_str in start:
-                busy_times.append(start)
-        
-        if not busy_times:
-            return f"The calendar is completely free on {date_str}."
-        return f"Busy slots on {date_str}: {', '.join(busy_times)}"
+        doctor_id, label = None, "The calendar"
+        if doctor_name:
+            doctor = find_doctor(doctor_name)
+            if not doctor:
+                return _doctor_not_found(doctor_name)
+            doctor_id, label = doctor
+
+        # A) Specific slot
+        if 'T' in date_str:
+            start = to_local(date_str)
+            if start < availability.clock():
+                upcoming = ', '.join(s.isoformat() for s in availability.next_free_slots(start, n=3, doctor_id=doctor_id))
+                return f"{start.isoformat()} is in the past. Next free slots: {upcoming or 'none'}"
+            if availability.is_free(start, doctor_id=doctor_id):
+                return f"{label} is free at {start.isoformat()}."
+            alternatives = availability.next_free_slots(start, n=3, doctor_id=doctor_id)
+            suggestions = ', '.join(s.isoformat() for s in alternatives) or "none in the next few weeks"
+            off_hours = doctor_id and schedules.outside_hours(doctor_id, start, start + schedules.slot_length(doctor_id, start))
+            if off_hours:
+                return f"{label} is not available at {start.isoformat()}: {off_hours}. Next free slots: {suggestions}"
+            return f"{label} is busy at {start.isoformat()}. Next free slots: {suggestions}"
+
+        # B) Whole day
+        day = datetime.date.fromisoformat(date_str)
+        if doctor_id and not schedules.slot_starts(doctor_id, day):
+            upcoming = ', '.join(s.isoformat() for s in availability.next_free_slots(
+                datetime.datetime(day.year, day.month, day.day), n=3, doctor_id=doctor_id))
+            return f"{label} does not see patients on {date_str}. Next free slots: {upcoming or 'none'}"
+        busy = availability.busy_on(day, doctor_id=doctor_id)
+        day_start = datetime.datetime(day.year, day.month, day.day)
+        free = [
+            s for s in availability.next_free_slots(day_start, n=3, doctor_id=doctor_id)
+            if s.date() == day
+        ]
+        free_text = ', '.join(s.strftime('%H:%M') for s in free) or "none"
+        if not busy:
+            return f"{label} is completely free on {date_str}. Suggested slots: {free_text}"
+        busy_text = ', '.join(f"{b[0].strftime('%H:%M')}-{b[1].strftime('%H:%M')}" for b in busy)
+        return f"Busy slots on {date_str}: {busy_text}. Free slots: {free_text}"
     except Exception as e:
         return f"Error checking calendar: {e}"
 
 # --- TOOL 3: BOOKING (Updated) ---
-def book_doctor_appointment(patient_name: str, patient_email: str, doctor_name: str, date_time_iso: str, reason: str) -> str:
+@timed_tool(is_error=_failed)
+async def book_doctor_appointment(patient_name: str, patient_email: str, doctor_name: str, date_time_iso: str, reason: str,
+                                  tool_context: ToolContext) -> str:
     """
     Books an appointment.
     YOU MUST COLLECT ALL 5 ARGUMENTS FROM THE USER BEFORE CALLING THIS.
@@ -61,37 +171,75 @@ def book_doctor_appointment(patient_name: str, patient_email: str, doctor_name:
         reason: The purpose of the visit.
     """
     try:
-        # 1. Calculate End Time
-        start_dt = datetime.datetime.fromisoformat(date_time_iso)
-        end_dt = start_dt + datetime.timedelta(hours=1)
+        # 1. Start time (the end follows from the doctor's slot length); an offset such as +05:30 is
+        # converted to the naive clinic time everything else is stored in.
+        start_dt = to_local(date_time_iso)
+        if start_dt < availability.clock():
+            return f"ERROR: {start_dt.isoformat()} is in the past. Please ask the patient for a future time."
         
-        # 2. Save to Database
-        # Note: We removed tool_context, so we aren't capturing session_id here anymore.
-        result = create_appointment_in_db(
+        # 2. Reserve the slot and save it; the Google Calendar event follows via the outbox
+        # (a retried call with the same details returns the same booking).
+        # The chat session is recorded so the appointment links to its transcript
+        # (ADK fills in tool_context and leaves it out of the tool's schema).
+        booking = await reservations.book(
             patient_name=patient_name,
             patient_email=patient_email,
             doctor_name=doctor_name,
-            start_time=start_dt,
-            end_time=end_dt,
-            reason=reason
+            start=start_dt,
+            end=None,
+            reason=reason,
+            session_id=tool_context.state.get(SESSION_ID_STATE_KEY)
         )
-        
-        if not result:
-            valid_docs = list_available_doctors()
-            return f"ERROR: Could not find a doctor named '{doctor_name}'. Please ask the user to pick from: {valid_docs}"
-        
-        appt_id, real_doc_name = result
-
-        # 3. Save to Google Calendar
-        create_event(
-            service, 
-            summary=f"Appt: {patient_name} ({real_doc_name})", 
-            start_iso=date_time_iso, 
-            end_iso=end_dt.isoformat(),
-            description=f"Reason: {reason}\nDB ID: {appt_id}",
-            attendee_email=patient_email
-        )
-        
-        return f"SUCCESS. Booked {patient_name} with {real_doc_name} at {date_time_iso}."
+    except BookingInProgressError as e:
+        return f"ERROR: {e}. Wait a moment and make the same booking call again to get its result."
+    except BookingConflictError as e:
+        return f"ERROR: {e}. Please suggest a different time (check_calendar_availability lists free slots)."
     except Exception as e:
-        return f"Failed to book: {e}"
\ No newline at end of file
+        return f"Failed to book: {e}"
+
+    if not booking:
+        return _doctor_not_found(doctor_name)
+
+    # The appointment is committed from here on: a failed index update must not turn into "Failed to book".
+    if not booking.replayed:
+        try:
+            availability.add_booking(booking.doctor_id, start_dt, booking.end_time)
+        except Exception as e:
+            logger.warning(f"Availability index update failed for appointment {booking.appointment_id}: {e}")
+            availability.invalidate()
+
+    return (f"SUCCESS. Booked {patient_name} with {booking.doctor_name} at {start_dt.isoformat()} "
+            f"until {booking.end_time.strftime('%H:%M')}.")
+
+# --- TOOL 4: WHO IS FREE ---
+@timed_tool(is_error=_failed)
+@tool_cache.cached("find_free_doctors", ttl_seconds=30, maxsize=512,
+                   depends_on=("appointments", "doctors", "departments", "calendar_events", "schedule_rules",
+                               "schedule_exceptions"), cache_if=_cacheable)
+async def find_free_doctors(date_time_iso: str, department: str) -> str:
+    """
+    Lists every doctor free for a one-hour slot, optionally within one department or specialization.
+
+    Args:
+        date_time_iso: Start time in ISO format (e.g. 2025-11-22T10:00:00).
+        department: Department or specialization (e.g. "Cardiology"). Use "" for all doctors.
+    """
+    return await asyncio.to_thread(_find_free_doctors, date_time_iso, department)
+
+def _find_free_doctors(date_time_iso, department):
+    try:
+        start = to_local(date_time_iso)
+        wanted = department.strip().lower()
+        doctors = [
+            d for d in get_doctor_catalog()
+            if not wanted or wanted in (d["department"] or "").lower() or wanted in (d["specialization"] or "").lower()
+        ]
+        if not doctors:
+            return f"ERROR: No doctors found for '{department}'. Use list_available_doctors to see the departments."
+        free = set(availability.free_doctors(start, [d["id"] for d in doctors]))
+        names = [f"{d['name']} ({d['specialization']})" for d in doctors if d["id"] in free]
+        if not names:
+            return f"No {department or 'doctor'} is free at {start.isoformat()}."
+        return f"Free at {start.isoformat()}: " + ", ".join(names)
+    except Exception as e:
+        return f"Error checking calendar: {e}"
@@ -0,0 +1,256 @@
+"""
+Full-text search over the chat log and appointment notes.
+
+Two SQLite FTS5 external-content indexes point at the source tables, so
+the text is stored once and the index only holds tokens:
+
+    chat_history_fts        chat_history.content   (rowid = chat_history.id)
+    appointment_notes_fts   appointments.notes     (rowid = appointments.id)
+
+Triggers keep them current in the same transaction as every insert,
+update and delete (including the chat archiver's deletes: archived
+messages drop out of search with the live rows). The porter tokenizer
+matches word forms, so "pain" also finds "pains"; prefixes match the
+stems ("palp*" finds "palpitations", whose stem is "palpit").
+
+Queries are plain words: every word must match, "double quotes" make a
+phrase and a trailing * a prefix, and anything else (operators,
+punctuation) is taken literally, so user input can never be an FTS5
+syntax error. Results are ranked by bm25, or newest first with
+sort="recent", and paged with the usual keyset cursors (app/pagination.py).
+Ranking scores every match, so a ranked page costs time in proportion to
+how common the words are; newest-first pages stop after `limit` hits.
+
+Usage:
+    python -m app.search --check      # FTS5 integrity-check against the source tables
+    python -m app.search --rebuild    # re-index both tables from scratch
+    python -m app.search --optimize   # merge index segments (after large imports)
+"""
+import argparse
+import logging
+import re
+import sys
+from pathlib import Path
+
+from sqlalchemy import Float, Integer, column, func, literal_column, select, table, text
+from sqlalchemy.exc import DatabaseError
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.database import engine, Appointment, ChatHistory, Doctor
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_TOKENS = 12
+SNIPPET_MARK = ("<mark>", "</mark>")   # not HTML-escaped: the text around the marks is raw content
+
+
+# --- INDEXES ---
+# name -> (source table, indexed column)
+SEARCH_INDEXES = {
+    "chat_history_fts": ("chat_history", "content"),
+    "appointment_notes_fts": ("appointments", "notes"),
+}
+
+
+def _index_sql(name, source, col):
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5(
+            {col}, content='{source}', content_rowid='id', tokenize='porter unicode61'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_insert AFTER INSERT ON {source}
+        BEGIN
+            INSERT INTO {name} (rowid, {col}) VALUES (NEW.id, NEW.{col});
+        END
+        """,
+        # External content: the index removes a row's tokens given its old text.
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_delete AFTER DELETE ON {source}
+        BEGIN
+            INSERT INTO {name} ({name}, rowid, {col}) VALUES ('delete', OLD.id, OLD.{col});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_update AFTER UPDATE OF {col} ON {source}
+        BEGIN
+            INSERT INTO {name} ({name}, rowid, {col}) VALUES ('delete', OLD.id, OLD.{col});
+            INSERT INTO {name} (rowid, {col}) VALUES (NEW.id, NEW.{col});
+        END
+        """,
+    ]
+
+
+def create(conn):
+    """Creates the indexes and their triggers if missing (used by the migration)."""
+    for name, (source, col) in SEARCH_INDEXES.items():
+        for sql in _index_sql(name, source, col):
+            conn.exec_driver_sql(sql)
+
+
+def rebuild_on(conn):
+    """Re-indexes every row of the source tables on `conn`."""
+    for name in SEARCH_INDEXES:
+        conn.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+
+
+def rebuild(bind=engine):
+    with bind.begin() as conn:
+        rebuild_on(conn)
+    logger.info("Search indexes rebuilt")
+
+
+def optimize(bind=engine):
+    with bind.begin() as conn:
+        for name in SEARCH_INDEXES:
+            conn.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('optimize')")
+
+
+def check(bind=engine):
+    """Indexes that disagree with their source table, as (index, error)."""
+    problems = []
+    with bind.connect() as conn:
+        for name in SEARCH_INDEXES:
+            try:
+                # rank = 1 also compares the index with the external content.
+                conn.exec_driver_sql(f"INSERT INTO {name} ({name}, rank) VALUES ('integrity-check', 1)")
+            except DatabaseError as e:
+                problems.append((name, str(e.orig)))
+        conn.rollback()
+    return problems
+
+
+# --- QUERIES ---
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+")
+
+
+def to_match(q):
+    """
+    User text -> FTS5 MATCH expression: each word or "phrase" becomes a
+    quoted string (a trailing * keeps prefix matching), implicitly ANDed.
+    Returns None when `q` has no searchable words.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(q):
+        source = phrase or word
+        if not _WORD.search(source):
+            continue
+        prefix = "*" if word.endswith("*") else ""
+        terms.append('"' + source.rstrip("*").replace('"', '""') + '"' + prefix)
+    return " ".join(terms) or None
+
+
+def _fts(name):
+    return table(name, column("rowid", Integer), column("rank", Float))
+
+
+CHAT_FTS = _fts("chat_history_fts")
+NOTES_FTS = _fts("appointment_notes_fts")
+# sort -> (keyset columns, descending)
+SEARCH_SORTS = {
+    "rank": lambda fts: ((fts.c.rank, fts.c.rowid), False),
+    "recent": lambda fts: ((fts.c.rowid,), True),
+}
+
+
+def _snippet(fts, col):
+    return func.snippet(literal_column(fts.name), col, *SNIPPET_MARK, "…", SNIPPET_TOKENS).label("snippet")
+
+
+def chat_query(match, session_id=None, since=None, until=None):
+    """Matching chat messages; page it with keyset_page over SEARCH_SORTS[sort](CHAT_FTS)."""
+    stmt = (
+        select(CHAT_FTS.c.rowid, CHAT_FTS.c.rank, ChatHistory.session_id, ChatHistory.role, ChatHistory.timestamp,
+               _snippet(CHAT_FTS, 0))
+        .select_from(CHAT_FTS.join(ChatHistory, ChatHistory.id == CHAT_FTS.c.rowid))
+        .where(text("chat_history_fts MATCH :match").bindparams(match=match))
+    )
+    if session_id:
+        stmt = stmt.where(ChatHistory.session_id == session_id)
+    if since:
+        stmt = stmt.where(ChatHistory.timestamp >= since)
+    if until:
+        stmt = stmt.where(ChatHistory.timestamp < until)
+    return stmt
+
+
+def notes_query(match, session_id=None, since=None, until=None):
+    """Appointments whose notes match; `since`/`until` bound the appointment start."""
+    stmt = (
+        select(NOTES_FTS.c.rowid, NOTES_FTS.c.rank, Appointment.patient_name, Doctor.name.label("doctor"),
+               Appointment.start_time, Appointment.status, Appointment.source_session_id, _snippet(NOTES_FTS, 0))
+        .select_from(NOTES_FTS.join(Appointment, Appointment.id == NOTES_FTS.c.rowid)
+                     .join(Doctor, Doctor.id == Appointment.doctor_id))
+        .where(text("appointment_notes_fts MATCH :match").bindparams(match=match))
+    )
+    if session_id:
+        stmt = stmt.where(Appointment.source_session_id == session_id)
+    if since:
+        stmt = stmt.where(Appointment.start_time >= since)
+    if until:
+        stmt = stmt.where(Appointment.start_time < until)
+    return stmt
+
+
+def chat_hit(row):
+    return {
+        "id": row.rowid,
+        "session_id": row.session_id,
+        "role": row.role,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "snippet": row.snippet,
+        "score": float(f"{-row.rank:.4g}"),
+    }
+
+
+def notes_hit(row):
+    return {
+        "id": row.rowid,
+        "patient": row.patient_name,
+        "doctor": row.doctor,
+        "time": row.start_time.strftime("%Y-%m-%d %H:%M"),
+        "status": row.status,
+        "session_id": row.source_session_id,
+        "snippet": row.snippet,
+        "score": float(f"{-row.rank:.4g}"),
+    }
+
+
+# scope -> (FTS table, query builder, row -> dict)
+SEARCH_SCOPES = {
+    "chat": (CHAT_FTS, chat_query, chat_hit),
+    "appointments": (NOTES_FTS, notes_query, notes_hit),
+}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Check, rebuild or optimize the full-text search indexes.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--check", action="store_true", help="compare the indexes with the source tables")
+    group.add_argument("--rebuild", action="store_true", help="re-index both tables from scratch")
+    group.add_argument("--optimize", action="store_true", help="merge each index into a single segment")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild()
+        print("Search indexes rebuilt.")
+        return
+    if args.optimize:
+        optimize()
+        print("Search indexes optimized.")
+        return
+    problems = check()
+    for name, error in problems:
+        print(f"{name}: {error}")
+    print(f"{len(problems)} index(es) out of sync." if problems else "Search indexes match the source tables.")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
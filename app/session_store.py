@@ -0,0 +1,347 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(BASE_DIR, "..", "sessions.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS adk_sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS ix_adk_sessions_last_update ON adk_sessions (last_update_time);
+CREATE TABLE IF NOT EXISTS adk_events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS adk_app_state (
+    app_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (app_name, key)
+);
+CREATE TABLE IF NOT EXISTS adk_user_state (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, key)
+);
+"""
+
+
+def _encode_event(event):
+    """Compact event encoding: JSON without null fields, zlib-compressed."""
+    return zlib.compress(event.model_dump_json(exclude_none=True).encode("utf-8"))
+
+
+def _decode_event(blob):
+    return Event.model_validate_json(zlib.decompress(blob))
+
+
+def _session_scoped(state):
+    """Drops app:/user:/temp: keys, which live in their own tables (or nowhere)."""
+    return {
+        k: v for k, v in state.items()
+        if not k.startswith((State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX))
+    }
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    ADK session service persisted in SQLite (WAL mode), so sessions survive
+    restarts and are shared by every uvicorn worker on the host.
+
+    - An in-process LRU cache serves hot sessions; a cached copy is only used
+      while its last_update_time still matches the DB row, so a turn handled
+      by another worker is never missed.
+    - Events are stored one row each as zlib-compressed JSON, and each
+      session keeps at most `max_events` of them (trimmed on a user-turn
+      boundary so function calls stay paired with their responses).
+    - Sessions idle for longer than `ttl_seconds` are deleted by the
+      janitor task (run_janitor) and dropped from the cache.
+    - append_event only writes if the row's last_update_time is still the
+      one the caller's session was read with; otherwise another turn got
+      there first and it raises ValueError (stale session), as ADK's
+      DatabaseSessionService does, instead of interleaving the two turns.
+    """
+
+    def __init__(self, db_path=SESSION_DB_PATH, cache_size=1024, max_events=200, ttl_seconds=24 * 3600):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.max_events = max_events
+        self.ttl_seconds = ttl_seconds
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self._connect(write=False).conn.executescript(_SCHEMA)
+
+    # --- CONNECTIONS ---
+    def _connect(self, write=True):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return _Transaction(conn, "IMMEDIATE" if write else "DEFERRED")
+
+    # --- CACHE ---
+    def _cache_get(self, key):
+        with self._cache_lock:
+            session = self._cache.get(key)
+            if session is not None:
+                self._cache.move_to_end(key)
+            return session
+
+    def _cache_put(self, key, session):
+        with self._cache_lock:
+            self._cache[key] = session
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, key):
+        with self._cache_lock:
+            self._cache.pop(key, None)
+
+    # --- BaseSessionService ---
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        session = Session(
+            app_name=app_name, user_id=user_id, id=session_id,
+            state=_session_scoped(state or {}), last_update_time=time.time()
+        )
+        await asyncio.to_thread(self._insert_session, session, state or {})
+        self._cache_put((app_name, user_id, session_id), session)
+        return await asyncio.to_thread(self._with_shared_state, session.model_copy(deep=True))
+
+    def _insert_session(self, session, state):
+        with self._connect() as conn:
+            try:
+                conn.execute(
+                    "INSERT INTO adk_sessions (app_name, user_id, id, state, last_update_time) VALUES (?, ?, ?, ?, ?)",
+                    (session.app_name, session.user_id, session.id, json.dumps(session.state), session.last_update_time)
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Session with id {session.id} already exists.")
+            self._store_shared_state(conn, session, state)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        session = await asyncio.to_thread(self._load_session, app_name, user_id, session_id)
+        if session is None:
+            return None
+        session = session.model_copy(deep=True)
+        if config:
+            if config.num_recent_events:
+                session.events = session.events[-config.num_recent_events:]
+            if config.after_timestamp:
+                session.events = [e for e in session.events if e.timestamp >= config.after_timestamp]
+        return session
+
+    def _load_session(self, app_name, user_id, session_id):
+        key = (app_name, user_id, session_id)
+        with self._connect(write=False) as conn:
+            row = conn.execute(
+                "SELECT state, last_update_time FROM adk_sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None:
+                self._cache_drop(key)
+                return None
+            cached = self._cache_get(key)
+            if cached is not None and cached.last_update_time == row[1]:
+                return self._merge_state(conn, cached)
+            events = [
+                _decode_event(blob) for (blob,) in conn.execute(
+                    "SELECT data FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                    key
+                )
+            ]
+            session = Session(
+                app_name=app_name, user_id=user_id, id=session_id,
+                state=json.loads(row[0]), events=events, last_update_time=row[1]
+            )
+            self._cache_put(key, session)
+            return self._merge_state(conn, session)
+
+    def _with_shared_state(self, session):
+        with self._connect(write=False) as conn:
+            return self._merge_state(conn, session)
+
+    def _merge_state(self, conn, session):
+        """Adds app:/user: state to the session, as InMemorySessionService does."""
+        for key, value in conn.execute(
+            "SELECT key, value FROM adk_app_state WHERE app_name = ?", (session.app_name,)
+        ):
+            session.state[State.APP_PREFIX + key] = json.loads(value)
+        for key, value in conn.execute(
+            "SELECT key, value FROM adk_user_state WHERE app_name = ? AND user_id = ?",
+            (session.app_name, session.user_id)
+        ):
+            session.state[State.USER_PREFIX + key] = json.loads(value)
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        def _list():
+            with self._connect(write=False) as conn:
+                rows = conn.execute(
+                    "SELECT id, state, last_update_time FROM adk_sessions WHERE app_name = ? AND user_id = ?",
+                    (app_name, user_id)
+                ).fetchall()
+                return [
+                    self._merge_state(conn, Session(
+                        app_name=app_name, user_id=user_id, id=sid, state=json.loads(state), last_update_time=updated
+                    ))
+                    for sid, state, updated in rows
+                ]
+        return ListSessionsResponse(sessions=await asyncio.to_thread(_list))
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        await asyncio.to_thread(self._delete_sessions, [key])
+
+    def _delete_sessions(self, keys):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ?", keys)
+            conn.executemany("DELETE FROM adk_sessions WHERE app_name = ? AND user_id = ? AND id = ?", keys)
+        for key in keys:
+            self._cache_drop(key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        read_at = session.last_update_time
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        self._trim(session)
+        try:
+            await asyncio.to_thread(self._store_event, session, event, read_at)
+        except ValueError:
+            self._cache_drop(key)
+            raise
+        self._cache_put(key, session)
+        return event
+
+    def _trim(self, session):
+        """Keeps the newest max_events events, starting on a user message."""
+        if len(session.events) <= self.max_events:
+            return
+        kept = session.events[-self.max_events:]
+        for i, e in enumerate(kept):
+            if e.author == "user":
+                kept = kept[i:]
+                break
+        session.events[:] = kept
+
+    def _store_event(self, session, event, read_at):
+        key = (session.app_name, session.user_id, session.id)
+        delta = event.actions.state_delta if event.actions else {}
+        with self._connect() as conn:
+            # Optimistic concurrency: nobody may have written since `session` was read.
+            updated = conn.execute(
+                "UPDATE adk_sessions SET state = ?, last_update_time = ? "
+                "WHERE app_name = ? AND user_id = ? AND id = ? AND last_update_time = ?",
+                (json.dumps(_session_scoped(session.state)), session.last_update_time, *key, read_at)
+            ).rowcount
+            if not updated:
+                row = conn.execute(
+                    "SELECT last_update_time FROM adk_sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+                ).fetchone()
+                if row is None:
+                    raise ValueError(f"Session {session.id} does not exist.")
+                raise ValueError(
+                    f"Session {session.id} was updated at {row[0]} since it was read (at {read_at}); "
+                    "it is a stale session."
+                )
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                key
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO adk_events (app_name, user_id, session_id, seq, data) VALUES (?, ?, ?, ?, ?)",
+                (*key, seq, _encode_event(event))
+            )
+            # Drop whatever the in-memory trim dropped.
+            conn.execute(
+                "DELETE FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq <= ?",
+                (*key, seq - len(session.events))
+            )
+            self._store_shared_state(conn, session, delta)
+
+    def _store_shared_state(self, conn, session, state):
+        for k, v in state.items():
+            if k.startswith(State.APP_PREFIX):
+                conn.execute(
+                    "INSERT OR REPLACE INTO adk_app_state (app_name, key, value) VALUES (?, ?, ?)",
+                    (session.app_name, k.removeprefix(State.APP_PREFIX), json.dumps(v))
+                )
+            elif k.startswith(State.USER_PREFIX):
+                conn.execute(
+                    "INSERT OR REPLACE INTO adk_user_state (app_name, user_id, key, value) VALUES (?, ?, ?, ?)",
+                    (session.app_name, session.user_id, k.removeprefix(State.USER_PREFIX), json.dumps(v))
+                )
+
+    # --- JANITOR ---
+    def evict_expired(self, now=None):
+        """Deletes sessions idle longer than ttl_seconds. Returns how many were removed."""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        with self._connect(write=False) as conn:
+            keys = conn.execute(
+                "SELECT app_name, user_id, id FROM adk_sessions WHERE last_update_time < ?", (cutoff,)
+            ).fetchall()
+        if keys:
+            self._delete_sessions(keys)
+        return len(keys)
+
+    async def run_janitor(self, interval_seconds=300):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                removed = await asyncio.to_thread(self.evict_expired)
+                if removed:
+                    logger.info(f"Session janitor removed {removed} idle session(s)")
+            except Exception as e:
+                logger.error(f"Session janitor failed: {e}")
+
+
+class _Transaction:
+    """`with` block = one transaction (IMMEDIATE for writes) on an autocommit sqlite3 connection."""
+
+    def __init__(self, conn, mode):
+        self.conn = conn
+        self.mode = mode
+
+    def __enter__(self):
+        self.conn.execute(f"BEGIN {self.mode}")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
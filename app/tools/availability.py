@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from app.tools.calendar_client import IST, to_local, to_rfc3339, list_events_between, query_freebusy
+from app.database import get_booked_intervals, get_doctor_calendars
+
+# Clinic opening hours used to generate candidate slots (IST, 24h clock).
+CLINIC_OPEN_HOUR = 9
+CLINIC_CLOSE_HOUR = 18
+DEFAULT_SLOT = timedelta(hours=1)
+
+_DB_ID_RE = re.compile(r"DB ID:\s*(\d+)")
+
+logger = logging.getLogger(__name__)
+
+
+def clinic_now():
+    """Current time as the naive IST datetime every index stores."""
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def google_events_loader(get_service, calendar_id='primary'):
+    """load_events callable that reads straight from the Calendar API (paginated events.list)."""
+    def load(start, end):
+        events = list_events_between(get_service(), to_rfc3339(start), to_rfc3339(end), calendar_id=calendar_id)
+        return [
+            (to_local(e['start']), to_local(e['end']), e.get('description'))
+            for e in events
+            if e.get('status') != 'cancelled' and e.get('transparency') != 'transparent'
+        ]
+    return load
+
+
+def google_freebusy_loader(run_calendar):
+    """
+    Async load_calendar_busy callable: every calendar's busy intervals from
+    chunked freebusy.query calls, run through `run_calendar(fn, *args)`
+    (calendar_clients.run: the bounded Calendar pool).
+    """
+    async def load(calendar_ids, start, end):
+        return await run_calendar(query_freebusy, calendar_ids, to_rfc3339(start), to_rfc3339(end))
+    return load
+
+
+class BusyIndex:
+    """
+    Disjoint, sorted busy intervals kept in two parallel lists.
+    Overlapping or touching intervals are merged on insert, so every lookup
+    is a single bisect: O(log n).
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if self._ends and start <= self._ends[-1]:
+                self._ends[-1] = max(self._ends[-1], end)
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, start, end):
+        if end <= start:
+            return
+        i = bisect_left(self._ends, start)
+        j = bisect_right(self._starts, end)
+        if i < j:
+            start = min(start, self._starts[i])
+            end = max(end, self._ends[j - 1])
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def conflict(self, start, end):
+        """Returns the end of the busy interval overlapping [start, end), or None if free."""
+        i = bisect_right(self._ends, start)
+        if i < len(self._starts) and self._starts[i] < end:
+            return self._ends[i]
+        return None
+
+    def is_free(self, start, end):
+        return self.conflict(start, end) is None
+
+    def between(self, start, end):
+        """Busy intervals overlapping [start, end)."""
+        i = bisect_right(self._ends, start)
+        j = bisect_left(self._starts, end)
+        return list(zip(self._starts[i:j], self._ends[i:j]))
+
+
+class AvailabilityEngine:
+    """
+    Answers "is slot X free?" and "next N free slots" from an in-memory index
+    instead of asking Google on every check.
+
+    Busy intervals for a rolling window come from `load_events(start, end)`
+    (the local calendar mirror, or google_events_loader for direct bulk
+    reads) and are merged with the confirmed Appointment rows from the local
+    DB. Calendar events created by book_doctor_appointment carry
+    "DB ID: <n>" and are attributed to that appointment's doctor; any other
+    event blocks the whole clinic, as the shared calendar always has.
+
+    Doctors with their own calendar (`load_calendars()` -> {doctor_id:
+    calendar_id}) also get that calendar's busy time for the coming
+    `horizon_days`, fetched for all of them at once by the async
+    `load_calendar_busy(calendar_ids, start, end)` (google_freebusy_loader:
+    one freebusy.query per 50 calendars). The fetch runs in the background
+    (run_calendar_refresh) and refreshes only read its last result, so an
+    availability check never waits on the Calendar API.
+
+    With `schedules` (a DoctorSchedules), per-doctor queries also respect
+    the doctor's working hours and slot length: a slot is free only if it
+    is one of the doctor's bookable slots and nothing overlaps it.
+    """
+
+    def __init__(self, load_events, horizon_days=30, ttl_seconds=60, load_bookings=get_booked_intervals,
+                 load_calendar_busy=None, load_calendars=get_doctor_calendars, schedules=None, clock=clinic_now):
+        self.load_events = load_events
+        self.clock = clock
+        self.schedules = schedules
+        self.load_bookings = load_bookings
+        self.load_calendar_busy = load_calendar_busy
+        self.load_calendars = load_calendars
+        self.horizon = timedelta(days=horizon_days)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._window = (None, None)
+        self._shared = BusyIndex()
+        self._by_doctor = {}
+        self._calendar_busy = {}   # calendar_id -> busy intervals, from the last load_calendar_busy
+
+    # --- LOADING ---
+    def refresh(self, now=None):
+        now = now or self.clock()
+        window_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        window_end = window_start + self.horizon
+
+        booked = self.load_bookings(window_start, window_end)
+        booked_ids = {appt_id for appt_id, _, _, _ in booked}
+        per_doctor = {}
+        for _, doctor_id, start, end in booked:
+            per_doctor.setdefault(doctor_id, []).append((start, end))
+
+        shared = []
+        for start, end, description in self.load_events(window_start, window_end):
+            match = _DB_ID_RE.search(description or '')
+            if match and int(match.group(1)) in booked_ids:
+                continue  # Already covered by the local Appointment row
+            shared.append((start, end))
+
+        if self.load_calendar_busy:
+            busy = self._calendar_busy
+            for doctor_id, calendar_id in self.load_calendars().items():
+                per_doctor.setdefault(doctor_id, []).extend(busy.get(calendar_id, ()))
+
+        with self._lock:
+            self._shared = BusyIndex(shared)
+            self._by_doctor = {doc_id: BusyIndex(iv) for doc_id, iv in per_doctor.items()}
+            self._window = (window_start, window_end)
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self, start):
+        stale = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+        window_start, window_end = self._window
+        if stale or window_start is None or not window_start <= start < window_end:
+            now = self.clock()
+            # Keep the window anchored on today unless the query falls outside it.
+            self.refresh(now=now if now <= start < now + self.horizon else start)
+
+    def invalidate(self):
+        """Forces a reload on the next query (e.g. after the calendar mirror changed)."""
+        self._loaded_at = None
+
+    async def refresh_calendar_busy(self):
+        """Fetches the doctor calendars' busy time from today to the horizon; the next query uses it."""
+        window_start = self.clock().replace(hour=0, minute=0, second=0, microsecond=0)
+        calendars = await asyncio.to_thread(self.load_calendars)
+        calendar_ids = sorted(set(calendars.values()))
+        busy = {}
+        if calendar_ids:
+            busy = await self.load_calendar_busy(calendar_ids, window_start, window_start + self.horizon)
+        with self._lock:
+            self._calendar_busy = busy
+        self.invalidate()
+
+    async def run_calendar_refresh(self, interval_seconds=60):
+        """Runs refresh_calendar_busy now and then every `interval_seconds` until cancelled."""
+        while True:
+            try:
+                await self.refresh_calendar_busy()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Doctor calendar free/busy refresh failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def add_booking(self, doctor_id, start, end):
+        """Records a new booking immediately so the next check sees it without a refresh."""
+        with self._lock:
+            self._by_doctor.setdefault(doctor_id, BusyIndex()).add(start, end)
+
+    # --- QUERIES ---
+    def _indexes(self, doctor_id):
+        if doctor_id is None:
+            # Clinic-wide view: every booking counts.
+            return [self._shared, *self._by_doctor.values()]
+        return [self._shared, self._by_doctor.get(doctor_id, BusyIndex())]
+
+    def _conflict(self, start, end, doctor_id):
+        blocked_until = None
+        for index in self._indexes(doctor_id):
+            until = index.conflict(start, end)
+            if until is not None and (blocked_until is None or until > blocked_until):
+                blocked_until = until
+        return blocked_until
+
+    def _slot_end(self, start, end, doctor_id):
+        """`end`, else the doctor's slot length (one hour without schedules), and whether the schedule allows it."""
+        if self.schedules is None or doctor_id is None:
+            return end or start + DEFAULT_SLOT, True
+        end = end or start + self.schedules.slot_length(doctor_id, start)
+        return end, self.schedules.is_bookable(doctor_id, start, end)
+
+    def is_free(self, start, end=None, doctor_id=None):
+        end, in_schedule = self._slot_end(start, end, doctor_id)
+        if not in_schedule:
+            return False
+        self._ensure_fresh(start)
+        with self._lock:
+            return self._conflict(start, end, doctor_id) is None
+
+    def free_doctors(self, start, doctor_ids, end=None):
+        """The subset of `doctor_ids` free for [start, end), answered from the index in one pass."""
+        self._ensure_fresh(start)
+        free = []
+        for doctor_id in doctor_ids:
+            doctor_end, in_schedule = self._slot_end(start, end, doctor_id)
+            if in_schedule:
+                free.append((doctor_id, doctor_end))
+        with self._lock:
+            return [
+                doctor_id for doctor_id, doctor_end in free
+                if self._shared.is_free(start, doctor_end)
+                and (doctor_id not in self._by_doctor or self._by_doctor[doctor_id].is_free(start, doctor_end))
+            ]
+
+    def busy_on(self, day, doctor_id=None):
+        day_start = datetime(day.year, day.month, day.day)
+        day_end = day_start + timedelta(days=1)
+        self._ensure_fresh(day_start)
+        with self._lock:
+            merged = BusyIndex()
+            for index in self._indexes(doctor_id):
+                for start, end in index.between(day_start, day_end):
+                    merged.add(start, end)
+            return merged.between(day_start, day_end)
+
+    def next_free_slots(self, after, n=3, doctor_id=None, duration=DEFAULT_SLOT, step=DEFAULT_SLOT):
+        """
+        First `n` free slots of `duration` at or after `after`, on the `step`
+        grid within clinic hours. Each busy block is skipped with one bisect.
+        With schedules, a doctor's slots come from their schedule bitmaps
+        instead (one masked bit scan per day). Slots that have already
+        started are never offered, whatever `after` is.
+        """
+        after = max(after, self.clock())
+        self._ensure_fresh(after)
+        if self.schedules and doctor_id is not None:
+            return self._next_scheduled_slots(after, n, doctor_id)
+        slots = []
+        candidate = _align(after, step)
+        limit = self._window[1]
+        with self._lock:
+            while len(slots) < n and candidate < limit:
+                candidate = _within_clinic_hours(candidate, duration)
+                blocked_until = self._conflict(candidate, candidate + duration, doctor_id)
+                if blocked_until is None:
+                    slots.append(candidate)
+                    candidate += step
+                else:
+                    candidate = _align(blocked_until, step)
+        return slots
+
+    def _next_scheduled_slots(self, after, n, doctor_id):
+        slots = []
+        day = after.date()
+        limit = self._window[1]
+        while len(slots) < n and datetime(day.year, day.month, day.day) < limit:
+            day_start = datetime(day.year, day.month, day.day)
+            with self._lock:
+                busy = [iv for index in self._indexes(doctor_id)
+                        for iv in index.between(day_start, day_start + timedelta(days=1))]
+            slots.extend(self.schedules.free_slots(doctor_id, day, busy, after=after, limit=n - len(slots)))
+            day += timedelta(days=1)
+        return slots
+
+
+def _align(dt, step):
+    """Rounds dt up to the next multiple of `step` past midnight."""
+    midnight = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = dt - midnight
+    steps = -(-offset // step)  # ceil division
+    return midnight + steps * step
+
+
+def _within_clinic_hours(dt, duration):
+    opening = dt.replace(hour=CLINIC_OPEN_HOUR, minute=0, second=0, microsecond=0)
+    closing = dt.replace(hour=CLINIC_CLOSE_HOUR, minute=0, second=0, microsecond=0)
+    if dt < opening:
+        return opening
+    if dt + duration > closing:
+        return opening + timedelta(days=1)
+    return dt
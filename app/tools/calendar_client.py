@@ -1,33 +1,65 @@
 import os.path
+import asyncio
+import contextvars
 import datetime
+import functools
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+import pytz
+
+from app.observability import GOOGLE_API_SECONDS, GOOGLE_API_REQUESTS
+
+logger = logging.getLogger(__name__)
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-def get_calendar_service():
+IST = pytz.timezone("Asia/Kolkata")
+
+def to_local(value):
+    """Parses a Calendar start/end dict (or ISO string) into a naive IST datetime."""
+    if isinstance(value, dict):
+        value = value.get('dateTime') or value.get('date')
+    if len(value) == 10:  # All-day event: 'YYYY-MM-DD'
+        return datetime.datetime.fromisoformat(value)
+    dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(IST).replace(tzinfo=None)
+    return dt
+
+def to_rfc3339(dt):
+    """Naive IST datetime -> RFC3339 string for the Calendar API."""
+    return IST.localize(dt).isoformat()
+
+# Look for the ROOT folder (where main.py or init_db.py are run from)
+# We assume this file is in app/tools/calendar_client.py
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+TOKEN_PATH = os.path.join(ROOT_DIR, 'token.json')
+CREDS_PATH = os.path.join(ROOT_DIR, 'credentials.json')
+
+def load_credentials(token_path=TOKEN_PATH, creds_path=CREDS_PATH):
     """
-    Authenticates with Google and returns the Calendar API service.
+    Returns valid OAuth credentials.
     Handles the 'credentials.json' -> 'token.json' flow automatically.
     """
     creds = None
-    
-    # 1. Look for the ROOT folder (where main.py or init_db.py are run from)
-    # We assume this file is in app/tools/calendar_client.py
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.abspath(os.path.join(current_dir, "..", ".."))
-    
-    token_path = os.path.join(root_dir, 'token.json')
-    creds_path = os.path.join(root_dir, 'credentials.json')
 
-    # 2. Load existing token if available
+    # 1. Load existing token if available
     if os.path.exists(token_path):
         creds = Credentials.from_authorized_user_file(token_path, SCOPES)
     
-    # 3. Refresh or Login if needed
+    # 2. Refresh or Login if needed
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             try:
@@ -35,7 +67,7 @@ def get_calendar_service():
             except Exception:
                 # If refresh fails, delete token and re-login
                 os.remove(token_path)
-                return get_calendar_service()
+                return load_credentials(token_path, creds_path)
         else:
             if not os.path.exists(creds_path):
                 raise FileNotFoundError(f"Could not find credentials.json at {creds_path}. Please download it from Google Cloud Console.")
@@ -48,7 +80,189 @@ def get_calendar_service():
         with open(token_path, 'w') as token:
             token.write(creds.to_json())
 
-    return build('calendar', 'v3', credentials=creds)
+    return creds
+
+@functools.lru_cache(maxsize=1)
+def _discovery_document():
+    """The Calendar v3 discovery doc shipped with google-api-python-client (no network fetch)."""
+    return get_static_doc('calendar', 'v3')
+
+def _operation(uri):
+    """Coarse, low-cardinality name for a Calendar API request URI."""
+    path = urlsplit(uri).path
+    if path.endswith("/batch") or "/batch/" in path:
+        return "batch"
+    if path.endswith("/freeBusy"):
+        return "freebusy"
+    if "/events" in path:
+        return "events"
+    return "other"
+
+class TimedHttp:
+    """Wraps an (authorized) httplib2.Http and times every request it sends."""
+
+    def __init__(self, http):
+        self._http = http
+
+    def request(self, uri, method="GET", *args, **kwargs):
+        operation = _operation(uri)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            resp, content = self._http.request(uri, method, *args, **kwargs)
+            status = str(resp.status)
+            return resp, content
+        finally:
+            GOOGLE_API_SECONDS.observe(time.perf_counter() - started, operation=operation, method=method)
+            GOOGLE_API_REQUESTS.inc(operation=operation, status=status)
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+class SharedCredentials:
+    """
+    The manager's credentials as each thread's AuthorizedHttp sees them: an
+    on-demand refresh (expired token, or a 401) goes through
+    CalendarClientManager.refresh, under the same lock as the background
+    refresher, so threads never refresh the one token concurrently.
+    """
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._sent = None   # token on this thread's last request (one instance per thread)
+
+    def refresh(self, request):
+        # After a 401: replace the token that request carried, unless another thread already has.
+        self._manager.refresh(request, stale_token=self._sent)
+
+    def before_request(self, request, method, url, headers):
+        creds = self._manager.credentials()
+        if not creds.valid:
+            self._manager.refresh(request, stale_token=creds.token)
+        creds.before_request(request, method, url, headers)
+        self._sent = creds.token
+
+    def __getattr__(self, name):
+        return getattr(self._manager.credentials(), name)
+
+class CalendarClientManager:
+    """
+    Lazily created, thread-safe access to the Calendar API.
+
+    - Nothing happens at import: credentials are loaded on first use.
+    - googleapiclient services sit on httplib2, which is not thread-safe, so
+      every worker thread gets its own authorized transport and service,
+      built from the cached on-disk discovery document.
+    - A daemon thread refreshes the OAuth token shortly before it expires so
+      requests never pay for a refresh. When a request still has to (the
+      token expired anyway, or was rejected), it refreshes through the same
+      lock, and threads that waited on it reuse the new token.
+    - run() executes a blocking Calendar call in a bounded thread pool, so
+      async callers (the /chat loop) are never blocked.
+    """
+
+    def __init__(self, credentials_loader=load_credentials, http_factory=None, max_workers=8,
+                 refresh_margin_seconds=300, token_path=TOKEN_PATH):
+        self._credentials_loader = credentials_loader
+        self._http_factory = http_factory or (lambda: httplib2.Http(timeout=30))
+        self._max_workers = max_workers
+        self._refresh_margin = datetime.timedelta(seconds=refresh_margin_seconds)
+        self._token_path = token_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds = None
+        self._executor = None
+        self._refresher = None
+        self._stop = threading.Event()
+        self._override = None
+
+    # --- CREDENTIALS ---
+    def credentials(self):
+        if self._creds is None:
+            with self._lock:
+                if self._creds is None:
+                    self._creds = self._credentials_loader()
+                    self._start_refresher()
+        return self._creds
+
+    def _start_refresher(self):
+        if self._creds.expiry is None or not self._creds.refresh_token:
+            return  # Nothing to refresh (e.g. static test credentials)
+        self._refresher = threading.Thread(target=self._refresh_loop, name="calendar-token-refresh", daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            remaining = self._creds.expiry - datetime.datetime.utcnow() - self._refresh_margin
+            if self._stop.wait(max(remaining.total_seconds(), 5)):
+                return
+            try:
+                self.refresh(Request())
+            except Exception as e:
+                logger.error(f"Proactive Calendar token refresh failed: {e}")
+
+    def refresh(self, request, stale_token=None):
+        """
+        Refreshes the token and saves it, under the credentials lock. With
+        `stale_token` (the token a request found expired or rejected), does
+        nothing if another thread has already replaced it; returns whether
+        this call refreshed.
+        """
+        creds = self.credentials()
+        with self._lock:
+            if stale_token is not None and creds.token != stale_token:
+                return False
+            creds.refresh(request)
+            if self._token_path:
+                with open(self._token_path, 'w') as token:
+                    token.write(creds.to_json())
+        return True
+
+    # --- PER-THREAD SERVICES ---
+    def service(self):
+        """The Calendar service for the calling thread."""
+        if self._override is not None:
+            return self._override
+        svc = getattr(self._local, 'service', None)
+        if svc is None:
+            http = TimedHttp(AuthorizedHttp(SharedCredentials(self), http=self._http_factory()))
+            svc = build_from_document(_discovery_document(), http=http)
+            self._local.service = svc
+        return svc
+
+    def use_service(self, service):
+        """
+        Hands `service` (e.g. app/tools/fake_calendar.FakeCalendarService) to
+        every thread instead of Google clients, for offline runs and load
+        tests; None goes back to the real API.
+        """
+        self._override = service
+
+    # --- BOUNDED POOL ---
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="calendar")
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs fn(service, *args, **kwargs) in the Calendar thread pool."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()  # keeps the request's trace ID in pool threads' logs
+        return await loop.run_in_executor(self._pool(), lambda: context.run(lambda: fn(self.service(), *args, **kwargs)))
+
+    def close(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+calendar_clients = CalendarClientManager()
+
+def get_calendar_service():
+    """Returns the Calendar API service for the current thread (created on first use)."""
+    return calendar_clients.service()
 
 def list_upcoming_events(service, max_results=10):
     """Lists the next few events from the primary calendar."""
@@ -64,7 +278,7 @@ def list_upcoming_events(service, max_results=10):
     
     return events_result.get('items', [])
 
-def create_event(service, summary, start_iso, end_iso, description=None, attendee_email=None):
+def event_body(summary, start_iso, end_iso, description=None, attendee_email=None):
     event = {
         'summary': summary,
         'description': description,
@@ -82,6 +296,80 @@ def create_event(service, summary, start_iso, end_iso, description=None, attende
     # 2. Add Attendee Logic
     if attendee_email:
         event['attendees'] = [{'email': attendee_email}]
+    return event
 
+def create_event(service, summary, start_iso, end_iso, description=None, attendee_email=None):
+    event = event_body(summary, start_iso, end_iso, description, attendee_email)
     event = service.events().insert(calendarId='primary', body=event).execute()
-    return event
\ No newline at end of file
+    return event
+
+def put_event(service, event_id, body, calendar_id='primary'):
+    """
+    Creates the event with a caller-chosen ID, or overwrites it if that ID
+    already exists (a retried write, or a cancelled event being restored).
+    Event IDs must be 5-1024 characters from [a-v0-9]; a hex digest works.
+    """
+    try:
+        return service.events().insert(calendarId=calendar_id, body={**body, 'id': event_id}).execute()
+    except HttpError as e:
+        if e.resp.status != 409:
+            raise
+    return service.events().update(calendarId=calendar_id, eventId=event_id,
+                                   body={**body, 'id': event_id, 'status': 'confirmed'}).execute()
+
+def delete_event(service, event_id, calendar_id='primary'):
+    """Deletes the event; an event that is already gone counts as deleted."""
+    try:
+        service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+    except HttpError as e:
+        if e.resp.status not in (404, 410):
+            raise
+
+# freebusy.query answers for at most this many calendars per request.
+FREEBUSY_MAX_CALENDARS = 50
+
+def query_freebusy(service, calendar_ids, time_min, time_max, chunk_size=FREEBUSY_MAX_CALENDARS):
+    """
+    Busy intervals for many calendars between time_min and time_max (RFC3339
+    strings): {calendar_id: [(start, end), ...]} as naive IST datetimes.
+    One freebusy.query per `chunk_size` calendars instead of one per calendar.
+    Calendars the API reports errors for (not found, no access) are left out.
+    """
+    calendar_ids = list(dict.fromkeys(calendar_ids))
+    busy = {}
+    for i in range(0, len(calendar_ids), chunk_size):
+        chunk = calendar_ids[i:i + chunk_size]
+        result = service.freebusy().query(body={
+            'timeMin': time_min,
+            'timeMax': time_max,
+            'timeZone': 'Asia/Kolkata',
+            'items': [{'id': cal_id} for cal_id in chunk],
+        }).execute()
+        for cal_id, info in result.get('calendars', {}).items():
+            if info.get('errors'):
+                logger.warning(f"Free/busy unavailable for calendar {cal_id}: {info['errors']}")
+                continue
+            busy[cal_id] = [(to_local(b['start']), to_local(b['end'])) for b in info.get('busy', [])]
+    return busy
+
+def list_events_between(service, time_min, time_max, calendar_id='primary', page_size=2500):
+    """
+    Returns every event between time_min and time_max (RFC3339 strings),
+    following nextPageToken so nothing is cut off.
+    """
+    events = []
+    page_token = None
+    while True:
+        events_result = service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min,
+            timeMax=time_max,
+            maxResults=page_size,
+            singleEvents=True,
+            orderBy='startTime',
+            pageToken=page_token
+        ).execute()
+        events.extend(events_result.get('items', []))
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            return events
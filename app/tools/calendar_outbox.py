@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from googleapiclient.errors import HttpError
+from sqlalchemy import func
+
+from app.database import SessionLocal, WriteSessionLocal, Appointment, CalendarOutboxEntry
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_event(db, appointment_id, event_id, body, calendar_id=None):
+    """Adds the calendar write for an appointment to `db`'s transaction (committed with the appointment)."""
+    db.add(CalendarOutboxEntry(appointment_id=appointment_id, event_id=event_id, calendar_id=calendar_id,
+                               payload=json.dumps(body)))
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per second, in bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    async def acquire(self, n=1):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= n:
+                self._tokens -= n
+                return
+            await asyncio.sleep((n - self._tokens) / self.rate)
+
+
+class CalendarOutbox:
+    """
+    Pushes committed `calendar_outbox` rows to Google Calendar in the
+    background, so a booking only waits for its DB commit.
+
+    - Due rows are claimed in batches of up to `batch_size` (the Calendar
+      batch endpoint's limit is 50) by pushing their next_attempt_at past a
+      lease, so a worker that dies mid-batch leaves them due again.
+    - Each batch is one batch HTTP request. Event IDs are deterministic, so
+      an insert answered 409 (already written by an earlier attempt) is
+      resent as an update.
+    - Requests go through a token bucket (`rate_per_second`); failed rows
+      back off exponentially with jitter and are marked failed after
+      `max_attempts`.
+    - On success the row is marked done and Appointment.gcal_event_id is set.
+      A row that runs out of attempts marks its appointment
+      calendar_status="failed", which the admin dashboard shows live.
+
+    Each row is written to its own calendar_id (the doctor's calendar),
+    falling back to `calendar_id`; one batch can span many calendars.
+
+    `run_calendar(fn, *args)` runs fn(service, *args), like calendar_clients.run.
+    Claims and settles go through `session_factory` (BEGIN IMMEDIATE);
+    stats() only reads, through `read_session_factory`, so polling it
+    never takes the write lock.
+    """
+
+    def __init__(self, run_calendar, session_factory=WriteSessionLocal, calendar_id='primary', batch_size=50,
+                 rate_per_second=10.0, max_attempts=8, base_backoff_seconds=2.0, max_backoff_seconds=600.0,
+                 lease_seconds=120, retention_days=7, read_session_factory=SessionLocal):
+        self.run_calendar = run_calendar
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory
+        self.calendar_id = calendar_id
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_per_second, burst=batch_size)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff_seconds
+        self.max_backoff = max_backoff_seconds
+        self.lease = timedelta(seconds=lease_seconds)
+        self.retention = timedelta(days=retention_days)
+        self._wake = None
+        self._loop = None
+
+        # Metrics
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self._total_lag_seconds = 0.0
+
+    # --- DB STEPS (worker threads) ---
+    def _claim(self):
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            rows = db.query(CalendarOutboxEntry).filter(
+                CalendarOutboxEntry.status == "pending",
+                CalendarOutboxEntry.next_attempt_at <= now
+            ).order_by(CalendarOutboxEntry.next_attempt_at).limit(self.batch_size).all()
+            for row in rows:
+                row.next_attempt_at = now + self.lease
+                row.attempts += 1
+            claimed = [
+                (row.id, row.calendar_id or self.calendar_id, row.event_id, json.loads(row.payload), row.attempts,
+                 row.created_at)
+                for row in rows
+            ]
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _settle(self, claimed, results):
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            for outbox_id, _, event_id, _, attempts, created_at in claimed:
+                row = db.get(CalendarOutboxEntry, outbox_id)
+                error = results.get(outbox_id)
+                if error is None:
+                    row.status, row.sent_at, row.last_error = "done", now, None
+                    # Through the ORM, not a bulk update, so the commit hooks publish the change
+                    # (event_hub) and clear the tool caches that depend on appointments.
+                    appointment = db.get(Appointment, row.appointment_id)
+                    if appointment is not None:
+                        appointment.gcal_event_id, appointment.calendar_status = event_id, "synced"
+                    self._record_lag((now - created_at).total_seconds())
+                elif attempts >= self.max_attempts:
+                    row.status, row.last_error = "failed", error
+                    self.failed += 1
+                    # Compensation: the booking stands, but it is flagged (and, through the ORM update,
+                    # pushed to the admin dashboard) so staff can add the event or contact the patient.
+                    appointment = db.get(Appointment, row.appointment_id)
+                    if appointment is not None:
+                        appointment.calendar_status = "failed"
+                    logger.error(f"Calendar event for appointment {row.appointment_id} failed for good after "
+                                 f"{attempts} attempts (outbox entry {outbox_id}): {error}")
+                else:
+                    backoff = min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+                    row.next_attempt_at = now + timedelta(seconds=backoff * random.uniform(0.5, 1.0))
+                    row.last_error = error
+                    self.retried += 1
+            db.commit()
+        finally:
+            db.close()
+
+    def _record_lag(self, lag_seconds):
+        self.sent += 1
+        self.last_lag_seconds = lag_seconds
+        self.max_lag_seconds = max(self.max_lag_seconds, lag_seconds)
+        self._total_lag_seconds += lag_seconds
+
+    def purge_done(self):
+        """Deletes rows delivered more than `retention_days` ago."""
+        db = self.session_factory()
+        try:
+            deleted = db.query(CalendarOutboxEntry).filter(
+                CalendarOutboxEntry.status == "done",
+                CalendarOutboxEntry.sent_at < datetime.utcnow() - self.retention
+            ).delete()
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    # --- CALENDAR CALLS (calendar pool thread) ---
+    def _send_batch(self, service, claimed):
+        """Writes every claimed event; returns {outbox_id: error string} for the ones that failed."""
+        errors, conflicts = {}, []
+
+        def collect(request_id, response, exception):
+            outbox_id = int(request_id)
+            if isinstance(exception, HttpError) and exception.resp.status == 409:
+                conflicts.append(outbox_id)
+            elif exception is not None:
+                errors[outbox_id] = str(exception)
+
+        payloads = {outbox_id: (calendar_id, event_id, body) for outbox_id, calendar_id, event_id, body, _, _ in claimed}
+        batch = service.new_batch_http_request(callback=collect)
+        for outbox_id, (calendar_id, event_id, body) in payloads.items():
+            batch.add(service.events().insert(calendarId=calendar_id, body={**body, 'id': event_id}),
+                      request_id=str(outbox_id))
+        self._execute(batch, payloads, errors)
+
+        if conflicts:
+            # Written by an earlier attempt (or a cancelled event with this ID): overwrite it.
+            retry = {outbox_id: payloads[outbox_id] for outbox_id in conflicts}
+            conflicts.clear()
+            batch = service.new_batch_http_request(callback=collect)
+            for outbox_id, (calendar_id, event_id, body) in retry.items():
+                batch.add(service.events().update(calendarId=calendar_id, eventId=event_id,
+                                                  body={**body, 'id': event_id, 'status': 'confirmed'}),
+                          request_id=str(outbox_id))
+            self._execute(batch, retry, errors)
+            for outbox_id in conflicts:
+                errors[outbox_id] = "event ID conflict on update"
+        return errors
+
+    def _execute(self, batch, payloads, errors):
+        try:
+            batch.execute()
+        except Exception as e:
+            # The whole batch request failed: every entry in it is retried.
+            for outbox_id in payloads:
+                errors.setdefault(outbox_id, f"batch request failed: {e}")
+
+    # --- WORKER ---
+    async def drain_once(self):
+        """Sends one batch of due entries. Returns how many were claimed."""
+        claimed = await asyncio.to_thread(self._claim)
+        if not claimed:
+            return 0
+        await self.limiter.acquire(len(claimed))
+        start = time.perf_counter()
+        try:
+            errors = await self.run_calendar(self._send_batch, claimed)
+        except Exception as e:
+            errors = {outbox_id: f"calendar client error: {e}" for outbox_id, *_ in claimed}
+        self.batches += 1
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+        await asyncio.to_thread(self._settle, claimed, errors)
+        return len(claimed)
+
+    def wake(self):
+        """Tells the worker new entries were committed. Safe from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def run(self, poll_seconds=5.0, purge_every_seconds=3600):
+        """Drains the outbox until cancelled, waking early whenever wake() is called."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        last_purge = 0.0
+        while True:
+            try:
+                while await self.drain_once() == self.batch_size:
+                    pass  # more may be due right away
+                if time.monotonic() - last_purge > purge_every_seconds:
+                    await asyncio.to_thread(self.purge_done)
+                    last_purge = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Calendar outbox worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def stats(self):
+        db = self.read_session_factory()
+        try:
+            counts = dict(db.query(CalendarOutboxEntry.status, func.count()).group_by(CalendarOutboxEntry.status).all())
+            oldest = db.query(func.min(CalendarOutboxEntry.created_at)).filter(
+                CalendarOutboxEntry.status == "pending"
+            ).scalar()
+        finally:
+            db.close()
+        return {
+            "pending": counts.get("pending", 0),
+            "failed": counts.get("failed", 0),
+            "done": counts.get("done", 0),
+            "oldest_pending_age_seconds": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed_for_good": self.failed,
+            "batches": self.batches,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "last_lag_seconds": round(self.last_lag_seconds, 3),
+            "avg_lag_seconds": round(self._total_lag_seconds / self.sent, 3) if self.sent else 0.0,
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from googleapiclient.errors import HttpError
+from sqlalchemy import insert
+
+from app.tools.calendar_client import IST, to_local, to_rfc3339
+from app.database import SessionLocal, CalendarEvent, CalendarSyncState
+
+logger = logging.getLogger(__name__)
+
+
+class CalendarSync:
+    """
+    Mirrors a Google Calendar into the local `calendar_events` table.
+
+    The first sync lists every event from `lookback_days` ago onwards and
+    stores the returned nextSyncToken. Later syncs send that token and only
+    receive what changed since (cancelled events are deleted from the
+    mirror). A 410 Gone means the token expired: the mirror for that
+    calendar is rebuilt with a fresh full sync. Every sync also drops the
+    mirrored events that ended more than `lookback_days` ago, so the table
+    stays the size of the window the first sync fetched.
+
+    Readers (the availability engine) only ever query the mirror, so
+    availability checks make no network calls. The app's background task
+    (run_periodically) runs the first sync as soon as it starts, without
+    holding up startup; until it lands the mirror is empty.
+    """
+
+    def __init__(self, get_service, calendar_id='primary', session_factory=SessionLocal,
+                 lookback_days=1, page_size=2500, on_change=None):
+        self.get_service = get_service
+        self.calendar_id = calendar_id
+        self.session_factory = session_factory
+        self.lookback = timedelta(days=lookback_days)
+        self.page_size = page_size
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._tables_ready = False
+
+    def _ensure_tables(self, db):
+        if not self._tables_ready:
+            bind = db.get_bind()
+            CalendarEvent.__table__.create(bind=bind, checkfirst=True)
+            CalendarSyncState.__table__.create(bind=bind, checkfirst=True)
+            self._tables_ready = True
+
+    # --- SYNC ---
+    def sync(self):
+        """Runs one full or incremental sync. Returns the number of changed events."""
+        with self._lock:
+            db = self.session_factory()
+            try:
+                self._ensure_tables(db)
+                state = db.get(CalendarSyncState, self.calendar_id)
+                if state is None:
+                    state = CalendarSyncState(calendar_id=self.calendar_id)
+                    db.add(state)
+
+                if state.sync_token:
+                    try:
+                        changed = self._incremental_sync(db, state)
+                    except HttpError as e:
+                        if e.resp.status != 410:
+                            raise
+                        logger.warning(f"Sync token for {self.calendar_id} expired, running full resync")
+                        db.rollback()
+                        state = db.get(CalendarSyncState, self.calendar_id)
+                        changed = self._full_sync(db, state)
+                else:
+                    changed = self._full_sync(db, state)
+
+                pruned = db.query(CalendarEvent).filter(
+                    CalendarEvent.calendar_id == self.calendar_id,
+                    CalendarEvent.end_time < self._window_start()
+                ).delete(synchronize_session=False)
+                if pruned:
+                    logger.debug(f"Pruned {pruned} past event(s) from the {self.calendar_id} mirror")
+                state.last_sync = datetime.utcnow()
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        if changed and self.on_change:
+            self.on_change()
+        return changed
+
+    def _list_pages(self, **params):
+        """Yields every page of events.list; the last page carries nextSyncToken."""
+        service = self.get_service()
+        page_token = None
+        while True:
+            page = service.events().list(
+                calendarId=self.calendar_id,
+                maxResults=self.page_size,
+                singleEvents=True,
+                pageToken=page_token,
+                **params
+            ).execute()
+            yield page
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _window_start(self):
+        """Oldest time the mirror keeps: `lookback` before now, clinic-local and naive like the rows."""
+        return datetime.now(IST).replace(tzinfo=None) - self.lookback
+
+    def _full_sync(self, db, state):
+        items, sync_token = [], None
+        for page in self._list_pages(timeMin=to_rfc3339(self._window_start())):
+            items.extend(page.get('items', []))
+            sync_token = page.get('nextSyncToken', sync_token)
+
+        # Swap the mirror contents in the same transaction so readers never see it empty.
+        db.query(CalendarEvent).filter(CalendarEvent.calendar_id == self.calendar_id).delete()
+        rows = [self._row(item) for item in items if item.get('status') != 'cancelled']
+        if rows:
+            db.execute(insert(CalendarEvent.__table__), rows)
+        state.sync_token = sync_token
+        state.last_full_sync = datetime.utcnow()
+        return len(items)
+
+    def _incremental_sync(self, db, state):
+        changed = 0
+        sync_token = state.sync_token
+        for page in self._list_pages(syncToken=state.sync_token):
+            for item in page.get('items', []):
+                self._apply(db, item)
+                changed += 1
+            sync_token = page.get('nextSyncToken', sync_token)
+        state.sync_token = sync_token
+        return changed
+
+    def _apply(self, db, item):
+        key = (item['id'], self.calendar_id)
+        if item.get('status') == 'cancelled':
+            existing = db.get(CalendarEvent, key)
+            if existing is not None:
+                db.delete(existing)
+            return
+        db.merge(CalendarEvent(**self._row(item)))
+
+    def _row(self, item):
+        return {
+            "id": item['id'],
+            "calendar_id": self.calendar_id,
+            "summary": item.get('summary'),
+            "description": item.get('description'),
+            "start_time": to_local(item['start']),
+            "end_time": to_local(item['end']),
+            "transparency": item.get('transparency'),
+            "updated": item.get('updated'),
+        }
+
+    # --- READ SIDE ---
+    def events_between(self, start, end):
+        """
+        (start, end, description) of blocking mirrored events overlapping
+        [start, end). Never calls the API: before the first sync has filled
+        the mirror this is whatever it holds (nothing).
+        """
+        db = self.session_factory()
+        try:
+            self._ensure_tables(db)
+            rows = db.query(CalendarEvent.start_time, CalendarEvent.end_time, CalendarEvent.description).filter(
+                CalendarEvent.calendar_id == self.calendar_id,
+                CalendarEvent.start_time < end,
+                CalendarEvent.end_time > start,
+                (CalendarEvent.transparency.is_(None)) | (CalendarEvent.transparency != 'transparent')
+            ).all()
+            return [tuple(r) for r in rows]
+        finally:
+            db.close()
+
+    # --- BACKGROUND SCHEDULE ---
+    async def sync_once(self, lease=None):
+        """
+        One sync in a worker thread, if this process holds `lease` (an
+        app.worker_sync.Lease; None = always). Failures are logged, not
+        raised, so a Calendar outage never stops the schedule.
+        """
+        try:
+            if lease is None or await asyncio.to_thread(lease.acquire):
+                changed = await asyncio.to_thread(self.sync)
+                if changed:
+                    logger.info(f"Calendar sync: {changed} event(s) changed in {self.calendar_id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Calendar sync failed: {e}")
+
+    async def run_periodically(self, interval_seconds=60, lease=None):
+        """
+        Syncs now and then every `interval_seconds` until cancelled. With a
+        `lease`, only the worker process holding it syncs; the others pick
+        up the changes through the shared mirror.
+        """
+        try:
+            while True:
+                await self.sync_once(lease)
+                await asyncio.sleep(interval_seconds)
+        finally:
+            if lease is not None:
+                lease.release()
@@ -0,0 +1,267 @@
+"""
+In-memory doctor name index: resolves "Dr. Sarah", "smith" or "Jon Doe" to
+one doctor ID with a ranked candidate list, instead of a leading-wildcard
+ILIKE scan that returns an arbitrary first match.
+
+Names are normalized (case, punctuation and titles dropped) and indexed
+three ways: full name -> IDs, token -> IDs, and character bigram ->
+tokens. Exact tokens are dict lookups; typos are found through the bigram
+postings, so a lookup never scans the catalog.
+"""
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain
+from difflib import SequenceMatcher
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+logger = logging.getLogger(__name__)
+
+_TITLES = {"dr", "doctor", "prof", "professor", "mr", "mrs", "ms", "miss"}
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name):
+    """'Dr. Sarah  SMITH' -> ['sarah', 'smith']"""
+    return [t for t in _NON_ALNUM.sub(" ", (name or "").lower()).split() if t not in _TITLES]
+
+
+def _bigrams(token):
+    """Padded character bigrams; unlike trigrams they still overlap for transpositions ('jhon'/'john')."""
+    padded = f"${token}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+@dataclass
+class DoctorCandidate:
+    doctor_id: int
+    name: str
+    score: float
+
+
+class DoctorIndex:
+    """
+    `loader()` returns (doctor_id, name) pairs and is called on first use.
+    After that, watch(Doctor) keeps the index current: committed inserts,
+    updates and deletes of Doctor rows are applied one doctor at a time.
+
+    resolve() only answers when the best candidate scores at least
+    `min_score` and beats the runner-up by `margin`; otherwise the caller
+    should ask the user to pick from candidates().
+    """
+
+    def __init__(self, loader=None, min_score=0.65, margin=0.1, fuzzy_cutoff=0.75, fuzzy_pool=50):
+        self.loader = loader
+        self.min_score = min_score
+        self.margin = margin
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.fuzzy_pool = fuzzy_pool
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._names = {}          # doctor_id -> display name
+        self._tokens = {}         # doctor_id -> normalized tokens
+        self._by_full = {}        # "sarah smith" -> {doctor_id}
+        self._by_token = {}       # "sarah" -> {doctor_id}
+        self._by_bigram = {}      # "$s" -> {"sarah", "sam", ...}
+
+    # --- MAINTENANCE ---
+    def load(self, rows):
+        with self._lock:
+            self._reset()
+            for doctor_id, name in rows:
+                self._add(doctor_id, name)
+            self._loaded = True
+        logger.info(f"Doctor index built with {len(self._names)} doctor(s)")
+
+    def _ensure_loaded(self):
+        if not self._loaded and self.loader is not None:
+            self.load(self.loader())
+
+    def invalidate(self):
+        """Forces a full reload on the next lookup."""
+        with self._lock:
+            self._loaded = False
+
+    def upsert(self, doctor_id, name):
+        with self._lock:
+            if self._loaded:
+                self._remove(doctor_id)
+                self._add(doctor_id, name)
+
+    def remove(self, doctor_id):
+        with self._lock:
+            if self._loaded:
+                self._remove(doctor_id)
+
+    def _add(self, doctor_id, name):
+        tokens = normalize(name)
+        self._names[doctor_id] = name
+        self._tokens[doctor_id] = tokens
+        self._by_full.setdefault(" ".join(tokens), set()).add(doctor_id)
+        for token in tokens:
+            if token not in self._by_token:
+                for gram in _bigrams(token):
+                    self._by_bigram.setdefault(gram, set()).add(token)
+            self._by_token.setdefault(token, set()).add(doctor_id)
+
+    def _remove(self, doctor_id):
+        tokens = self._tokens.pop(doctor_id, None)
+        if tokens is None:
+            return
+        del self._names[doctor_id]
+        _discard(self._by_full, " ".join(tokens), doctor_id)
+        for token in tokens:
+            if _discard(self._by_token, token, doctor_id):
+                for gram in _bigrams(token):
+                    _discard(self._by_bigram, gram, token)
+
+    # --- LOOKUPS ---
+    def _similar_tokens(self, token):
+        """{indexed token: similarity} for `token` itself or close misspellings of it."""
+        if token in self._by_token:
+            return {token: 1.0}
+        shared = Counter()
+        for gram in _bigrams(token):
+            shared.update(self._by_bigram.get(gram, ()))
+        matches = {}
+        for candidate, _ in shared.most_common(self.fuzzy_pool):
+            score = SequenceMatcher(None, token, candidate).ratio()
+            if score >= self.fuzzy_cutoff:
+                matches[candidate] = score
+        return matches
+
+    def _ranked(self, query, limit, done):
+        """
+        Scores doctors bucket by bucket, most query tokens matched first, and
+        stops once done(ranked, bound) holds, where `bound` is the best score
+        any doctor in the remaining buckets could reach. Common first or
+        last names then never get every namesake scored.
+        """
+        query_tokens = normalize(query)
+        if not query_tokens:
+            return []
+        n = len(query_tokens)
+        with self._lock:
+            self._ensure_loaded()
+            exact = self._by_full.get(" ".join(query_tokens), set())
+
+            # Per query token: {doctor_id: similarity of their best-matching name token}.
+            hits = []
+            for token in query_tokens:
+                token_hits = {}
+                for candidate, score in sorted(self._similar_tokens(token).items(), key=lambda m: m[1]):
+                    token_hits.update(dict.fromkeys(self._by_token[candidate], score))
+                hits.append(token_hits)
+
+            buckets = {}
+            for doctor_id, matched in Counter(chain.from_iterable(hits)).items():
+                buckets.setdefault(matched, []).append(doctor_id)
+
+            ranked = []
+            for matched in sorted(buckets, reverse=True):
+                for doctor_id in buckets[matched]:
+                    if doctor_id in exact:
+                        score = 1.0
+                    else:
+                        query_coverage = sum(h.get(doctor_id, 0.0) for h in hits) / n
+                        name_coverage = min(matched / max(len(self._tokens[doctor_id]), 1), 1.0)
+                        score = 0.9 * query_coverage + 0.05 * name_coverage
+                    ranked.append(DoctorCandidate(doctor_id, self._names[doctor_id], round(score, 3)))
+                ranked.sort(key=lambda c: (-c.score, c.name))
+                del ranked[limit:]
+                if done(ranked, 0.9 * (matched - 1) / n + 0.05):
+                    break
+        return ranked
+
+    def candidates(self, query, limit=5):
+        """Doctors matching `query`, best first, as DoctorCandidate(doctor_id, name, score)."""
+        return self._ranked(query, limit, lambda ranked, bound: len(ranked) >= limit and ranked[-1].score >= bound)
+
+    def resolve(self, query):
+        """The one doctor `query` refers to, or None when nothing (or more than one doctor) matches well."""
+        def decided(ranked, bound):
+            runner_up = max(bound, ranked[1].score if len(ranked) > 1 else 0.0)
+            return bool(ranked) and ranked[0].score - runner_up >= self.margin
+
+        ranked = self._ranked(query, 2, decided)
+        if not ranked or ranked[0].score < self.min_score:
+            return None
+        if len(ranked) > 1 and ranked[0].score - ranked[1].score < self.margin:
+            return None
+        return ranked[0]
+
+    def mentioned(self, words, min_score=0.0):
+        """
+        {doctor_id: score} for doctors with a name token equal or close to
+        one of `words` (e.g. the words of a chat message), scored by their
+        best such match. Posting lookups only, like candidates().
+        """
+        scores = {}
+        with self._lock:
+            self._ensure_loaded()
+            for token in chain.from_iterable(normalize(word) for word in words):
+                for candidate, score in self._similar_tokens(token).items():
+                    if score < min_score:
+                        continue
+                    for doctor_id in self._by_token[candidate]:
+                        scores[doctor_id] = max(scores.get(doctor_id, 0.0), score)
+        return scores
+
+    def name_of(self, doctor_id):
+        """Display name of `doctor_id`, or None if unknown."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._names.get(doctor_id)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._names)
+
+    # --- INCREMENTAL UPDATES ---
+    def watch(self, model):
+        """Applies committed inserts/updates/deletes of `model` rows (needs `id` and `name`)."""
+        def queue(mapper, connection, target, op):
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault(_PENDING_KEY, []).append((self, op, target.id, target.name))
+
+        event.listen(model, "after_insert", lambda m, c, t: queue(m, c, t, "upsert"))
+        event.listen(model, "after_update", lambda m, c, t: queue(m, c, t, "upsert"))
+        event.listen(model, "after_delete", lambda m, c, t: queue(m, c, t, "remove"))
+
+
+def _discard(postings, key, value):
+    """Removes value from postings[key]; returns True when the key is gone."""
+    values = postings.get(key)
+    if values is None:
+        return True
+    values.discard(value)
+    if not values:
+        del postings[key]
+        return True
+    return False
+
+
+_PENDING_KEY = "doctor_index_ops"
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    for index, op, doctor_id, name in session.info.pop(_PENDING_KEY, []):
+        if op == "upsert":
+            index.upsert(doctor_id, name)
+        else:
+            index.remove(doctor_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,241 @@
+"""
+In-process stand-in for the googleapiclient Calendar v3 service.
+Supports the call chains the app uses (events().list/insert/update/delete,
+freebusy().query, new_batch_http_request())
+with the same request/response shapes, including paging and
+nextSyncToken/syncToken deltas, so benchmarks and local runs never need
+OAuth or network access.
+"""
+import itertools
+import threading
+import time
+from collections import Counter
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from app.tools.calendar_client import to_local, FREEBUSY_MAX_CALENDARS
+
+
+class _Request:
+    def __init__(self, service, fn):
+        self._service = service
+        self._fn = fn
+
+    def execute(self, num_retries=0):
+        self._service._round_trip()
+        return self._fn()
+
+
+class _Events:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, calendarId='primary', timeMin=None, timeMax=None, maxResults=250,
+             singleEvents=True, orderBy=None, pageToken=None, syncToken=None, **kwargs):
+        return _Request(
+            self._service, lambda: self._service._list(calendarId, timeMin, timeMax, maxResults, pageToken, syncToken)
+        )
+
+    def insert(self, calendarId='primary', body=None, **kwargs):
+        return _Request(self._service, lambda: self._service._insert(calendarId, body))
+
+    def update(self, calendarId='primary', eventId=None, body=None, **kwargs):
+        return _Request(self._service, lambda: self._service._update(calendarId, eventId, body))
+
+    def delete(self, calendarId='primary', eventId=None, **kwargs):
+        return _Request(self._service, lambda: self._service._delete(calendarId, eventId))
+
+
+class _Batch:
+    """Runs the added requests in one round trip, reporting each to the callback like BatchHttpRequest."""
+
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((str(request_id or len(self._requests) + 1), request, callback or self._callback))
+
+    def execute(self):
+        with self._service._lock:
+            self._service.calls['batch'] += 1
+        self._service._round_trip()
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = request._fn(), None
+            except HttpError as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class _FreeBusy:
+    def __init__(self, service):
+        self._service = service
+
+    def query(self, body=None):
+        return _Request(self._service, lambda: self._service._freebusy(body))
+
+
+class FakeCalendarService:
+    """
+    Holds events per calendar ID in memory. `calls` counts API round trips
+    per method so callers can assert how many requests they made.
+
+    Every write stamps the event with a change sequence number; sync tokens
+    are just "the sequence at the time of the last full page", so a delta
+    list returns everything stamped after it (deleted events come back with
+    status 'cancelled', as with the real API).
+
+    `latency_seconds` is slept once per round trip (a batch is one), outside
+    the lock, to stand in for the network in load tests.
+    """
+
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._seq = 0
+        self._token_generation = 0
+        self.calendars = {}
+        self.known_calendars = {'primary'}  # calendars that exist even without events
+        self.calls = Counter()
+
+    # --- googleapiclient surface ---
+    def events(self):
+        return _Events(self)
+
+    def freebusy(self):
+        return _FreeBusy(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
+
+    # --- Test helpers ---
+    def add_calendar(self, calendar_id):
+        self.known_calendars.add(calendar_id)
+
+    def add_event(self, start_iso, end_iso, calendar_id='primary', summary="Busy", description=None):
+        return self._insert(calendar_id, {
+            'summary': summary,
+            'description': description,
+            'start': {'dateTime': start_iso, 'timeZone': 'Asia/Kolkata'},
+            'end': {'dateTime': end_iso, 'timeZone': 'Asia/Kolkata'},
+        }, count=False)
+
+    def update_event(self, event_id, calendar_id='primary', **fields):
+        with self._lock:
+            event = self.calendars[calendar_id][event_id]
+            event.update(fields)
+            self._stamp(event)
+            return event
+
+    def delete_event(self, event_id, calendar_id='primary'):
+        self.update_event(event_id, calendar_id=calendar_id, status='cancelled')
+
+    def expire_sync_tokens(self):
+        """Makes every sync token issued so far invalid (the API then answers 410 Gone)."""
+        with self._lock:
+            self._token_generation += 1
+
+    # --- Implementations ---
+    def _round_trip(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _stamp(self, event):
+        self._seq += 1
+        event['_seq'] = self._seq
+        event['updated'] = f"seq-{self._seq}"
+
+    def _insert(self, calendar_id, body, count=True):
+        with self._lock:
+            if count:
+                self.calls['events.insert'] += 1
+            if body.get('id') in self.calendars.get(calendar_id, {}):
+                # IDs stay taken after deletion, as with the real API.
+                raise HttpError(httplib2.Response({'status': 409}), b'{"error": {"message": "The requested identifier already exists."}}')
+            event = dict(body)
+            event.setdefault('id', f"fake{next(self._ids)}")
+            event.setdefault('status', 'confirmed')
+            self._stamp(event)
+            self.calendars.setdefault(calendar_id, {})[event['id']] = event
+            return event
+
+    def _update(self, calendar_id, event_id, body):
+        with self._lock:
+            self.calls['events.update'] += 1
+            events = self.calendars.get(calendar_id, {})
+            if event_id not in events:
+                raise HttpError(httplib2.Response({'status': 404}), b'{"error": {"message": "Not Found"}}')
+            event = dict(body, id=event_id)
+            event.setdefault('status', 'confirmed')
+            self._stamp(event)
+            events[event_id] = event
+            return event
+
+    def _delete(self, calendar_id, event_id):
+        with self._lock:
+            self.calls['events.delete'] += 1
+            event = self.calendars.get(calendar_id, {}).get(event_id)
+            if event is None:
+                raise HttpError(httplib2.Response({'status': 404}), b'{"error": {"message": "Not Found"}}')
+            if event.get('status') == 'cancelled':
+                raise HttpError(httplib2.Response({'status': 410}), b'{"error": {"message": "Resource has been deleted"}}')
+            event['status'] = 'cancelled'
+            self._stamp(event)
+
+    def _in_range(self, event, time_min, time_max):
+        start, end = to_local(event['start']), to_local(event['end'])
+        if time_min and end <= to_local(time_min):
+            return False
+        if time_max and start >= to_local(time_max):
+            return False
+        return True
+
+    def _list(self, calendar_id, time_min, time_max, max_results, page_token, sync_token):
+        with self._lock:
+            self.calls['events.list'] += 1
+            stored = self.calendars.get(calendar_id, {}).values()
+            if sync_token:
+                generation, since = (int(part) for part in sync_token.split('-')[-2:])
+                if generation != self._token_generation:
+                    raise HttpError(httplib2.Response({'status': 410}), b'{"error": {"message": "Sync token is no longer valid"}}')
+                events = [e for e in stored if e['_seq'] > since]
+            else:
+                events = [
+                    e for e in stored
+                    if e.get('status') != 'cancelled' and self._in_range(e, time_min, time_max)
+                ]
+            current_seq, generation = self._seq, self._token_generation
+            events = [{k: v for k, v in e.items() if k != '_seq'} for e in events]
+        events.sort(key=lambda e: to_local(e['start']))
+        offset = int(page_token or 0)
+        page = events[offset:offset + max_results]
+        result = {'items': page}
+        if offset + max_results < len(events):
+            result['nextPageToken'] = str(offset + max_results)
+        else:
+            result['nextSyncToken'] = f"fake-sync-{generation}-{current_seq}"
+        return result
+
+    def _freebusy(self, body):
+        with self._lock:
+            self.calls['freebusy.query'] += 1
+            if len(body.get('items', [])) > FREEBUSY_MAX_CALENDARS:
+                raise HttpError(httplib2.Response({'status': 400}), b'{"error": {"message": "Too many calendars requested"}}')
+            calendars = {}
+            for item in body.get('items', []):
+                cal_id = item['id']
+                if cal_id not in self.calendars and cal_id not in self.known_calendars:
+                    calendars[cal_id] = {'errors': [{'domain': 'global', 'reason': 'notFound'}], 'busy': []}
+                    continue
+                busy = [
+                    {'start': e['start']['dateTime'], 'end': e['end']['dateTime']}
+                    for e in self.calendars.get(cal_id, {}).values()
+                    if e.get('status') != 'cancelled' and self._in_range(e, body['timeMin'], body['timeMax'])
+                ]
+                calendars[cal_id] = {'busy': sorted(busy, key=lambda b: to_local(b['start']))}
+            return {'kind': 'calendar#freeBusy', 'calendars': calendars}
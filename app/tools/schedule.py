@@ -0,0 +1,338 @@
+"""
+Doctor schedules: weekly rules plus dated exceptions, turned into bookable
+slots without asking the LLM to read availability_text.
+
+Each doctor-day in the rolling window is precomputed as two bitmaps over
+5-minute cells (288 bits, held in a Python int):
+
+    open    cells the doctor is working
+    starts  cells where a slot may begin (rule start + n * slot length)
+
+Busy time from the AvailabilityEngine becomes a third bitmap, and the
+bookable slots of a day are `starts & runs(open & ~busy, slot cells)`,
+where runs() keeps the cells that begin `k` consecutive free cells (a few
+shifts and ANDs over the whole day). Slot lookups are single bit tests;
+"next available" is a lowest-set-bit scan per day.
+
+Doctors with no rules keep the old behaviour: clinic hours, every day,
+one-hour slots.
+"""
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.database import get_schedules
+from app.tools.calendar_client import IST
+
+logger = logging.getLogger(__name__)
+
+CELL_MINUTES = 5
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+DEFAULT_SLOT_MINUTES = 60
+
+
+# --- availability_text PARSER ---
+_DAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+_DAY = r"\b(?:mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:r(?:s(?:day)?)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)\b\.?"
+_TIME = r"\d{1,2}(?:[:.]\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)?"
+_TOKEN_RE = re.compile(
+    rf"(?P<days>(?P<d1>{_DAY})(?:\s*(?:-|–|to|through)\s*(?P<d2>{_DAY}))?)"
+    rf"|(?P<keyword>\b(?:daily|every\s*day|weekdays|weekends?)\b)"
+    rf"|(?P<time>(?P<t1>{_TIME})\s*(?:-|–|to)\s*(?P<t2>{_TIME}))"
+    rf"|(?P<closed>\b(?:closed|off)\b)",
+    re.IGNORECASE,
+)
+
+
+def _parse_time(value):
+    """'9am' -> (540, 'am'), '4:30 pm' -> (990, 'pm'), '14' -> (840, None)."""
+    value = value.lower().replace(".", ":").replace(" ", "")
+    suffix = "am" if value.endswith(("am", "a:m:")) else "pm" if value.endswith(("pm", "p:m:")) else None
+    digits = value.rstrip("apm:")
+    hour, _, minute = digits.partition(":")
+    hour, minute = int(hour), int(minute or 0)
+    if suffix == "pm" and hour != 12:
+        hour += 12
+    elif suffix == "am" and hour == 12:
+        hour = 0
+    return hour * 60 + minute, suffix
+
+
+def _day_span(first, last):
+    first, last = _DAYS[first[:3].lower()], _DAYS[(last or first)[:3].lower()]
+    return [(first + i) % 7 for i in range(((last - first) % 7) + 1)]
+
+
+def parse_availability_text(text):
+    """
+    Parses free text like "Mon-Fri 9am-4pm", "Tue, Thu 10:00-13:00 and
+    14:00-17:00" or "Weekdays 9-5; Sat 10am-2pm" into sorted
+    (weekday, start_minute, end_minute) tuples. Returns [] when nothing
+    recognisable is found.
+    """
+    rules = set()
+    days, days_done = set(), False
+    for match in _TOKEN_RE.finditer(text or ""):
+        if match.group("days") or match.group("keyword"):
+            if days_done:  # a day list after a time range starts a new group
+                days, days_done = set(), False
+            if match.group("days"):
+                days.update(_day_span(match.group("d1"), match.group("d2")))
+            else:
+                keyword = match.group("keyword").lower().replace(" ", "")
+                days.update(range(5) if keyword == "weekdays" else (5, 6) if keyword.startswith("weekend") else range(7))
+        elif match.group("time"):
+            start, start_suffix = _parse_time(match.group("t1"))
+            end, end_suffix = _parse_time(match.group("t2"))
+            if start_suffix is None and end_suffix == "pm" and start + 12 * 60 < end:
+                start += 12 * 60           # "2-5pm"
+            elif end_suffix is None and end <= start and end < 12 * 60:
+                end += 12 * 60             # "9-5"
+            if not 0 <= start < end <= 24 * 60:
+                continue
+            rules.update((day, start, end) for day in (days or range(7)))
+            days_done = True
+        elif match.group("closed"):
+            days, days_done = set(), True  # "Sun closed": drop the pending day list
+    return sorted(rules)
+
+
+# --- BITMAPS ---
+def _cells(start_minute, end_minute):
+    """Bitmap of the cells covering [start_minute, end_minute)."""
+    first = max(start_minute // CELL_MINUTES, 0)
+    last = min(-(-end_minute // CELL_MINUTES), CELLS_PER_DAY)
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def _runs(mask, k):
+    """Cells that begin `k` consecutive set cells in `mask`."""
+    result, width = mask, 1
+    while width < k:
+        step = min(width, k - width)
+        result &= result >> step
+        width += step
+    return result
+
+
+def _bits(mask):
+    """Indices of the set bits, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@dataclass
+class DaySchedule:
+    open: int = 0
+    starts: int = 0
+    slot_minutes: int = DEFAULT_SLOT_MINUTES
+
+    @property
+    def slot_cells(self):
+        return -(-self.slot_minutes // CELL_MINUTES)
+
+    def add_window(self, start_minute, end_minute, slot_minutes):
+        self.open |= _cells(start_minute, end_minute)
+        for minute in range(start_minute, end_minute - slot_minutes + 1, slot_minutes):
+            self.starts |= 1 << (minute // CELL_MINUTES)
+        self.slot_minutes = slot_minutes
+
+    def close(self, start_minute, end_minute):
+        self.open &= ~_cells(start_minute, end_minute)
+
+    def bookable(self, busy=0):
+        """Slot-start cells whose whole slot is open and not busy."""
+        return self.starts & _runs(self.open & ~busy, self.slot_cells)
+
+
+class DoctorSchedules:
+    """
+    Precomputed DaySchedules for a rolling window, from `load(start_day,
+    end_day)` -> (rules, exceptions) tuples (get_schedules reads them from
+    the DB). Doctor-days are built on first use and kept until the next
+    refresh; precompute() builds a whole window up front.
+
+    A day uses the slot length of its last window; doctors with several
+    rules on one day should give them the same slot_minutes.
+    """
+
+    def __init__(self, load=get_schedules, horizon_days=30, ttl_seconds=300, default_hours=(9, 18)):
+        self.load = load
+        self.horizon = timedelta(days=horizon_days)
+        self.ttl_seconds = ttl_seconds
+        self._loaded_at = None
+        self.default_hours = default_hours
+        self._lock = threading.Lock()
+        self._window = (None, None)
+        self._rules = {}        # doctor_id -> [(weekday, start, end, slot, valid_from, valid_until)]
+        self._exceptions = {}   # (doctor_id or None, day) -> [(start, end, available, slot)]
+        self._days = {}         # (doctor_id, day) -> DaySchedule
+        self._generation = 0    # bumped by invalidate(), so a load that raced a commit is not kept
+        self.refreshes = 0
+
+    # --- LOADING ---
+    def refresh(self, start_day):
+        end_day = start_day + self.horizon
+        generation = self._generation
+        rules, exceptions = self.load(start_day, end_day)
+        by_doctor, by_day = {}, {}
+        for doctor_id, *rule in rules:
+            by_doctor.setdefault(doctor_id, []).append(tuple(rule))
+        for doctor_id, day, start, end, available, slot in exceptions:
+            by_day.setdefault((doctor_id, day), []).append((start, end, available, slot))
+        with self._lock:
+            self._rules, self._exceptions = by_doctor, by_day
+            self._days = {}
+            self._window = (start_day, end_day)
+            # Invalidated while loading: serve what was read, but reload on the next query.
+            self._loaded_at = time.monotonic() if generation == self._generation else None
+            self.refreshes += 1
+
+    def invalidate(self):
+        """Drops the window; the next query reloads it."""
+        with self._lock:
+            self._window = (None, None)
+            self._generation += 1
+
+    def _ensure_loaded(self, day):
+        start, end = self._window
+        stale = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+        if stale or start is None or not start <= day < end:
+            today = datetime.now(IST).date()
+            # Keep the window anchored on today unless the query falls outside it.
+            self.refresh(today if today <= day < today + self.horizon else day)
+
+    def watch(self, *models):
+        """Reloads on the next query after a committed write to `models` (ScheduleRule, ScheduleException)."""
+        def queue(mapper, connection, target):
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault(_PENDING_KEY, set()).add(self)
+
+        for model in models:
+            for name in ("after_insert", "after_update", "after_delete"):
+                event.listen(model, name, queue)
+
+    def _build(self, doctor_id, day):
+        schedule = DaySchedule()
+        rules = self._rules.get(doctor_id)
+        if rules is None:
+            open_hour, close_hour = self.default_hours
+            schedule.add_window(open_hour * 60, close_hour * 60, DEFAULT_SLOT_MINUTES)
+        else:
+            for weekday, start, end, slot, valid_from, valid_until in rules:
+                if weekday == day.weekday() and (valid_from is None or valid_from <= day) \
+                        and (valid_until is None or day <= valid_until):
+                    schedule.add_window(start, end, slot)
+        for start, end, available, slot in self._exceptions.get((None, day), []) + \
+                self._exceptions.get((doctor_id, day), []):
+            start, end = (0, 24 * 60) if start is None else (start, end)
+            if available:
+                schedule.add_window(start, end, slot)
+            else:
+                schedule.close(start, end)
+        return schedule
+
+    def day(self, doctor_id, day):
+        """The DaySchedule of `doctor_id` on `day` (a date)."""
+        self._ensure_loaded(day)
+        key = (doctor_id, day)
+        schedule = self._days.get(key)
+        if schedule is None:
+            with self._lock:
+                schedule = self._days.setdefault(key, self._build(doctor_id, day))
+        return schedule
+
+    def precompute(self, doctor_ids, start_day, days=None):
+        """Builds every doctor-day in the window up front (refresh() leaves them lazy)."""
+        self._ensure_loaded(start_day)
+        for offset in range(days or self.horizon.days):
+            for doctor_id in doctor_ids:
+                self.day(doctor_id, start_day + timedelta(days=offset))
+
+    # --- QUERIES ---
+    def slot_length(self, doctor_id, start):
+        return timedelta(minutes=self.day(doctor_id, start.date()).slot_minutes)
+
+    def is_bookable(self, doctor_id, start, end):
+        """True if [start, end) starts on one of the doctor's slots and lies within their hours."""
+        if start.date() != (end - timedelta(microseconds=1)).date() or start.second or start.microsecond:
+            return False
+        schedule = self.day(doctor_id, start.date())
+        start_minute = start.hour * 60 + start.minute
+        window = _cells(start_minute, start_minute + int((end - start).total_seconds() // 60))
+        return (not start_minute % CELL_MINUTES and schedule.starts >> (start_minute // CELL_MINUTES) & 1
+                and schedule.open & window == window)
+
+    def outside_hours(self, doctor_id, start, end):
+        """Why [start, end) can't be booked by the schedule, or None if it's a bookable slot."""
+        if end.date() != start.date() and end != datetime.combine(start.date() + timedelta(days=1), datetime.min.time()):
+            return "appointments can't span midnight"
+        schedule = self.day(doctor_id, start.date())
+        if not schedule.open:
+            return f"the doctor does not work on {start.strftime('%A %Y-%m-%d')}"
+        start_minute = start.hour * 60 + start.minute
+        end_minute = start_minute + int((end - start).total_seconds() // 60)
+        window = _cells(start_minute, end_minute)
+        if schedule.open & window != window:
+            return f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')} is outside the doctor's working hours"
+        if start_minute % CELL_MINUTES or not schedule.starts >> (start_minute // CELL_MINUTES) & 1:
+            return f"slots start at {', '.join(self.slot_starts(doctor_id, start.date())[:6])}"
+        return None
+
+    def slot_starts(self, doctor_id, day):
+        """'HH:MM' labels of every slot start on `day`, ignoring bookings."""
+        return [f"{cell * CELL_MINUTES // 60:02d}:{cell * CELL_MINUTES % 60:02d}"
+                for cell in _bits(self.day(doctor_id, day).starts)]
+
+    def capacity_minutes(self, doctor_id, day):
+        """Bookable minutes on `day` with nothing booked: the slot starts (slot_starts) times the slot length."""
+        schedule = self.day(doctor_id, day)
+        return schedule.starts.bit_count() * schedule.slot_minutes
+
+    def free_slots(self, doctor_id, day, busy_intervals=(), after=None, limit=None):
+        """The first `limit` (default all) bookable slot starts on `day`, given busy (start, end) intervals."""
+        midnight = datetime.combine(day, datetime.min.time())
+        busy = 0
+        for start, end in busy_intervals:
+            busy |= _cells(int((start - midnight).total_seconds() // 60), int((end - midnight).total_seconds() // 60))
+        mask = self.day(doctor_id, day).bookable(busy)
+        if after is not None and after > midnight:
+            minutes = -(-int((after - midnight).total_seconds()) // 60)   # a slot may start at `after`, not before
+            mask &= ~((1 << -(-minutes // CELL_MINUTES)) - 1)
+        return [midnight + timedelta(minutes=cell * CELL_MINUTES) for cell in islice(_bits(mask), limit)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "doctors_with_rules": len(self._rules),
+                "exceptions": sum(len(v) for v in self._exceptions.values()),
+                "precomputed_days": len(self._days),
+                "window_start": str(self._window[0]) if self._window[0] else None,
+                "refreshes": self.refreshes,
+            }
+
+
+# Invalidate once the write is durable: before commit a concurrent query could reload the old
+# rules and keep them for ttl_seconds, and a rolled-back edit needs no reload at all.
+_PENDING_KEY = "schedule_invalidations"
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for schedules in session.info.pop(_PENDING_KEY, ()):
+        schedules.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,176 @@
+"""
+Response cache for idempotent agent tools. Each cached tool gets its own
+TTL + LRU-bounded cache and declares which tables its answer depends on;
+committing a change to one of those tables (through any SQLAlchemy
+session, sync or async) clears the dependent caches. A miss whose call
+overlapped such a commit returns its result without caching it.
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict, Counter
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl_seconds`."""
+
+    def __init__(self, maxsize=256, ttl_seconds=60):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0   # bumped by clear(), so a result computed across a clear is not stored
+        self.counters = Counter()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                    self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value, generation=None):
+        """Stores `value`, unless `generation` is given and the cache was cleared since it was read."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.counters["stale_puts"] += 1
+                return
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+            self.counters["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.counters["hits"], self.counters["misses"]
+            return {
+                **{k: self.counters[k] for k in ("hits", "misses", "expired", "evictions", "invalidations", "stale_puts")},
+                "size": len(self._data),
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            }
+
+
+class ToolCache:
+    """
+    Registry of per-tool caches.
+
+        @tool_cache.cached("list_available_doctors", ttl_seconds=300, depends_on=("doctors",))
+        def list_available_doctors() -> str: ...
+
+    Works for sync and async tools and keeps the wrapped function's name,
+    signature and docstring, so ADK builds the same tool declaration.
+    """
+
+    def __init__(self):
+        self.caches = {}
+        self._dependents = {}
+
+    def cached(self, name, ttl_seconds=60, maxsize=256, depends_on=(), cache_if=None):
+        cache = self.caches[name] = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        for table in depends_on:
+            self._dependents.setdefault(table, []).append(cache)
+
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            def key_of(args, kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return tuple(bound.arguments.items())
+
+            def store(key, result, generation):
+                if cache_if is None or cache_if(result):
+                    cache.put(key, result, generation)
+                return result
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def wrapper(*args, **kwargs):
+                    key = key_of(args, kwargs)
+                    generation = cache.generation
+                    result = cache.get(key)
+                    if result is _MISSING:
+                        result = store(key, await fn(*args, **kwargs), generation)
+                    return result
+            else:
+                @functools.wraps(fn)
+                def wrapper(*args, **kwargs):
+                    key = key_of(args, kwargs)
+                    generation = cache.generation
+                    result = cache.get(key)
+                    if result is _MISSING:
+                        result = store(key, fn(*args, **kwargs), generation)
+                    return result
+
+            wrapper.cache = cache
+            return wrapper
+        return decorator
+
+    def invalidate(self, tables):
+        """Clears every cache that depends on one of `tables`."""
+        cleared = {id(c): c for t in tables for c in self._dependents.get(t, [])}
+        for cache in cleared.values():
+            cache.clear()
+        if cleared:
+            logger.debug(f"Tool cache invalidated for {sorted(tables)}")
+
+    def invalidate_all(self):
+        for cache in self.caches.values():
+            cache.clear()
+
+    def stats(self):
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+
+tool_cache = ToolCache()
+
+
+# --- DB-CHANGE INVALIDATION ---
+# after_flush records which tables a session touched; after_commit invalidates
+# them once the change is durable (a rolled-back write invalidates nothing).
+# Listening on the Session class covers every sessionmaker, including the
+# sync session behind AsyncSession.
+_PENDING_KEY = "tool_cache_tables"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    tables = session.info.setdefault(_PENDING_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    tables = session.info.pop(_PENDING_KEY, None)
+    if tables:
+        tool_cache.invalidate(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,276 @@
+"""
+Coordination between the worker processes that share appointments.db
+(uvicorn --workers N, gunicorn).
+
+CacheSync: every process keeps its own caches (doctor index, schedules,
+availability, tool answers) and invalidates them on its own commits. To
+hear about the other processes' commits, each committed write to a
+tracked table bumps a per-table counter in `cache_versions`, inside the
+writing transaction. Every process polls the counters (a
+`PRAGMA data_version` check first, so an idle DB costs no table read) and
+runs the callbacks of tables that moved because of someone else. Bumps
+made by this process are counted and subtracted, so local writes, which
+the caches already handle, don't trigger a second invalidation.
+
+Lease: a row in `worker_leases` that one process at a time holds, for
+background jobs that should run once per deployment rather than once per
+worker (calendar sync).
+
+Only writes through SQLAlchemy (ORM flushes and session/connection DML on
+a tracked table) are counted; raw SQL from outside the app shows up once
+the caches' own TTLs expire.
+"""
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+TRACKED_TABLES = frozenset({
+    "departments", "doctors", "appointments", "schedule_rules", "schedule_exceptions", "calendar_events",
+    "chat_history",
+})
+
+
+def _new_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# Unique per process; a forked child (gunicorn --preload) gets its own.
+WORKER_ID = _new_worker_id()
+
+
+def _renew_worker_id():
+    global WORKER_ID
+    WORKER_ID = _new_worker_id()
+
+
+os.register_at_fork(after_in_child=_renew_worker_id)
+
+_BUMP = (
+    "INSERT INTO cache_versions (name, version) VALUES (?, 1) "
+    "ON CONFLICT(name) DO UPDATE SET version = version + 1"
+)
+_PENDING_KEY = "cache_sync_bumps"
+
+
+def _connect(db_path, busy_timeout_ms=5000):
+    conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+    return conn
+
+
+class CacheSync:
+    def __init__(self, db_path, interval_seconds=1.0):
+        self.db_path = db_path
+        self.interval_seconds = interval_seconds
+        self._callbacks = []            # (tables, callback)
+        self._own = Counter()           # bumps committed by this process
+        self._baseline = None           # (versions, own) at the first poll
+        self._remote = Counter()        # remote bumps already acted on
+        self._data_version = None
+        self._conn = None
+        self._binds = {}                # engine -> writes to db_path?
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+        # Metrics
+        self.polls = 0
+        self.reads = 0
+        self.remote_changes = Counter()
+        self.callback_errors = 0
+
+    # --- SUBSCRIBERS ---
+    def on_change(self, tables, callback):
+        """Calls callback(changed_tables) when another process commits to one of `tables`."""
+        self._callbacks.append((frozenset(tables), callback))
+
+    # --- WRITERS ---
+    def bump(self, conn, tables):
+        """
+        Counts a write to `tables` in the caller's transaction (`conn` is a
+        SQLAlchemy Connection). Returns False, doing nothing, when `conn` is
+        on another database file.
+        """
+        if not self._is_ours(conn.engine):
+            return False
+        for table in sorted(tables):
+            conn.exec_driver_sql(_BUMP, (table,))
+        return True
+
+    def committed(self, tables):
+        """Records bumps of ours that are now committed (call after the commit)."""
+        with self._lock:
+            self._own.update(tables)
+
+    # --- POLLING ---
+    def _read_versions(self):
+        if self._conn is None:
+            self._conn = _connect(self.db_path)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return None
+        self._data_version = data_version
+        self.reads += 1
+        return dict(self._conn.execute("SELECT name, version FROM cache_versions").fetchall())
+
+    def poll(self):
+        """Runs the callbacks for tables changed by other processes since the last poll; returns those tables."""
+        self.polls += 1
+        # Our count first, then the DB: a commit in between reads as a remote
+        # change once (a spare invalidation), never the other way around.
+        with self._lock:
+            own = Counter(self._own)
+        versions = self._read_versions()
+        if versions is None:
+            return set()
+        if self._baseline is None:
+            self._baseline = (versions, own)
+            return set()
+        base_versions, base_own = self._baseline
+        changed = set()
+        for table, version in versions.items():
+            remote = version - base_versions.get(table, 0) - (own[table] - base_own[table])
+            if remote > self._remote[table]:
+                changed.add(table)
+                self.remote_changes[table] += remote - self._remote[table]
+            self._remote[table] = remote
+        if changed:
+            logger.debug(f"Tables changed by other workers: {sorted(changed)}")
+            for tables, callback in self._callbacks:
+                if tables & changed:
+                    try:
+                        callback(tables & changed)
+                    except Exception as e:
+                        self.callback_errors += 1
+                        logger.error(f"Cache sync callback failed for {sorted(tables & changed)}: {e}")
+        return changed
+
+    async def run(self):
+        """Polls every `interval_seconds` until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.poll)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache sync poll failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self):
+        with self._lock:
+            own = dict(self._own)
+        return {
+            "worker_id": WORKER_ID,
+            "polls": self.polls,
+            "version_reads": self.reads,
+            "own_changes": own,
+            "remote_changes": dict(self.remote_changes),
+            "callback_errors": self.callback_errors,
+        }
+
+    # --- ORM HOOKS ---
+    def _is_ours(self, engine):
+        """True when `engine` is on this database file (not some other one, e.g. a benchmark's)."""
+        ours = self._binds.get(engine)
+        if ours is None:
+            database = engine.url.database
+            ours = self._binds[engine] = bool(database) and os.path.realpath(database) == os.path.realpath(self.db_path)
+        return ours
+
+    def watch_sessions(self):
+        """Bumps the tracked tables written through any SQLAlchemy Session (sync or async) on this database."""
+        def pending(session):
+            return session.info.setdefault(_PENDING_KEY, Counter())
+
+        @event.listens_for(Session, "after_flush")
+        def _bump_flushed(session, flush_context):
+            tables = {getattr(obj, "__tablename__", None) for obj in (*session.new, *session.dirty, *session.deleted)}
+            tables &= TRACKED_TABLES
+            if tables and self.bump(session.connection(), tables):
+                pending(session).update(tables)
+
+        @event.listens_for(Session, "do_orm_execute")
+        def _bump_executed(state):
+            # Bulk DML: session.execute(insert(...)), query.update()/delete().
+            if not (state.is_insert or state.is_update or state.is_delete):
+                return None
+            table = getattr(getattr(state.statement, "table", None), "name", None)
+            if table not in TRACKED_TABLES:
+                return None
+            result = state.invoke_statement()
+            if self.bump(state.session.connection(), [table]):
+                pending(state.session)[table] += 1
+            return result
+
+        @event.listens_for(Session, "after_commit")
+        def _record_committed(session):
+            bumps = session.info.pop(_PENDING_KEY, None)
+            if bumps:
+                with self._lock:
+                    self._own.update(bumps)
+
+        @event.listens_for(Session, "after_rollback")
+        def _discard_rolled_back(session):
+            session.info.pop(_PENDING_KEY, None)
+
+    def _reset_after_fork(self):
+        # The parent's sqlite3 connection must not be used from the child.
+        self._conn = None
+        self._data_version = None
+
+
+class Lease:
+    """
+    A named lock in `worker_leases` that expires unless renewed, so at most
+    one process runs a given background job and another takes over within
+    `ttl_seconds` if the holder dies.
+    """
+
+    def __init__(self, db_path, name, ttl_seconds=180):
+        self.db_path = db_path
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.held = False
+        self._conn = None
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._conn = None
+        self.held = False
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = _connect(self.db_path)
+        return self._conn
+
+    def acquire(self):
+        """Takes or renews the lease; returns True while this process holds it."""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("""
+            INSERT INTO worker_leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE worker_leases.owner = excluded.owner OR worker_leases.expires_at < ?
+        """, (self.name, WORKER_ID, now + self.ttl_seconds, now))
+        held = conn.execute("SELECT changes()").fetchone()[0] == 1
+        if held != self.held:
+            logger.info(f"{'Acquired' if held else 'Lost'} the {self.name!r} lease ({WORKER_ID})")
+        self.held = held
+        return held
+
+    def release(self):
+        if self.held:
+            self._connection().execute(
+                "DELETE FROM worker_leases WHERE name = ? AND owner = ?", (self.name, WORKER_ID)
+            )
+            self.held = False
@@ -0,0 +1,118 @@
+"""
+Admin API benchmark: builds a synthetic appointments.db (see bench_schema.py),
+upgrades it, and times the admin endpoints through FastAPI's TestClient:
+the first and a deep cursor page, filtered pages, and the streaming export
+against the old load-everything query, with peak Python memory for each.
+
+Usage:
+    python benchmarks/bench_admin_api.py [--rows 1000000] [--db /tmp/bench_admin.db]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_and_measure(fn):
+    """(seconds, peak MB); timed without tracemalloc, which slows allocation-heavy code."""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="/tmp/bench_admin.db")
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    os.environ["APPOINTMENTS_DB_PATH"] = args.db
+    from benchmarks.bench_schema import build
+
+    start = time.perf_counter()
+    build(args.db, args.rows, args.doctors)
+    print(f"built {args.rows} appointments in {time.perf_counter() - start:.1f} s")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+    from app.database import engine, Appointment, Doctor
+    from app.migrations import upgrade
+    from app.main import app, export_appointments, AppointmentFilters
+
+    upgrade(engine)
+    client = TestClient(app)  # no lifespan: the agent and calendar sync are not needed
+
+    def get(url):
+        res = client.get(url)
+        res.raise_for_status()
+        return res.json()
+
+    # Walk halfway down the table to get a deep cursor.
+    deep = get("/api/admin/appointments?limit=500")["next_cursor"]
+    for _ in range(args.rows // 500 // 2 - 1):
+        deep = get(f"/api/admin/appointments?limit=500&cursor={deep}")["next_cursor"]
+
+    print(f"{'request':<44}{'median ms':>10}")
+    cases = {
+        "first page (50, newest first)": "/api/admin/appointments",
+        "deep page (50, cursor at ~50%)": f"/api/admin/appointments?cursor={deep}",
+        "one doctor, newest first": "/api/admin/appointments?doctor_id=7",
+        "date range by start_time": "/api/admin/appointments?sort=start_time&date_from=2024-03-01&date_to=2024-03-02",
+        "one session": f"/api/admin/appointments?session_id=sess-{args.rows // 4}",
+        "chat log first page (100)": "/api/admin/chat_history",
+    }
+    for name, url in cases.items():
+        print(f"{name:<44}{timed(lambda: get(url), args.repeat):10.2f}")
+
+    Session = sessionmaker(bind=engine)
+
+    def load_all():
+        # The pre-pagination endpoint: every appointment, one list.
+        with Session() as db:
+            rows = db.query(Appointment, Doctor.name).join(Doctor, Appointment.doctor_id == Doctor.id).all()
+            return [{"id": a.id, "patient": a.patient_name, "doctor": d, "time": a.start_time.strftime("%Y-%m-%d %H:%M"),
+                     "status": a.status, "session_id": a.source_session_id} for a, d in rows]
+
+    def export(fmt):
+        # Drains the response body directly: TestClient buffers whole responses.
+        async def drain():
+            response = await export_appointments(AppointmentFilters(), format=fmt)
+            return sum([len(chunk) async for chunk in response.body_iterator])
+        return asyncio.run(drain())
+
+    print(f"\n{'full dump':<44}{'total s':>10}{'peak MB':>10}")
+    for name, fn in (("load all (old endpoint)", load_all),
+                     ("export ndjson (streamed)", lambda: export("ndjson")),
+                     ("export csv (streamed)", lambda: export("csv"))):
+        elapsed, peak = run_and_measure(fn)
+        print(f"{name:<44}{elapsed:10.1f}{peak:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Load benchmark for chat-log persistence: sync SessionLocal commits on the
+event loop (old /chat behaviour), the aiosqlite AsyncSession path with and
+without an in-process write lock, and the write-behind ChatLogWriter queue.
+All engines use the app's SQLite pragmas (WAL, busy_timeout).
+
+Concurrent AsyncSession commits collide on SQLite's single write lock, and
+the losers wait in SQLite's busy handler, which polls with sleeps of up to
+100 ms rather than queueing: their turn p99 is worse than the sync path's,
+which serializes every commit on the loop. "locked" queues the same commits
+on an asyncio.Lock instead, which is what the ChatLogWriter's single
+writer task does for /chat.
+
+Usage:
+    python benchmarks/bench_async_db.py --sessions 200 --turns 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.database import Base, ChatHistory, _configure_sqlite
+from app.chat_log import ChatLogWriter
+from benchmarks.latency import percentiles
+
+LLM_DELAY = 0.02  # Simulated model round trip per turn (seconds)
+
+
+async def probe_loop_lag(stop, lags, interval=0.005):
+    """Measures how late a 5ms timer fires; a blocked loop shows up here."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def with_probe(workload):
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(probe_loop_lag(stop, lags))
+    latencies = await workload
+    stop.set()
+    await probe
+    return latencies, lags
+
+
+def async_engine_for(db_path):
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    event.listen(engine.sync_engine, "connect", _configure_sqlite)
+    return engine
+
+
+async def run_sync(db_path, sessions, turns):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", _configure_sqlite)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    latencies = []
+
+    async def one_session(sid):
+        for turn in range(turns):
+            start = time.perf_counter()
+            await asyncio.sleep(LLM_DELAY)
+            db = Session()
+            db.add(ChatHistory(session_id=sid, role="user", content=f"turn {turn}"))
+            db.add(ChatHistory(session_id=sid, role="model", content="ok"))
+            db.commit()
+            db.close()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one_session(f"sync-{i}") for i in range(sessions)))
+    engine.dispose()
+    return latencies
+
+
+async def run_async(db_path, sessions, turns, write_lock=None):
+    engine = async_engine_for(db_path)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    latencies = []
+
+    async def save(sid, turn):
+        async with Session() as db:
+            db.add_all([
+                ChatHistory(session_id=sid, role="user", content=f"turn {turn}"),
+                ChatHistory(session_id=sid, role="model", content="ok"),
+            ])
+            await db.commit()
+
+    async def one_session(sid):
+        for turn in range(turns):
+            start = time.perf_counter()
+            await asyncio.sleep(LLM_DELAY)
+            if write_lock is None:
+                await save(sid, turn)
+            else:
+                async with write_lock:
+                    await save(sid, turn)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one_session(f"async-{i}") for i in range(sessions)))
+    await engine.dispose()
+    return latencies
+
+
+async def run_locked(db_path, sessions, turns):
+    return await run_async(db_path, sessions, turns, write_lock=asyncio.Lock())
+
+
+async def run_queued(db_path, sessions, turns):
+    engine = async_engine_for(db_path)
+    writer = ChatLogWriter(engine=engine)
+    writer.start()
+    latencies = []
+
+    async def one_session(sid):
+        for turn in range(turns):
+            start = time.perf_counter()
+            await asyncio.sleep(LLM_DELAY)
+            writer.enqueue(sid, "user", f"turn {turn}")
+            writer.enqueue(sid, "model", "ok")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one_session(f"queued-{i}") for i in range(sessions)))
+    await writer.stop()
+    stats = writer.stats()
+    print(f"queued writer: {stats['rows_written']} rows in {stats['batches']} batches, "
+          f"avg flush {stats['avg_flush_ms']}ms, max flush {stats['max_flush_ms']}ms")
+    await engine.dispose()
+    return latencies
+
+
+def report(label, result):
+    latencies, lags = result
+    p50, p99 = percentiles(latencies, 50, 99)
+    print(f"{label:>6}: turns={len(latencies)} "
+          f"p50={p50 * 1000:.1f}ms "
+          f"p99={p99 * 1000:.1f}ms | "
+          f"loop lag p99={percentiles(lags, 99)[0] * 1000:.1f}ms "
+          f"max={max(lags) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report("sync", asyncio.run(with_probe(run_sync(os.path.join(tmp, "sync.db"), args.sessions, args.turns))))
+        report("async", asyncio.run(with_probe(run_async(os.path.join(tmp, "async.db"), args.sessions, args.turns))))
+        report("locked", asyncio.run(with_probe(run_locked(os.path.join(tmp, "locked.db"), args.sessions, args.turns))))
+        report("queued", asyncio.run(with_probe(run_queued(os.path.join(tmp, "queued.db"), args.sessions, args.turns))))
+
+
+if __name__ == "__main__":
+    main()
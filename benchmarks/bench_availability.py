@@ -0,0 +1,92 @@
+"""
+Availability benchmark: thousands of calendar events + local bookings.
+Compares the old per-check events.list + substring scan with the
+AvailabilityEngine's bulk load and bisect lookups, using the fake
+Calendar service (no network).
+
+Usage:
+    python benchmarks/bench_availability.py --events 5000 --doctors 20 --queries 2000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.tools.availability import AvailabilityEngine, google_events_loader
+from app.tools.calendar_client import IST
+from app.tools.fake_calendar import FakeCalendarService
+
+
+def build_fixture(n_events, n_doctors, seed=7):
+    rng = random.Random(seed)
+    today = datetime.now(IST).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    service = FakeCalendarService()
+    bookings = []
+    for i in range(n_events):
+        start = today + timedelta(days=rng.randrange(30), hours=rng.randrange(9, 18), minutes=rng.choice([0, 30]))
+        end = start + timedelta(minutes=rng.choice([30, 60]))
+        if i % 4 == 0:
+            service.add_event(start.isoformat(), end.isoformat(), summary="Clinic meeting")
+        else:
+            bookings.append((i, rng.randrange(1, n_doctors + 1), start, end))
+            service.add_event(start.isoformat(), end.isoformat(), summary="Appt", description=f"DB ID: {i}")
+    return service, bookings, today
+
+
+def naive_check(service, date_str):
+    """The pre-engine tool: one events.list round trip, substring match on the first page."""
+    events = service.events().list(calendarId='primary', maxResults=10, singleEvents=True, orderBy='startTime').execute()
+    return [e['start']['dateTime'] for e in events.get('items', []) if date_str in e['start']['dateTime']]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    service, bookings, today = build_fixture(args.events, args.doctors)
+    rng = random.Random(11)
+    probes = [
+        (today + timedelta(days=rng.randrange(30), hours=rng.randrange(9, 18)), rng.randrange(1, args.doctors + 1))
+        for _ in range(args.queries)
+    ]
+
+    start = time.perf_counter()
+    for slot, _ in probes[:200]:
+        naive_check(service, slot.date().isoformat())
+    naive_ms = (time.perf_counter() - start) / 200 * 1000
+    naive_calls = service.calls['events.list']
+
+    engine = AvailabilityEngine(google_events_loader(lambda: service), ttl_seconds=3600, load_bookings=lambda s, e: bookings)
+    start = time.perf_counter()
+    engine.refresh()
+    load_ms = (time.perf_counter() - start) * 1000
+    engine_calls = service.calls['events.list'] - naive_calls
+
+    start = time.perf_counter()
+    for slot, doctor_id in probes:
+        engine.is_free(slot, doctor_id=doctor_id)
+    is_free_us = (time.perf_counter() - start) / len(probes) * 1e6
+
+    start = time.perf_counter()
+    for slot, doctor_id in probes:
+        engine.next_free_slots(slot, n=5, doctor_id=doctor_id)
+    next_free_us = (time.perf_counter() - start) / len(probes) * 1e6
+
+    print(f"events={args.events} doctors={args.doctors} queries={args.queries}")
+    print(f"naive check:        {naive_ms:.2f} ms/check, 1 events.list per check (first page only)")
+    print(f"engine bulk load:   {load_ms:.1f} ms, {engine_calls} events.list call(s)")
+    print(f"engine is_free:     {is_free_us:.1f} us/query, 0 API calls")
+    print(f"engine next 5 free: {next_free_us:.1f} us/query, 0 API calls")
+
+
+if __name__ == "__main__":
+    main()
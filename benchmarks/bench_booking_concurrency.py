@@ -0,0 +1,221 @@
+"""
+Booking concurrency stress test against the in-process fake Calendar API.
+
+Fires hundreds of bookings at once at a few doctors and slots, so most of
+them collide. A share of them are sent twice, as a retried tool call would
+be, and a share of the calendar writes fail. Both booking paths run on a
+fresh database each:
+
+  legacy        create_appointment_in_db, then events.insert (the old tool)
+  reservations  SlotReservations: hold -> confirm + outbox entry, then
+                the CalendarOutbox worker writes events with deterministic
+                IDs, retrying failed writes until the outbox is drained
+
+Then the database and the fake calendar are checked for overlapping
+bookings, appointments without an event, events without an appointment,
+and retries that got a different answer than the original call. Exits
+non-zero if the reservations path breaks any of them.
+
+Usage:
+    python benchmarks/bench_booking_concurrency.py [--bookings 500] [--doctors 5] [--slots 8]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.latency import percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=500, help="distinct booking requests fired at once")
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--slots", type=int, default=8, help="one-hour slots per doctor being fought over")
+    parser.add_argument("--retry-rate", type=float, default=0.3, help="share of requests sent twice")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="share of calendar writes that fail")
+    parser.add_argument("--calendar-ms", type=float, default=20, help="simulated Calendar API latency")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_booking_")
+    os.environ["APPOINTMENTS_DB_PATH"] = os.path.join(workdir, "appointments.db")
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import database
+    from app.database import (
+        Doctor, Appointment, SlotHold, CalendarOutboxEntry, BookingConflictError, create_appointment_in_db
+    )
+    from app.migrations import upgrade
+    from app.reservations import SlotReservations
+    from app.tools.calendar_client import create_event
+    from app.tools.calendar_outbox import CalendarOutbox
+    from app.tools.fake_calendar import FakeCalendarService
+
+    rng = random.Random(args.seed)
+    base = datetime(2030, 1, 7, 9, 0)
+    requests = []
+    for i in range(args.bookings):
+        patient = f"patient{rng.randrange(args.bookings // 2)}"
+        requests.append((
+            f"Patient {patient}", f"{patient}@example.com", f"Dr. Stress Doctor{rng.randrange(args.doctors)}",
+            base + timedelta(hours=rng.randrange(args.slots)), "checkup"
+        ))
+    retried = set(rng.sample(range(len(requests)), int(len(requests) * args.retry_rate)))
+    calls = [(i, r) for i, r in enumerate(requests)] + [(i, requests[i]) for i in retried]
+    rng.shuffle(calls)
+
+    class FlakyCalendar:
+        """FakeCalendarService behind a latency and a failure rate, run like calendar_clients.run."""
+        def __init__(self):
+            self.service = FakeCalendarService()
+            self.rng = random.Random(args.seed)
+
+        async def run(self, fn, *fn_args, **fn_kwargs):
+            def call():
+                time.sleep(args.calendar_ms / 1000)
+                if fn.__name__ in ("create_event", "_send_batch") and self.rng.random() < args.fail_rate:
+                    raise TimeoutError("simulated Calendar API failure")
+                return fn(self.service, *fn_args, **fn_kwargs)
+            return await asyncio.to_thread(call)
+
+    def fresh_db():
+        database.engine.dispose()
+        database.write_engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            path = os.environ["APPOINTMENTS_DB_PATH"] + suffix
+            if os.path.exists(path):
+                os.remove(path)
+        upgrade(database.engine)
+        db = database.SessionLocal()
+        db.add_all(Doctor(name=f"Dr. Stress Doctor{d}", consultation_fee=100) for d in range(args.doctors))
+        db.commit()
+        db.close()
+        database.doctor_index.invalidate()
+
+    async def legacy(calendar, patient_name, patient_email, doctor_name, start, reason):
+        end = start + timedelta(hours=1)
+        result = await asyncio.to_thread(create_appointment_in_db, patient_name, patient_email, doctor_name,
+                                         start, end, reason)
+        if not result:
+            return "error", None
+        await calendar.run(create_event, summary=f"Appt: {patient_name}", start_iso=start.isoformat(),
+                           end_iso=end.isoformat(), description=f"Reason: {reason}\nDB ID: {result[0]}")
+        return "booked", result[0]
+
+    async def reserved(reservations, patient_name, patient_email, doctor_name, start, reason):
+        booking = await reservations.book(patient_name, patient_email, doctor_name, start,
+                                          start + timedelta(hours=1), reason)
+        return ("replayed" if booking.replayed else "booked"), booking.appointment_id
+
+    async def drain(outbox):
+        while await asyncio.to_thread(lambda: outbox.stats()["pending"]):
+            if not await outbox.drain_once():
+                await asyncio.sleep(0.01)  # entries backing off
+
+    async def fire(book):
+        async def one(i, request):
+            started = time.perf_counter()
+            try:
+                outcome = await book(*request)
+            except BookingConflictError:
+                outcome = ("conflict", None)
+            except TimeoutError:
+                outcome = ("calendar failed", None)
+            return i, outcome, (time.perf_counter() - started) * 1000
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i, request) for i, request in calls))
+        return results, time.perf_counter() - start
+
+    def audit(calendar, results):
+        Session = sessionmaker(bind=create_engine(f"sqlite:///{os.environ['APPOINTMENTS_DB_PATH']}"))
+        with Session() as db:
+            appts = db.query(Appointment).filter(Appointment.status == "Confirmed").all()
+            holds = db.query(SlotHold).count()
+            undelivered = db.query(CalendarOutboxEntry).filter(CalendarOutboxEntry.status != "done").count()
+        by_doctor = {}
+        for a in appts:
+            by_doctor.setdefault(a.doctor_id, []).append((a.start_time, a.end_time))
+        overlaps = sum(
+            1 for spans in by_doctor.values()
+            for (s1, e1), (s2, e2) in zip(sorted(spans), sorted(spans)[1:]) if s2 < e1
+        )
+        events = [e for e in calendar.service.calendars.get('primary', {}).values() if e.get('status') != 'cancelled']
+        described = {int(e['description'].rsplit("DB ID: ", 1)[1]) for e in events}
+        appt_ids = {a.id for a in appts}
+        answers = {}
+        for i, (outcome, appt_id), _ in results:
+            answers.setdefault(i, []).append((outcome, appt_id))
+        inconsistent = 0
+        for i in retried:
+            # A retry must report the booking the first call made, not a conflict with it.
+            booked = {appt_id for outcome, appt_id in answers[i] if outcome in ("booked", "replayed")}
+            if booked and (len(booked) > 1 or any(outcome == "conflict" for outcome, _ in answers[i])):
+                inconsistent += 1
+        return {
+            "confirmed appointments": len(appts),
+            "calendar events": len(events),
+            "overlapping bookings": overlaps,
+            "appointments without an event": len(appt_ids - described),
+            "events without an appointment": len(described - appt_ids),
+            "duplicate events per appointment": len(events) - len(described),
+            "retries answered differently": inconsistent,
+            "leftover holds": holds,
+            "undelivered outbox entries": undelivered,
+        }
+
+    print(f"{len(calls)} concurrent calls ({len(requests)} bookings, {len(retried)} sent twice) for "
+          f"{args.doctors} doctors x {args.slots} slots; {args.fail_rate:.0%} calendar failures, "
+          f"{args.calendar_ms:.0f} ms calendar latency\n")
+    reports = {}
+    for label in ("legacy", "reservations"):
+        fresh_db()
+        calendar = FlakyCalendar()
+        if label == "legacy":
+            book = lambda *r: legacy(calendar, *r)
+        else:
+            reservations = SlotReservations()
+            book = lambda *r: reserved(reservations, *r)
+        results, elapsed = asyncio.run(fire(book))
+        outcomes = {}
+        for _, (outcome, _), _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = [ms for _, _, ms in results]
+        p50, p99 = percentiles(latencies, 50, 99)
+        print(f"[{label}] {elapsed:.2f} s total, p50 {p50:.0f} ms, p99 {p99:.0f} ms; "
+              f"outcomes {dict(sorted(outcomes.items()))}")
+        if label == "reservations":
+            outbox = CalendarOutbox(calendar.run, rate_per_second=10_000, base_backoff_seconds=0.01,
+                                    max_attempts=50)
+            start = time.perf_counter()
+            asyncio.run(drain(outbox))
+            stats = outbox.stats()
+            print(f"[outbox] drained in {time.perf_counter() - start:.2f} s: {stats['sent']} sent in "
+                  f"{stats['batches']} batches, {stats['retried']} retried")
+        reports[label] = audit(calendar, results)
+
+    print(f"\n{'check':<36}{'legacy':>10}{'reservations':>14}")
+    for check in reports["reservations"]:
+        print(f"{check:<36}{reports['legacy'][check]:>10}{reports['reservations'][check]:>14}")
+
+    bad = {k: v for k, v in reports["reservations"].items()
+           if k not in ("confirmed appointments", "calendar events") and v}
+    if bad or reports["reservations"]["confirmed appointments"] != reports["reservations"]["calendar events"]:
+        print(f"\nFAIL: {bad}")
+        sys.exit(1)
+    print("\nOK: no double bookings, duplicates or orphaned writes")
+
+
+if __name__ == "__main__":
+    main()
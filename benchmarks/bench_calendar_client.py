@@ -0,0 +1,91 @@
+"""
+Calendar client benchmark: startup cost of the old import-time build() vs.
+the lazy CalendarClientManager, and booking throughput when Calendar
+inserts run inline on the event loop vs. in the manager's bounded pool.
+HTTP is served by an in-process transport with a fixed latency.
+
+Usage:
+    python benchmarks/bench_calendar_client.py --bookings 200 --latency-ms 50 --workers 8
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+import httplib2
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from app.tools.calendar_client import CalendarClientManager, create_event
+
+
+class SlowHttp:
+    """httplib2.Http stand-in: answers every request after `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.timeout = None
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        time.sleep(self.latency)
+        payload = json.loads(body) if body else {}
+        payload.setdefault("id", "evt")
+        return httplib2.Response({"status": "200", "content-type": "application/json"}), json.dumps(payload).encode()
+
+
+def book(service, i):
+    return create_event(service, f"Appt {i}", "2030-01-01T10:00:00", "2030-01-01T11:00:00")
+
+
+async def inline_bookings(service, n):
+    # Old behaviour: sync tool body runs on the loop, so calls are serialized.
+    async def one(i):
+        book(service, i)
+    await asyncio.gather(*(one(i) for i in range(n)))
+
+
+async def pooled_bookings(manager, n):
+    await asyncio.gather(*(manager.run(book, i) for i in range(n)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+    creds = Credentials(token="bench-token")
+
+    start = time.perf_counter()
+    eager = build('calendar', 'v3', http=SlowHttp(latency), static_discovery=True)
+    eager_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    manager = CalendarClientManager(
+        credentials_loader=lambda: creds, http_factory=lambda: SlowHttp(latency), max_workers=args.workers
+    )
+    lazy_ms = (time.perf_counter() - start) * 1000
+    print(f"startup: eager build() {eager_ms:.1f} ms (+ token I/O / OAuth refresh), lazy manager {lazy_ms:.3f} ms")
+
+    start = time.perf_counter()
+    asyncio.run(inline_bookings(eager, args.bookings))
+    inline_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(pooled_bookings(manager, args.bookings))
+    pooled_s = time.perf_counter() - start
+    manager.close()
+
+    print(f"inline on loop: {args.bookings / inline_s:.1f} bookings/s ({inline_s:.2f} s)")
+    print(f"pooled x{args.workers}:     {args.bookings / pooled_s:.1f} bookings/s ({pooled_s:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Calendar outbox benchmark against the in-process fake Calendar API.
+
+  latency     booking latency when the calendar write is awaited inline
+              (the old path) vs queued in the outbox (SlotReservations)
+  batching    Calendar API round trips to deliver N queued events in
+              batch requests vs one request per event
+  outage      the calendar fails for --outage-seconds, with some writes
+              landing before the error; reports commit -> sent lag and
+              checks every event was delivered once (409s resent as updates)
+
+Usage:
+    python benchmarks/bench_calendar_outbox.py [--bookings 200] [--calendar-ms 300]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.latency import percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--calendar-ms", type=float, default=300, help="simulated Calendar API latency per request")
+    parser.add_argument("--outage-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_outbox_")
+    os.environ["APPOINTMENTS_DB_PATH"] = os.path.join(workdir, "appointments.db")
+
+    from app import database
+    from app.database import Doctor, Appointment, CalendarOutboxEntry
+    from app.migrations import upgrade
+    from app.reservations import SlotReservations
+    from app.tools.calendar_client import put_event
+    from app.tools.calendar_outbox import CalendarOutbox
+    from app.tools.fake_calendar import FakeCalendarService
+
+    base = datetime(2030, 1, 7, 9, 0)
+    requests = [
+        (f"Patient {i}", f"p{i}@example.com", f"Dr. Outbox Doctor{i % args.doctors}",
+         base + timedelta(hours=i // args.doctors), base + timedelta(hours=i // args.doctors + 1), "checkup")
+        for i in range(args.bookings)
+    ]
+
+    class SlowCalendar:
+        """FakeCalendarService behind a per-request latency; `failing` makes calls error after running."""
+        def __init__(self):
+            self.service = FakeCalendarService()
+            self.failing = False
+
+        async def run(self, fn, *fn_args):
+            def call():
+                time.sleep(args.calendar_ms / 1000)
+                result = fn(self.service, *fn_args)
+                if self.failing:
+                    raise TimeoutError("simulated Calendar API outage")  # the writes landed anyway
+                return result
+            return await asyncio.to_thread(call)
+
+    def fresh_db():
+        database.engine.dispose()
+        database.write_engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            path = os.environ["APPOINTMENTS_DB_PATH"] + suffix
+            if os.path.exists(path):
+                os.remove(path)
+        upgrade(database.engine)
+        with database.SessionLocal() as db:
+            db.add_all(Doctor(name=f"Dr. Outbox Doctor{d}", consultation_fee=100) for d in range(args.doctors))
+            db.commit()
+        database.doctor_index.invalidate()
+
+    async def book_all(book):
+        async def one(request):
+            started = time.perf_counter()
+            await book(*request)
+            return (time.perf_counter() - started) * 1000
+        return await asyncio.gather(*(one(r) for r in requests))
+
+    def summary(latencies):
+        p50, p99 = percentiles(latencies, 50, 99)
+        return f"p50 {p50:7.0f} ms   p99 {p99:7.0f} ms"
+
+    def delivered():
+        with database.SessionLocal() as db:
+            return (db.query(Appointment).filter(Appointment.gcal_event_id.isnot(None)).count(),
+                    db.query(CalendarOutboxEntry).filter(CalendarOutboxEntry.status == "done").count())
+
+    # --- latency ---
+    fresh_db()
+    calendar = SlowCalendar()
+    reservations = SlotReservations()
+
+    async def inline(*request):
+        booking = await reservations.book(*request)
+        # The old flow: the reply waits for the calendar write.
+        with database.SessionLocal() as db:
+            payload = db.query(CalendarOutboxEntry.payload).filter(
+                CalendarOutboxEntry.appointment_id == booking.appointment_id
+            ).scalar()
+        await calendar.run(put_event, booking.event_id, json.loads(payload))
+
+    print(f"{args.bookings} bookings, {args.calendar_ms:.0f} ms per Calendar API request\n")
+    print(f"{'calendar write awaited':<28}{summary(asyncio.run(book_all(inline)))}")
+    fresh_db()
+    reservations = SlotReservations()
+    print(f"{'calendar write via outbox':<28}{summary(asyncio.run(book_all(reservations.book)))}")
+
+    # --- batching ---
+    async def drain(outbox):
+        while await outbox.drain_once():
+            pass
+
+    for batch_size in (1, 50):
+        calendar = SlowCalendar()
+        outbox = CalendarOutbox(calendar.run, batch_size=batch_size, rate_per_second=10_000)
+        start = time.perf_counter()
+        asyncio.run(drain(outbox))
+        elapsed = time.perf_counter() - start
+        print(f"\nbatch size {batch_size:>2}: {calendar.service.calls['batch']} round trips, {elapsed:.2f} s to deliver "
+              f"{outbox.sent} events")
+        if batch_size == 1:
+            with database.SessionLocal() as db:  # undo the delivery for the next run
+                db.query(CalendarOutboxEntry).update({CalendarOutboxEntry.status: "pending",
+                                                      CalendarOutboxEntry.attempts: 0,
+                                                      CalendarOutboxEntry.next_attempt_at: datetime.utcnow()})
+                db.query(Appointment).update({Appointment.gcal_event_id: None})
+                db.commit()
+
+    # --- outage ---
+    fresh_db()
+    calendar = SlowCalendar()
+    calendar.failing = True
+    outbox = CalendarOutbox(calendar.run, base_backoff_seconds=0.2, max_backoff_seconds=1.0, max_attempts=50)
+    reservations = SlotReservations(on_booked=outbox.wake)
+
+    async def outage():
+        worker = asyncio.create_task(outbox.run(poll_seconds=0.1))
+        await book_all(reservations.book)
+        await asyncio.sleep(args.outage_seconds)
+        calendar.failing = False
+        while (await asyncio.to_thread(outbox.stats))["pending"]:
+            await asyncio.sleep(0.05)
+        worker.cancel()
+
+    start = time.perf_counter()
+    asyncio.run(outage())
+    stats = outbox.stats()
+    with_event, done = delivered()
+    events = [e for e in calendar.service.calendars.get('primary', {}).values() if e.get('status') != 'cancelled']
+    print(f"\noutage of {args.outage_seconds:.1f} s at {outbox.limiter.rate:.0f} req/s: drained after {time.perf_counter() - start:.2f} s; "
+          f"{stats['retried']} retries, {calendar.service.calls['events.update']} resent as updates; "
+          f"lag avg {stats['avg_lag_seconds']:.2f} s, max {stats['max_lag_seconds']:.2f} s")
+    ok = with_event == done == len(events) == args.bookings and stats["failed"] == 0
+    print(f"{with_event} appointments with an event ID, {len(events)} calendar events for {args.bookings} bookings")
+    if not ok:
+        print("FAIL: events missing or duplicated")
+        sys.exit(1)
+    print("OK: every booking delivered exactly once")
+
+
+if __name__ == "__main__":
+    main()
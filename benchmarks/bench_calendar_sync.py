@@ -0,0 +1,80 @@
+"""
+Calendar mirror benchmark against the in-process fake Calendar API:
+full sync (paged), incremental deltas via syncToken, 410 recovery, and
+availability checks served from the mirror with zero API calls.
+
+Usage:
+    python benchmarks/bench_calendar_sync.py --events 5000 --changes 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.tools.availability import AvailabilityEngine
+from app.tools.calendar_client import IST
+from app.tools.calendar_sync import CalendarSync
+from app.tools.fake_calendar import FakeCalendarService
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=50)
+    parser.add_argument("--checks", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    today = datetime.now(IST).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    service = FakeCalendarService()
+    ids = []
+    for _ in range(args.events):
+        start = today + timedelta(days=rng.randrange(30), hours=rng.randrange(9, 18))
+        ids.append(service.add_event(start.isoformat(), (start + timedelta(minutes=30)).isoformat())['id'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'mirror.db')}")
+        sync = CalendarSync(lambda: service, session_factory=sessionmaker(bind=engine), page_size=250)
+
+        changed, ms = timed(sync.sync)
+        print(f"full sync:        {changed} events, {service.calls['events.list']} pages, {ms:.0f} ms")
+
+        for event_id in rng.sample(ids, args.changes):
+            service.delete_event(event_id)
+        calls_before = service.calls['events.list']
+        changed, ms = timed(sync.sync)
+        print(f"incremental sync: {changed} changes, {service.calls['events.list'] - calls_before} page(s), {ms:.0f} ms")
+
+        service.expire_sync_tokens()
+        calls_before = service.calls['events.list']
+        changed, ms = timed(sync.sync)
+        print(f"410 -> resync:    {changed} events, {service.calls['events.list'] - calls_before} call(s), {ms:.0f} ms")
+
+        availability = AvailabilityEngine(sync.events_between, load_bookings=lambda s, e: [])
+        calls_before = sum(service.calls.values())
+        probes = [today + timedelta(days=rng.randrange(30), hours=rng.randrange(9, 18)) for _ in range(args.checks)]
+        _, ms = timed(lambda: [availability.is_free(p) for p in probes])
+        print(f"availability:     {args.checks} checks in {ms:.0f} ms, "
+              f"{sum(service.calls.values()) - calls_before} API calls")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
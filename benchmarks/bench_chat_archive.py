@@ -0,0 +1,193 @@
+"""
+Chat-history archival benchmark (no network, no LLM).
+
+Fills chat_history with --sessions conversations spread over the last
+--days days, then runs ChatArchiver.run_once() (archive after 30 days,
+keep archives for 365) and reports:
+
+  - archiving throughput, the compression ratio, and the size of
+    appointments.db before and after (incremental vacuum, --vacuum-pages
+    per call, each call timed since it holds the write lock);
+  - archived transcript fetches by session_id (p50/p99), checked against
+    the original messages;
+  - that only sessions active in the last 30 days stay live, that
+    sessions older than the retention window are gone, and that the
+    session summaries' archived counts match the archive.
+
+Exits non-zero on a wrong transcript, a misplaced session, a file that
+did not shrink, or a p99 fetch above 10 ms.
+
+Usage:
+    python benchmarks/bench_chat_archive.py [--sessions 20000] [--messages 10] [--days 400]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.latency import percentiles
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"  # SQLAlchemy's SQLite DateTime storage format
+NOW = datetime(2025, 6, 1, 12, 0)
+USER_LINES = [
+    "Hi, I'd like to see a cardiologist this week.", "Is Dr. Sarah Smith free on Friday at 3pm?",
+    "My name is Ravi Kumar and my email is ravi.kumar@example.com.", "I have had chest pain for two days.",
+    "Can I book a follow-up with Dr. John Doe?", "What are the consultation fees?", "Thanks, that works.",
+]
+MODEL_LINES = [
+    "Hello! I can help you book an appointment. Which doctor would you like to see?",
+    "Dr. Sarah Smith is free at 2025-05-23T15:00:00. Shall I book it?",
+    "SUCCESS. Booked Ravi Kumar with Dr. Sarah Smith at 2025-05-23T15:00:00 until 16:00.",
+    "Available Doctors:\nDr. Sarah Smith (Cardiologist)\nDr. John Doe (General Physician)",
+    "Dr. Sarah Smith is busy at 2025-05-23T10:00:00. Next free slots: 2025-05-23T11:00:00, 2025-05-23T12:00:00",
+]
+
+
+def file_bytes(path, suffix=""):
+    return os.path.getsize(path + suffix) if os.path.exists(path + suffix) else 0
+
+
+def fill(db_path, sessions, messages, days, seed):
+    """Returns {session_id: last message time} for the generated conversations."""
+    rng = random.Random(seed)
+    last_seen = {}
+
+    def rows():
+        for n in range(sessions):
+            session_id = f"sess-{n:07d}"
+            at = NOW - timedelta(days=rng.uniform(0, days))
+            for i in range(messages):
+                if i:
+                    at += timedelta(seconds=rng.randint(5, 90))
+                text = rng.choice(USER_LINES if i % 2 == 0 else MODEL_LINES)
+                yield session_id, "user" if i % 2 == 0 else "model", text, at.strftime(FMT)
+            last_seen[session_id] = at
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO chat_history (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)", rows())
+    conn.commit()
+    conn.close()
+    return last_seen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--messages", type=int, default=10, help="messages per session")
+    parser.add_argument("--days", type=int, default=400, help="sessions are spread over this many days")
+    parser.add_argument("--fetches", type=int, default=2000)
+    parser.add_argument("--vacuum-pages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_chat_archive_")
+    db_path = os.path.join(workdir, "appointments.db")
+    os.environ["APPOINTMENTS_DB_PATH"] = db_path
+    from app.migrations import upgrade
+    from app.chat_archive import ChatArchiver
+    from app import chat_sessions
+
+    upgrade()
+    last_seen = fill(db_path, args.sessions, args.messages, args.days, args.seed)
+    total = args.sessions * args.messages
+    before = file_bytes(db_path)
+    print(f"{total:,} messages in {args.sessions:,} sessions over {args.days} days; appointments.db {before / 1e6:.1f} MB")
+
+    conn = sqlite3.connect(db_path)
+    originals = {}
+    for session_id, role, content, at in conn.execute(
+            "SELECT session_id, role, content, timestamp FROM chat_history WHERE session_id IN "
+            "(SELECT DISTINCT session_id FROM chat_history ORDER BY random() LIMIT 500) ORDER BY timestamp, id"):
+        originals.setdefault(session_id, []).append((role, content, datetime.strptime(at, FMT).isoformat()))
+    conn.close()
+
+    archiver = ChatArchiver(archive_path=os.path.join(workdir, "chat_archive.db"), archive_after_days=30,
+                            retention_days=365, vacuum_pages=args.vacuum_pages)
+    failures = []
+    start = time.perf_counter()
+    archived = archiver.archive(now=NOW)
+    archive_s = time.perf_counter() - start
+    expired = archiver.enforce_retention(now=NOW)
+    print(f"archived {archived:,} sessions ({archiver.messages_archived:,} messages) in {archive_s:.2f} s "
+          f"({archiver.messages_archived / archive_s:,.0f} messages/s); compression "
+          f"{archiver.raw_bytes / max(archiver.compressed_bytes, 1):.1f}x; {expired:,} expired by retention")
+
+    vacuum_ms, freed = [], 0
+    while True:
+        start = time.perf_counter()
+        pages = archiver.vacuum()
+        if not pages:
+            break
+        vacuum_ms.append((time.perf_counter() - start) * 1000)
+        freed += pages
+    # The truncation reaches the file at the next checkpoint; do it now to measure it.
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    after = file_bytes(db_path)
+    print(f"incremental vacuum: {freed:,} pages in {len(vacuum_ms)} call(s), max {max(vacuum_ms, default=0):.1f} ms "
+          f"per call; appointments.db {before / 1e6:.1f} -> {after / 1e6:.1f} MB after a checkpoint, "
+          f"chat_archive.db {(file_bytes(archiver.archive_path) + file_bytes(archiver.archive_path, '-wal')) / 1e6:.1f} MB "
+          f"with its WAL")
+    if after >= before:
+        failures.append("appointments.db did not shrink")
+
+    # --- placement ---
+    cutoff, oldest = NOW - timedelta(days=30), NOW - timedelta(days=365)
+    conn = sqlite3.connect(db_path)
+    live = {row[0] for row in conn.execute("SELECT DISTINCT session_id FROM chat_history")}
+    conn.close()
+    archive = sqlite3.connect(archiver.archive_path)
+    stored = {row[0] for row in archive.execute("SELECT session_id FROM archived_sessions")}
+    archive.close()
+    want_live = {s for s, at in last_seen.items() if at >= cutoff}
+    want_archived = {s for s, at in last_seen.items() if oldest.date() <= at.date() and at < cutoff}
+    print(f"live {len(live):,} (expected {len(want_live):,}), archived {len(stored):,} (expected {len(want_archived):,})")
+    if live != want_live:
+        failures.append(f"{len(live ^ want_live)} sessions wrongly live or archived")
+    if stored != want_archived:
+        failures.append(f"{len(stored ^ want_archived)} sessions wrongly archived or expired")
+    drift = chat_sessions.check_archived(archiver.summaries())
+    if drift:
+        failures.append(f"{len(drift)} session summaries disagree with the archive, e.g. {drift[:3]}")
+
+    # --- fetches ---
+    rng = random.Random(args.seed)
+    sample = rng.sample(sorted(stored), min(args.fetches, len(stored)))
+    latencies, wrong = [], 0
+    for session_id in sample:
+        start = time.perf_counter()
+        transcript = archiver.transcript(session_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+        messages = [(m["role"], m["content"], m["timestamp"]) for m in transcript["messages"]]
+        wrong += session_id in originals and messages != originals[session_id]
+    p50, p99 = percentiles(latencies, 50, 99)
+    print(f"transcript fetch: p50 {p50:.3f} ms, p99 {p99:.3f} ms over {len(latencies):,} sessions")
+    if wrong:
+        failures.append(f"{wrong} wrong transcripts")
+    if p99 > 10:
+        failures.append(f"p99 fetch {p99:.1f} ms above 10 ms")
+
+    # A second run finds nothing more to do.
+    again = archiver.run_once(now=NOW)
+    if again["archived_sessions"] or again["expired_sessions"]:
+        failures.append(f"second run not idle: {again}")
+
+    if failures:
+        print(f"\nFAIL: {failures}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
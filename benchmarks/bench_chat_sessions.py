@@ -0,0 +1,178 @@
+"""
+Chat session list and transcript benchmark (no network, no LLM).
+
+Fills chat_history with --sessions conversations twice, once with the
+chat_sessions triggers (app/chat_sessions.py) and once without, to
+measure the write overhead, then reports:
+
+  - the admin session list (newest 50): a GROUP BY over chat_history
+    against one index range of chat_sessions;
+  - per-session transcripts over the (session_id, timestamp) index
+    (p50/p99), checked against the summary's message count;
+  - that the summary matches chat_history (check() finds no drift) and
+    still counts sessions after ChatArchiver moves the idle ones.
+
+Exits non-zero on drift, a wrong count, or a summary page slower than
+the GROUP BY it replaces.
+
+Usage:
+    python benchmarks/bench_chat_sessions.py [--sessions 20000] [--messages 10] [--days 120]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.latency import percentiles
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"  # SQLAlchemy's SQLite DateTime storage format
+NOW = datetime(2025, 6, 1, 12, 0)
+
+GROUP_BY_PAGE = """
+    SELECT session_id, COUNT(*), MIN(timestamp), MAX(timestamp) AS last_at FROM chat_history
+    GROUP BY session_id ORDER BY last_at DESC, session_id DESC LIMIT 50
+"""
+SUMMARY_PAGE = """
+    SELECT session_id, messages + archived_messages, first_at, last_at FROM chat_sessions
+    ORDER BY last_at DESC, session_id DESC LIMIT 50
+"""
+TRANSCRIPT = "SELECT id, role, content, timestamp FROM chat_history WHERE session_id = ? ORDER BY timestamp, id"
+
+
+def rows(sessions, messages, days, seed):
+    rng = random.Random(seed)
+    for n in range(sessions):
+        session_id = f"sess-{n:07d}"
+        at = NOW - timedelta(days=rng.uniform(0, days))
+        for i in range(messages):
+            at += timedelta(seconds=rng.randint(5, 90))
+            yield session_id, "user" if i % 2 == 0 else "model", f"message {i} of {session_id}", at.strftime(FMT)
+
+
+def fill(db_path, args):
+    """Inserts the conversations in 1000-row transactions (as the chat log writer batches); returns seconds."""
+    conn = sqlite3.connect(db_path)
+    batch, start = [], time.perf_counter()
+    for row in rows(args.sessions, args.messages, args.days, args.seed):
+        batch.append(row)
+        if len(batch) == 1000:
+            conn.executemany("INSERT INTO chat_history (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)", batch)
+            conn.commit()
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO chat_history (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)", batch)
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def best_ms(conn, sql, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = conn.execute(sql).fetchall()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--messages", type=int, default=10, help="messages per session")
+    parser.add_argument("--days", type=int, default=120, help="sessions are spread over this many days")
+    parser.add_argument("--fetches", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_chat_sessions_")
+    db_path = os.path.join(workdir, "appointments.db")
+    os.environ["APPOINTMENTS_DB_PATH"] = db_path
+    from sqlalchemy import create_engine
+    from app.migrations import upgrade
+    from app import chat_sessions
+    from app.chat_archive import ChatArchiver
+
+    plain_path = os.path.join(workdir, "plain.db")
+    for path in (db_path, plain_path):
+        engine = create_engine(f"sqlite:///{path}")
+        upgrade(engine)
+        engine.dispose()
+    conn = sqlite3.connect(plain_path)
+    conn.executescript("DROP TRIGGER trg_chat_sessions_insert; DROP TRIGGER trg_chat_sessions_delete;")
+    conn.close()
+
+    total = args.sessions * args.messages
+    plain_s = fill(plain_path, args)
+    with_s = fill(db_path, args)
+    print(f"{total:,} messages in {args.sessions:,} sessions: insert {total / plain_s:,.0f}/s without the "
+          f"triggers, {total / with_s:,.0f}/s with them ({(with_s / plain_s - 1) * 100:+.0f}%)")
+
+    failures = []
+    engine = create_engine(f"sqlite:///{db_path}")
+    drift = chat_sessions.check(engine)
+    if drift:
+        failures.append(f"{len(drift)} sessions drifted after insert, e.g. {drift[:3]}")
+
+    conn = sqlite3.connect(db_path)
+    group_ms, grouped = best_ms(conn, GROUP_BY_PAGE, args.repeat)
+    summary_ms, summary = best_ms(conn, SUMMARY_PAGE, args.repeat)
+    print(f"session list (newest 50): GROUP BY {group_ms:.2f} ms, chat_sessions {summary_ms:.3f} ms "
+          f"({group_ms / max(summary_ms, 1e-6):,.0f}x)")
+    if [(r[0], r[1]) for r in grouped] != [(r[0], r[1]) for r in summary]:
+        failures.append("summary page differs from the GROUP BY page")
+    if summary_ms > group_ms:
+        failures.append(f"summary page {summary_ms:.2f} ms slower than GROUP BY {group_ms:.2f} ms")
+
+    # --- transcripts ---
+    counts = dict(conn.execute("SELECT session_id, messages FROM chat_sessions"))
+    rng = random.Random(args.seed)
+    latencies, wrong = [], 0
+    for session_id in rng.sample(sorted(counts), min(args.fetches, len(counts))):
+        start = time.perf_counter()
+        messages = conn.execute(TRANSCRIPT, (session_id,)).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+        wrong += len(messages) != counts[session_id]
+    plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + TRANSCRIPT, ("x",)))
+    conn.close()
+    p50, p99 = percentiles(latencies, 50, 99)
+    print(f"transcript fetch: p50 {p50:.3f} ms, p99 {p99:.3f} ms over {len(latencies):,} "
+          f"sessions ({plan})")
+    if wrong:
+        failures.append(f"{wrong} transcripts disagree with their message count")
+
+    # --- archiving keeps the sessions listed ---
+    archiver = ChatArchiver(archive_path=os.path.join(workdir, "chat_archive.db"), archive_after_days=30,
+                            retention_days=365, bind=engine)
+    archiver.archive(now=NOW)
+    conn = sqlite3.connect(db_path)
+    sessions, live, archived = conn.execute(
+        "SELECT COUNT(*), SUM(messages), SUM(archived_messages) FROM chat_sessions").fetchone()
+    conn.close()
+    print(f"after archiving {archiver.messages_archived:,} messages: {sessions:,} sessions listed, "
+          f"{live:,} live + {archived:,} archived messages")
+    if sessions != args.sessions or live + archived != total or archived != archiver.messages_archived:
+        failures.append(f"summary after archiving: {sessions} sessions, {live} live, {archived} archived")
+    drift = chat_sessions.check(engine)
+    if drift:
+        failures.append(f"{len(drift)} sessions drifted after archiving")
+
+    if failures:
+        print(f"\nFAIL: {failures}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+History-compaction benchmark: replays a long scripted conversation through
+the ADK Runner with and without HistoryCompactor and reports prompt tokens
+per model call and end-to-end turn latency.
+
+The model is a scripted stand-in whose latency is `--base-ms` plus
+`--ms-per-1k` per 1,000 prompt tokens (prefill cost), so no API key is
+needed; tools are stubs with the real names and output sizes.
+
+Usage:
+    python benchmarks/bench_compaction.py [--turns 40] [--keep-turns 4] [--ms-per-1k 40]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+import litellm
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, FunctionCall, Part
+
+from app.scheduling_agent._llm import SYSTEM_INSTRUCTION
+from app.scheduling_agent.compaction import BOOKING_STATE_KEY, HistoryCompactor
+
+APP_NAME = "bench"
+TOKEN_MODEL = "gpt-4o"
+
+OPENING = [
+    "Hi",
+    "My name is Priya Shah",
+    "I have a persistent cough and a mild fever",
+    "Which doctors do you have for that?",
+    "Is Dr. John Doe free tomorrow at 10am?",
+]
+SMALL_TALK = [
+    "What should I bring to the appointment?",
+    "Do you accept insurance?",
+    "Is there parking near the clinic?",
+    "Can I bring my daughter along?",
+    "How long does a consultation usually take?",
+    "Which doctors handle heart problems, just in case?",
+    "Is Dr. John Doe free tomorrow at 11am instead?",
+]
+CLOSING = [
+    "My email is priya.shah@example.com",
+    "Great, please book it for 11am",
+    "Thanks, that's all",
+]
+
+
+def conversation(turns):
+    middle = list(itertools.islice(itertools.cycle(SMALL_TALK), max(turns - len(OPENING) - len(CLOSING), 0)))
+    return OPENING + middle + CLOSING
+
+
+# --- Stub tools (same names and roughly the same output size as the real ones) ---
+def list_available_doctors() -> str:
+    """Returns a list of all doctors, their specializations, and consultation fees."""
+    rows = [f"- Dr. Doctor {i} ({spec}) - Fee: ${80 + i}" for i, spec in enumerate(
+        ["Cardiologist", "General Physician", "Dermatologist", "Pediatrician", "Orthopedist", "ENT Specialist"] * 5)]
+    return "Available Doctors:\n" + "\n".join(rows)
+
+
+def check_calendar_availability(date_str: str, doctor_name: str) -> str:
+    """Checks availability for a date or a specific slot."""
+    return f"{doctor_name} is free at {date_str}."
+
+
+def book_doctor_appointment(patient_name: str, patient_email: str, doctor_name: str, date_time_iso: str, reason: str) -> str:
+    """Books an appointment."""
+    return f"SUCCESS. Booked {patient_name} with {doctor_name} at {date_time_iso}."
+
+
+class ScriptedLlm(BaseLlm):
+    """Picks a reply or tool call from the last user message and records prompt size."""
+    model: str = "scripted"
+    base_ms: float = 50.0
+    ms_per_1k: float = 40.0
+    prompt_tokens: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        prompt = str(llm_request.config.system_instruction or "") + "".join(
+            c.model_dump_json(exclude_none=True) for c in llm_request.contents
+        )
+        tokens = litellm.token_counter(model=TOKEN_MODEL, text=prompt)
+        self.prompt_tokens.append(tokens)
+        await asyncio.sleep((self.base_ms + self.ms_per_1k * tokens / 1000) / 1000)
+
+        last = llm_request.contents[-1]
+        text = " ".join(p.text for p in last.parts if p.text).lower()
+        call = None
+        if any(p.function_response for p in last.parts):
+            reply = "Done. Is there anything else I can help you with?"
+        elif "doctors" in text or "cough" in text:
+            call = FunctionCall(name="list_available_doctors", args={})
+        elif "free" in text:
+            hour = "11" if "11am" in text else "10"
+            call = FunctionCall(name="check_calendar_availability",
+                                args={"date_str": f"2030-01-02T{hour}:00:00", "doctor_name": "Dr. John Doe"})
+        elif "book it" in text:
+            call = FunctionCall(name="book_doctor_appointment", args={
+                "patient_name": "Priya Shah", "patient_email": "priya.shah@example.com",
+                "doctor_name": "Dr. John Doe", "date_time_iso": "2030-01-02T11:00:00", "reason": "cough and fever"})
+        else:
+            reply = "Sure, happy to help with that. " * 6
+        part = Part(function_call=call) if call else Part(text=reply)
+        yield LlmResponse(content=Content(role="model", parts=[part]))
+
+
+async def replay(utterances, compactor, args):
+    llm = ScriptedLlm(base_ms=args.base_ms, ms_per_1k=args.ms_per_1k, prompt_tokens=[])
+    agent = LlmAgent(
+        model=llm, name="scheduling_agent", instruction=SYSTEM_INSTRUCTION,
+        tools=[list_available_doctors, check_calendar_availability, book_doctor_appointment],
+        before_model_callback=compactor,
+    )
+    sessions = InMemorySessionService()
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=sessions)
+    await sessions.create_session(app_name=APP_NAME, user_id="bench", session_id="s1")
+
+    per_turn_tokens, latencies = [], []
+    for text in utterances:
+        calls_before = len(llm.prompt_tokens)
+        start = time.perf_counter()
+        async for _ in runner.run_async(user_id="bench", session_id="s1",
+                                        new_message=Content(role="user", parts=[Part(text=text)])):
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+        per_turn_tokens.append(sum(llm.prompt_tokens[calls_before:]))
+
+    session = await sessions.get_session(app_name=APP_NAME, user_id="bench", session_id="s1")
+    return per_turn_tokens, latencies, session.state.get(BOOKING_STATE_KEY)
+
+
+def report(name, per_turn_tokens, latencies):
+    print(f"{name:<22} prompt tokens/turn avg {statistics.mean(per_turn_tokens):7.0f}  "
+          f"last {per_turn_tokens[-1]:6d}  total {sum(per_turn_tokens):8d}   "
+          f"turn latency avg {statistics.mean(latencies):6.1f} ms  max {max(latencies):6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--keep-turns", type=int, default=4)
+    parser.add_argument("--base-ms", type=float, default=50.0)
+    parser.add_argument("--ms-per-1k", type=float, default=40.0)
+    args = parser.parse_args()
+
+    utterances = conversation(args.turns)
+    print(f"{len(utterances)} user turns, model latency = {args.base_ms:.0f} ms + {args.ms_per_1k:.0f} ms per 1k prompt tokens")
+    tokens, latencies, _ = asyncio.run(replay(utterances, None, args))
+    report("full history", tokens, latencies)
+    tokens, latencies, state = asyncio.run(replay(utterances, HistoryCompactor(keep_turns=args.keep_turns), args))
+    report(f"compacted (K={args.keep_turns})", tokens, latencies)
+    print("booking_state:", state)
+
+
+if __name__ == "__main__":
+    main()
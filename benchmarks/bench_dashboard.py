@@ -0,0 +1,114 @@
+"""
+Dashboard benchmark: builds a synthetic appointments.db (see bench_schema.py),
+upgrades it (which materializes the stats), then compares the old
+COUNT(*)-per-request dashboard with the materialized read, and measures
+what the stats triggers add to each booking insert.
+
+Usage:
+    python benchmarks/bench_dashboard.py [--rows 1000000] [--db /tmp/bench_dashboard.db]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", default="/tmp/bench_dashboard.db")
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    os.environ["APPOINTMENTS_DB_PATH"] = args.db
+    from benchmarks.bench_schema import build, BASE, FMT
+    from sqlalchemy import select, func
+    from app.database import engine, AsyncSessionLocal, Appointment, Doctor, Department
+    from app.migrations import upgrade
+    from app.dashboard_stats import STATS_TRIGGERS, read_counters, read_utilization, check, rebuild
+    from app.tools.schedule import DoctorSchedules
+
+    build(args.db, args.rows, args.doctors)
+    upgrade(engine, target=5)
+
+    def insert_ms(n=2000):
+        far = BASE + timedelta(days=36500)
+        with engine.connect() as conn:
+            start = time.perf_counter()
+            for i in range(n):
+                s = far + timedelta(hours=i)
+                conn.exec_driver_sql(
+                    "INSERT INTO appointments (doctor_id, patient_name, start_time, end_time, status) "
+                    "VALUES (?, 'x', ?, ?, 'Confirmed')",
+                    (i % args.doctors + 1, s.strftime(FMT), (s + timedelta(hours=1)).strftime(FMT)))
+            elapsed = (time.perf_counter() - start) / n * 1000
+            conn.rollback()
+        return elapsed
+
+    before_insert = insert_ms()
+    start = time.perf_counter()
+    upgrade(engine)
+    print(f"{args.rows} appointments; stats materialized by the migration in {time.perf_counter() - start:.1f} s")
+    after_insert = insert_ms()
+    schedules = DoctorSchedules()
+
+    async def old_counts():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(select(
+                select(func.count()).select_from(Doctor).scalar_subquery(),
+                select(func.count()).select_from(Department).scalar_subquery(),
+                select(func.count()).select_from(Appointment).scalar_subquery(),
+            ))).one()
+
+    async def new_counts():
+        async with AsyncSessionLocal() as db:
+            return await read_counters(db)
+
+    async def utilization():
+        async with AsyncSessionLocal() as db:
+            return await read_utilization(db, schedules, BASE.date() + timedelta(days=30), days=7)
+
+    async def timings():
+        results = {}
+        for name, fn in (("counts, COUNT(*) per request", old_counts),
+                         ("counts, materialized", new_counts),
+                         ("7-day utilization, all doctors", utilization)):
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                await fn()
+                samples.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(samples)
+        return results
+
+    print(f"{'dashboard read':<36}{'median ms':>10}")
+    for name, ms in asyncio.run(timings()).items():
+        print(f"{name:<36}{ms:10.2f}")
+
+    print(f"\nbooking insert: {before_insert:.3f} ms/row without stats triggers, {after_insert:.3f} ms/row with "
+          f"({len(STATS_TRIGGERS)} triggers)")
+    print(f"drift check: {median_ms(check, 1):.0f} ms, {len(check())} drifted row(s); "
+          f"full rebuild: {median_ms(rebuild, 1):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
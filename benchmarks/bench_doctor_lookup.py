@@ -0,0 +1,121 @@
+"""
+Doctor-lookup benchmark: builds a synthetic multi-hospital catalog and
+compares the old `Doctor.name.ilike('%name%').first()` resolution with
+DoctorIndex on latency and on how often each returns the intended doctor.
+
+Query mix per doctor sampled: full name, "Dr. <first>", last name only,
+and a typo (two adjacent letters swapped).
+
+Usage:
+    python benchmarks/bench_doctor_lookup.py [--doctors 10000] [--queries 2000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, Doctor
+from app.tools.doctor_index import DoctorIndex
+from benchmarks.latency import percentiles
+
+FIRST = ["Sarah", "John", "Priya", "Arjun", "Meera", "Rahul", "Anita", "Vikram", "Fatima", "Omar", "Li", "Wei",
+         "Maria", "Jose", "Emma", "Liam", "Aisha", "Kofi", "Yuki", "Hiro", "Sofia", "Lucas", "Nina", "Ivan"]
+LAST = ["Smith", "Doe", "Sharma", "Patel", "Iyer", "Khan", "Chen", "Garcia", "Okafor", "Tanaka", "Rossi", "Novak",
+        "Mehta", "Reddy", "Nair", "Kapoor", "Silva", "Muller", "Kowalski", "Haddad", "Mensah", "Sato", "Costa", "Berg"]
+
+
+def synthetic_names(n, rng):
+    """Unique 'Dr. First Middle Last' names; first and last names repeat a lot, as in a real catalog."""
+    names = set()
+    while len(names) < n:
+        middle = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 8))).title()
+        names.add(f"Dr. {rng.choice(FIRST)} {middle} {rng.choice(LAST)}")
+    return sorted(names)
+
+
+def swap_typo(word, rng):
+    if len(word) < 4:
+        return word
+    i = rng.randint(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def queries_for(name, rng):
+    first, middle, last = name.split()[1:]
+    return {
+        "full name": name,
+        "first + middle": f"Dr. {first} {middle}",
+        "middle name only": middle,
+        "typo": f"{first} {swap_typo(middle, rng)} {last}",
+    }
+
+
+def time_it(fn, queries):
+    samples, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doctors", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Doctor.__table__])
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all(Doctor(name=n, consultation_fee=100) for n in synthetic_names(args.doctors, rng))
+        db.commit()
+        rows = db.query(Doctor.id, Doctor.name).all()
+
+    start = time.perf_counter()
+    index = DoctorIndex()
+    index.load(rows)
+    print(f"{len(rows)} doctors, index build {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    db = Session()
+
+    def ilike_first(q):
+        doc = db.query(Doctor).filter(Doctor.name.ilike(f"%{q}%")).first()
+        return doc.id if doc else None
+
+    def indexed(q):
+        match = index.resolve(q)
+        return match.doctor_id if match else None
+
+    sample = rng.sample(rows, min(args.queries, len(rows)))
+    by_kind = {}
+    for doctor_id, name in sample:
+        for kind, q in queries_for(name, rng).items():
+            by_kind.setdefault(kind, []).append((q, doctor_id))
+
+    print(f"{'query kind':<18}{'method':<10}{'p50 ms':>9}{'p99 ms':>9}{'correct':>9}{'wrong':>8}{'none':>8}")
+    for kind, pairs in by_kind.items():
+        queries = [q for q, _ in pairs]
+        for label, fn in (("ilike", ilike_first), ("index", indexed)):
+            samples, results = time_it(fn, queries)
+            correct = sum(1 for got, (_, want) in zip(results, pairs) if got == want)
+            missing = sum(1 for got in results if got is None)
+            p50, p99 = percentiles(samples, 50, 99)
+            print(f"{kind:<18}{label:<10}{p50:9.3f}{p99:9.3f}{correct / len(pairs):9.0%}"
+                  f"{(len(pairs) - correct - missing) / len(pairs):8.0%}{missing / len(pairs):8.0%}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+End-to-end load test of the FastAPI app with offline stand-ins: the
+agent's LiteLlm is replaced by ScriptedLlm (app/scheduling_agent/fake_llm.py,
+scripted tool calls, --llm-latency-ms per model call) and Google Calendar
+by FakeCalendarService (--calendar-latency-ms per round trip). The
+database is a synthetic clinic (see synthetic_db.py) in a temp directory.
+
+The app runs in this process with its lifespan (migrations, chat log
+writer, calendar sync, outbox, cache sync) behind httpx's ASGI transport,
+so each request goes through the middleware, /chat, the router or the
+ADK runner, the real tools and SQLite. Scenarios:
+
+  greeting      "hello"-style messages (router fast path)
+  doctors       doctor-list questions (router fast path)
+  availability  "Is Dr. X available on <day or slot>?" (model -> check_calendar_availability -> model)
+  booking       "Book Dr. X at <slot> for <patient> <email>, reason: ..." (model -> check -> book -> model)
+
+Each scenario runs --requests turns at each --concurrency level and
+reports requests/s and p50/p95/p99/max latency. Bookings pick random
+slots, so some collide or land on a busy slot; afterwards the run checks
+that no doctor is double-booked, that every booking is linked to the
+chat session that made it, and that the outbox delivered every booking
+to the fake calendar.
+
+--json writes the numbers; --compare reads a previous --json and fails on
+a throughput drop or p95 rise beyond --tolerance. Exits non-zero on
+request errors, a fast-path turn that reached the model, a double booking,
+an unlinked booking or an undelivered calendar event.
+
+Usage:
+    python benchmarks/bench_e2e.py [--scenarios greeting,doctors,availability,booking]
+        [--concurrency 1,8,32] [--requests 200] [--llm-latency-ms 0] [--calendar-latency-ms 0]
+        [--json results.json] [--compare baseline.json] [--tolerance 0.25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.latency import percentiles
+
+SCENARIOS = ("greeting", "doctors", "availability", "booking")
+FAST_PATH = {"greeting", "doctors"}
+GREETINGS = ["hello", "Hi", "Good morning", "hey there"]
+DOCTOR_QUESTIONS = ["Which doctors do you have?", "List all doctors", "Which specialists are available?"]
+PATIENTS = ["Ravi Kumar", "Anita Desai", "John Mathew", "Fatima Sheikh", "Deepak Nair", "Lakshmi Iyer"]
+
+
+class Messages:
+    """Deterministic user messages per scenario, built from the synthetic clinic."""
+
+    def __init__(self, clinic, seed):
+        self.clinic = clinic
+        self.rng = random.Random(seed)
+        self.booking_no = 0
+
+    def _doctor_slot(self):
+        while True:
+            doctor = self.rng.choice(self.clinic.doctors)
+            starts = doctor.slot_starts(self.clinic.day(self.rng.randrange(self.clinic.days)))
+            if starts:
+                return doctor, self.rng.choice(starts)
+
+    def next(self, scenario):
+        if scenario == "greeting":
+            return self.rng.choice(GREETINGS)
+        if scenario == "doctors":
+            return self.rng.choice(DOCTOR_QUESTIONS)
+        doctor, start = self._doctor_slot()
+        if scenario == "availability":
+            when = start.isoformat() if self.rng.random() < 0.5 else start.date().isoformat()
+            return f"Is {doctor.name} available on {when}?"
+        self.booking_no += 1
+        patient = self.rng.choice(PATIENTS)
+        email = f"{patient.split()[0].lower()}.{self.booking_no}@example.com"
+        return (f"Book {doctor.name} at {start.isoformat()} for {patient} <{email}>, "
+                f"reason: {self.rng.choice(['checkup', 'follow-up', 'fever', 'back pain'])}")
+
+
+def outcome(scenario, response):
+    """'ok', 'booked', 'taken' (slot busy or lost the race) or 'wrong' (unexpected answer)."""
+    if scenario == "booking":
+        if response.startswith("SUCCESS"):
+            return "booked"
+        if " is busy at " in response or " is not available at " in response or "already booked" in response \
+                or response.startswith("ERROR: ") and "different time" in response:
+            return "taken"
+        return "wrong"
+    if scenario == "availability":
+        return "ok" if response and not response.startswith(("Error", "ERROR", "System:")) else "wrong"
+    return "ok" if response else "wrong"
+
+
+async def run_scenario(client, messages, scenario, requests, concurrency, run_id):
+    latencies, outcomes = [], {}
+    errors = []
+    remaining = iter(range(requests))
+
+    async def one_client(n):
+        for i in remaining:
+            text = messages.next(scenario)
+            start = time.perf_counter()
+            try:
+                res = await client.post("/chat", json={"session_id": f"e2e-{run_id}-{scenario}-{n}-{i}", "text": text})
+                res.raise_for_status()
+                result = outcome(scenario, res.json()["response"])
+                latencies.append((time.perf_counter() - start) * 1000)
+                outcomes[result] = outcomes.get(result, 0) + 1
+                if result == "wrong":
+                    errors.append(f"{text!r} -> {res.json()['response'][:120]!r}")
+            except httpx.HTTPError as e:
+                errors.append(f"{text!r} -> {e!r}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_client(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = percentiles(latencies, 50, 95, 99)
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(p50, 2),
+        "p95_ms": round(p95, 2),
+        "p99_ms": round(p99, 2),
+        "max_ms": round(max(latencies, default=0.0), 2),
+        "outcomes": outcomes,
+        "errors": errors,
+    }
+
+
+def double_bookings(db_path):
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("""
+            SELECT COUNT(*) FROM appointments a JOIN appointments b
+              ON a.doctor_id = b.doctor_id AND a.id < b.id
+             AND a.start_time < b.end_time AND b.start_time < a.end_time
+             WHERE a.status = 'Confirmed' AND b.status = 'Confirmed'
+        """).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def unlinked_bookings(db_path):
+    """Appointments without a source session (every booking here comes from a chat turn)."""
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM appointments WHERE source_session_id IS NULL").fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def drain_outbox(outbox, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = await asyncio.to_thread(outbox.stats)
+        if not stats["pending"]:
+            return stats
+        outbox.wake()
+        await asyncio.sleep(0.1)
+    return await asyncio.to_thread(outbox.stats)
+
+
+async def bench(args, clinic, calendar, db_path):
+    from app.main import app
+    from app.scheduling_agent.agent import root_agent
+    from app.scheduling_agent.fake_llm import ScriptedLlm
+    from app.scheduling_agent.tools import calendar_outbox, reservations
+
+    llm = ScriptedLlm(latency_seconds=args.llm_latency_ms / 1000)
+    root_agent.model = llm
+    messages = Messages(clinic, args.seed)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results, failures = {}, []
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://e2e", timeout=120) as client:
+            for scenario in scenarios:
+                await run_scenario(client, messages, scenario, args.warmup, 1, "warmup")
+            print(f"{'scenario':<14}{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+                  f"{'model/turn':>11}  outcomes")
+            for scenario in scenarios:
+                for concurrency in levels:
+                    calls_before = llm.calls
+                    result = await run_scenario(client, messages, scenario, args.requests, concurrency, concurrency)
+                    turns = sum(result["outcomes"].values())
+                    per_turn = (llm.calls - calls_before) / turns if turns else 0.0
+                    result["model_calls_per_turn"] = round(per_turn, 2)
+                    results.setdefault(scenario, {})[str(concurrency)] = result
+                    outcomes = ", ".join(f"{k} {v}" for k, v in sorted(result["outcomes"].items()))
+                    print(f"{scenario:<14}{concurrency:>5}{result['rps']:>9.1f}{result['p50_ms']:>9.1f}"
+                          f"{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['max_ms']:>9.1f}"
+                          f"{per_turn:>11.2f}  {outcomes}")
+                    if result["errors"]:
+                        failures.append(f"{scenario} x{concurrency}: {len(result['errors'])} errors, "
+                                        f"first {result['errors'][0]}")
+                    if scenario in FAST_PATH and per_turn:
+                        failures.append(f"{scenario} x{concurrency}: fast-path turns reached the model")
+                    if scenario not in FAST_PATH and not per_turn:
+                        failures.append(f"{scenario} x{concurrency}: the model was never called")
+
+            outbox = await drain_outbox(calendar_outbox)
+            metrics = (await client.get("/api/admin/metrics")).json()
+
+    booked = reservations.stats()["booked"]
+    overlaps = double_bookings(db_path)
+    unlinked = unlinked_bookings(db_path)
+    delivered = calendar.calls["events.insert"] + calendar.calls["events.update"]
+    print(f"\nbookings: {booked} confirmed, {overlaps} overlapping, {unlinked} without a session; outbox {outbox['done']} done, "
+          f"{outbox['pending']} pending, {outbox['failed']} failed; calendar writes {delivered}, "
+          f"{calendar.calls['batch']} batches, {calendar.calls['freebusy.query']} freebusy queries")
+    tools = metrics.get("tool_call_seconds", {})
+    for labels, stats in sorted(tools.items()):
+        print(f"  tool {labels:<45} n={stats['count']:<6} p50 {stats['p50_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms")
+    if overlaps:
+        failures.append(f"{overlaps} overlapping confirmed appointments")
+    if unlinked:
+        failures.append(f"{unlinked} appointments not linked to their chat session")
+    if outbox["pending"] or outbox["failed"] or outbox["done"] < booked:
+        failures.append(f"outbox not drained: {outbox}")
+    return results, failures
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against a previous --json run: lower throughput or higher p95 beyond `tolerance`."""
+    regressions = []
+    for scenario, levels in results.items():
+        for concurrency, now in levels.items():
+            before = baseline.get(scenario, {}).get(concurrency)
+            if not before:
+                continue
+            if now["rps"] < before["rps"] * (1 - tolerance):
+                regressions.append(f"{scenario} x{concurrency}: {before['rps']} -> {now['rps']} req/s")
+            if now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{scenario} x{concurrency}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=200, help="turns per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5, help="unrecorded turns per scenario first")
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--calendar-latency-ms", type=float, default=0)
+    parser.add_argument("--doctors", type=int, default=40)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--fill", type=float, default=0.3, help="share of slots already booked")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--compare", help="results of an earlier run (--json) to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # app.database reads the paths at import time, so set them before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    db_path = os.path.join(workdir, "appointments.db")
+    os.environ["APPOINTMENTS_DB_PATH"] = db_path
+    os.environ["SESSION_DB_PATH"] = os.path.join(workdir, "sessions.db")
+    os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+    from app.tools.fake_calendar import FakeCalendarService
+    from app.tools.calendar_client import calendar_clients
+    from benchmarks.synthetic_db import build
+
+    calendar = FakeCalendarService(latency_seconds=args.calendar_latency_ms / 1000)
+    clinic = build(db_path, args.doctors, args.days, args.fill, args.seed, calendar=calendar)
+    calendar_clients.use_service(calendar)
+    print(f"{len(clinic.doctors)} doctors, {clinic.appointments} appointments and {clinic.calendar_events} calendar "
+          f"events over {clinic.days} days from {clinic.first_day}; model {args.llm_latency_ms:g} ms/call, "
+          f"calendar {args.calendar_latency_ms:g} ms/round trip; {os.cpu_count()} CPU(s)\n")
+
+    import logging
+    logging.disable(logging.WARNING)  # per-request INFO lines would dominate the timings
+    results, failures = asyncio.run(bench(args, clinic, calendar, db_path))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({s: {c: {k: v for k, v in r.items() if k != "errors"} for c, r in levels.items()}
+                       for s, levels in results.items()}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print(f"\n{len(regressions)} regression(s) against {args.compare} (tolerance {args.tolerance:.0%})")
+        failures += regressions
+
+    if failures:
+        print(f"\nFAIL: {failures}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Per-doctor calendars with bulk free/busy, against the fake Calendar API.
+
+Gives each of --doctors doctors their own calendar with random busy
+blocks, then:
+
+  - loads every calendar's busy time one freebusy.query per doctor vs
+    chunked (50 calendars per request), with a simulated request latency,
+    and checks both return the same intervals;
+  - fetches them once for the AvailabilityEngine (refresh_calendar_busy, as
+    the app's background task does), then answers "who is free at <slot>?"
+    for a department and all doctors and checks it against a brute-force scan;
+  - books through SlotReservations + CalendarOutbox and checks the event
+    lands in the doctor's calendar and the doctor shows busy after the next
+    background free/busy fetch.
+
+Exits non-zero on any mismatch.
+
+Usage:
+    python benchmarks/bench_freebusy.py [--doctors 500] [--events 20] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doctors", type=int, default=500)
+    parser.add_argument("--departments", type=int, default=10)
+    parser.add_argument("--events", type=int, default=20, help="busy blocks per doctor calendar")
+    parser.add_argument("--latency-ms", type=float, default=50, help="simulated latency per freebusy.query")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_freebusy_")
+    os.environ["APPOINTMENTS_DB_PATH"] = os.path.join(workdir, "appointments.db")
+
+    from app import database
+    from app.database import Department, Doctor, get_doctor_calendars
+    from app.migrations import upgrade
+    from app.reservations import SlotReservations
+    from app.tools.availability import AvailabilityEngine, google_freebusy_loader, CLINIC_OPEN_HOUR, CLINIC_CLOSE_HOUR
+    from app.tools.calendar_client import IST, query_freebusy, to_rfc3339
+    from app.tools.calendar_outbox import CalendarOutbox
+    from app.tools.fake_calendar import FakeCalendarService
+
+    class SlowCalendarService(FakeCalendarService):
+        def _freebusy(self, body):
+            time.sleep(args.latency_ms / 1000)
+            return super()._freebusy(body)
+
+    rng = random.Random(args.seed)
+    today = datetime.now(IST).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    service = SlowCalendarService()
+
+    upgrade(database.engine)
+    with database.SessionLocal() as db:
+        departments = [Department(name=f"Department {d}") for d in range(args.departments)]
+        db.add_all(departments)
+        db.flush()
+        for i in range(args.doctors):
+            calendar_id = f"doctor{i}@clinic.example"
+            db.add(Doctor(name=f"Dr. Bulk Doctor{i}", specialization="General", consultation_fee=100,
+                          department_id=departments[i % args.departments].id, calendar_id=calendar_id))
+            service.add_calendar(calendar_id)
+            for _ in range(args.events):
+                start = today + timedelta(days=rng.randrange(1, 8), hours=rng.randrange(CLINIC_OPEN_HOUR, CLINIC_CLOSE_HOUR))
+                service.add_event(start.isoformat(), (start + timedelta(hours=1)).isoformat(), calendar_id=calendar_id)
+        db.commit()
+    database.doctor_index.invalidate()
+    calendars = get_doctor_calendars()
+    failures = []
+
+    # --- one request per doctor vs chunked ---
+    time_min, time_max = to_rfc3339(today), to_rfc3339(today + timedelta(days=30))
+    results = {}
+    for label, chunk_size in (("one query per doctor", 1), ("chunked, 50 per query", 50)):
+        before = service.calls['freebusy.query']
+        start = time.perf_counter()
+        results[label] = query_freebusy(service, calendars.values(), time_min, time_max, chunk_size=chunk_size)
+        print(f"{label:<24}{service.calls['freebusy.query'] - before:>5} requests  "
+              f"{(time.perf_counter() - start) * 1000:8.0f} ms")
+    if len(set(map(repr, results.values()))) != 1 or len(results["chunked, 50 per query"]) != args.doctors:
+        failures.append("chunked free/busy differs from per-doctor free/busy")
+
+    # --- who is free? ---
+    async def run_calendar(fn, *fn_args):
+        return fn(service, *fn_args)
+
+    engine = AvailabilityEngine(lambda start, end: [], load_bookings=lambda start, end: [],
+                                load_calendar_busy=google_freebusy_loader(run_calendar), ttl_seconds=3600)
+    before = service.calls['freebusy.query']
+    start = time.perf_counter()
+    asyncio.run(engine.refresh_calendar_busy())
+    print(f"\nbackground free/busy fetch for {args.doctors} calendars: {service.calls['freebusy.query'] - before} requests, "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    busy = results["chunked, 50 per query"]
+    with database.SessionLocal() as db:
+        by_department = {}
+        for doctor_id, department_id in db.query(Doctor.id, Doctor.department_id).order_by(Doctor.id):
+            by_department.setdefault(department_id, []).append(doctor_id)
+    groups = [("one department", next(iter(by_department.values()))), ("all doctors", list(calendars))]
+    for label, doctor_ids in groups:
+        elapsed, mismatches = 0.0, 0
+        for _ in range(args.queries):
+            slot = today + timedelta(days=rng.randrange(1, 8), hours=rng.randrange(CLINIC_OPEN_HOUR, CLINIC_CLOSE_HOUR))
+            started = time.perf_counter()
+            free = engine.free_doctors(slot, doctor_ids)
+            elapsed += time.perf_counter() - started
+            expected = [d for d in doctor_ids
+                        if not any(s < slot + timedelta(hours=1) and e > slot for s, e in busy[calendars[d]])]
+            mismatches += free != expected
+        print(f"who is free, {label:<15} ({len(doctor_ids):>3} doctors): {elapsed / args.queries * 1000:.3f} ms/query")
+        if mismatches:
+            failures.append(f"{mismatches} wrong answers for {label}")
+
+    # --- bookings land in the doctor's calendar ---
+    doctor_id = next(iter(calendars))
+    with database.SessionLocal() as db:
+        doctor_name = db.get(Doctor, doctor_id).name
+    slot = next(
+        today + timedelta(days=9, hours=h) for h in range(CLINIC_OPEN_HOUR, CLINIC_CLOSE_HOUR)
+        if engine.free_doctors(today + timedelta(days=9, hours=h), [doctor_id])
+    )
+
+    async def book_and_deliver():
+        booking = await SlotReservations().book("Pat", "pat@example.com", doctor_name, slot,
+                                                slot + timedelta(hours=1), "checkup")
+        await CalendarOutbox(run_calendar).drain_once()
+        return booking
+
+    booking = asyncio.run(book_and_deliver())
+    landed = booking.event_id in service.calendars.get(calendars[doctor_id], {})
+    asyncio.run(engine.refresh_calendar_busy())
+    now_busy = not engine.free_doctors(slot, [doctor_id])
+    print(f"\nbooking for {doctor_name}: event in their calendar: {landed}; busy after the next fetch: {now_busy}")
+    if not (landed and now_busy):
+        failures.append("booking did not reach the doctor's calendar")
+
+    if failures:
+        print(f"\nFAIL: {failures}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Observability overhead and accuracy (no network, no LLM).
+
+  - records --samples log-normal latencies into a Histogram and compares
+    its p50/p90/p99 with the exact quantiles of the same samples;
+  - times one observe(), one `with histogram.time()`, a timed_tool-wrapped
+    async call against the bare call, and TraceMiddleware around a no-op
+    ASGI app, and adds them up for an agent turn;
+  - serves routed /chat turns through the app (TestClient, no lifespan),
+    then checks /metrics parses as Prometheus text, counts the fast-path
+    hits, and that each response carries X-Trace-ID.
+
+Exits non-zero if a quantile is off by more than 2%, or if what a routed
+turn records (turn histogram, fast-path counter, trace middleware) costs
+more than 1% of the fastest routed turn. An agent turn records more but
+waits seconds on the model, so its share is reported against a 100 ms
+model call.
+
+Usage:
+    python benchmarks/bench_observability.py [--samples 200000] [--turns 200]
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+# Stages recorded by one agent turn: model calls, tool calls, commits, Google requests, the turn itself.
+AGENT_TURN_OBSERVATIONS = 3 + 2 + 4 + 2 + 1
+_SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*",?)*\})? -?[0-9.e+Inf]+$')
+
+
+def per_call_us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    os.environ["APPOINTMENTS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_observability_"), "app.db")
+    from app.observability import Histogram, TraceMiddleware, metrics, timed_tool
+    failures = []
+
+    # --- accuracy ---
+    rng = random.Random(args.seed)
+    samples = [rng.lognormvariate(math.log(0.05), 1.5) for _ in range(args.samples)]  # ~50 ms median, long tail
+    histogram = Histogram("bench", "bench")
+    for value in samples:
+        histogram.observe(value)
+    stats = histogram.stats()["all"]
+    ordered = sorted(samples)
+    print(f"{'quantile':<10}{'exact ms':>12}{'histogram ms':>14}{'error':>9}")
+    for q in (0.50, 0.90, 0.99):
+        exact = ordered[max(math.ceil(q * len(ordered)), 1) - 1] * 1000
+        approx = stats[f"p{int(q * 100)}_ms"]
+        error = abs(approx - exact) / exact
+        print(f"p{int(q * 100):<9}{exact:>12.3f}{approx:>14.3f}{error:>8.2%}")
+        if error > 0.02:
+            failures.append(f"p{int(q * 100)} off by {error:.2%}")
+
+    # --- overhead ---
+    n = 200_000
+    observe_us = per_call_us(lambda: histogram.observe(0.0123), n)
+
+    def with_timer():
+        with histogram.time():
+            pass
+
+    timer_us = per_call_us(with_timer, n)
+
+    async def tool():
+        return "ok"
+
+    wrapped = timed_tool(is_error=lambda result: result.startswith("ERROR"))(tool)
+
+    async def calls(fn, count):
+        start = time.perf_counter()
+        for _ in range(count):
+            await fn()
+        return (time.perf_counter() - start) / count * 1e6
+
+    tool_us = asyncio.run(calls(wrapped, n)) - asyncio.run(calls(tool, n))
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def sink(message):
+        pass
+
+    scope = {"type": "http", "headers": [(b"host", b"x")]}
+    traced = TraceMiddleware(noop_app)
+    middleware_us = (asyncio.run(calls(lambda: traced(scope, None, sink), n))
+                     - asyncio.run(calls(lambda: noop_app(scope, None, sink), n)))
+    turn_us = AGENT_TURN_OBSERVATIONS * timer_us + middleware_us
+    routed_us = 2 * observe_us + middleware_us
+    print(f"\nobserve() {observe_us:.2f} us, timer {timer_us:.2f} us, timed_tool +{tool_us:.2f} us, "
+          f"trace middleware +{middleware_us:.2f} us")
+    print(f"agent turn ({AGENT_TURN_OBSERVATIONS} observations + middleware): ~{turn_us:.1f} us, "
+          f"{turn_us / 100_000:.3%} of one 100 ms model call")
+
+    # --- through the app ---
+    from fastapi.testclient import TestClient
+    from app.database import seed_database
+    from app.migrations import upgrade
+    from app.main import app
+
+    upgrade()
+    seed_database()
+    client = TestClient(app)  # no lifespan: the agent and background workers are not needed
+    questions = ["hello", "Which doctors do you have?", "What are the consultation fees?"]
+    fastest, missing_trace = float("inf"), 0
+    for i in range(args.turns):
+        start = time.perf_counter()
+        res = client.post("/chat", json={"session_id": f"bench-{i}", "text": questions[i % len(questions)]},
+                          headers={"X-Request-ID": f"req-{i}"} if i % 2 else {})
+        fastest = min(fastest, time.perf_counter() - start)
+        res.raise_for_status()
+        trace_id = res.headers.get("x-trace-id")
+        missing_trace += not trace_id or (i % 2 and trace_id != f"req-{i}")
+    print(f"\nfastest routed /chat turn: {fastest * 1000:.2f} ms; its observability (~{routed_us:.1f} us) "
+          f"is {routed_us / (fastest * 1e6):.2%} of it")
+    if routed_us > 0.01 * fastest * 1e6:
+        failures.append("routed-turn overhead above 1% of the fastest routed turn")
+    if missing_trace:
+        failures.append(f"{missing_trace} responses without the expected X-Trace-ID")
+
+    text = client.get("/metrics").text
+    bad = [line for line in text.splitlines() if line and not line.startswith("#") and not _SAMPLE_LINE.match(line)]
+    hits = sum(float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+               if line.startswith("scheduling_fast_path_hits_total"))
+    print(f"/metrics: {len(text.splitlines())} lines, {len(bad)} malformed, fast-path hits {hits:.0f}")
+    if bad:
+        failures.append(f"malformed /metrics lines: {bad[:3]}")
+    if hits != args.turns:
+        failures.append(f"fast-path hits {hits:.0f} != {args.turns} turns")
+    start = time.perf_counter()
+    metrics.render()
+    print(f"render: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    if failures:
+        print(f"\nFAIL: {failures}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
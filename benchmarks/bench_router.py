@@ -0,0 +1,88 @@
+"""
+Intent-router benchmark: replays a labelled utterance corpus and reports the
+LLM-bypass rate, routing accuracy and per-turn routing latency. With
+--doctors N the two-doctor catalog is padded with synthetic doctors, to
+show that routing a turn does not grow with the catalog (the first turn
+after a catalog load builds the snapshot and is timed separately).
+
+Usage:
+    python benchmarks/bench_router.py [--corpus benchmarks/data/router_corpus.txt] [--repeat 200] [--doctors 5000]
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.scheduling_agent.router import IntentRouter
+
+CATALOG = [
+    {"id": 1, "name": "Dr. Sarah Smith", "specialization": "Cardiologist", "fee": 150.0,
+     "availability": "Mon-Fri 9am-4pm", "department": "Cardiology", "location": "Wing A, Floor 2"},
+    {"id": 2, "name": "Dr. John Doe", "specialization": "General Physician", "fee": 80.0,
+     "availability": "Tue-Sat 10am-6pm", "department": "General Medicine", "location": "Wing B, Floor 1"},
+]
+
+
+def padded_catalog(size):
+    """CATALOG plus synthetic doctors up to `size`, with names and departments unlike the corpus's."""
+    catalog = list(CATALOG)
+    for n in range(len(catalog) + 1, size + 1):
+        catalog.append({"id": n, "name": f"Dr. Synth{n} Lastname{n % 97}", "specialization": f"Specialty{n % 40}",
+                        "fee": 100.0, "availability": "Mon-Fri 9am-5pm", "department": f"Department{n % 40}",
+                        "location": f"Wing {n % 5}"})
+    return catalog
+
+
+def load_corpus(path):
+    rows = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if line.strip() and not line.startswith("#"):
+            expected, text = line.split("\t", 1)
+            rows.append((expected, text))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=str(Path(__file__).parent / "data" / "router_corpus.txt"))
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--doctors", type=int, default=len(CATALOG), help="catalog size")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    catalog = padded_catalog(args.doctors)
+    router = IntentRouter(catalog_loader=lambda: catalog)
+    start = time.perf_counter()
+    router.catalog()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    outcomes, wrong = Counter(), []
+    for expected, text in corpus:
+        result = router.route(text)
+        got = result.intent if result else "agent"
+        outcomes[got] += 1
+        if got != expected:
+            wrong.append((expected, got, text))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for _, text in corpus:
+            router.route(text)
+    per_turn_us = (time.perf_counter() - start) / (args.repeat * len(corpus)) * 1e6
+
+    bypassed = len(corpus) - outcomes["agent"]
+    print(f"catalog: {len(catalog)} doctors, snapshot built in {load_ms:.1f} ms")
+    print(f"utterances: {len(corpus)}  LLM bypass rate: {bypassed / len(corpus):.0%}  "
+          f"accuracy: {1 - len(wrong) / len(corpus):.0%}  routing latency: {per_turn_us:.0f} us/turn")
+    print("routes:", dict(outcomes))
+    for expected, got, text in wrong:
+        print(f"  MISROUTED expected={expected} got={got}: {text!r}")
+
+
+if __name__ == "__main__":
+    main()
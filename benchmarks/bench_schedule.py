@@ -0,0 +1,148 @@
+"""
+Schedule bitmap benchmark (no DB, no network).
+
+Generates weekly rules, lunch breaks and holidays for --doctors doctors
+plus random bookings, then:
+
+  - precomputes every doctor-day of the window and reports time and size;
+  - times "is this a bookable free slot?" and "next 3 free slots" through
+    the AvailabilityEngine with schedules, against the old clinic-hours
+    scan, and checks the bitmap answers against a brute-force minute walk;
+  - parses a set of availability_text samples.
+
+Exits non-zero on a mismatch.
+
+Usage:
+    python benchmarks/bench_schedule.py [--doctors 500] [--bookings 20000] [--queries 2000]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from app.tools.availability import AvailabilityEngine
+from app.tools.calendar_client import IST
+from app.tools.schedule import DoctorSchedules, parse_availability_text
+
+SAMPLES = [
+    "Mon-Fri 9am-4pm", "Tue-Sat 10am-6pm", "Mon, Wed, Fri 9:30am-1pm", "Weekdays 9-5; Sat 10am-2pm, Sun closed",
+    "Mon-Fri 9am-1pm and 2pm-5pm", "Monday to Thursday 9:00-17:00, Saturday 10-1", "Tues. & Thurs. 2pm-6pm",
+    "Daily 08:00-20:00", "by appointment only",
+]
+
+
+def build(n_doctors, n_bookings, seed):
+    rng = random.Random(seed)
+    today = datetime.now(IST).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    rules, exceptions = [], []
+    for doctor_id in range(1, n_doctors + 1):
+        slot = rng.choice([15, 20, 30, 60])
+        start, end = rng.choice([(8 * 60, 16 * 60), (9 * 60, 17 * 60), (10 * 60, 18 * 60)])
+        lunch = rng.choice([12 * 60, 13 * 60])
+        for weekday in rng.sample(range(6), rng.randint(3, 6)):
+            rules.append((doctor_id, weekday, start, lunch, slot, None, None))
+            rules.append((doctor_id, weekday, lunch + 60, end, slot, None, None))
+        day = (today + timedelta(days=rng.randrange(30))).date()
+        exceptions.append((doctor_id, day, None, None, False, slot))  # a day off
+    exceptions.append((None, (today + timedelta(days=10)).date(), None, None, False, 60))  # clinic holiday
+    bookings = []
+    for i in range(n_bookings):
+        doctor_id = rng.randrange(1, n_doctors + 1)
+        start = today + timedelta(days=rng.randrange(30), minutes=rng.randrange(8 * 60, 18 * 60, 15))
+        bookings.append((i, doctor_id, start, start + timedelta(minutes=rng.choice([15, 30, 60]))))
+    return today, rules, exceptions, bookings
+
+
+def brute_force_free(rules, exceptions, busy, doctor_id, start):
+    """Checks one slot start against the raw rules, exceptions and bookings, without bitmaps."""
+    day = start.date()
+    rules = [r for d, *r in rules if d == doctor_id and r[0] == day.weekday()]
+    day_off = [e for e in exceptions if e[0] in (None, doctor_id) and e[1] == day]
+    minute = start.hour * 60 + start.minute
+    for _, rule_start, rule_end, slot, *_ in rules:
+        if (minute - rule_start) % slot == 0 and rule_start <= minute and minute + slot <= rule_end:
+            break
+    else:
+        return False
+    if day_off:
+        return False
+    end = start + timedelta(minutes=slot)
+    return not any(s < end and e > start for s, e in busy.get(doctor_id, ()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doctors", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    today, rules, exceptions, bookings = build(args.doctors, args.bookings, args.seed)
+    busy = {}
+    for _, doctor_id, start, end in bookings:
+        busy.setdefault(doctor_id, []).append((start, end))
+
+    schedules = DoctorSchedules(load=lambda start, end: (rules, exceptions))
+    start = time.perf_counter()
+    schedules.precompute(range(1, args.doctors + 1), today.date())
+    elapsed = time.perf_counter() - start
+    days = schedules.stats()["precomputed_days"]
+    size = sum((d.open.bit_length() + d.starts.bit_length() + 7) // 8 for d in schedules._days.values())
+    print(f"precomputed {days} doctor-days in {elapsed * 1000:.0f} ms, {size / 1024:.0f} KiB of bitmaps")
+
+    engines = {
+        "clinic hours (old)": AvailabilityEngine(lambda s, e: [], load_bookings=lambda s, e: bookings),
+        "schedule bitmaps": AvailabilityEngine(lambda s, e: [], load_bookings=lambda s, e: bookings,
+                                               schedules=schedules),
+    }
+    rng = random.Random(args.seed)
+    queries = [
+        (rng.randrange(1, args.doctors + 1),
+         today + timedelta(days=rng.randrange(1, 28), minutes=rng.randrange(8 * 60, 18 * 60, 15)))
+        for _ in range(args.queries)
+    ]
+    print(f"\n{'engine':<22}{'is_free us':>12}{'next 3 free us':>16}")
+    for label, engine in engines.items():
+        engine.refresh()
+        start = time.perf_counter()
+        for doctor_id, slot in queries:
+            engine.is_free(slot, doctor_id=doctor_id)
+        is_free_us = (time.perf_counter() - start) / len(queries) * 1e6
+        start = time.perf_counter()
+        for doctor_id, slot in queries:
+            engine.next_free_slots(slot, n=3, doctor_id=doctor_id)
+        next_us = (time.perf_counter() - start) / len(queries) * 1e6
+        print(f"{label:<22}{is_free_us:12.1f}{next_us:16.1f}")
+
+    engine = engines["schedule bitmaps"]
+    mismatches = sum(
+        engine.is_free(slot, doctor_id=doctor_id) != brute_force_free(rules, exceptions, busy, doctor_id, slot)
+        for doctor_id, slot in queries
+    )
+    for doctor_id, slot in queries[:200]:
+        for found in engine.next_free_slots(slot, n=3, doctor_id=doctor_id):
+            mismatches += not (found >= slot and brute_force_free(rules, exceptions, busy, doctor_id, found))
+    print(f"\nchecked against a brute-force walk: {mismatches} mismatch(es)")
+
+    print("\navailability_text samples:")
+    for sample in SAMPLES:
+        parsed = parse_availability_text(sample)
+        days = sorted({day for day, _, _ in parsed})
+        hours = sorted({f"{s // 60:02d}:{s % 60:02d}-{e // 60:02d}:{e % 60:02d}" for _, s, e in parsed})
+        print(f"  {sample!r:<48} days {days} {', '.join(hours) or 'unparsed'}")
+
+    if mismatches:
+        print("\nFAIL")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
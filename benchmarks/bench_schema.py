@@ -0,0 +1,157 @@
+"""
+Schema benchmark: builds a synthetic appointments.db with the original
+(unindexed) schema, runs the app's hot queries, upgrades the file in place
+with app.migrations and runs them again, printing EXPLAIN QUERY PLAN and
+timings for both.
+
+Usage:
+    python benchmarks/bench_schema.py [--rows 1000000] [--db /tmp/bench_schema.db]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from sqlalchemy import create_engine
+
+from app.migrations import upgrade
+
+# Schema as created by the original app/database.py (before migrations).
+BASELINE_SCHEMA = """
+CREATE TABLE departments (id INTEGER NOT NULL, name VARCHAR NOT NULL, location VARCHAR, PRIMARY KEY (id));
+CREATE TABLE doctors (
+    id INTEGER NOT NULL, name VARCHAR NOT NULL, specialization VARCHAR, consultation_fee NUMERIC(10, 2) NOT NULL,
+    availability_text VARCHAR, department_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(department_id) REFERENCES departments (id)
+);
+CREATE TABLE appointments (
+    id INTEGER NOT NULL, doctor_id INTEGER, patient_name VARCHAR NOT NULL, patient_email VARCHAR, patient_phone VARCHAR,
+    start_time DATETIME NOT NULL, end_time DATETIME NOT NULL, status VARCHAR, notes TEXT, gcal_event_id VARCHAR,
+    source_session_id VARCHAR, created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(doctor_id) REFERENCES doctors (id)
+);
+CREATE TABLE chat_history (
+    id INTEGER NOT NULL, session_id VARCHAR NOT NULL, role VARCHAR NOT NULL, content TEXT NOT NULL, timestamp DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_chat_history_session_id ON chat_history (session_id);
+"""
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"  # SQLAlchemy's SQLite DateTime storage format
+BASE = datetime(2024, 1, 1, 9, 0)
+
+
+def build(path, rows, doctors):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(11)
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO doctors (id, name, consultation_fee) VALUES (?, ?, 100)",
+                     [(d, f"Dr. Synthetic {d}") for d in range(1, doctors + 1)])
+
+    def appointments():
+        # Each doctor gets back-to-back one-hour slots, 9 per day; 5% are cancelled.
+        for i in range(rows):
+            doctor_id = i % doctors + 1
+            slot = i // doctors
+            start = BASE + timedelta(days=slot // 9, hours=slot % 9)
+            status = "Cancelled" if rng.random() < 0.05 else "Confirmed"
+            yield (doctor_id, f"Patient {i}", f"p{i}@example.com", start.strftime(FMT),
+                   (start + timedelta(hours=1)).strftime(FMT), status, f"sess-{i // 2}")
+
+    def messages():
+        for i in range(rows):
+            yield (f"sess-{i // 10}", "user" if i % 2 == 0 else "model", "hello " * 8,
+                   (BASE + timedelta(seconds=i * 30)).strftime(FMT))
+
+    conn.executemany(
+        "INSERT INTO appointments (doctor_id, patient_name, patient_email, start_time, end_time, status, source_session_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", appointments())
+    conn.executemany("INSERT INTO chat_history (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)", messages())
+    conn.commit()
+    conn.close()
+
+
+def queries(rows, doctors):
+    # "Today" is a week before the last booked day, as for a live clinic.
+    today = BASE + timedelta(days=rows // doctors // 9 - 7)
+    mid = BASE + timedelta(days=rows // doctors // 9 // 2)
+    return {
+        "booked intervals (next 30 days)": (
+            "SELECT id, doctor_id, start_time, end_time FROM appointments "
+            "WHERE status = 'Confirmed' AND start_time < ? AND end_time > ?",
+            ((today + timedelta(days=30)).strftime(FMT), today.strftime(FMT))),
+        "one doctor, one day": (
+            "SELECT * FROM appointments WHERE doctor_id = ? AND start_time >= ? AND start_time < ? ORDER BY start_time",
+            (7, mid.strftime(FMT), (mid + timedelta(days=1)).strftime(FMT))),
+        "appointments by session": (
+            "SELECT * FROM appointments WHERE source_session_id = ?", (f"sess-{rows // 4}",)),
+        "admin chat log (latest 100)": (
+            "SELECT * FROM chat_history ORDER BY timestamp DESC LIMIT 100", ()),
+        "session transcript": (
+            "SELECT * FROM chat_history WHERE session_id = ? ORDER BY timestamp", (f"sess-{rows // 20}",)),
+    }
+
+
+def run(path, rows, doctors, repeat):
+    conn = sqlite3.connect(path)
+    for name, (sql, params) in queries(rows, doctors).items():
+        plan = "; ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"  {name:<34} {statistics.median(samples):9.3f} ms   {plan}")
+    conn.close()
+
+
+def time_guarded_insert(path, doctors, n=1000):
+    conn = sqlite3.connect(path)
+    far = BASE + timedelta(days=36500)
+    start = time.perf_counter()
+    for i in range(n):
+        s = far + timedelta(hours=i)
+        conn.execute(
+            "INSERT INTO appointments (doctor_id, patient_name, start_time, end_time, status) VALUES (?, 'x', ?, ?, 'Confirmed')",
+            (i % doctors + 1, s.strftime(FMT), (s + timedelta(hours=1)).strftime(FMT)))
+    elapsed = (time.perf_counter() - start) / n * 1000
+    conn.rollback()
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows in appointments and in chat_history")
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="/tmp/bench_schema.db")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build(args.db, args.rows, args.doctors)
+    print(f"built {args.rows} appointments + {args.rows} chat messages in {time.perf_counter() - start:.1f} s")
+
+    print(f"before migrations (insert {time_guarded_insert(args.db, args.doctors):.3f} ms/row):")
+    run(args.db, args.rows, args.doctors, args.repeat)
+
+    start = time.perf_counter()
+    applied = upgrade(create_engine(f"sqlite:///{args.db}"))
+    print(f"applied migrations {applied} in place in {time.perf_counter() - start:.1f} s")
+
+    print(f"after migrations (insert with overlap guard {time_guarded_insert(args.db, args.doctors):.3f} ms/row):")
+    run(args.db, args.rows, args.doctors, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
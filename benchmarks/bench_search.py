@@ -0,0 +1,216 @@
+"""
+Full-text search benchmark (no network, no LLM).
+
+Fills chat_history with --messages messages (default 2 million) drawn
+from a Zipf-weighted vocabulary, with a known number of planted rare
+words and phrases, through the search triggers (app/search.py), then
+reports:
+
+  - the insert overhead of the FTS triggers (a --sample fill with and
+    without them), the rebuild time and the index size;
+  - search latency (best of --repeat) for rare, phrase, common, prefix
+    and multi-word queries: the first page ranked by bm25, the first page
+    newest-first, and five ranked pages followed by cursor; plus the LIKE
+    scan that finds the rare word's messages without the index;
+  - that the match counts equal the planted counts, before and after
+    deleting a slice of sessions (as the chat archiver does), and that
+    the FTS5 integrity check passes.
+
+Exits non-zero on a wrong count or a failed integrity check.
+
+Usage:
+    python benchmarks/bench_search.py [--messages 2000000] [--sample 200000]
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"  # SQLAlchemy's SQLite DateTime storage format
+NOW = datetime(2025, 6, 1, 12, 0)
+COMMON = [
+    "the", "i", "to", "a", "for", "is", "my", "you", "appointment", "doctor", "book", "can", "on", "at", "with",
+    "please", "available", "tomorrow", "morning", "afternoon", "thanks", "slot", "friday", "monday", "email",
+    "name", "confirm", "time", "next", "week", "visit", "checkup", "follow", "up", "fever", "cough", "headache",
+]
+# (query, planted text, share of messages) - planted words appear nowhere else.
+PLANTED = [
+    ("anaphylaxis", "anaphylaxis", 0.0001),
+    ('"chest pain"', "chest pain", 0.01),
+    ("palp*", "palpitations", 0.002),
+    ("dizzy nausea", "dizzy with nausea", 0.003),
+]
+QUERIES = [("rare", "anaphylaxis"), ("phrase", '"chest pain"'), ("prefix", "palp*"), ("two words", "dizzy nausea"),
+           ("common", "appointment")]
+
+
+def messages(total, per_session, seed):
+    rng = random.Random(seed)
+    vocab = COMMON + [f"word{n}" for n in range(20_000)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))
+    planted = {query: 0 for query, _, _ in PLANTED}
+    rows = []
+    at = NOW - timedelta(days=60)
+    step = timedelta(days=60) / total
+    for n in range(total):
+        words = rng.choices(vocab, cum_weights=weights, k=rng.randint(4, 24))
+        for query, phrase, share in PLANTED:
+            if rng.random() < share:
+                words.insert(rng.randrange(len(words) + 1), phrase)
+                planted[query] += 1
+        at += step
+        rows.append((f"sess-{n // per_session:07d}", "user" if n % 2 == 0 else "model", " ".join(words), at.strftime(FMT)))
+    return rows, planted
+
+
+def fill(db_path, rows, first):
+    """
+    Inserts `rows` in 1000-row transactions (as the chat log writer
+    batches); returns (seconds for all, seconds for the first `first`).
+    """
+    conn = sqlite3.connect(db_path)
+    start, first_s = time.perf_counter(), None
+    for i in range(0, len(rows), 1000):
+        if i >= first and first_s is None:
+            first_s = time.perf_counter() - start
+        conn.executemany("INSERT INTO chat_history (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                         rows[i:i + 1000])
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed, first_s or elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2_000_000)
+    parser.add_argument("--per-session", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=200_000, help="messages for the trigger overhead comparison")
+    parser.add_argument("--delete-sessions", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_search_")
+    db_path = os.path.join(workdir, "appointments.db")
+    os.environ["APPOINTMENTS_DB_PATH"] = db_path
+    from sqlalchemy import create_engine, func, select, text
+    from app.migrations import upgrade
+    from app.pagination import keyset_page, next_cursor
+    from app import search
+
+    rows, planted = messages(args.messages, args.per_session, args.seed)
+    sample = rows[:min(args.sample, len(rows))]
+    plain_path = os.path.join(workdir, "plain.db")
+    for path in (db_path, plain_path):
+        engine = create_engine(f"sqlite:///{path}")
+        upgrade(engine)
+        engine.dispose()
+    conn = sqlite3.connect(plain_path)
+    conn.executescript("".join(f"DROP TRIGGER trg_{name}_insert;" for name in search.SEARCH_INDEXES))
+    conn.close()
+    plain_s, _ = fill(plain_path, sample, len(sample))
+    os.remove(plain_path)
+
+    fill_s, sample_s = fill(db_path, rows, len(sample))
+    print(f"{len(rows):,} messages: insert {len(rows) / fill_s:,.0f}/s with the search triggers; first "
+          f"{len(sample):,}: {len(sample) / sample_s:,.0f}/s with them, {len(sample) / plain_s:,.0f}/s without "
+          f"({(sample_s / plain_s - 1) * 100:+.0f}%)")
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    start = time.perf_counter()
+    search.rebuild(engine)
+    rebuild_s = time.perf_counter() - start
+    conn = sqlite3.connect(db_path)
+    try:
+        index_bytes = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'chat_history_fts%'").fetchone()[0]
+        size = f"index {index_bytes / 1e6:.0f} MB, "
+    except sqlite3.OperationalError:   # dbstat is optional in SQLite builds
+        size = ""
+    content_bytes = conn.execute("SELECT SUM(LENGTH(content)) FROM chat_history").fetchone()[0]
+    conn.close()
+    print(f"rebuild {rebuild_s:.1f} s; {size}text {content_bytes / 1e6:.0f} MB; "
+          f"database {os.path.getsize(db_path) / 1e6:.0f} MB")
+
+    failures = []
+    fts = search.CHAT_FTS
+
+    def count(conn, match):
+        return conn.execute(select(func.count()).select_from(fts)
+                            .where(text("chat_history_fts MATCH :m").bindparams(m=match))).scalar()
+
+    def timed_page(conn, query, sort, pages=1):
+        columns, descending = search.SEARCH_SORTS[sort](fts)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start, cursor = time.perf_counter(), None
+            for _ in range(pages):
+                stmt = keyset_page(search.chat_query(search.to_match(query)), columns, cursor=cursor,
+                                   descending=descending, limit=20)
+                page, cursor = next_cursor(conn.execute(stmt).all(), columns, 20)
+                if cursor is None:
+                    break
+            best = min(best, (time.perf_counter() - start) * 1000)
+        return best, page
+
+    print(f"\n{'query':<12}{'matches':>10}{'rank p1 ms':>12}{'recent ms':>11}{'5 ranked ms':>12}{'LIKE ms':>10}")
+    with engine.connect() as conn:
+        for label, query in QUERIES:
+            matches = count(conn, search.to_match(query))
+            rank_ms, page = timed_page(conn, query, "rank")
+            recent_ms, _ = timed_page(conn, query, "recent")
+            deep_ms, _ = timed_page(conn, query, "rank", pages=5)
+            like_ms = ""
+            if label == "rare":
+                start = time.perf_counter()
+                conn.exec_driver_sql("SELECT COUNT(*) FROM chat_history WHERE content LIKE '%anaphylaxis%'").all()
+                like_ms = f"{(time.perf_counter() - start) * 1000:.0f}"
+            print(f"{label:<12}{matches:>10,}{rank_ms:>12.2f}{recent_ms:>11.2f}{deep_ms:>12.2f}{like_ms:>10}")
+            if query in planted and matches != planted[query]:
+                failures.append(f"{query}: {matches} matches, {planted[query]} planted")
+            if page and "<mark>" not in page[0].snippet:
+                failures.append(f"{query}: snippet without a highlight")
+
+    # --- deletes (archiving) keep the index in step ---
+    doomed = {f"sess-{n:07d}" for n in range(args.delete_sessions)}
+    removed = {query: 0 for query in planted}
+    for session_id, _, content, _ in rows:
+        if session_id in doomed:
+            for query, phrase, _ in PLANTED:
+                removed[query] += content.count(phrase)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        deleted = conn.exec_driver_sql(
+            f"DELETE FROM chat_history WHERE session_id < 'sess-{args.delete_sessions:07d}'").rowcount
+    delete_s = time.perf_counter() - start
+    print(f"\ndeleted {deleted:,} messages in {delete_s:.2f} s ({deleted / max(delete_s, 1e-9):,.0f}/s)")
+    with engine.connect() as conn:
+        for query in planted:
+            matches = count(conn, search.to_match(query))
+            if matches != planted[query] - removed[query]:
+                failures.append(f"{query} after delete: {matches} matches, {planted[query] - removed[query]} expected")
+    start = time.perf_counter()
+    problems = search.check(engine)
+    print(f"integrity check {time.perf_counter() - start:.1f} s: {problems or 'ok'}")
+    if problems:
+        failures.append(f"integrity check: {problems}")
+
+    if failures:
+        print(f"\nFAIL: {failures}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Session-store benchmark: simulates many chat sessions against
+InMemorySessionService and SqliteSessionService and reports Python heap
+held by the service plus get_session/append_event latency.
+
+Usage:
+    python benchmarks/bench_session_store.py [--sessions 10000] [--turns 10] [--cache-size 1024]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from google.adk.events.event import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from app.session_store import SqliteSessionService
+from benchmarks.latency import percentile
+
+APP_NAME = "bench"
+USER_TEXT = "I have had a fever and a headache since yesterday, can I see a doctor tomorrow at 10am?"
+MODEL_TEXT = "I'm sorry to hear that. Dr. John Doe (General Physician) is available tomorrow at 10:00 AM. " \
+             "Could you please share your name and email address so I can book it?"
+
+
+def make_event(author, text):
+    return Event(author=author, invocation_id="bench", content=Content(role=author, parts=[Part(text=text)]))
+
+
+def pct(samples, q):
+    return percentile(samples, q) * 1000
+
+
+async def run(service, sessions, turns):
+    get_ms, append_ms = [], []
+    for s in range(sessions):
+        await service.create_session(app_name=APP_NAME, user_id=f"user_{s}", session_id=f"s{s}")
+
+    # Round-robin over sessions, like many concurrent chats taking turns.
+    for turn in range(turns):
+        for s in range(sessions):
+            t0 = time.perf_counter()
+            session = await service.get_session(app_name=APP_NAME, user_id=f"user_{s}", session_id=f"s{s}")
+            get_ms.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            await service.append_event(session, make_event("user", USER_TEXT))
+            await service.append_event(session, make_event("model", MODEL_TEXT))
+            append_ms.append((time.perf_counter() - t0) / 2)
+    return get_ms, append_ms
+
+
+def measure(name, factory, sessions, turns):
+    # Latency pass first: tracemalloc slows every allocation down several-fold.
+    get_ms, append_ms = asyncio.run(run(factory(), sessions, turns))
+
+    gc.collect()
+    tracemalloc.start()
+    service = factory()
+    asyncio.run(run(service, sessions, turns))
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<32} heap {held / 2**20:7.1f} MiB   "
+          f"get p50 {pct(get_ms, 50):6.3f} ms p99 {pct(get_ms, 99):6.3f} ms   "
+          f"append p50 {pct(append_ms, 50):6.3f} ms p99 {pct(append_ms, 99):6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--max-events", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.turns} turns (2 events per turn)")
+    measure("InMemorySessionService", InMemorySessionService, args.sessions, args.turns)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = iter(os.path.join(tmp, f"sessions{i}.db") for i in range(2))
+        measure(
+            f"SqliteSessionService (lru={args.cache_size})",
+            lambda: SqliteSessionService(next(paths), cache_size=args.cache_size, max_events=args.max_events),
+            args.sessions, args.turns,
+        )
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        print(f"sessions.db on disk: {size / 2 / 2**20:.1f} MiB per run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Multi-worker load test: the app served by 1, 2, 4 and 8 uvicorn worker
+processes sharing one appointments.db (WAL).
+
+Builds a synthetic database (see bench_schema.py), then for each worker
+count starts `uvicorn app.main:app --workers N`, waits until N distinct
+processes answer, and drives it for --seconds with --concurrency client
+connections on requests that never reach the LLM:
+
+  - POST /chat with a rule-routed question (catalog read + chat log write)
+  - GET /api/admin/appointments (first page)
+  - GET /api/admin/dashboard (materialized counters)
+
+Reports requests/s, p50/p99 latency and errors per worker count. With two
+or more workers it also checks that exactly one worker holds the calendar
+sync lease, and commits a doctor change from this process and times how
+long until every worker has seen it (/api/admin/worker_sync).
+
+Throughput only scales up to the CPU cores available, which the load
+generator shares. To show where the ceiling is, each run also reports
+the CPU cores the server processes and the load generator kept busy
+(from /proc, on Linux), against the cores the machine actually delivers
+(timed busy loops, since a VM may give less than os.cpu_count()); when
+together they use all of it, the run is CPU-bound and more workers
+cannot add throughput. Exits non-zero on request errors, a missing or shared
+lease, or a worker that never sees the change.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1,2,4,8] [--seconds 10] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+from benchmarks.latency import percentiles
+
+ROUTED_QUESTIONS = [
+    "hello", "Which doctors do you have?", "What are the consultation fees?", "Where is Cardiology located?",
+    "What are Dr. Sarah Smith's timings?",
+]
+
+
+def start_server(workers, port, env, log):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=project_root, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def _spin(seconds):
+    start, cpu = time.perf_counter(), time.process_time()
+    while time.perf_counter() - start < seconds:
+        pass
+    return (time.process_time() - cpu) / (time.perf_counter() - start)
+
+
+def usable_cores(seconds=1.0):
+    """CPU cores the machine delivers to one busy process per core."""
+    with multiprocessing.Pool(os.cpu_count()) as pool:
+        return sum(pool.map(_spin, [seconds] * os.cpu_count()))
+
+
+def tree_cpu_seconds(pid):
+    """User + system CPU seconds used so far by `pid` and its live descendants; None without /proc."""
+    ticks = os.sysconf("SC_CLK_TCK")
+    total, pending = 0, [pid]
+    while pending:
+        child = pending.pop()
+        try:
+            with open(f"/proc/{child}/stat") as f:
+                fields = f.read().rpartition(")")[2].split()
+            with open(f"/proc/{child}/task/{child}/children") as f:
+                pending.extend(int(c) for c in f.read().split())
+        except FileNotFoundError:
+            if child == pid:
+                return None
+            continue  # exited in between
+        total += int(fields[11]) + int(fields[12])   # utime, stime
+    return total / ticks
+
+
+async def worker_stats(base_url, workers, timeout=180):
+    """/api/admin/worker_sync from every worker: fresh connections until N distinct pids answered."""
+    seen = {}
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        while len(seen) < workers and time.monotonic() < deadline:
+            try:
+                res = await client.get("/api/admin/worker_sync", headers={"Connection": "close"})
+                res.raise_for_status()
+                stats = res.json()
+                seen[stats["pid"]] = stats
+            except httpx.HTTPError:
+                await asyncio.sleep(0.5)
+    return seen
+
+
+async def drive(base_url, seconds, concurrency, seed):
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        async def one_client(n):
+            nonlocal errors
+            session_id = f"load-{seed}-{n}"
+            while time.monotonic() < deadline:
+                pick = rng.random()
+                start = time.perf_counter()
+                try:
+                    if pick < 0.5:
+                        res = await client.post("/chat", json={"session_id": session_id,
+                                                               "text": rng.choice(ROUTED_QUESTIONS)})
+                    elif pick < 0.8:
+                        res = await client.get("/api/admin/appointments", params={"limit": 50})
+                    else:
+                        res = await client.get("/api/admin/dashboard")
+                    res.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except httpx.HTTPError:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_client(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return len(latencies), errors, elapsed, latencies
+
+
+async def propagation_seconds(base_url, workers, change, timeout=30):
+    """Commits `change()` and waits until every worker reports a remote change to `doctors`."""
+    before = {pid: s["remote_changes"].get("doctors", 0) for pid, s in (await worker_stats(base_url, workers)).items()}
+    start = time.perf_counter()
+    change()
+    pending = set(before)
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        while pending and time.perf_counter() - start < timeout:
+            res = await client.get("/api/admin/worker_sync", headers={"Connection": "close"})
+            stats = res.json()
+            if stats["pid"] in pending and stats["remote_changes"].get("doctors", 0) > before[stats["pid"]]:
+                pending.discard(stats["pid"])
+    return None if pending else time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rows", type=int, default=100_000, help="synthetic appointments")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    workdir = tempfile.mkdtemp(prefix="bench_workers_")
+    db_path = os.path.join(workdir, "appointments.db")
+    os.environ["APPOINTMENTS_DB_PATH"] = db_path
+    from benchmarks.bench_schema import build
+    build(db_path, args.rows, args.doctors)
+
+    from app.database import engine, SessionLocal, Doctor
+    from app.migrations import upgrade
+    upgrade(engine)
+
+    def change_a_doctor():
+        with SessionLocal() as db:
+            doctor = db.query(Doctor).first()
+            doctor.consultation_fee = float(doctor.consultation_fee) + 1
+            db.commit()
+
+    env = {
+        **os.environ,
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+        "CALENDAR_SYNC_INTERVAL": "5",
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "PYTHONPATH": str(project_root),
+    }
+    cores = usable_cores()
+    print(f"{os.cpu_count()} CPU(s), {cores:.2f} usable; {args.concurrency} connections for {args.seconds:.0f} s per run; log in {workdir}\n")
+    print(f"{'workers':>7}{'req/s':>10}{'speedup':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+          f"{'srv cpu':>9}{'load cpu':>9}  cross-worker checks")
+    failures, baseline, busiest = [], None, 0.0
+    with open(os.path.join(workdir, "server.log"), "w") as log:
+        for workers in (int(w) for w in args.workers.split(",")):
+            server = start_server(workers, args.port, env, log)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                stats = asyncio.run(worker_stats(base_url, workers))
+                if len(stats) < workers:
+                    failures.append(f"only {len(stats)} of {workers} workers came up")
+                    continue
+                server_cpu, load_cpu = tree_cpu_seconds(server.pid), time.process_time()
+                ok, errors, elapsed, latencies = asyncio.run(drive(base_url, args.seconds, args.concurrency, workers))
+                load_cores = (time.process_time() - load_cpu) / elapsed
+                server_cores = server_cpu and (tree_cpu_seconds(server.pid) - server_cpu) / elapsed
+                cpu = f"{server_cores:>9.2f}" if server_cores is not None else f"{'-':>9}"
+                busiest = max(busiest, (server_cores or 0) + load_cores)
+                rate = ok / elapsed
+                baseline = baseline or rate
+                p50, p99 = percentiles(latencies, 50, 99)
+
+                checks = ""
+                if workers > 1:
+                    holders = sum(s["calendar_sync_lease"] for s in asyncio.run(worker_stats(base_url, workers)).values())
+                    seconds = asyncio.run(propagation_seconds(base_url, workers, change_a_doctor))
+                    checks = (f"lease held by {holders}; doctor change seen by all in "
+                              f"{'never' if seconds is None else f'{seconds:.2f} s'}")
+                    if holders != 1:
+                        failures.append(f"{workers} workers: calendar sync lease held by {holders}")
+                    if seconds is None:
+                        failures.append(f"{workers} workers: a worker never saw the doctor change")
+                if errors:
+                    failures.append(f"{workers} workers: {errors} request errors")
+                print(f"{workers:>7}{rate:>10.0f}{rate / baseline:>8.2f}x{p50:>9.1f}{p99:>9.1f}"
+                      f"{errors:>8}{cpu}{load_cores:>9.2f}  {checks}")
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+
+    if busiest >= 0.9 * cores:
+        print(f"\nCPU-bound: server and load generator kept {busiest:.2f} of {cores:.2f} usable core(s) busy, "
+              f"so adding workers cannot raise throughput on this machine.")
+    if failures:
+        print(f"\nFAIL: {failures}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
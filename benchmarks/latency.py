@@ -0,0 +1,21 @@
+"""
+Latency percentiles for the benchmark tables.
+
+Nearest-rank: the p-th percentile is the smallest sample with at least
+p% of the samples at or below it. Every reported value is one that was
+actually observed, so p99 can never exceed the max (statistics.quantiles'
+default "exclusive" method extrapolates past it on small runs).
+"""
+import math
+
+
+def percentiles(samples, *pcts):
+    """Nearest-rank percentiles of `samples`, one per entry of `pcts` (0.0 each when there are none)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return [0.0] * len(pcts)
+    return [ordered[min(max(math.ceil(p / 100 * len(ordered)), 1), len(ordered)) - 1] for p in pcts]
+
+
+def percentile(samples, pct):
+    return percentiles(samples, pct)[0]
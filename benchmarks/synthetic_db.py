@@ -0,0 +1,185 @@
+"""
+Synthetic clinic for end-to-end runs: departments, doctors with distinct
+names, weekly schedules and per-doctor calendars, and a booked share of
+the coming days, written to a fresh appointments.db at the latest schema.
+
+Unlike bench_schema.py (a large history in the original schema, for query
+plans), everything here is in the availability window, so availability
+checks and bookings see a realistically busy diary. The same seed gives
+the same clinic.
+
+Usage:
+    python benchmarks/synthetic_db.py --db /tmp/clinic.db [--doctors 40] [--days 14] [--fill 0.3]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"  # SQLAlchemy's SQLite DateTime storage format
+
+DEPARTMENTS = [
+    ("Cardiology", "Wing A, Floor 2", ["Cardiologist", "Interventional Cardiologist"]),
+    ("General Medicine", "Wing B, Floor 1", ["General Physician", "Family Physician"]),
+    ("Dermatology", "Wing C, Floor 1", ["Dermatologist"]),
+    ("Orthopedics", "Wing A, Floor 3", ["Orthopedic Surgeon", "Sports Medicine Specialist"]),
+    ("Pediatrics", "Wing D, Floor 1", ["Pediatrician"]),
+    ("Neurology", "Wing A, Floor 4", ["Neurologist"]),
+    ("ENT", "Wing C, Floor 2", ["ENT Specialist"]),
+    ("Gynecology", "Wing D, Floor 2", ["Gynecologist", "Obstetrician"]),
+]
+FIRST_NAMES = [
+    "Aarav", "Meera", "Rohan", "Priya", "Vikram", "Ananya", "Karan", "Isha", "Arjun", "Kavya", "Nikhil", "Sneha",
+    "Rahul", "Divya", "Sanjay", "Pooja", "Aditya", "Neha", "Manish", "Ritu", "Sarah", "David", "Emily", "James",
+]
+LAST_NAMES = [
+    "Sharma", "Patel", "Iyer", "Reddy", "Menon", "Gupta", "Nair", "Kapoor", "Joshi", "Banerjee", "Desai", "Kulkarni",
+    "Chatterjee", "Rao", "Singh", "Verma", "Mehta", "Pillai", "Bose", "Malhotra", "Fernandes", "Thomas",
+]
+# (weekdays, start hour, end hour, slot minutes, availability_text)
+SCHEDULES = [
+    (range(0, 5), 9, 17, 60, "Mon-Fri 9am-5pm"),
+    (range(0, 6), 10, 18, 30, "Mon-Sat 10am-6pm"),
+    ((0, 2, 4), 9, 13, 20, "Mon, Wed, Fri 9am-1pm"),
+    (range(1, 6), 14, 20, 30, "Tue-Sat 2pm-8pm"),
+]
+REASONS = ["Routine checkup", "Follow-up visit", "Persistent cough", "Back pain", "Skin rash", "Headaches",
+           "Chest discomfort", "Vaccination", "Knee injury", "Ear infection"]
+
+
+@dataclass
+class SyntheticDoctor:
+    id: int
+    name: str
+    department: str
+    specialization: str
+    calendar_id: str
+    weekdays: tuple
+    start_minute: int
+    end_minute: int
+    slot_minutes: int
+
+    def slot_starts(self, day):
+        """Every slot start of `day` under this doctor's weekly rule (none on days off)."""
+        if day.weekday() not in self.weekdays:
+            return []
+        midnight = datetime(day.year, day.month, day.day)
+        return [midnight + timedelta(minutes=m)
+                for m in range(self.start_minute, self.end_minute - self.slot_minutes + 1, self.slot_minutes)]
+
+
+@dataclass
+class SyntheticClinic:
+    doctors: list
+    first_day: date
+    days: int
+    appointments: int = 0
+    calendar_events: int = 0
+    departments: list = field(default_factory=lambda: [d[0] for d in DEPARTMENTS])
+
+    def day(self, n):
+        return self.first_day + timedelta(days=n)
+
+
+def build(path, doctors=40, days=14, fill=0.3, seed=7, first_day=None, calendar=None):
+    """
+    Creates `path` from scratch and returns the SyntheticClinic written to it.
+
+    `fill` is the share of slots already booked (as appointments) in the
+    `days` days from `first_day` (default tomorrow). If `calendar` is a
+    FakeCalendarService, every doctor's calendar is registered on it and a
+    further fill/3 of their slots are blocked there as outside events.
+    """
+    from sqlalchemy import create_engine
+    from app.migrations import upgrade
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(seed)
+    first_day = first_day or date.today() + timedelta(days=1)
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade(engine)
+    engine.dispose()
+
+    names = [f"Dr. {first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    if doctors > len(names):
+        raise ValueError(f"at most {len(names)} synthetic doctors")
+    rng.shuffle(names)
+    clinic = SyntheticClinic(doctors=[], first_day=first_day, days=days)
+
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO departments (id, name, location) VALUES (?, ?, ?)",
+                     [(i, name, location) for i, (name, location, _) in enumerate(DEPARTMENTS, 1)])
+    for doctor_id in range(1, doctors + 1):
+        department_id = rng.randrange(len(DEPARTMENTS)) + 1
+        department, _, specializations = DEPARTMENTS[department_id - 1]
+        weekdays, start_hour, end_hour, slot, text = SCHEDULES[rng.randrange(len(SCHEDULES))]
+        doctor = SyntheticDoctor(
+            id=doctor_id, name=names[doctor_id - 1], department=department,
+            specialization=rng.choice(specializations), calendar_id=f"doctor-{doctor_id}@calendar.rugas.example",
+            weekdays=tuple(weekdays), start_minute=start_hour * 60, end_minute=end_hour * 60, slot_minutes=slot,
+        )
+        clinic.doctors.append(doctor)
+        conn.execute(
+            "INSERT INTO doctors (id, name, specialization, consultation_fee, availability_text, department_id, "
+            "calendar_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (doctor.id, doctor.name, doctor.specialization, rng.choice((60, 80, 100, 120, 150, 200)), text,
+             department_id, doctor.calendar_id))
+        conn.executemany(
+            "INSERT INTO schedule_rules (doctor_id, weekday, start_minute, end_minute, slot_minutes) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(doctor.id, weekday, doctor.start_minute, doctor.end_minute, slot) for weekday in doctor.weekdays])
+        if calendar is not None:
+            calendar.add_calendar(doctor.calendar_id)
+
+    def appointments():
+        for doctor in clinic.doctors:
+            for n in range(days):
+                for start in doctor.slot_starts(clinic.day(n)):
+                    end = start + timedelta(minutes=doctor.slot_minutes)
+                    pick = rng.random()
+                    if pick < fill:
+                        clinic.appointments += 1
+                        i = clinic.appointments
+                        yield (doctor.id, f"Patient {i}", f"patient{i}@example.com", start.strftime(FMT),
+                               end.strftime(FMT), "Confirmed", rng.choice(REASONS), f"synthetic-{i}")
+                    elif calendar is not None and pick < fill * 4 / 3:
+                        clinic.calendar_events += 1
+                        calendar.add_event(f"{start.isoformat()}+05:30", f"{end.isoformat()}+05:30",
+                                           calendar_id=doctor.calendar_id)
+
+    conn.executemany(
+        "INSERT INTO appointments (doctor_id, patient_name, patient_email, start_time, end_time, status, notes, "
+        "source_session_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", appointments())
+    conn.commit()
+    conn.close()
+    return clinic
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--doctors", type=int, default=40)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--fill", type=float, default=0.3, help="share of slots already booked")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # app.database reads the path at import time, so set it before any app import.
+    os.environ["APPOINTMENTS_DB_PATH"] = args.db
+    clinic = build(args.db, args.doctors, args.days, args.fill, args.seed)
+    print(f"{args.db}: {len(clinic.doctors)} doctors in {len(clinic.departments)} departments, "
+          f"{clinic.appointments} appointments from {clinic.first_day} over {clinic.days} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 from app.database import seed_database
+from app.migrations import upgrade
 
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    upgrade()
+    seed_database()
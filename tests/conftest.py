@@ -0,0 +1,51 @@
+"""
+Test setup. app.database and app.session_store bind to APPOINTMENTS_DB_PATH
+and SESSION_DB_PATH when first imported, so point both at scratch files
+before any test module imports the app: the suite never touches the repo's
+databases. LiteLLM is kept from fetching its cost map at import.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.append(str(project_root))
+
+_scratch = tempfile.mkdtemp(prefix="appointments_tests_")
+os.environ["APPOINTMENTS_DB_PATH"] = os.path.join(_scratch, "appointments.db")
+os.environ["SESSION_DB_PATH"] = os.path.join(_scratch, "sessions.db")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+
+@pytest.fixture
+def fresh_db():
+    """An empty, fully migrated appointments database; returns app.database."""
+    from app import database
+    from app.migrations import upgrade
+
+    database.engine.dispose()
+    database.write_engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        path = os.environ["APPOINTMENTS_DB_PATH"] + suffix
+        if os.path.exists(path):
+            os.remove(path)
+    upgrade(database.engine)
+    database.doctor_index.invalidate()
+    yield database
+    database.engine.dispose()
+    database.write_engine.dispose()
+
+
+@pytest.fixture
+def client(fresh_db):
+    """TestClient over the app without its lifespan: no background tasks, just the endpoints."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    yield TestClient(app)
+    asyncio.run(fresh_db.async_engine.dispose())
@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.chat_log import ChatLogWriter
+from app.session_store import SqliteSessionService
+
+NOW = datetime(2030, 6, 1, 12, 0)
+
+
+def chat_rows(database):
+    with database.engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT COUNT(*) FROM chat_history").scalar()
+
+
+def test_chat_turn_leaves_the_write_to_the_chat_log_writer(client, fresh_db, tmp_path, monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main, "session_service", SqliteSessionService(str(tmp_path / "sessions.db")))
+    monkeypatch.setattr(main, "chat_log_writer", ChatLogWriter())
+    response = client.post("/chat", json={"text": "Hello!", "session_id": "chat-1"})
+    assert response.status_code == 200
+    reply = response.json()["response"]
+
+    # Queued for the background batch writer; nothing was committed on the event loop.
+    assert chat_rows(fresh_db) == 0
+    queue = main.chat_log_writer.queue
+    assert [(row["session_id"], row["role"], row["content"]) for row in (queue.get_nowait() for _ in range(2))] == [
+        ("chat-1", "user", "Hello!"), ("chat-1", "model", reply)
+    ]
+
+
+def test_admin_reads_do_not_wait_for_a_writer(client, fresh_db):
+    db = fresh_db.SessionLocal()
+    for i in range(4):
+        db.add(fresh_db.ChatHistory(session_id="s1", role="user" if i % 2 == 0 else "model",
+                                    content=f"message {i}", timestamp=NOW + timedelta(minutes=i)))
+    db.commit()
+    db.close()
+
+    with fresh_db.write_engine.connect() as writer:
+        writer.execute(text("INSERT INTO chat_history (session_id, role, content, timestamp) "
+                            "VALUES ('s2', 'user', 'uncommitted', '2030-06-01 13:00:00')"))
+        started = time.perf_counter()
+        logs = client.get("/api/admin/chat_history", params={"role": "user"}).json()
+        dashboard = client.get("/api/admin/dashboard").json()
+        appointments = client.get("/api/admin/appointments").json()
+        assert time.perf_counter() - started < 1
+        writer.rollback()
+
+    # The readers see the last committed state, newest first.
+    assert [m["content"] for m in logs["items"]] == ["message 2", "message 0"]
+    assert dashboard["stats"]["appointments"] == 0
+    assert appointments == {"items": [], "next_cursor": None}
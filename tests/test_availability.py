@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from app.tools.availability import AvailabilityEngine, BusyIndex
+
+NOW = datetime(2030, 1, 7, 8, 0)   # a Monday, before opening
+
+
+def engine_with(bookings=(), events=(), now=NOW):
+    """AvailabilityEngine over fixed intervals; `bookings` are (doctor_id, start, end)."""
+    booked = [(n, doctor_id, start, end) for n, (doctor_id, start, end) in enumerate(bookings, 1)]
+    return AvailabilityEngine(
+        load_events=lambda start, end: [(s, e, None) for s, e in events],
+        load_bookings=lambda start, end: booked,
+        clock=lambda: now,
+    )
+
+
+def at(day, hour, minute=0):
+    return datetime(2030, 1, day, hour, minute)
+
+
+def test_busy_index_merges_touching_intervals():
+    index = BusyIndex([(at(7, 10), at(7, 11)), (at(7, 11), at(7, 12))])
+    assert len(index) == 1
+    assert index.conflict(at(7, 11), at(7, 11, 30)) == at(7, 12)
+    assert index.is_free(at(7, 12), at(7, 13))
+    assert index.is_free(at(7, 9), at(7, 10))
+
+
+def test_busy_index_add_bridges_gap():
+    index = BusyIndex([(at(7, 9), at(7, 10)), (at(7, 12), at(7, 13))])
+    index.add(at(7, 10), at(7, 12))
+    assert index.between(at(7, 0), at(8, 0)) == [(at(7, 9), at(7, 13))]
+
+
+def test_back_to_back_bookings_are_skipped_together():
+    engine = engine_with(bookings=[(1, at(7, 9), at(7, 10)), (1, at(7, 10), at(7, 11))])
+    assert engine.next_free_slots(NOW, n=2, doctor_id=1) == [at(7, 11), at(7, 12)]
+    # Another doctor is not blocked by them.
+    assert engine.next_free_slots(NOW, n=1, doctor_id=2) == [at(7, 9)]
+
+
+def test_booking_spanning_midnight_blocks_next_morning():
+    engine = engine_with(events=[(at(7, 17), at(8, 10))])
+    assert engine.next_free_slots(at(7, 16), n=2) == [at(7, 16), at(8, 10)]
+    assert engine.busy_on(at(8, 0).date()) == [(at(7, 17), at(8, 10))]   # intervals overlapping the day
+
+
+def test_slot_earlier_today_is_never_offered():
+    now = at(7, 14, 30)
+    engine = engine_with(now=now)
+    assert engine.next_free_slots(at(7, 9), n=2) == [at(7, 15), at(7, 16)]
+
+
+def test_last_slot_of_the_day_rolls_to_next_opening():
+    engine = engine_with(now=at(7, 17, 10))
+    assert engine.next_free_slots(at(7, 17, 10), n=1) == [at(8, 9)]
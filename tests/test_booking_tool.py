@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from google.adk.runners import Runner
+from google.genai.types import Content, Part
+
+from app.session_store import SqliteSessionService
+
+DAY = datetime.now() + timedelta(days=10)
+WHEN = DAY.replace(hour=10, minute=0, second=0, microsecond=0).isoformat()
+
+
+@pytest.fixture
+def agent(fresh_db, tmp_path):
+    from app.scheduling_agent.agent import root_agent
+    from app.scheduling_agent.fake_llm import ScriptedLlm
+    from app.tools.calendar_client import calendar_clients
+    from app.tools.fake_calendar import FakeCalendarService
+
+    db = fresh_db.SessionLocal()
+    db.add(fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=100))
+    db.commit()
+    db.close()
+    fresh_db.doctor_index.invalidate()
+    calendar_clients.use_service(FakeCalendarService())
+    model, root_agent.model = root_agent.model, ScriptedLlm()
+    yield Runner(agent=root_agent, app_name="test", session_service=SqliteSessionService(str(tmp_path / "s.db")))
+    root_agent.model = model
+
+
+def test_booking_records_the_chat_session(fresh_db, agent):
+    from app.scheduling_agent.tools import SESSION_ID_STATE_KEY
+
+    async def turn():
+        await agent.session_service.create_session(app_name="test", user_id="u", session_id="chat-1")
+        text = f"Book Dr. Asha Rao at {WHEN} for Ravi Kumar <ravi@example.com>, reason: checkup"
+        async for _ in agent.run_async(user_id="u", session_id="chat-1",
+                                       new_message=Content(role="user", parts=[Part(text=text)]),
+                                       state_delta={SESSION_ID_STATE_KEY: "chat-1"}):
+            pass
+
+    asyncio.run(turn())
+    db = fresh_db.SessionLocal()
+    appointments = db.query(fresh_db.Appointment.patient_name, fresh_db.Appointment.source_session_id).all()
+    db.close()
+    assert appointments == [("Ravi Kumar", "chat-1")]
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+import time
+
+import httplib2
+
+from app.tools.calendar_client import CalendarClientManager, list_upcoming_events
+
+
+class Token:
+    """Credentials stand-in: refresh() hands out token-1, token-2, ..."""
+
+    def __init__(self):
+        self.token = "token-0"
+        self.expiry = None
+        self.refresh_token = None
+        self.refreshes = 0
+
+    @property
+    def valid(self):
+        return True
+
+    def refresh(self, request):
+        time.sleep(0.05)
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+
+    def before_request(self, request, method, url, headers):
+        headers["authorization"] = f"Bearer {self.token}"
+
+
+class Http:
+    """httplib2.Http stand-in answering events.list; rejects `reject` tokens with a 401."""
+
+    def __init__(self, log, reject=()):
+        self.log = log
+        self.reject = reject
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        token = headers["authorization"].removeprefix("Bearer ")
+        self.log.append((threading.current_thread().name, token))
+        if token in self.reject:
+            return httplib2.Response({"status": 401}), b"{}"
+        return httplib2.Response({"status": 200}), json.dumps({"items": [{"summary": token}]}).encode()
+
+
+def manager(log, loads=None, reject=(), token=None, **kwargs):
+    token = token or Token()
+
+    def loader():
+        if loads is not None:
+            loads.append(1)
+        return token
+    return CalendarClientManager(credentials_loader=loader, http_factory=lambda: Http(log, reject),
+                                 token_path=None, **kwargs)
+
+
+def test_nothing_is_loaded_until_first_use_and_then_once():
+    loads = []
+    clients = manager([], loads)
+    assert loads == []
+    threads = [threading.Thread(target=clients.credentials) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == [1]
+
+
+def test_run_uses_a_bounded_pool_with_one_service_per_thread():
+    log = []
+    clients = manager(log, max_workers=2)
+
+    async def calls():
+        return await asyncio.gather(*(clients.run(list_upcoming_events) for _ in range(10)))
+    services = []
+    for _ in range(3):
+        services.append(asyncio.run(clients.run(lambda service: service)))
+    assert len(asyncio.run(calls())) == 10
+    threads = {name for name, _ in log}
+    assert len(threads) <= 2 and all(name.startswith("calendar") for name in threads)
+    assert len({id(s) for s in services}) <= 2
+    clients.close()
+
+
+def test_rejected_token_is_refreshed_once_for_all_threads():
+    log, token = [], Token()
+    clients = manager(log, reject={"token-0"}, token=token, max_workers=4)
+
+    async def calls():
+        return await asyncio.gather(*(clients.run(list_upcoming_events) for _ in range(4)))
+    results = asyncio.run(calls())
+    assert token.refreshes == 1
+    assert all(events == [{"summary": "token-1"}] for events in results)
+    clients.close()
+
+
+def test_stale_refresh_is_skipped():
+    token = Token()
+    clients = manager([], token=token)
+    assert clients.refresh(None, stale_token="token-0")
+    assert not clients.refresh(None, stale_token="token-0")     # someone already replaced it
+    assert token.refreshes == 1
+
+
+def test_use_service_overrides_every_thread():
+    clients = manager([])
+    fake = object()
+    clients.use_service(fake)
+    assert asyncio.run(clients.run(lambda service: service)) is fake
+    clients.use_service(None)
+    assert asyncio.run(clients.run(lambda service: service)) is not fake
+    clients.close()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.event_hub import event_hub
+from app.reservations import SlotReservations
+from app.tools.calendar_outbox import CalendarOutbox
+from app.tools.fake_calendar import FakeCalendarService
+from app.tools.tool_cache import tool_cache
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+class Calendar:
+    """run_calendar over FakeCalendarService; `failing` makes every call raise."""
+
+    def __init__(self, failing=False):
+        self.service = FakeCalendarService()
+        self.failing = failing
+
+    async def run(self, fn, *args, **kwargs):
+        if self.failing:
+            raise TimeoutError("simulated Calendar API failure")
+        return await asyncio.to_thread(fn, self.service, *args, **kwargs)
+
+
+@pytest.fixture
+def booking(fresh_db):
+    db = fresh_db.SessionLocal()
+    db.add(fresh_db.Doctor(name="Dr. Test Doctor", consultation_fee=100))
+    db.commit()
+    db.close()
+    fresh_db.doctor_index.invalidate()
+    return asyncio.run(SlotReservations().book("Patient alice", "alice@example.com", "Dr. Test Doctor", START,
+                                               START + timedelta(hours=1), "checkup"))
+
+
+def appointment_events(since):
+    return [data for seq, event_type, data in list(event_hub._buffer)
+            if seq > since and event_type == "appointment" and data["op"] == "updated"]
+
+
+def stored(database, appointment_id):
+    db = database.SessionLocal()
+    try:
+        return db.get(database.Appointment, appointment_id)
+    finally:
+        db.close()
+
+
+def test_delivery_marks_synced_and_publishes_it(fresh_db, booking):
+    calls = []
+    cached = tool_cache.cached("test_outbox_appointments", depends_on=("appointments",))(lambda: calls.append(1))
+    cached()
+    seq = event_hub._seq
+    outbox = CalendarOutbox(Calendar().run)
+    assert asyncio.run(outbox.drain_once()) == 1
+
+    appointment = stored(fresh_db, booking.appointment_id)
+    assert (appointment.gcal_event_id, appointment.calendar_status) == (booking.event_id, "synced")
+    assert [e["calendar_status"] for e in appointment_events(seq)] == ["synced"]
+    cached()   # the commit cleared the appointments-dependent cache
+    assert len(calls) == 2
+
+
+def test_failure_backs_off_then_flags_the_appointment(fresh_db, booking):
+    outbox = CalendarOutbox(Calendar(failing=True).run, base_backoff_seconds=0, max_attempts=2)
+    asyncio.run(outbox.drain_once())
+    assert outbox.stats()["pending"] == 1 and outbox.retried == 1
+    assert stored(fresh_db, booking.appointment_id).calendar_status != "failed"
+
+    seq = event_hub._seq
+    asyncio.run(outbox.drain_once())
+    assert outbox.stats()["failed"] == 1 and outbox.failed == 1
+    assert stored(fresh_db, booking.appointment_id).calendar_status == "failed"
+    assert [e["calendar_status"] for e in appointment_events(seq)] == ["failed"]
+
+
+def test_stats_read_while_a_writer_holds_the_lock(fresh_db, booking):
+    writer = fresh_db.WriteSessionLocal()
+    writer.connection()   # BEGIN IMMEDIATE: holds SQLite's write lock
+    try:
+        outbox = CalendarOutbox(Calendar().run)
+        started = time.monotonic()
+        assert outbox.stats()["pending"] == 1
+        assert time.monotonic() - started < 1   # not queued behind the writer's busy_timeout
+    finally:
+        writer.rollback()
+        writer.close()
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import CalendarEvent
+from app.tools.calendar_client import IST
+from app.tools.calendar_sync import CalendarSync
+from app.tools.fake_calendar import FakeCalendarService
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    service = FakeCalendarService()
+    yield service, CalendarSync(lambda: service, session_factory=sessionmaker(bind=engine), page_size=10)
+    engine.dispose()
+
+
+def add_events(service, count, first):
+    starts = [first + timedelta(hours=n) for n in range(count)]
+    return [service.add_event(start.isoformat(), (start + timedelta(minutes=30)).isoformat())['id'] for start in starts]
+
+
+def tomorrow():
+    return datetime.now(IST).replace(tzinfo=None, hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+def test_events_between_never_calls_the_api(mirror):
+    service, sync = mirror
+    add_events(service, 3, tomorrow())
+    assert sync.events_between(tomorrow(), tomorrow() + timedelta(days=1)) == []
+    assert sum(service.calls.values()) == 0
+
+
+def test_incremental_sync_applies_deletes(mirror):
+    service, sync = mirror
+    ids = add_events(service, 25, tomorrow())
+    assert sync.sync() == 25
+    service.delete_event(ids[0])
+    calls = service.calls['events.list']
+    assert sync.sync() == 1
+    assert service.calls['events.list'] == calls + 1
+    assert len(sync.events_between(tomorrow(), tomorrow() + timedelta(days=2))) == 24
+
+
+def test_expired_sync_token_falls_back_to_full_resync(mirror):
+    service, sync = mirror
+    ids = add_events(service, 25, tomorrow())
+    sync.sync()
+    service.delete_event(ids[0])
+    service.expire_sync_tokens()
+    calls = service.calls['events.list']
+    assert sync.sync() == 24
+    # One 410 answer, then three pages of the full list.
+    assert service.calls['events.list'] == calls + 4
+    starts = [start for start, _, _ in sync.events_between(tomorrow(), tomorrow() + timedelta(days=2))]
+    assert len(starts) == 24 and tomorrow() not in starts
+    assert sync.sync() == 0   # back on incremental syncs
+
+
+def test_sync_prunes_events_past_the_lookback(mirror):
+    service, sync = mirror
+    add_events(service, 1, tomorrow())
+    sync.sync()
+    db = sync.session_factory()
+    old = tomorrow() - timedelta(days=5)
+    db.add(CalendarEvent(id="old", calendar_id="primary", start_time=old, end_time=old + timedelta(minutes=30)))
+    db.commit()
+    sync.sync()
+    assert len(sync.events_between(tomorrow(), tomorrow() + timedelta(days=1))) == 1
+    assert db.query(CalendarEvent).filter(CalendarEvent.id == "old").count() == 0
+    db.close()
+
+
+def test_background_task_syncs_right_away(mirror):
+    service, sync = mirror
+    add_events(service, 3, tomorrow())
+
+    async def start_then_stop():
+        task = asyncio.create_task(sync.run_periodically(interval_seconds=3600))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if service.calls['events.list']:
+                break
+        task.cancel()
+
+    asyncio.run(start_then_stop())
+    assert len(sync.events_between(tomorrow(), tomorrow() + timedelta(days=1))) == 3
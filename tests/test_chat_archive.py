@@ -0,0 +1,98 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import chat_sessions
+from app.chat_archive import ChatArchiver
+
+NOW = datetime(2030, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def archiver(fresh_db, tmp_path):
+    return ChatArchiver(archive_path=str(tmp_path / "chat_archive.db"), bind=fresh_db.engine,
+                        archive_after_days=30, retention_days=365, batch_sessions=2)
+
+
+def say(database, session_id, *days_ago):
+    db = database.SessionLocal()
+    for i, days in enumerate(days_ago):
+        role = "user" if i % 2 == 0 else "assistant"
+        db.add(database.ChatHistory(session_id=session_id, role=role, content=f"{session_id} {i}",
+                                    timestamp=NOW - timedelta(days=days, minutes=-i)))
+    db.commit()
+    db.close()
+
+
+def live(database):
+    with database.engine.connect() as conn:
+        return dict(conn.exec_driver_sql("SELECT session_id, COUNT(*) FROM chat_history GROUP BY session_id").all())
+
+
+def test_idle_sessions_move_to_the_archive(fresh_db, archiver):
+    say(fresh_db, "old-1", 40, 40)
+    say(fresh_db, "old-2", 50)
+    say(fresh_db, "old-3", 45, 45, 45)
+    say(fresh_db, "active", 60, 1)       # an old message, but talked to yesterday
+    assert archiver.archive(NOW) == 3     # in two batches of batch_sessions=2
+    assert live(fresh_db) == {"active": 2}
+
+    transcript = archiver.transcript("old-3")
+    assert [m["content"] for m in transcript["messages"]] == ["old-3 0", "old-3 1", "old-3 2"]
+    assert archiver.transcript("active") is None
+    # The session list still counts the archived messages.
+    assert chat_sessions.check(fresh_db.engine) == []
+    assert chat_sessions.check_archived(archiver.summaries(), fresh_db.engine) == []
+    with fresh_db.engine.connect() as conn:
+        assert conn.exec_driver_sql(
+            "SELECT messages, archived_messages FROM chat_sessions WHERE session_id = 'old-3'"
+        ).one() == (0, 3)
+
+
+def test_rearchiving_a_session_merges_its_messages(fresh_db, archiver):
+    say(fresh_db, "s1", 40, 40)
+    archiver.archive(NOW)
+    # chat_history is empty now, so this message gets id 1 again.
+    say(fresh_db, "s1", 35)
+    archiver.archive(NOW)
+    assert [m["content"] for m in archiver.transcript("s1")["messages"]] == ["s1 0", "s1 1", "s1 0"]
+    assert archiver.stats()["archived_messages"] == 3
+
+
+def test_run_stopped_before_the_delete_archives_nothing_twice(fresh_db, archiver, monkeypatch):
+    say(fresh_db, "s1", 40, 40)
+
+    def crash(conn, counts):
+        raise RuntimeError("stopped between the archive commit and the delete")
+    with monkeypatch.context() as patch:
+        patch.setattr(chat_sessions, "record_archived", crash)
+        with pytest.raises(RuntimeError):
+            archiver.archive(NOW)
+    assert live(fresh_db) == {"s1": 2}
+    assert archiver.archive(NOW) == 1
+    assert live(fresh_db) == {} and len(archiver.transcript("s1")["messages"]) == 2
+
+
+def test_retention_drops_old_archive_days(fresh_db, archiver):
+    say(fresh_db, "ancient", 400)
+    say(fresh_db, "recent", 40)
+    result = archiver.run_once(NOW)
+    assert result["archived_sessions"] == 2 and result["expired_sessions"] == 1
+    assert archiver.transcript("ancient") is None and archiver.transcript("recent") is not None
+    with fresh_db.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT session_id FROM chat_sessions").scalars().all() == ["recent"]
+
+
+def test_new_connection_does_not_wait_for_a_writer(fresh_db):
+    with fresh_db.write_engine.connect() as writer:
+        writer.execute(text("INSERT INTO departments (name) VALUES ('Cardiology')"))
+        fresh_db.engine.dispose()
+        started = time.perf_counter()
+        with fresh_db.engine.connect() as reader:
+            assert reader.execute(text("SELECT COUNT(*) FROM departments")).scalar() == 0
+        assert time.perf_counter() - started < 1
+        writer.rollback()
+    with fresh_db.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2    # INCREMENTAL, set on the new file
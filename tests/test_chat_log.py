@@ -0,0 +1,82 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.chat_log import ChatLogWriter
+from app.event_hub import event_hub
+
+
+def published_since(seq):
+    return [m for s, event_type, data in list(event_hub._buffer)
+            if s > seq and event_type == "chat" for m in data["messages"]]
+
+
+def stored(database):
+    with database.engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT id, session_id, role, content FROM chat_history ORDER BY id").all()
+
+
+def test_rows_are_written_in_batches(fresh_db):
+    writer = ChatLogWriter(batch_size=2, max_delay=5)
+    seq = event_hub._seq
+
+    async def scenario():
+        writer.start()
+        for i in range(5):
+            writer.enqueue("s1", "user", f"message {i}")
+        await writer.stop()
+        await fresh_db.async_engine.dispose()
+    asyncio.run(scenario())
+
+    # Two full batches; stop() flushes the last row without waiting out max_delay.
+    assert writer.stats()["batches"] == 3 and writer.rows_written == 5
+    assert [row.content for row in stored(fresh_db)] == [f"message {i}" for i in range(5)]
+    assert [(m["id"], m["content"]) for m in published_since(seq)] == [(row.id, row.content) for row in stored(fresh_db)]
+
+
+def test_partial_batch_is_flushed_after_max_delay(fresh_db):
+    writer = ChatLogWriter(batch_size=100, max_delay=0.05)
+
+    async def scenario():
+        writer.start()
+        writer.enqueue("s1", "user", "hello")
+        await asyncio.sleep(0.5)
+        written = writer.rows_written
+        await writer.stop()
+        await fresh_db.async_engine.dispose()
+        return written
+    assert asyncio.run(scenario()) == 1
+
+
+def test_batch_is_dropped_after_max_retries(fresh_db, tmp_path):
+    unreachable = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'appointments.db'}")
+    writer = ChatLogWriter(engine=unreachable, max_retries=2)
+
+    async def scenario():
+        writer.start()
+        writer.enqueue("s1", "user", "lost")
+        await writer.stop()
+        await unreachable.dispose()
+    asyncio.run(scenario())
+    assert writer.rows_dropped == 1 and writer.rows_written == 0
+
+
+def test_rows_from_other_workers_are_published_once(fresh_db):
+    writer = ChatLogWriter()
+    writer.mark_seen()
+    seq = event_hub._seq
+
+    async def own_rows():
+        writer.start()
+        writer.enqueue("mine", "user", "written here")
+        await writer.stop()
+        await fresh_db.async_engine.dispose()
+    asyncio.run(own_rows())
+    with fresh_db.engine.begin() as conn:    # another worker's write
+        conn.exec_driver_sql("INSERT INTO chat_history (session_id, role, content, timestamp) "
+                             "VALUES ('theirs', 'user', 'written there', '2030-01-01 09:00:00')")
+
+    writer.publish_remote()
+    writer.publish_remote()
+    assert [m["session_id"] for m in published_since(seq)] == ["mine", "theirs"]
+    assert writer.remote_rows == 1
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import chat_sessions
+from app.chat_archive import ChatArchiver
+
+NOW = datetime(2030, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def archiver(fresh_db, tmp_path, monkeypatch):
+    from app import main
+    archiver = ChatArchiver(archive_path=str(tmp_path / "chat_archive.db"), bind=fresh_db.engine,
+                            archive_after_days=30)
+    monkeypatch.setattr(main, "chat_archiver", archiver)
+    return archiver
+
+
+def say(database, session_id, *messages):
+    """messages: (content, days before NOW)."""
+    db = database.SessionLocal()
+    for content, days in messages:
+        db.add(database.ChatHistory(session_id=session_id, role="user", content=content,
+                                    timestamp=NOW - timedelta(days=days)))
+    db.commit()
+    db.close()
+
+
+def test_sessions_are_listed_most_recent_first(client, fresh_db):
+    say(fresh_db, "a", ("hi", 5), ("bye", 3))
+    say(fresh_db, "b", ("hi", 4))
+    say(fresh_db, "c", ("hi", 1))
+    first = client.get("/api/admin/sessions", params={"limit": 2}).json()
+    second = client.get("/api/admin/sessions", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [(s["session_id"], s["messages"]) for s in first["items"] + second["items"]] == [("c", 1), ("a", 2), ("b", 1)]
+    assert second["next_cursor"] is None
+    since = (NOW - timedelta(days=3, hours=1)).isoformat()
+    assert [s["session_id"] for s in client.get("/api/admin/sessions", params={"since": since}).json()["items"]] == [
+        "c", "a"
+    ]
+    assert chat_sessions.check(fresh_db.engine) == []
+
+
+def test_transcript_joins_archived_and_live_messages(client, fresh_db, archiver):
+    say(fresh_db, "s1", ("first", 40), ("second", 39))
+    archiver.archive(NOW)
+    # chat_history is empty, so these get ids 1 and 2 again.
+    say(fresh_db, "s1", ("third", 2), ("fourth", 1))
+    body = client.get("/api/admin/sessions/s1").json()
+    assert [m["content"] for m in body["messages"]] == ["first", "second", "third", "fourth"]
+    assert body["session"]["messages"] == 4 and body["session"]["archived_messages"] == 2
+    assert body["appointments"] == []
+
+
+def test_transcript_includes_booked_appointments(client, fresh_db):
+    say(fresh_db, "s1", ("book me", 1))
+    db = fresh_db.SessionLocal()
+    doctor = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800)
+    db.add(doctor)
+    db.flush()
+    start = datetime(2030, 6, 3, 10)
+    db.add(fresh_db.Appointment(doctor_id=doctor.id, patient_name="Ravi", start_time=start,
+                                end_time=start + timedelta(hours=1), source_session_id="s1"))
+    db.commit()
+    db.close()
+    body = client.get("/api/admin/sessions/s1").json()
+    assert [(a["patient"], a["doctor"]) for a in body["appointments"]] == [("Ravi", "Dr. Asha Rao")]
+
+
+def test_unknown_session_is_a_404(client, fresh_db, archiver):
+    assert client.get("/api/admin/sessions/nope").status_code == 404
@@ -0,0 +1,87 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+from google.adk.runners import Runner
+
+from app.chat_log import ChatLogWriter
+from app.session_store import SqliteSessionService
+
+DAY = (date.today() + timedelta(days=10)).isoformat()
+
+
+@pytest.fixture
+def stream(fresh_db, client, tmp_path, monkeypatch):
+    """POSTs one /chat/stream turn and returns its SSE frames as (event, data)."""
+    from app import main
+    from app.scheduling_agent.fake_llm import ScriptedLlm
+    from app.scheduling_agent.tools import availability
+    from app.tools.calendar_client import calendar_clients
+    from app.tools.fake_calendar import FakeCalendarService
+
+    db = fresh_db.SessionLocal()
+    db.add(fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=100))
+    db.commit()
+    db.close()
+    fresh_db.doctor_index.invalidate()
+    availability.invalidate()
+    calendar_clients.use_service(FakeCalendarService())
+    monkeypatch.setattr(main.root_agent, "model", ScriptedLlm())
+    sessions = SqliteSessionService(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(main, "session_service", sessions)
+    monkeypatch.setattr(main, "runner", Runner(agent=main.root_agent, app_name=main.APP_NAME,
+                                               session_service=sessions))
+    monkeypatch.setattr(main, "chat_log_writer", ChatLogWriter())
+
+    def post(text, session_id="chat-1"):
+        response = client.post("/chat/stream", json={"text": text, "session_id": session_id})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = []
+        for block in response.text.strip().split("\n\n"):
+            event, data = block.split("\n")
+            frames.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return frames
+    return post
+
+
+def logged(main):
+    queue = main.chat_log_writer.queue
+    return [(row["role"], row["content"]) for row in (queue.get_nowait() for _ in range(queue.qsize()))]
+
+
+def test_routed_turn_is_one_token_then_done(stream):
+    from app import main
+
+    frames = stream("Hello!")
+    assert [event for event, _ in frames] == ["token", "done"]
+    reply = frames[0][1]["text"]
+    assert frames[1][1]["response"] == reply and frames[1][1]["ttft_ms"] == frames[1][1]["total_ms"]
+    assert logged(main) == [("user", "Hello!"), ("model", reply)]
+
+
+def test_agent_turn_streams_tool_calls_and_tokens(stream):
+    from app import main
+
+    frames = stream(f"Is Dr. Asha Rao available on {DAY}?")
+    events = [event for event, _ in frames]
+    assert frames[:2] == [("tool", {"name": "check_calendar_availability", "status": "started"}),
+                          ("tool", {"name": "check_calendar_availability", "status": "finished"})]
+    assert events[-1] == "done" and set(events[2:-1]) == {"token"} and len(events[2:-1]) > 1
+
+    # The partial chunks add up to the final reply, which is not sent a second time.
+    done = frames[-1][1]
+    assert "".join(data["text"] for _, data in frames[2:-1]) == done["response"]
+    assert done["response"] == f"Dr. Asha Rao is completely free on {DAY}. Suggested slots: 09:00, 10:00, 11:00"
+    assert 0 <= done["ttft_ms"] <= done["total_ms"]
+    assert logged(main) == [("user", f"Is Dr. Asha Rao available on {DAY}?"), ("model", done["response"])]
+
+
+def test_agent_failure_ends_the_stream_with_an_error(stream, monkeypatch):
+    from app import main
+
+    def fail(text, results):
+        raise RuntimeError("model unavailable")
+    monkeypatch.setattr(main.root_agent.model, "script", fail)
+    frames = stream(f"Is Dr. Asha Rao available on {DAY}?")
+    assert frames[-1] == ("error", {"detail": "model unavailable"})
+    assert "done" not in [event for event, _ in frames]
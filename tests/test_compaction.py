@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from app.scheduling_agent.compaction import BOOKING_STATE_KEY, HistoryCompactor, extract_booking_state
+
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def call(name, **args):
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))])
+
+
+def response(name, result):
+    return types.Content(role="user", parts=[types.Part(
+        function_response=types.FunctionResponse(name=name, response={"result": result})
+    )])
+
+
+CONVERSATION = [
+    user("Hi, my name is Ravi Kumar"),
+    model("Hello Ravi! What brings you in?"),
+    user("I have chest pain since yesterday."),
+    call("list_available_doctors"),
+    response("list_available_doctors", "Dr. Asha Rao (Cardiologist) ... a very long list ..."),
+    model("Dr. Asha Rao is our cardiologist."),
+    user("Book her tomorrow at 10, ravi@example.com"),
+    call("book_doctor_appointment", patient_name="Ravi Kumar", patient_email="ravi@example.com",
+         doctor_name="Dr. Asha Rao", date_time_iso="2030-01-07T10:00:00", reason="chest pain"),
+    response("book_doctor_appointment", "SUCCESS: booked"),
+    model("You're booked."),
+    user("Thanks! Where is the clinic?"),
+]
+
+
+def test_extract_booking_state_reads_messages_and_tool_calls():
+    # Later contents win: the booking call's arguments replace what was read from the messages.
+    assert extract_booking_state(CONVERSATION[:3]) == {"patient_name": "Ravi Kumar", "reason": "chest pain since yesterday"}
+    assert extract_booking_state(CONVERSATION) == {
+        "patient_name": "Ravi Kumar", "patient_email": "ravi@example.com", "doctor_name": "Dr. Asha Rao",
+        "date_time": "2030-01-07T10:00:00", "reason": "chest pain", "status": "booked",
+    }
+
+
+def test_old_turns_are_folded_into_state_and_the_instruction():
+    compactor = HistoryCompactor(keep_turns=2)
+    context = SimpleNamespace(state={})
+    request = LlmRequest(contents=list(CONVERSATION))
+    compactor(context, request)
+
+    # The function response is not a user turn: the last two turns start at "Book her ..." and "Thanks! ...".
+    assert request.contents == CONVERSATION[6:]
+    assert context.state[BOOKING_STATE_KEY] == {"patient_name": "Ravi Kumar", "reason": "chest pain since yesterday"}
+    assert "- patient name: Ravi Kumar" in request.config.system_instruction
+    assert compactor.stats() == {"requests": 1, "compacted": 1, "contents_dropped": 6}
+
+
+def test_short_conversations_are_sent_unchanged():
+    compactor = HistoryCompactor(keep_turns=4)
+    context = SimpleNamespace(state={})
+    request = LlmRequest(contents=CONVERSATION[:5])
+    compactor(context, request)
+    assert request.contents == CONVERSATION[:5]
+    assert context.state == {} and not request.config.system_instruction
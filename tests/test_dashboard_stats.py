@@ -0,0 +1,96 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+
+from app import dashboard_stats
+from app.tools.schedule import DoctorSchedules
+
+MONDAY = date(2030, 1, 7)
+
+
+def at(hour, day=MONDAY):
+    return datetime.combine(day, time(hour))
+
+
+def read(database, schedules=None):
+    """(counters, utilization) through the dashboard's async reads."""
+    async def scenario():
+        try:
+            async with database.AsyncSessionLocal() as db:
+                counters = await dashboard_stats.read_counters(db)
+                utilization = await dashboard_stats.read_utilization(db, schedules, MONDAY, days=7) if schedules else []
+                return counters, utilization
+        finally:
+            await database.async_engine.dispose()
+    return asyncio.run(scenario())
+
+
+def test_counters_follow_every_kind_of_write(fresh_db):
+    db = fresh_db.SessionLocal()
+    dept = fresh_db.Department(name="Cardiology", location="Block A")
+    db.add(dept)
+    db.flush()
+    rao = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800, department_id=dept.id)
+    shah = fresh_db.Doctor(name="Dr. Vikram Shah", consultation_fee=500, department_id=dept.id)
+    db.add_all([rao, shah])
+    db.flush()
+    first = fresh_db.Appointment(doctor_id=rao.id, patient_name="Ravi", start_time=at(10), end_time=at(11))
+    db.add_all([first, fresh_db.Appointment(doctor_id=shah.id, patient_name="Mira", start_time=at(10), end_time=at(11))])
+    db.commit()
+
+    first.status = "Cancelled"
+    db.commit()
+    with fresh_db.engine.begin() as conn:   # raw SQL is counted too
+        conn.exec_driver_sql(
+            "INSERT INTO appointments (doctor_id, patient_name, start_time, end_time, status) "
+            "VALUES (?, 'Sam', '2030-01-08 09:00:00', '2030-01-08 10:30:00', 'Confirmed')", (rao.id,)
+        )
+    db.delete(shah)
+    db.commit()
+    db.close()
+
+    # Deleting Dr. Shah unlinks Mira's booking (doctor_id NULL), which then earns no fee.
+    counters, _ = read(fresh_db)
+    assert counters == {
+        "doctors": 1, "departments": 1, "appointments": 3, "confirmed": 2, "cancelled": 1, "revenue": 800.0
+    }
+    assert dashboard_stats.check(fresh_db.engine) == []
+
+
+def test_rebuild_repairs_drift(fresh_db):
+    db = fresh_db.SessionLocal()
+    doctor = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800)
+    db.add(doctor)
+    db.flush()
+    db.add(fresh_db.Appointment(doctor_id=doctor.id, patient_name="Ravi", start_time=at(10), end_time=at(11)))
+    db.commit()
+    db.close()
+    with fresh_db.engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE stats_counters SET value = 99 WHERE name = 'appointments'")
+    assert dashboard_stats.check(fresh_db.engine) == [
+        ("stats_counters", ("appointments", 99.0)), ("stats_counters (fresh)", ("appointments", 1.0))
+    ]
+    dashboard_stats.rebuild(fresh_db.engine)
+    assert dashboard_stats.check(fresh_db.engine) == []
+
+
+def test_utilization_is_measured_against_the_doctors_own_hours(fresh_db):
+    db = fresh_db.SessionLocal()
+    doctor = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800)
+    db.add(doctor)
+    db.flush()
+    db.add_all([
+        fresh_db.Appointment(doctor_id=doctor.id, patient_name="Ravi", start_time=at(9), end_time=at(10)),
+        # Booked on a day with no hours (a Tuesday): no capacity to divide by.
+        fresh_db.Appointment(doctor_id=doctor.id, patient_name="Mira", start_time=at(9, MONDAY + timedelta(days=1)),
+                             end_time=at(10, MONDAY + timedelta(days=1))),
+    ])
+    db.commit()
+    doctor_id = doctor.id
+    db.close()
+
+    # Mondays 9:00-13:00 in 60-minute slots.
+    schedules = DoctorSchedules(load=lambda start, end: ([(doctor_id, 0, 9 * 60, 13 * 60, 60, None, None)], []))
+    _, utilization = read(fresh_db, schedules)
+    assert [(row["day"], row["booked_hours"], row["capacity_hours"], row["utilization"]) for row in utilization] == [
+        ("2030-01-07", 1.0, 4.0, 0.25), ("2030-01-08", 1.0, 0.0, None)
+    ]
@@ -0,0 +1,55 @@
+from app.tools.doctor_index import DoctorIndex, normalize
+
+DOCTORS = [(1, "Dr. Sarah Smith"), (2, "Dr. Sarah Jones"), (3, "Dr. John Doe"), (4, "Dr. Asha Rao")]
+
+
+def index():
+    return DoctorIndex(loader=lambda: DOCTORS)
+
+
+def test_normalize_drops_titles_case_and_punctuation():
+    assert normalize("Dr. Sarah  SMITH") == ["sarah", "smith"]
+    assert normalize("Prof. O'Neil") == ["o", "neil"]
+
+
+def test_resolves_full_names_surnames_and_typos():
+    doctors = index()
+    assert doctors.resolve("Dr. Sarah Smith").doctor_id == 1
+    assert doctors.resolve("smith").doctor_id == 1
+    assert doctors.resolve("Jhon Doe").doctor_id == 3
+    assert doctors.resolve("aasha rao").doctor_id == 4
+
+
+def test_ambiguous_or_unknown_names_do_not_resolve():
+    doctors = index()
+    assert doctors.resolve("Dr. Sarah") is None
+    assert [c.doctor_id for c in doctors.candidates("Dr. Sarah")] == [2, 1]
+    assert doctors.resolve("Dr. Nobody") is None
+    assert doctors.resolve("") is None
+
+
+def test_mentioned_finds_names_among_message_words():
+    assert index().mentioned(["is", "doe", "free"], min_score=0.8) == {3: 1.0}
+
+
+def test_committed_doctor_changes_are_applied(fresh_db):
+    db = fresh_db.SessionLocal()
+    doctor = fresh_db.Doctor(name="Dr. Meera Iyer", consultation_fee=500)
+    db.add(doctor)
+    db.commit()
+    assert fresh_db.find_doctor("Meera") == (doctor.id, "Dr. Meera Iyer")
+
+    doctor.name = "Dr. Meera Nair"
+    db.flush()
+    db.rollback()
+    assert fresh_db.find_doctor("Iyer") == (doctor.id, "Dr. Meera Iyer")
+
+    doctor.name = "Dr. Meera Nair"
+    db.commit()
+    assert fresh_db.find_doctor("Iyer") is None
+    assert fresh_db.find_doctor("Nair") == (doctor.id, "Dr. Meera Nair")
+
+    db.delete(doctor)
+    db.commit()
+    db.close()
+    assert fresh_db.find_doctor("Meera") is None
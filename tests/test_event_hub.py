@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+from app.event_hub import EventHub, event_hub
+
+
+def frames(hub, last_event_id=None, live=(), count=None):
+    """The first `count` frames of a stream (after its retry line); `live` is published once subscribed."""
+    async def scenario():
+        stream = hub.stream(last_event_id)
+        assert await anext(stream) == "retry: 3000\n\n"
+        received = []
+        if live:
+            threading.Thread(target=lambda: [hub.publish(*event) for event in live]).start()
+        for _ in range(count):
+            received.append(await asyncio.wait_for(anext(stream), 5))
+        await stream.aclose()
+        return received
+    return asyncio.run(scenario())
+
+
+def events(received):
+    return [frame.split("\n")[1].removeprefix("event: ") for frame in received]
+
+
+def test_live_events_from_other_threads_reach_the_client():
+    hub = EventHub()
+    received = frames(hub, live=[("chat", {"n": 1}), ("appointment", {"n": 2})], count=2)
+    assert received[0] == f'id: {hub.epoch}-1\nevent: chat\ndata: {{"n": 1}}\n\n'
+    assert events(received) == ["chat", "appointment"]
+
+
+def test_reconnect_replays_missed_events():
+    hub = EventHub()
+    for n in range(5):
+        hub.publish("chat", {"n": n})
+    assert frames(hub, f"{hub.epoch}-3", count=2) == [
+        f'id: {hub.epoch}-4\nevent: chat\ndata: {{"n": 3}}\n\n',
+        f'id: {hub.epoch}-5\nevent: chat\ndata: {{"n": 4}}\n\n',
+    ]
+
+
+def test_unreplayable_ids_get_a_reset():
+    hub = EventHub(buffer_size=2)
+    for n in range(5):
+        hub.publish("chat", {"n": n})
+    for last_event_id in (f"{hub.epoch}-1", "otherworker-3", f"{hub.epoch}-99", "garbage"):
+        assert frames(hub, last_event_id, count=1) == [f"id: {hub.epoch}-5\nevent: reset\ndata: {{}}\n\n"]
+    assert hub.resets == 4
+
+
+def test_slow_client_is_reset_instead_of_queueing_forever():
+    hub = EventHub(max_queue=2)
+
+    async def scenario():
+        stream = hub.stream()
+        await anext(stream)
+        for n in range(5):      # nobody reads meanwhile
+            hub.publish("chat", {"n": n})
+        await asyncio.sleep(0.05)
+        frame = await anext(stream)
+        await stream.aclose()
+        return frame
+    assert asyncio.run(scenario()) == f"id: {hub.epoch}-5\nevent: reset\ndata: {{}}\n\n"
+    assert hub.resets == 2
+
+
+def test_only_committed_appointment_changes_are_published(fresh_db):
+    db = fresh_db.SessionLocal()
+    doctor = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800)
+    db.add(doctor)
+    db.commit()
+    seq = event_hub._seq
+    start = datetime(2030, 1, 7, 10)
+    db.add(fresh_db.Appointment(doctor_id=doctor.id, patient_name="Rolled back", start_time=start,
+                                end_time=start + timedelta(hours=1)))
+    db.flush()
+    db.rollback()
+    appointment = fresh_db.Appointment(doctor_id=doctor.id, patient_name="Ravi", start_time=start,
+                                       end_time=start + timedelta(hours=1))
+    db.add(appointment)
+    db.commit()
+    appointment.status = "Cancelled"
+    db.commit()
+    db.close()
+    published = [data for s, event_type, data in list(event_hub._buffer) if s > seq and event_type == "appointment"]
+    assert [(e["op"], e["patient"], e["status"], e["doctor"]) for e in published] == [
+        ("created", "Ravi", "Confirmed", "Dr. Asha Rao"), ("updated", "Ravi", "Cancelled", "Dr. Asha Rao")
+    ]
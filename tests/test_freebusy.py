@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.tools.availability import AvailabilityEngine, google_freebusy_loader
+from app.tools.calendar_client import FREEBUSY_MAX_CALENDARS, query_freebusy, to_rfc3339
+from app.tools.fake_calendar import FakeCalendarService
+
+DAY = datetime(2030, 1, 7)
+
+
+def service_with(calendars):
+    service = FakeCalendarService()
+    for n, calendar_id in enumerate(calendars):
+        start = DAY + timedelta(hours=9 + n % 8)
+        service.add_event(start.isoformat(), (start + timedelta(minutes=30)).isoformat(), calendar_id=calendar_id)
+    return service
+
+
+def query(service, calendar_ids):
+    return query_freebusy(service, calendar_ids, to_rfc3339(DAY), to_rfc3339(DAY + timedelta(days=1)))
+
+
+def test_one_query_per_fifty_calendars():
+    calendars = [f"doctor{n}@example.com" for n in range(2 * FREEBUSY_MAX_CALENDARS + 1)]
+    service = service_with(calendars)
+    busy = query(service, calendars)
+    assert service.calls['freebusy.query'] == 3
+    assert set(busy) == set(calendars)
+    assert busy["doctor1@example.com"] == [(DAY + timedelta(hours=10), DAY + timedelta(hours=10, minutes=30))]
+
+
+def test_exactly_fifty_calendars_is_one_query():
+    calendars = [f"doctor{n}@example.com" for n in range(FREEBUSY_MAX_CALENDARS)]
+    service = service_with(calendars)
+    query(service, calendars + calendars[:5])   # duplicates are asked for once
+    assert service.calls['freebusy.query'] == 1
+
+
+def test_unknown_calendars_are_left_out():
+    service = service_with(["doctor0@example.com"])
+    assert set(query(service, ["doctor0@example.com", "missing@example.com"])) == {"doctor0@example.com"}
+
+
+def engine_over(service, calendars, pool):
+    async def run_calendar(fn, *args):
+        pool.append(fn.__name__)
+        return fn(service, *args)
+
+    return AvailabilityEngine(
+        load_events=lambda start, end: [],
+        load_bookings=lambda start, end: [],
+        load_calendar_busy=google_freebusy_loader(run_calendar),
+        load_calendars=lambda: calendars,
+        clock=lambda: DAY,
+    )
+
+
+def test_engine_loads_doctor_calendars_in_bulk_through_the_pool():
+    calendars = {doctor_id: f"doctor{doctor_id}@example.com" for doctor_id in range(120)}
+    service, pool = service_with(calendars.values()), []
+    engine = engine_over(service, calendars, pool)
+    asyncio.run(engine.refresh_calendar_busy())
+    assert service.calls['freebusy.query'] == 3 and pool == ["query_freebusy"]
+
+    slot = DAY + timedelta(hours=9)
+    free = engine.free_doctors(slot, list(calendars), end=slot + timedelta(minutes=30))
+    assert free == [doctor_id for doctor_id in calendars if doctor_id % 8 != 0]
+    assert service.calls['freebusy.query'] == 3   # the check itself made no Calendar calls
+
+
+def test_checks_before_the_first_fetch_stay_local():
+    calendars = {1: "doctor1@example.com"}
+    service, pool = service_with(calendars.values()), []
+    engine = engine_over(service, calendars, pool)
+    assert engine.free_doctors(DAY + timedelta(hours=10), [1]) == [1]
+    assert sum(service.calls.values()) == 0 and pool == []
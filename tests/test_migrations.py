@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import IntegrityError
+
+from app.migrations import MIGRATIONS, applied_versions, upgrade
+
+# appointments.db as the original app/models/models.py created it (no appointments.notes).
+OLD_SCHEMA = """
+CREATE TABLE departments (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, location VARCHAR);
+CREATE TABLE doctors (
+    id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, specialization VARCHAR,
+    consultation_fee NUMERIC(10, 2) NOT NULL, availability_text VARCHAR, department_id INTEGER
+);
+CREATE TABLE appointments (
+    id INTEGER PRIMARY KEY, doctor_id INTEGER, patient_name VARCHAR NOT NULL, patient_email VARCHAR,
+    patient_phone VARCHAR, start_time DATETIME NOT NULL, end_time DATETIME NOT NULL, status VARCHAR,
+    gcal_event_id VARCHAR, source_session_id VARCHAR, created_at DATETIME
+);
+CREATE TABLE chat_history (
+    id INTEGER PRIMARY KEY, session_id VARCHAR NOT NULL, role VARCHAR NOT NULL, content TEXT NOT NULL,
+    timestamp DATETIME
+);
+CREATE INDEX ix_chat_history_session_id ON chat_history (session_id);
+INSERT INTO departments VALUES (1, 'Cardiology', 'Block A');
+INSERT INTO doctors VALUES (1, 'Dr. Asha Rao', 'Cardiologist', 800, 'Mon-Fri 9am-1pm', 1);
+INSERT INTO doctors VALUES (2, 'Dr. Vikram Shah', 'Cardiologist', 600, 'By appointment', 1);
+-- Two bookings that already overlap: upgrade() must keep both.
+INSERT INTO appointments VALUES
+    (1, 1, 'Ravi', NULL, NULL, '2030-01-07 10:00:00', '2030-01-07 11:00:00', 'Confirmed', 'evt1', NULL, NULL),
+    (2, 1, 'Mira', NULL, NULL, '2030-01-07 10:30:00', '2030-01-07 11:30:00', 'Confirmed', NULL, NULL, NULL);
+INSERT INTO chat_history VALUES (1, 's1', 'user', 'hello', '2030-01-01 09:00:00');
+"""
+
+
+@pytest.fixture
+def old_db(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with bind.begin() as conn:
+        conn.connection.driver_connection.executescript(OLD_SCHEMA)
+    yield bind
+    bind.dispose()
+
+
+def test_upgrade_brings_an_old_database_to_the_latest_version(old_db):
+    assert upgrade(old_db) == [version for version, _, _ in MIGRATIONS]
+    assert upgrade(old_db) == []
+    assert applied_versions(old_db) == {version for version, _, _ in MIGRATIONS}
+
+    schema = inspect(old_db)
+    assert {"notes", "idempotency_key", "calendar_status"} <= {c["name"] for c in schema.get_columns("appointments")}
+    assert "ix_chat_history_session_id" not in {i["name"] for i in schema.get_indexes("chat_history")}
+    with old_db.connect() as conn:
+        assert conn.exec_driver_sql("SELECT id, calendar_status FROM appointments ORDER BY id").all() == [
+            (1, "synced"), (2, None)
+        ]
+        # Parsed rules for the doctor with readable hours; the other keeps the default.
+        assert conn.exec_driver_sql("SELECT DISTINCT doctor_id FROM schedule_rules").all() == [(1,)]
+        assert conn.exec_driver_sql("SELECT value FROM stats_counters WHERE name = 'confirmed'").scalar() == 2
+
+
+def test_overlap_guard_rejects_new_overlaps_only(old_db):
+    upgrade(old_db)
+    insert = ("INSERT INTO appointments (doctor_id, patient_name, start_time, end_time, status) "
+              "VALUES (?, 'New', ?, ?, ?)")
+    with old_db.begin() as conn:
+        conn.exec_driver_sql(insert, (1, "2030-01-07 11:30:00", "2030-01-07 12:30:00", "Confirmed"))
+        conn.exec_driver_sql(insert, (2, "2030-01-07 10:00:00", "2030-01-07 11:00:00", "Confirmed"))
+        conn.exec_driver_sql(insert, (1, "2030-01-07 12:00:00", "2030-01-07 13:00:00", "Cancelled"))
+    with pytest.raises(IntegrityError), old_db.begin() as conn:
+        conn.exec_driver_sql(insert, (1, "2030-01-07 12:00:00", "2030-01-07 13:00:00", "Confirmed"))
+    with pytest.raises(IntegrityError), old_db.begin() as conn:
+        conn.exec_driver_sql("UPDATE appointments SET status = 'Confirmed' WHERE status = 'Cancelled'")
+
+
+def test_upgrade_stops_at_target(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    assert upgrade(bind, target=3) == [1, 2, 3]
+    assert upgrade(bind) == [version for version, _, _ in MIGRATIONS if version > 3]
+    bind.dispose()
@@ -0,0 +1,69 @@
+import asyncio
+import random
+
+import pytest
+
+from app.observability import (
+    CounterFamily, Histogram, Registry, TOOL_CALL_SECONDS, TOOL_ERRORS, _bucket, _bucket_upper_us, new_trace_id,
+    timed_tool,
+)
+
+
+def test_buckets_are_exact_then_within_two_percent():
+    for us in list(range(200)) + [random.randrange(128, 10 ** 9) for _ in range(2000)]:
+        upper = _bucket_upper_us(_bucket(us))
+        assert us <= upper <= max(us * 1.016, us)
+        assert _bucket(upper) == _bucket(us)
+
+
+def test_quantiles_and_prometheus_buckets():
+    registry = Registry(namespace="test")
+    histogram = registry.histogram("stage_seconds", "Stage time.", ("stage",))
+    for ms in range(1, 101):
+        histogram.observe((ms + 0.5) / 1000, stage="db")    # 1.5 ms .. 100.5 ms, off the bucket bounds
+    stats = histogram.stats()["stage=db"]
+    assert stats["count"] == 100 and stats["max_ms"] == 100.5
+    assert stats["p50_ms"] == pytest.approx(50.5, rel=0.02) and stats["p99_ms"] == pytest.approx(99.5, rel=0.02)
+
+    text = registry.render()
+    assert "# TYPE test_stage_seconds histogram" in text
+    assert 'test_stage_seconds_bucket{stage="db",le="0.01"} 9' in text
+    assert 'test_stage_seconds_bucket{stage="db",le="0.05"} 49' in text
+    assert 'test_stage_seconds_bucket{stage="db",le="+Inf"} 100' in text
+    assert 'test_stage_seconds_count{stage="db"} 100' in text
+
+
+def test_counter_labels_are_escaped():
+    counter = CounterFamily("errors_total", "Errors.", ("tool",))
+    counter.inc(tool='say "hi"\n')
+    counter.inc(2, tool='say "hi"\n')
+    assert counter.render("errors_total") == ['errors_total{tool="say \\"hi\\"\\n"} 3']
+
+
+def test_timed_tool_counts_raised_and_reported_errors():
+    @timed_tool(is_error=lambda result: result.startswith("ERROR"))
+    def observability_test_tool(fail):
+        if fail == "raise":
+            raise RuntimeError("boom")
+        return "ERROR: no" if fail else "ok"
+
+    @timed_tool()
+    async def observability_test_async_tool():
+        return "ok"
+
+    observability_test_tool(False)
+    observability_test_tool(True)
+    with pytest.raises(RuntimeError):
+        observability_test_tool("raise")
+    asyncio.run(observability_test_async_tool())
+    assert TOOL_CALL_SECONDS.stats()["tool=observability_test_tool"]["count"] == 3
+    assert TOOL_ERRORS.stats()["tool=observability_test_tool"] == 2
+    assert TOOL_CALL_SECONDS.stats()["tool=observability_test_async_tool"]["count"] == 1
+
+
+def test_trace_ids(client):
+    assert new_trace_id("abc-123") == "abc-123"
+    assert len(new_trace_id("not ok; drop table")) == 16
+    response = client.get("/metrics", headers={"X-Request-ID": "req-42"})
+    assert response.headers["x-trace-id"] == "req-42"
+    assert "# TYPE scheduling_chat_turn_seconds histogram" in response.text
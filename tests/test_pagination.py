@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+START = datetime(2030, 1, 7, 9, 0)
+
+
+@pytest.fixture
+def appointments(fresh_db):
+    """Seven bookings over two doctors, created in the reverse of their start order."""
+    db = fresh_db.SessionLocal()
+    rao = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800)
+    shah = fresh_db.Doctor(name="Dr. Vikram Shah", consultation_fee=500)
+    db.add_all([rao, shah])
+    db.flush()
+    for i in reversed(range(7)):
+        start = START + timedelta(days=i)
+        db.add(fresh_db.Appointment(
+            doctor_id=rao.id if i % 2 else shah.id, patient_name=f"Patient {i}", start_time=start,
+            end_time=start + timedelta(hours=1), status="Cancelled" if i == 3 else "Confirmed",
+        ))
+    db.commit()
+    ids = {"rao": rao.id, "shah": shah.id}
+    db.close()
+    return ids
+
+
+def pages(client, url, **params):
+    items, cursor = [], None
+    while True:
+        body = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        items.append([item["patient"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_pages_cover_every_row_once(client, appointments):
+    assert pages(client, "/api/admin/appointments", limit=3) == [
+        ["Patient 0", "Patient 1", "Patient 2"], ["Patient 3", "Patient 4", "Patient 5"], ["Patient 6"]
+    ]
+    assert pages(client, "/api/admin/appointments", sort="start_time", limit=4) == [
+        ["Patient 0", "Patient 1", "Patient 2", "Patient 3"], ["Patient 4", "Patient 5", "Patient 6"]
+    ]
+    assert pages(client, "/api/admin/appointments", sort="-start_time", limit=7) == [
+        [f"Patient {i}" for i in reversed(range(7))]
+    ]
+
+
+def test_filters_apply_to_every_page(client, appointments):
+    assert pages(client, "/api/admin/appointments", doctor_id=appointments["rao"], status="Confirmed", limit=1) == [
+        ["Patient 1"], ["Patient 5"]
+    ]
+    params = {"sort": "start_time", "date_from": "2030-01-09T00:00:00", "date_to": "2030-01-11T00:00:00"}
+    assert pages(client, "/api/admin/appointments", **params) == [["Patient 2", "Patient 3"]]
+
+
+def test_rows_inserted_between_pages_do_not_shift_them(client, appointments, fresh_db):
+    first = client.get("/api/admin/appointments", params={"sort": "start_time", "limit": 2}).json()
+    db = fresh_db.SessionLocal()
+    db.add(fresh_db.Appointment(doctor_id=appointments["rao"], patient_name="Early", start_time=START - timedelta(days=1),
+                                end_time=START - timedelta(days=1, hours=-1)))
+    db.commit()
+    db.close()
+    second = client.get("/api/admin/appointments",
+                        params={"sort": "start_time", "limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [item["patient"] for item in second["items"]] == ["Patient 2", "Patient 3"]
+
+
+def test_bad_sort_or_cursor_is_a_400(client, appointments):
+    assert client.get("/api/admin/appointments", params={"sort": "patient"}).status_code == 400
+    assert client.get("/api/admin/appointments", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/admin/chat_history", params={"cursor": "WzFd"}).status_code == 400   # [1]: one value
+
+
+def test_export_streams_every_matching_row(client, appointments, monkeypatch):
+    from app import main
+    monkeypatch.setattr(main, "EXPORT_CHUNK", 2)
+    ndjson = client.get("/api/admin/appointments/export", params={"status": "Confirmed"})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["patient"] for line in ndjson.text.splitlines()] == [
+        f"Patient {i}" for i in (6, 5, 4, 2, 1, 0)
+    ]
+    exported = list(csv.DictReader(io.StringIO(client.get("/api/admin/appointments/export?format=csv").text)))
+    assert len(exported) == 7 and exported[0]["doctor"] == "Dr. Vikram Shah"
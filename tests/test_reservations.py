@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.reservations import SlotReservations, idempotency_key
+
+START = datetime(2030, 1, 7, 10, 0)
+END = START + timedelta(hours=1)
+
+
+@pytest.fixture
+def doctor(fresh_db):
+    db = fresh_db.SessionLocal()
+    db.add(fresh_db.Doctor(name="Dr. Test Doctor", consultation_fee=100))
+    db.commit()
+    doctor_id = db.query(fresh_db.Doctor.id).scalar()
+    db.close()
+    fresh_db.doctor_index.invalidate()
+    return doctor_id
+
+
+def book(reservations, patient, start=START):
+    return reservations.book(f"Patient {patient}", f"{patient}@example.com", "Dr. Test Doctor",
+                             start, start + timedelta(hours=1), "checkup")
+
+
+def confirmed(database):
+    db = database.SessionLocal()
+    try:
+        return db.query(database.Appointment).filter(database.Appointment.status == "Confirmed").count()
+    finally:
+        db.close()
+
+
+def test_racing_bookings_for_one_slot_book_it_once(fresh_db, doctor):
+    reservations = SlotReservations()
+
+    async def race():
+        return await asyncio.gather(*(book(reservations, f"p{n}") for n in range(8)), return_exceptions=True)
+
+    results = asyncio.run(race())
+    booked = [r for r in results if not isinstance(r, Exception)]
+    assert len(booked) == 1
+    assert all(isinstance(r, fresh_db.BookingConflictError) for r in results if r not in booked)
+    assert confirmed(fresh_db) == 1
+    assert reservations.stats()["conflicts"] == 7
+
+
+def test_retried_call_returns_the_same_booking(fresh_db, doctor):
+    reservations = SlotReservations()
+
+    async def twice():
+        return await asyncio.gather(book(reservations, "alice"), book(reservations, "alice"))
+
+    first, second = asyncio.run(twice())
+    assert first.appointment_id == second.appointment_id
+    assert [first.replayed, second.replayed].count(True) == 1
+    assert confirmed(fresh_db) == 1
+
+
+def test_live_hold_blocks_another_patient(fresh_db, doctor):
+    reservations = SlotReservations()
+    key = idempotency_key(doctor, START, "alice@example.com", "Patient alice")
+    assert reservations._hold(key, doctor, START, END) == ("held", None)
+    with pytest.raises(fresh_db.BookingConflictError):
+        asyncio.run(book(reservations, "bob"))
+    # The holder confirms and its hold is gone.
+    _, replayed = reservations._confirm(key, doctor, "Dr. Test Doctor", START, END, "Patient alice",
+                                        "alice@example.com", "checkup", None)
+    assert not replayed
+    db = fresh_db.SessionLocal()
+    assert db.query(fresh_db.SlotHold).count() == 0
+    db.close()
+
+
+def test_lapsed_hold_still_confirms_a_free_slot(fresh_db, doctor):
+    reservations = SlotReservations(hold_seconds=0)
+    key = idempotency_key(doctor, START, "alice@example.com", "Patient alice")
+    assert reservations._hold(key, doctor, START, END) == ("held", None)
+    appointment_id, replayed = reservations._confirm(key, doctor, "Dr. Test Doctor", START, END, "Patient alice",
+                                                     "alice@example.com", "checkup", None)
+    assert not replayed and confirmed(fresh_db) == 1
+    # Adjacent slots stay bookable.
+    assert asyncio.run(book(reservations, "bob", start=END)).appointment_id != appointment_id
+
+
+def test_repeat_gives_up_on_a_hold_it_does_not_own(fresh_db, doctor):
+    key = idempotency_key(doctor, START, "alice@example.com", "Patient alice")
+    assert SlotReservations(hold_seconds=60)._hold(key, doctor, START, END) == ("held", None)
+    with pytest.raises(fresh_db.BookingInProgressError):
+        asyncio.run(book(SlotReservations(hold_seconds=0.2), "alice"))
+    db = fresh_db.SessionLocal()
+    assert db.query(fresh_db.SlotHold).filter(fresh_db.SlotHold.idempotency_key == key).count() == 1
+    db.close()
+    assert confirmed(fresh_db) == 0
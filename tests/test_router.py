@@ -0,0 +1,72 @@
+from app.scheduling_agent.router import GREETING_RESPONSE, IntentRouter, RouteResult
+
+CATALOG = [
+    {"id": 1, "name": "Dr. Asha Rao", "specialization": "Cardiologist", "fee": 800.0,
+     "availability": "Mon-Fri 9am-1pm", "department": "Cardiology", "location": "Block A, 2nd floor"},
+    {"id": 2, "name": "Dr. Vikram Shah", "specialization": "Dermatologist", "fee": 500.0,
+     "availability": "Tue, Thu 2pm-6pm", "department": "Dermatology", "location": "Block B, 1st floor"},
+]
+
+
+def router(**kwargs):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return CATALOG
+    return IntentRouter(catalog_loader=loader, **kwargs), loads
+
+
+def test_greeting_and_catalog_listings_are_answered():
+    r, _ = router()
+    assert r.route("Hello!").response == GREETING_RESPONSE
+    listing = r.route("Which doctors do you have?")
+    assert listing.intent == "list_doctors"
+    assert "Dr. Asha Rao" in listing.response and "Dr. Vikram Shah" in listing.response
+
+
+def test_questions_about_one_doctor_match_names_fuzzily():
+    r, _ = router()
+    fee = r.route("What is the fee for Dr Asha Rau?")
+    assert fee.intent == "doctor_fee"
+    assert fee.response == "The consultation fee for Dr. Asha Rao (Cardiologist) is $800.00."
+    where = r.route("Where is the dermatology department?")
+    assert where.intent == "doctor_location" and "Block B, 1st floor" in where.response
+    assert "Tue, Thu 2pm-6pm" in r.route("What are Dr. Shah's timings?").response
+
+
+def test_booking_and_time_questions_go_to_the_agent():
+    r, _ = router()
+    assert r.route("Book Dr. Asha Rao tomorrow at 10am") is None
+    assert r.route("Is Dr. Shah free at 3pm?") is None
+    assert r.route("My knee hurts after running") is None
+
+
+def test_threshold_and_registered_handlers():
+    r, _ = router(threshold=0.99)
+    assert r.route("Which doctors do you have?") is None    # confidence 0.9
+
+    @r.register
+    def insurance(ctx):
+        if "insurance" in ctx.text.lower():
+            return RouteResult("insurance", 1.0, "We accept all major insurers.")
+    assert r.route("Do you take insurance?").intent == "insurance"
+
+
+def test_catalog_is_loaded_once_per_ttl():
+    r, loads = router(catalog_ttl=60)
+    for _ in range(3):
+        r.route("How much does Dr. Shah charge?")
+    assert len(loads) == 1
+    r.catalog_ttl = -1
+    r.route("How much does Dr. Shah charge?")
+    assert len(loads) == 2
+
+
+def test_stats_count_bypassed_turns():
+    r, _ = router()
+    r.record("greeting", 2.0)
+    r.record("agent", 900.0)
+    stats = r.stats()
+    assert stats["turns"] == 2 and stats["llm_bypass_rate"] == 0.5
+    assert stats["routes"]["agent"] == {"turns": 1, "avg_latency_ms": 900.0}
@@ -0,0 +1,87 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.tools.schedule import DoctorSchedules, parse_availability_text
+
+MONDAY = date(2030, 1, 7)
+
+
+def at(hour, minute=0, day=MONDAY):
+    return datetime.combine(day, time(hour, minute))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Mon-Fri 9am-1pm", [(day, 540, 780) for day in range(5)]),
+    ("Tue, Thu 10:00-13:00 and 14:00-17:00", [(1, 600, 780), (1, 840, 1020), (3, 600, 780), (3, 840, 1020)]),
+    ("Weekdays 9-5; Sat 10am-2pm", [(day, 540, 1020) for day in range(5)] + [(5, 600, 840)]),
+    ("Sat-Mon 2-5pm, Sun closed", [(0, 840, 1020), (5, 840, 1020), (6, 840, 1020)]),
+    ("By appointment", []),
+])
+def test_parse_availability_text(text, expected):
+    assert parse_availability_text(text) == expected
+
+
+def schedules(rules=(), exceptions=()):
+    return DoctorSchedules(load=lambda start, end: (list(rules), list(exceptions)))
+
+
+def test_free_slots_follow_rules_and_busy_time():
+    # Mondays 9:00-12:00 in 30-minute slots.
+    engine = schedules(rules=[(1, 0, 540, 720, 30, None, None)])
+    assert engine.free_slots(1, MONDAY, busy_intervals=[(at(9, 40), at(10, 10))]) == [
+        at(9), at(10, 30), at(11), at(11, 30)
+    ]
+    assert engine.free_slots(1, MONDAY, after=at(10, 50), limit=1) == [at(11)]
+    assert engine.free_slots(1, MONDAY + timedelta(days=1)) == []
+    assert engine.capacity_minutes(1, MONDAY) == 180
+
+
+def test_is_bookable_and_outside_hours():
+    engine = schedules(rules=[(1, 0, 540, 720, 30, None, None)])
+    assert engine.is_bookable(1, at(9, 30), at(10))
+    assert not engine.is_bookable(1, at(9, 15), at(9, 45))
+    assert engine.outside_hours(1, at(9, 15), at(9, 45)) == "slots start at 09:00, 09:30, 10:00, 10:30, 11:00, 11:30"
+    assert engine.outside_hours(1, at(11, 30), at(12, 30)) == "11:30-12:30 is outside the doctor's working hours"
+    assert "does not work on Tuesday" in engine.outside_hours(1, at(9, day=MONDAY + timedelta(days=1)),
+                                                               at(10, day=MONDAY + timedelta(days=1)))
+
+
+def test_doctors_without_rules_keep_clinic_hours():
+    engine = schedules()
+    assert engine.slot_starts(7, MONDAY + timedelta(days=6)) == [f"{hour:02d}:00" for hour in range(9, 18)]
+
+
+def test_exceptions_close_and_open_days():
+    engine = schedules(
+        rules=[(1, 0, 540, 720, 60, None, MONDAY + timedelta(days=7))],
+        exceptions=[
+            (1, MONDAY, 600, 660, False, 60),                       # 10-11 off
+            (None, MONDAY + timedelta(days=1), None, None, False, 60),  # clinic closed all day
+            (1, MONDAY + timedelta(days=2), 840, 960, True, 60),    # extra Wednesday afternoon
+        ],
+    )
+    assert engine.slot_starts(1, MONDAY) == ["09:00", "10:00", "11:00"]    # starts stay, but 10:00 is closed
+    assert engine.free_slots(1, MONDAY) == [at(9), at(11)]
+    assert engine.free_slots(2, MONDAY + timedelta(days=1)) == []
+    assert engine.free_slots(1, MONDAY + timedelta(days=2)) == [at(14, day=MONDAY + timedelta(days=2)),
+                                                                at(15, day=MONDAY + timedelta(days=2))]
+    assert engine.free_slots(1, MONDAY + timedelta(days=14)) == []      # past valid_until
+
+
+def test_committed_rule_changes_reload(fresh_db):
+    engine = DoctorSchedules()
+    engine.watch(fresh_db.ScheduleRule, fresh_db.ScheduleException)
+    db = fresh_db.SessionLocal()
+    doctor = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800)
+    db.add(doctor)
+    db.commit()
+    assert len(engine.free_slots(doctor.id, MONDAY)) == 9
+    db.add(fresh_db.ScheduleRule(doctor_id=doctor.id, weekday=0, start_minute=540, end_minute=660, slot_minutes=60))
+    db.flush()
+    db.rollback()
+    assert len(engine.free_slots(doctor.id, MONDAY)) == 9
+    db.add(fresh_db.ScheduleRule(doctor_id=doctor.id, weekday=0, start_minute=540, end_minute=660, slot_minutes=60))
+    db.commit()
+    assert engine.free_slots(doctor.id, MONDAY) == [at(9), at(10)]
+    db.close()
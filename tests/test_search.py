@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import search
+from app.search import to_match
+
+MESSAGES = [
+    ("s1", "user", "I have chest pains and palpitations"),
+    ("s1", "assistant", "Dr. Asha Rao is our cardiologist"),
+    ("s2", "user", "Mild chest pain after running, C++ developer here"),
+    ("s2", "user", "Pain in the knee"),
+]
+
+
+@pytest.fixture
+def chat(fresh_db):
+    db = fresh_db.SessionLocal()
+    for i, (session_id, role, content) in enumerate(MESSAGES):
+        db.add(fresh_db.ChatHistory(session_id=session_id, role=role, content=content,
+                                    timestamp=datetime(2030, 1, 1, 9) + timedelta(minutes=i)))
+    db.commit()
+    db.close()
+
+
+def hits(client, q, **params):
+    response = client.get("/api/admin/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["items"]]
+
+
+def test_to_match_quotes_user_input():
+    assert to_match('chest "sharp pain" palp*') == '"chest" "sharp pain" "palp"*'
+    assert to_match('AND OR NOT ( ) "') is not None       # operators are just words
+    assert to_match("!!! ---") is None
+
+
+def test_words_match_their_forms_prefixes_and_phrases(client, chat):
+    assert hits(client, "chest pain", sort="recent") == [3, 1]
+    assert hits(client, "palp*") == [1]
+    assert hits(client, '"chest pain"', sort="recent") == [3, 1]
+    assert hits(client, "knee pain") == [4] and hits(client, '"knee pain"') == []
+    assert hits(client, "C++") == [3]
+    assert hits(client, "pain", session_id="s2", sort="recent") == [4, 3]
+    assert client.get("/api/admin/search", params={"q": "!!!"}).status_code == 400
+
+
+def test_ranked_results_page_with_cursors(client, chat):
+    first = client.get("/api/admin/search", params={"q": "pain", "limit": 2}).json()
+    second = client.get("/api/admin/search", params={"q": "pain", "limit": 2, "cursor": first["next_cursor"]}).json()
+    assert second["next_cursor"] is None
+    ids = [item["id"] for item in first["items"] + second["items"]]
+    assert sorted(ids) == [1, 3, 4]
+    scores = [item["score"] for item in first["items"] + second["items"]]
+    assert scores == sorted(scores, reverse=True)
+    assert all("<mark>" in item["snippet"] for item in first["items"])
+
+
+def test_index_follows_updates_and_deletes(client, chat, fresh_db):
+    with fresh_db.engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE chat_history SET content = 'Pain in the elbow' WHERE id = 4")
+        conn.exec_driver_sql("DELETE FROM chat_history WHERE id = 3")
+    assert hits(client, "knee") == []
+    assert hits(client, "elbow") == [4]
+    assert hits(client, "chest") == [1]
+    assert search.check(fresh_db.engine) == []
+
+
+def test_appointment_notes_are_searchable(client, fresh_db):
+    db = fresh_db.SessionLocal()
+    doctor = fresh_db.Doctor(name="Dr. Asha Rao", consultation_fee=800)
+    db.add(doctor)
+    db.flush()
+    start = datetime(2030, 1, 7, 10)
+    db.add(fresh_db.Appointment(doctor_id=doctor.id, patient_name="Ravi", start_time=start,
+                                end_time=start + timedelta(hours=1), notes="Follow-up for palpitations"))
+    db.commit()
+    db.close()
+    items = client.get("/api/admin/search", params={"q": "palpitation", "scope": "appointments"}).json()["items"]
+    assert [(item["patient"], item["doctor"]) for item in items] == [("Ravi", "Dr. Asha Rao")]
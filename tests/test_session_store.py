@@ -0,0 +1,86 @@
+import asyncio
+import sqlite3
+
+import pytest
+from google.adk.events.event import Event
+from google.genai import types
+
+from app.session_store import SqliteSessionService
+
+KEY = {"app_name": "app", "user_id": "user"}
+
+
+def message(author, text):
+    return Event(
+        author=author, invocation_id="inv",
+        content=types.Content(role="user" if author == "user" else "model", parts=[types.Part(text=text)])
+    )
+
+
+def texts(session):
+    return [e.content.parts[0].text for e in session.events]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return lambda **kwargs: SqliteSessionService(db_path=str(tmp_path / "sessions.db"), **kwargs)
+
+
+def test_events_survive_a_new_service_instance(store):
+    async def scenario():
+        first = store()
+        session = await first.create_session(**KEY, session_id="s1", state={"x": 1, "temp:y": 2})
+        await first.append_event(session, message("user", "hello"))
+        await first.append_event(session, message("agent", "hi"))
+
+        reloaded = await store().get_session(**KEY, session_id="s1")
+        assert texts(reloaded) == ["hello", "hi"]
+        assert reloaded.state == {"x": 1}
+    asyncio.run(scenario())
+
+
+def test_trim_keeps_max_events_starting_on_a_user_turn(store):
+    async def scenario():
+        service = store(max_events=4)
+        session = await service.create_session(**KEY, session_id="s1")
+        for turn in range(3):
+            await service.append_event(session, message("user", f"q{turn}"))
+            await service.append_event(session, message("agent", f"call{turn}"))
+            await service.append_event(session, message("agent", f"a{turn}"))
+
+        # The newest 4 are a1, q2, call2, a2: the orphaned a1 is dropped too.
+        assert texts(session) == ["q2", "call2", "a2"]
+        assert texts(await store(max_events=4).get_session(**KEY, session_id="s1")) == ["q2", "call2", "a2"]
+    asyncio.run(scenario())
+
+
+def test_append_to_a_stale_session_is_rejected(store):
+    async def scenario():
+        first, second = store(), store()
+        await first.create_session(**KEY, session_id="s1")
+        mine = await first.get_session(**KEY, session_id="s1")
+        theirs = await second.get_session(**KEY, session_id="s1")
+        await second.append_event(theirs, message("user", "their turn"))
+
+        with pytest.raises(ValueError, match="stale"):
+            await first.append_event(mine, message("user", "my turn"))
+        # The rejected event is not stored, and a fresh read sees the other turn.
+        assert texts(await first.get_session(**KEY, session_id="s1")) == ["their turn"]
+    asyncio.run(scenario())
+
+
+def test_evict_expired_removes_idle_sessions_only(store, tmp_path):
+    async def scenario():
+        service = store(ttl_seconds=60)
+        idle = await service.create_session(**KEY, session_id="idle")
+        await service.append_event(idle, message("user", "old"))
+        await service.create_session(**KEY, session_id="fresh")
+        with sqlite3.connect(tmp_path / "sessions.db") as conn:
+            conn.execute("UPDATE adk_sessions SET last_update_time = last_update_time - 120 WHERE id = 'idle'")
+
+        assert service.evict_expired() == 1
+        assert await service.get_session(**KEY, session_id="idle") is None
+        assert await service.get_session(**KEY, session_id="fresh") is not None
+        with sqlite3.connect(tmp_path / "sessions.db") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM adk_events").fetchone()[0] == 0
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import asyncio
+
+from app.tools.tool_cache import ToolCache, tool_cache
+
+
+def counting(cache, name, depends_on, during=None):
+    """A cached tool counting its calls; `during()` runs inside each call (a commit landing mid-miss)."""
+    calls = []
+
+    @cache.cached(name, depends_on=depends_on)
+    def tool(arg):
+        calls.append(arg)
+        if during:
+            during()
+        return f"answer {len(calls)}"
+    return tool, calls
+
+
+def test_hits_until_a_dependency_is_invalidated():
+    cache = ToolCache()
+    tool, calls = counting(cache, "tool", ("doctors",))
+    assert tool(1) == tool(1) == "answer 1"
+    cache.invalidate({"appointments"})
+    assert tool(1) == "answer 1"
+    cache.invalidate({"doctors"})
+    assert tool(1) == "answer 2" and calls == [1, 1]
+
+
+def test_miss_racing_an_invalidation_is_not_stored():
+    cache = ToolCache()
+    raced = [False]
+
+    def commit_once():
+        if not raced[0]:
+            raced[0] = True
+            cache.invalidate({"doctors"})
+
+    tool, calls = counting(cache, "tool", ("doctors",), during=commit_once)
+    assert tool(1) == "answer 1"      # returned, but computed across the commit
+    assert tool(1) == "answer 2"      # so it was not cached
+    assert tool(1) == "answer 2"
+    assert cache.stats()["tool"]["stale_puts"] == 1
+
+
+def test_async_miss_racing_an_invalidation_is_not_stored():
+    cache = ToolCache()
+    calls = []
+
+    @cache.cached("tool", depends_on=("appointments",))
+    async def tool():
+        calls.append(1)
+        await asyncio.sleep(0)
+        if len(calls) == 1:
+            cache.invalidate({"appointments"})
+        return len(calls)
+
+    assert asyncio.run(tool()) == 1
+    assert asyncio.run(tool()) == 2 and asyncio.run(tool()) == 2
+
+
+def test_commit_invalidates_and_rollback_does_not(fresh_db):
+    tool, calls = counting(tool_cache, "test_tool_cache_doctors", ("doctors",))
+    tool(1)
+    db = fresh_db.SessionLocal()
+    db.add(fresh_db.Doctor(name="Dr. Rolled Back", consultation_fee=100))
+    db.flush()
+    db.rollback()
+    tool(1)
+    assert len(calls) == 1
+    db.add(fresh_db.Doctor(name="Dr. Committed", consultation_fee=100))
+    db.commit()
+    db.close()
+    tool(1)
+    assert len(calls) == 2
@@ -0,0 +1,59 @@
+from sqlalchemy import create_engine
+
+from app import worker_sync
+from app.worker_sync import CacheSync, Lease
+
+
+def test_only_other_workers_commits_run_callbacks(fresh_db):
+    sync, other = CacheSync(fresh_db.DB_PATH), CacheSync(fresh_db.DB_PATH)
+    seen = []
+    sync.on_change({"doctors"}, seen.append)
+    assert sync.poll() == set()                 # baseline
+
+    with fresh_db.engine.begin() as conn:       # our own write: the caches already know
+        sync.bump(conn, ["doctors"])
+    sync.committed(["doctors"])
+    assert sync.poll() == set()
+
+    with fresh_db.engine.begin() as conn:       # another worker's write
+        other.bump(conn, ["doctors", "appointments"])
+    assert sync.poll() == {"doctors", "appointments"}
+    assert seen == [{"doctors"}]
+    assert sync.poll() == set() and sync.stats()["version_reads"] == 3
+
+
+def test_bumps_on_another_database_are_ignored(fresh_db, tmp_path):
+    elsewhere = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    with elsewhere.begin() as conn:
+        assert not fresh_db.cache_sync.bump(conn, ["doctors"])
+    elsewhere.dispose()
+
+
+def test_orm_commits_are_counted_and_rollbacks_are_not(fresh_db):
+    before = fresh_db.cache_sync.stats()["own_changes"].get("doctors", 0)
+    db = fresh_db.SessionLocal()
+    db.add(fresh_db.Doctor(name="Dr. Rolled Back", consultation_fee=100))
+    db.flush()
+    db.rollback()
+    assert fresh_db.cache_sync.stats()["own_changes"].get("doctors", 0) == before
+    db.add(fresh_db.Doctor(name="Dr. Committed", consultation_fee=100))
+    db.commit()
+    db.close()
+    assert fresh_db.cache_sync.stats()["own_changes"]["doctors"] == before + 1
+    with fresh_db.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT version FROM cache_versions WHERE name = 'doctors'").scalar() == 1
+
+
+def test_lease_has_one_holder_until_it_expires(fresh_db, monkeypatch):
+    mine = Lease(fresh_db.DB_PATH, "calendar_sync", ttl_seconds=60)
+    assert mine.acquire() and mine.acquire()    # renewing
+
+    monkeypatch.setattr(worker_sync, "WORKER_ID", "other-worker")
+    theirs = Lease(fresh_db.DB_PATH, "calendar_sync", ttl_seconds=60)
+    assert not theirs.acquire()
+    with fresh_db.engine.begin() as conn:       # the holder died a while ago
+        conn.exec_driver_sql("UPDATE worker_leases SET expires_at = 0")
+    assert theirs.acquire()
+    theirs.release()
+    with fresh_db.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM worker_leases").scalar() == 0